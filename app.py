@@ -3,7 +3,9 @@ import io
 import os
 import traceback
 
-from flask import Flask, render_template, request, jsonify, send_file
+import json
+
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 
 sys.path.insert(0, 'src')
 
@@ -14,13 +16,49 @@ from gp_parser_td   import generate_table_parser, TableParser
 from gp_visitor     import generate_visitor
 from gp_ontology    import generate_ontology
 from gp_sparql      import run_catalogue_query, run_custom_query, get_catalogue_info
-from gp_interpreter import parse_with_rd
+from gp_interpreter import parse_with_rd, parse_with_earley, steps_from_tree
+from gp_engine      import compile_rd
+from gp_packrat     import generate_packrat_parser
+from gp_normalize   import normalize
+from gp_incremental import IncrementalAnalysis, IncrementalParser, IncrementalPhrase
+from gp_reduce      import useless_symbols, useless_warnings, prune_useless
+from gp_optimize    import (merge_equivalent, inline_nonterminals, table_size,
+                            regular_nonterminals, hoist_tokens)
+from gp_batch       import compile_grammar, parse_batch, read_phrases
+from gp_table       import compress_table
+from gp_lr          import build_lr_tables, LRParser, METHODS as LR_METHODS
+from gp_simplify    import TreeSimplifier, tree_size
+from gp_cache       import ParseCache
+from gp_scanner     import Scanner, grammar_scanner_rules
 from gp_helpers     import *
 from gp_db  import visitor_save, visitor_list, visitor_load, visitor_delete
 from gp_svg import tree_to_svg
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
+# Últimas análises (grammar_hash → IncrementalAnalysis): /api/analyse com
+# 'previous' só recalcula o que a edição afetou
+_analyses      = {}
+_ANALYSES_KEEP = 32
+
+# Resumo LR (LALR(1)) de /api/analyse por (texto exato, prune): construir a
+# coleção de estados custa mais do que o resto da análise
+_lr_summaries = {}
+_LR_KEEP      = 32
+
+# Front-end do editor: só volta a parsear os blocos de regras/tokens alterados
+_front_end = IncrementalParser()
+
+# Frases em edição (sessão do cliente + gramática + opções → IncrementalPhrase):
+# /api/parse_edit recebe só a alteração do texto e reaproveita tokens e subárvores
+_phrases      = {}
+_PHRASES_KEEP = 32
+
+# Resultados de /api/parse_phrase e árvores de /api/run_visitor, por
+# (gramática, frase, parser, opções): alternar separadores ou repetir o
+# visitor não volta a fazer o parse
+_parse_cache = ParseCache(max_bytes=32 << 20, max_entries=1024, ttl=600)
+
 
 @app.route('/')
 def index():
@@ -31,24 +69,53 @@ def index():
 @app.route('/api/analyse', methods=['POST'])
 def analyse():
     src     = request.get_json().get('grammar', '')
-    grammar = parse_grammar(src)
+    grammar = _front_end.parse(src)
     errors  = get_parse_errors()
     warnings = get_parse_warnings()
 
     if grammar is None:
         return jsonify({'ok': False, 'errors': errors})
 
-    first       = compute_first(grammar)
-    follow      = compute_follow(grammar, first)
-    conflicts   = check_ll1(grammar, first, follow)
+    # Símbolos inúteis: avisos sempre; com 'prune' a análise usa a gramática reduzida
+    useless  = useless_symbols(grammar)
+    warnings = warnings + useless_warnings(grammar, useless)
+    if request.get_json().get('prune'):
+        grammar, _ = prune_useless(grammar, useless)
+
+    previous = _analyses.get(request.get_json().get('previous', ''))
+    analysis = previous.fork().update(grammar) if previous else IncrementalAnalysis(grammar)
+    _analyses.pop(grammar_hash(src), None)
+    _analyses[grammar_hash(src)] = analysis
+    while len(_analyses) > _ANALYSES_KEEP:
+        del _analyses[next(iter(_analyses))]
+
+    first       = analysis.first
+    follow      = analysis.follow
+    conflicts   = analysis.conflicts
     suggestions = suggest_fixes(grammar, conflicts)
-    table       = build_parse_table(grammar, first, follow)
+    table       = analysis.table
 
     llk_result = None
     if conflicts:
         k, _ = check_llk(grammar, max_k=5)
         llk_result = k
 
+    # 'lr': false dispensa o resumo LR; senão vem da cache ou é calculado uma vez
+    lr = None
+    if request.get_json().get('lr', True):
+        lr_key = (source_hash(src), bool(request.get_json().get('prune')))
+        lr     = _lr_summaries.pop(lr_key, None)
+        if lr is None:
+            lr_tables = build_lr_tables(grammar, 'lalr')
+            lr = {
+                'method':    LR_METHODS[lr_tables.method],
+                'states':    len(lr_tables.kernels),
+                'conflicts': ser_conflicts(lr_tables.conflicts),
+            }
+        _lr_summaries[lr_key] = lr
+        while len(_lr_summaries) > _LR_KEEP:
+            del _lr_summaries[next(iter(_lr_summaries))]
+
     return jsonify({
         'ok':           True,
         'warnings':     warnings,
@@ -59,6 +126,11 @@ def analyse():
         'suggestions':  ser_suggestions(suggestions),
         'table':        ser_table(table, grammar),
         'llk':          llk_result,
+        'useless': {
+            'unproductive': useless['unproductive'],
+            'unreachable':  useless['unreachable'],
+        },
+        'lr':           lr,
         'grammar_hash': grammar_hash(src),
     })
 
@@ -84,38 +156,126 @@ def apply_suggestions():
     if not replacements:
         return jsonify({'ok': False, 'errors': ['Nenhuma sugestão aplicável.']})
 
+    replacements = define_helpers(replacements, rules_of(grammar), grammar.ebnf_helpers)
     return jsonify({'ok': True, 'grammar': rebuild_grammar(src, replacements)})
 
 
+_NORMALIZE_MAX_ROUNDS = 50
+
+
+@app.route('/api/normalize', methods=['POST'])
+def normalize_endpoint():
+    """Aplica as sugestões ronda a ronda até a gramática ser LL(1) (ou deixar de mudar)."""
+    body = request.get_json()
+    try:
+        # Cada ronda recalcula FIRST/FOLLOW e os conflitos: limitar o pedido
+        rounds = max(1, min(int(body.get('max_rounds', 20)), _NORMALIZE_MAX_ROUNDS))
+        result = normalize(body.get('grammar', ''), max_rounds=rounds)
+    except ValueError as e:
+        return jsonify({'ok': False, 'errors': str(e).splitlines()})
+
+    return jsonify({
+        'ok':        True,
+        'grammar':   result['grammar'],
+        'll1':       result['ll1'],
+        'conflicts': ser_conflicts(result['conflicts']),
+        'rounds':    result['rounds'],
+        'time_ms':   result['time_ms'],
+    })
+
+
+@app.route('/api/optimize', methods=['POST'])
+def optimize_endpoint():
+    """
+    Funde NTs equivalentes e depois faz o inlining de produções unitárias
+    e de NTs usados uma só vez (sem novos conflitos LL(1)).
+
+    'hoist' (true ou lista de NTs) converte antes disso as sub-linguagens
+    regulares em tokens; 'regular' lista sempre os NTs candidatos.
+    """
+    body    = request.get_json()
+    src     = body.get('grammar', '')
+    grammar = parse_grammar(src)
+    if grammar is None:
+        return jsonify({'ok': False, 'errors': get_parse_errors()})
+
+    merged  = merge_equivalent(grammar, src)
+    spec, text, hoisted = merged['spec'], merged['grammar'], {}
+    if body.get('hoist'):
+        only    = None if body['hoist'] is True else set(body['hoist'])
+        result  = hoist_tokens(spec, text, only)
+        spec, text, hoisted = result['spec'], result['grammar'], result['hoisted']
+    inlined = inline_nonterminals(spec, text)
+    return jsonify({
+        'ok':      True,
+        'grammar': inlined['grammar'],
+        'renames': merged['renames'],
+        'regular': list(regular_nonterminals(grammar)),
+        'hoisted': hoisted,
+        'inlined': inlined['inlined'],
+        'rules':   [len(grammar.get_rules()), len(inlined['spec'].get_rules())],
+        'table':   {'before': merged['table']['before'], 'after': table_size(inlined['spec'])},
+        'time_ms': round(merged['time_ms'] + inlined['time_ms'], 3),
+    })
+
+
 @app.route('/api/generate', methods=['POST'])
 def generate():
     src     = request.get_json().get('grammar', '')
     grammar = parse_grammar(src)
     if grammar is None:
         return jsonify({'ok': False, 'errors': get_parse_errors()})
+    if request.get_json().get('prune'):
+        grammar, _ = prune_useless(grammar)
 
     first  = compute_first(grammar)
     follow = compute_follow(grammar, first)
 
+    # Com conflitos LL(1) só o RD é gerado, em modo packrat (backtracking
+    # memorizado); a tabela LL(1) teria células com várias produções.
     conflicts = check_ll1(grammar, first, follow)
     if conflicts:
+        try:
+            rd = generate_packrat_parser(grammar, first, follow)
+        except ValueError as e:
+            return jsonify({
+                'ok':            False,
+                'has_conflicts': True,
+                'errors': [
+                    f'A gramática tem {len(conflicts)} conflito(s) LL(1). {e}'
+                ],
+            })
         return jsonify({
-            'ok':            False,
-            'has_conflicts': True,
-            'errors': [
-                f'A gramática tem {len(conflicts)} conflito(s) LL(1). '
-                'Aplica as sugestões antes de gerar os parsers.'
-            ],
+            'ok':      True,
+            'mode':    'packrat',
+            'rd':      rd,
+            'td':      None,
+            'visitor': generate_visitor(grammar),
         })
 
     return jsonify({
         'ok':      True,
-        'rd':      generate_rd_parser(grammar, first, follow),
+        'mode':    'll1',
+        'rd':      generate_rd_parser(grammar, first, follow,
+                                      pratt=bool(request.get_json().get('pratt'))),
         'td':      generate_table_parser(grammar, first, follow),
         'visitor': generate_visitor(grammar),
     })
 
 
+_TOO_DEEP = 'Frase demasiado profunda: a árvore de derivação excede o limite de recursão'
+
+
+def _simplifier(grammar, option):
+    """'simplify': true (tudo) ou {epsilon, chains, lists, keep}; None = árvore completa."""
+    if not option:
+        return None
+    if option is True:
+        return TreeSimplifier(grammar)
+    return TreeSimplifier(grammar, **{k: option[k] for k in ('epsilon', 'chains', 'lists', 'keep')
+                                      if k in option})
+
+
 @app.route('/api/parse_phrase', methods=['POST'])
 def parse_phrase():
     body        = request.get_json()
@@ -123,52 +283,220 @@ def parse_phrase():
     phrase      = body.get('phrase', '')
     parser_type = body.get('parser_type', 'td')
 
+    key = _parse_cache.key(src, phrase, parser_type,
+                           {'simplify': body.get('simplify'), 'pratt': bool(body.get('pratt'))})
+    cached = _parse_cache.get(key)
+    if cached is not None:
+        return jsonify({'ok': True, 'cached': True, **cached})
+
     grammar = parse_grammar(src)
     if grammar is None:
         return jsonify({'ok': False, 'errors': get_parse_errors()})
+    simplify = _simplifier(grammar, body.get('simplify'))
 
     first    = compute_first(grammar)
     follow   = compute_follow(grammar, first)
-    table    = build_parse_table(grammar, first, follow)
+    table    = compress_table(build_parse_table(grammar, first, follow), grammar)
     patterns = build_patterns(grammar)
 
+    # Com conflitos LL(1), RD/TD escolheriam sempre a primeira alternativa
+    # da célula: usar o parser geral (Earley), que considera todas.
+    if parser_type in ('td', 'rd') and table.conflicts:
+        parser_type = 'earley'
+
+    derivations = 1
     try:
-        if parser_type == 'rd':
-            tree, steps = parse_with_rd(grammar, first, follow, phrase, patterns)
+        if parser_type == 'earley':
+            tree, steps, derivations = parse_with_earley(grammar, phrase, simplify=simplify)
+        elif parser_type == 'rd':
+            tree, steps = parse_with_rd(grammar, first, follow, phrase, patterns,
+                                        simplify=simplify, pratt=bool(body.get('pratt')))
+        elif parser_type == 'lr':
+            parser = LRParser(grammar, 'lalr', simplify=simplify)
+            tree   = parser.parse(phrase, trace=True)
+            steps  = parser.steps
         else:
-            parser = TableParser(grammar, table, phrase, patterns)
+            tokens = Scanner(grammar_scanner_rules(grammar)).tokenize(phrase)
+            parser = TableParser(grammar, table, phrase, patterns, tokens=tokens,
+                                 simplify=simplify)
             tree   = parser.parse()
             steps  = parser.steps
+
+        result = {
+            'tree_svg':    tree_to_svg(tree),
+            'tree_size':   tree_size(tree),
+            'steps':       steps,
+            'parser_type': parser_type,
+            'derivations': derivations if derivations != float('inf') else '∞',
+        }
     except SyntaxError as e:
         return jsonify({'ok': False, 'errors': [str(e)]})
+    except RecursionError:
+        # Árvores muito profundas (ex.: listas recursivas à esquerda no Earley)
+        return jsonify({'ok': False, 'errors': [_TOO_DEEP]})
+    _parse_cache.put(key, **result)
+    return jsonify({'ok': True, **result})
 
-    return jsonify({
-        'ok':          True,
-        'tree_svg':    tree_to_svg(tree),
-        'steps':       steps,
-        'parser_type': parser_type,
-    })
+
+@app.route('/api/parse_cache', methods=['GET'])
+def parse_cache_stats():
+    """Métricas da cache de resultados de parse (entradas, bytes, taxa de acertos)."""
+    return jsonify({'ok': True, **_parse_cache.stats()})
+
+
+@app.route('/api/parse_edit', methods=['POST'])
+def parse_edit():
+    """
+    Análise incremental da frase com o parser RD. {'session', 'grammar',
+    'phrase'} começa (ou recomeça) a sessão; depois {'session', 'grammar',
+    'edit': {'offset', 'deleted', 'inserted'}} aplica a edição ao texto
+    anterior. 'session' é um token gerado pelo cliente (um por editor), para
+    dois clientes com a mesma gramática não partilharem a frase. 'simplify' e
+    'pratt' como em /api/parse_phrase. 'resync': true pede ao cliente a frase
+    completa.
+
+    A resposta traz só 'incremental' (tokens relexados, subárvores
+    reaproveitadas, ...): desenhar a árvore e os passos é O(n) por edição, por
+    isso tree_svg, tree_size e steps só vêm com 'render': true.
+    """
+    body    = request.get_json()
+    src     = body.get('grammar', '')
+    session = body.get('session')
+    if not isinstance(session, str) or not session:
+        return jsonify({'ok': False, 'errors': ["Falta o token 'session' do cliente."]})
+    key = json.dumps([session, source_hash(src), body.get('simplify'), bool(body.get('pratt'))])
+    phrase = _phrases.pop(key, None)
+    if phrase is None:
+        if 'phrase' not in body:
+            return jsonify({'ok': False, 'resync': True,
+                            'errors': ['Sem frase anterior nesta sessão: envie a frase completa.']})
+        grammar = parse_grammar(src)
+        if grammar is None:
+            return jsonify({'ok': False, 'errors': get_parse_errors()})
+        first  = compute_first(grammar)
+        follow = compute_follow(grammar, first)
+        if check_ll1(grammar, first, follow):
+            return jsonify({'ok': False, 'errors': [
+                'A análise incremental usa o parser RD: a gramática tem conflitos LL(1).']})
+        phrase = IncrementalPhrase(grammar, first, follow,
+                                   _simplifier(grammar, body.get('simplify')),
+                                   bool(body.get('pratt')))
+    _phrases[key] = phrase
+    while len(_phrases) > _PHRASES_KEEP:
+        del _phrases[next(iter(_phrases))]
+
+    try:
+        if 'phrase' in body:
+            tree = phrase.parse(body['phrase'])
+        else:
+            edit = body.get('edit') or {}
+            tree = phrase.edit(int(edit.get('offset', 0)), int(edit.get('deleted', 0)),
+                               edit.get('inserted', ''))
+    except ValueError as e:
+        return jsonify({'ok': False, 'resync': True, 'errors': [str(e)]})
+    except SyntaxError as e:
+        return jsonify({'ok': False, 'errors': [str(e)], 'incremental': phrase.last_update})
+
+    result = {'ok': True, 'parser_type': 'rd', 'incremental': phrase.last_update}
+    if body.get('render'):
+        steps = steps_from_tree(tree)
+        steps.append({'step': len(steps) + 1, 'stack': [], 'input': '$', 'action': 'ACEITE'})
+        result.update(tree_svg=tree_to_svg(tree), tree_size=tree_size(tree), steps=steps)
+    return jsonify(result)
+
+
+@app.route('/api/parse_batch', methods=['POST'])
+def parse_batch_endpoint():
+    """
+    Parseia muitas frases com a gramática compilada uma só vez.
+
+    JSON:    {grammar, phrases: [...], parser_type, workers, ordered, svg}
+    NDJSON:  1.ª linha {grammar, parser_type, workers, ordered, svg}; cada linha
+             seguinte é uma frase ("..." ou {"phrase": "..."}).
+
+    Responde em NDJSON, uma linha {index, ok, error, time_ms} por frase,
+    enviada à medida que cada frase termina (pela ordem de entrada se
+    ordered=true). Com workers > 0 os processos ficam vivos entre pedidos
+    com a mesma gramática e o mesmo parser (gp_batch.shared_service).
+    """
+    # Erros do pedido (JSON inválido, 'workers' não numérico) são 'request';
+    # os da gramática (inválida, ou com conflitos LL(1) no 'td') são 'grammar'
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            lines   = iter(request.stream)
+            body    = json.loads(next(lines, b'{}'))
+            phrases = read_phrases(lines)
+        else:
+            body    = request.get_json()
+            phrases = body.get('phrases', [])
+
+        src         = body.get('grammar', '')
+        parser_type = body.get('parser_type', 'td')
+        workers     = max(0, min(int(body.get('workers', 0)), os.cpu_count() or 1))
+        svg         = bool(body.get('svg', False))
+        ordered     = bool(body.get('ordered', False))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'ok': False, 'error_kind': 'request',
+                        'errors': [f'Pedido inválido: {e}']}), 400
+
+    try:
+        compiled = compile_grammar(src, parser_type)
+    except ValueError as e:
+        return jsonify({'ok': False, 'error_kind': 'grammar',
+                        'errors': str(e).splitlines()}), 400
+
+    def generate():
+        try:
+            for result in parse_batch(src, phrases, parser_type, workers, svg,
+                                      compiled=compiled, ordered=ordered):
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+        except ValueError as e:
+            # Linha NDJSON inválida a meio do fluxo: as respostas anteriores já seguiram
+            yield json.dumps({'ok': False, 'error_kind': 'request',
+                              'error': str(e)}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 @app.route('/api/download/<ptype>', methods=['POST'])
 def download(ptype):
-    src     = request.get_json().get('grammar', '')
-    grammar = parse_grammar(src)
+    body       = request.get_json()
+    src        = body.get('grammar', '')
+    standalone = bool(body.get('standalone_lexer', False))
+    adaptive   = bool(body.get('adaptive', False))
+    pratt      = bool(body.get('pratt', False))
+    grammar    = parse_grammar(src)
     if grammar is None:
         return jsonify({'ok': False, 'errors': get_parse_errors()}), 400
+    if body.get('prune'):
+        grammar, _ = prune_useless(grammar)
 
     first  = compute_first(grammar)
     follow = compute_follow(grammar, first)
 
-    mapping = {
-        'rd':      (generate_rd_parser(grammar, first, follow),    'rd.py'),
-        'td':      (generate_table_parser(grammar, first, follow), 'td.py'),
-        'visitor': (generate_visitor(grammar),                     'visitor.py'),
-    }
-    if ptype not in mapping:
+    if ptype not in ('rd', 'td', 'visitor'):
         return jsonify({'ok': False, 'errors': ['Tipo inválido']}), 400
 
-    code, name = mapping[ptype]
+    # Com conflitos LL(1): RD em modo packrat e sem parser TD (ver /api/generate)
+    conflicts = check_ll1(grammar, first, follow)
+    if ptype == 'td' and conflicts:
+        return jsonify({'ok': False, 'errors': ['A gramática tem conflitos LL(1).']}), 400
+
+    try:
+        if ptype == 'rd' and conflicts and adaptive:
+            code = generate_rd_parser(grammar, first, follow, standalone, adaptive=True)
+        elif ptype == 'rd' and conflicts:
+            code = generate_packrat_parser(grammar, first, follow, standalone)
+        elif ptype == 'rd':
+            code = generate_rd_parser(grammar, first, follow, standalone, pratt=pratt)
+        elif ptype == 'td':
+            code = generate_table_parser(grammar, first, follow, standalone)
+        else:
+            code = generate_visitor(grammar)
+    except ValueError as e:
+        return jsonify({'ok': False, 'errors': [str(e)]}), 400
+
+    name = f'{ptype}.py'
     buf = io.BytesIO(code.encode())
     buf.seek(0)
     return send_file(buf, mimetype='text/plain', as_attachment=True, download_name=name)
@@ -261,22 +589,38 @@ def run_visitor():
     phrase       = body.get('phrase', '')
     visitor_code = body.get('visitor_code', '')
 
-    grammar = parse_grammar(src)
-    if grammar is None:
-        return jsonify({'ok': False, 'error_kind': 'grammar',
-                        'errors': get_parse_errors()})
-
-    first    = compute_first(grammar)
-    follow   = compute_follow(grammar, first)
-    table    = build_parse_table(grammar, first, follow)
-    patterns = build_patterns(grammar)
-
-    try:
-        parser = TableParser(grammar, table, phrase, patterns)
-        tree   = parser.parse()
-    except SyntaxError as e:
-        return jsonify({'ok': False, 'error_kind': 'phrase',
-                        'errors': [f'Erro na frase de input: {e}']})
+    # Cada pedido recebe uma árvore nova da cache: o visitor pode alterá-la à vontade
+    key    = _parse_cache.key(src, phrase, 'visitor',
+                              {'simplify': body.get('simplify'), 'pratt': bool(body.get('pratt'))})
+    cached = _parse_cache.get(key)
+    if cached is not None:
+        tree = cached['tree']
+    else:
+        grammar = parse_grammar(src)
+        if grammar is None:
+            return jsonify({'ok': False, 'error_kind': 'grammar',
+                            'errors': get_parse_errors()})
+
+        first  = compute_first(grammar)
+        follow = compute_follow(grammar, first)
+
+        # 'simplify': o visitor vê a árvore simplificada (sem ε, cadeias nem espinhas de listas)
+        # 'pratt': as expressões com operadores binários dão a árvore binária compacta
+        # Com conflitos LL(1) usa o Earley, como /api/parse_phrase (o RD escolheria
+        # sempre a primeira alternativa da célula)
+        simplify = _simplifier(grammar, body.get('simplify'))
+        try:
+            if check_ll1(grammar, first, follow):
+                tree, _, _ = parse_with_earley(grammar, phrase, simplify=simplify)
+            else:
+                tree = compile_rd(grammar, first, follow, simplify,
+                                  pratt=bool(body.get('pratt'))).parse(phrase)
+        except SyntaxError as e:
+            return jsonify({'ok': False, 'error_kind': 'phrase',
+                            'errors': [f'Erro na frase de input: {e}']})
+        except RecursionError:
+            return jsonify({'ok': False, 'error_kind': 'phrase', 'errors': [_TOO_DEEP]})
+        _parse_cache.put(key, tree=tree)
 
     try:
         compiled = compile(visitor_code, '<visitor>', 'exec')
@@ -25,8 +25,9 @@ class CodeGen(Visitor):
         return "\n".join(self.log)
 
     def visit_StmtList(self, node):
-        self.visit(node.children[0])
-        self.visit(node.children[1])
+        for child in node.children:          # Stmt StmtListR, ou binária (pratt): StmtList ; Stmt
+            if child.lexema is None:
+                self.visit(child)
 
     def visit_StmtListR(self, node):
         if node.children[0].label == "ε":
@@ -41,6 +42,8 @@ class CodeGen(Visitor):
         self.log.append(f"{var} = {val}")
 
     def visit_Expr(self, node):
+        if len(node.children) == 3:          # árvore binária (pratt): Expr + Term
+            return self.visit(node.children[0]) + self.visit(node.children[2])
         val  = self.visit(node.children[0])
         rest = self.visit(node.children[1])
         return val if rest is None else val + rest
@@ -0,0 +1,91 @@
+"""
+Grammar Playground — micro-benchmarks
+
+Compara o parser dirigido por tabela gerado no formato legível
+(parsing_table[NT][tipo], compact=False) com o formato compacto
+(ids inteiros, compact=True), com e sem construção da árvore, e mede o
+débito do ParseService (gp_batch) com 1, 2, 4, ... processos.
+
+Uso:
+    python bench_gp.py                # 2000 instruções, 5 repetições
+    python bench_gp.py 10000 3        # N instruções, R repetições
+    python bench_gp.py batch 20000    # débito do lote com N frases
+"""
+
+import os
+import sys
+import time
+
+from gp_parser import parse_grammar
+from gp_analysis import compute_first, compute_follow
+from gp_parser_td import generate_table_parser
+from gp_batch import ParseService
+from main import EXAMPLE_GRAMMAR
+
+
+def load(code):
+    ns = {}
+    exec(compile(code, '<bench>', 'exec'), ns)
+    return ns
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def example_phrase(n):
+    return ' ; '.join(f'x{i} := a + {i} + b' for i in range(n))
+
+
+def bench_td(n=2000, repeat=5):
+    grammar = parse_grammar(EXAMPLE_GRAMMAR)
+    first   = compute_first(grammar)
+    follow  = compute_follow(grammar, first)
+
+    old = load(generate_table_parser(grammar, first, follow, standalone_lexer=True, compact=False))
+    new = load(generate_table_parser(grammar, first, follow, standalone_lexer=True, compact=True))
+
+    phrase = example_phrase(n)
+    n_tok  = len(new['tokenizer'](phrase))
+    t_lex  = best_of(lambda: new['tokenizer'](phrase), repeat)
+
+    results = [
+        ('TD legível (parsing_table)', best_of(lambda: old['parse'](phrase), repeat)),
+        ('TD compacto (árvore)',       best_of(lambda: new['parse'](phrase), repeat)),
+        ('TD compacto (sem árvore)',   best_of(lambda: new['parse'](phrase, build_tree=False), repeat)),
+    ]
+
+    print(f"Frase com {n} instruções ({n_tok} tokens); tokenização: {t_lex * 1e3:.1f} ms")
+    base = results[0][1]
+    for label, t in results:
+        print(f"  {label:<30} {t * 1e3:9.1f} ms   ×{base / t:5.2f}")
+
+
+def bench_batch(n=20000):
+    phrases = [example_phrase(1 + i % 8) for i in range(n)]
+    cores   = os.cpu_count() or 1
+    counts  = sorted({1 << k for k in range(cores.bit_length()) if 1 << k <= cores} | {cores})
+
+    print(f"{n} frases, {cores} núcleos")
+    base = None
+    for workers in counts:
+        with ParseService(EXAMPLE_GRAMMAR, workers=workers) as service:
+            t0 = time.perf_counter()
+            ok = sum(r['ok'] for r in service.map(phrases))
+            t  = time.perf_counter() - t0
+        base = base or t
+        print(f"  {workers:3} processos  {n / t:10.0f} frases/s   ×{base / t:5.2f}   ({ok} aceites)")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        bench_batch(int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
+        sys.exit(0)
+    n      = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    bench_td(n, repeat)
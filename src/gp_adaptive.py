@@ -0,0 +1,352 @@
+"""
+gp_adaptive.py — Predição adaptativa com DFAs de lookahead em cache (estilo ALL(*)).
+
+Nas decisões com conflito LL(1), em vez de um k fixo ou de backtracking,
+as alternativas são simuladas sobre os tokens seguintes só até ficar uma.
+O caminho percorrido fica num DFA por decisão (estado = conjunto de
+configurações, arestas = tipos de token), pelo que a mesma decisão com um
+lookahead já visto custa apenas algumas consultas a dicionários.
+
+    predictor = AdaptivePredictor(grammar, first)
+    alt = predictor.predict('Stmt', tokens, pos)    # índice da alternativa
+    predictor.stats()                              # estatísticas por decisão
+    predictor.cache_size()                         # estados e arestas em cache
+
+Uma configuração é (alternativa, pilha de símbolos por reconhecer, topo
+primeiro). Na fase SLL o contexto abaixo da decisão é desconhecido: a pilha
+termina numa marca de retorno ('↑', X) que continua em qualquer sítio onde
+X aparece na gramática. Se mesmo assim houver conflito e o chamador der o
+contexto real (a pilha do TableParser), repete-se a simulação em LL
+completo, sem cache. Ambiguidades verdadeiras resolvem-se pela primeira
+alternativa, como no ANTLR.
+
+Gramáticas recursivas à esquerda são rejeitadas (ValueError), tal como no
+modo packrat.
+"""
+
+from gp_helpers   import is_epsilon_seq
+from gp_parser_rd import _tipo, _lookahead
+from gp_packrat   import _check_left_recursion
+
+
+class DFAState:
+    """Estado do DFA de lookahead de uma decisão."""
+
+    __slots__ = ('configs', 'alts', 'edges', 'prediction', 'conflict')
+
+    def __init__(self, configs):
+        self.configs    = configs
+        self.alts       = {alt for alt, _ in configs}
+        self.edges      = {}          # tipo de token → DFAState
+        self.prediction = next(iter(self.alts)) if len(self.alts) == 1 else None
+        self.conflict   = self.prediction is None and bool(self.alts) and _all_conflict(configs)
+
+
+def _all_conflict(configs):
+    """Todas as pilhas são partilhadas por mais de uma alternativa: mais tokens não ajudam."""
+    by_stack = {}
+    for alt, stack in configs:
+        by_stack.setdefault(stack, set()).add(alt)
+    return all(len(alts) > 1 for alts in by_stack.values())
+
+
+class AdaptivePredictor:
+    """Predição ALL(*) simplificada sobre as produções da gramática."""
+
+    def __init__(self, grammar, first):
+        _check_left_recursion(grammar, first)
+        self.start        = grammar.get_start()
+        self.nts          = set(grammar.get_nonterminals())
+        self.alternatives = {}    # NT → [SeqNode] (ordem da regra)
+        self.rhs          = {}    # NT → [tuplo de símbolos normalizados]
+        self.callers      = {}    # X → [(cabeça, símbolos após X)]
+
+        for rule in grammar.get_rules():
+            nt = rule.get_head_name()
+            self.alternatives[nt] = list(rule.altlist.sequences)
+            self.rhs[nt] = [
+                () if is_epsilon_seq(seq) else tuple(
+                    _tipo(s.get_value()) if s.get_is_terminal() else s.get_value()
+                    for s in seq.symbols
+                )
+                for seq in rule.altlist.sequences
+            ]
+        for head, alts in self.rhs.items():
+            for rhs in alts:
+                for i, sym in enumerate(rhs):
+                    if sym in self.nts:
+                        self.callers.setdefault(sym, []).append((head, rhs[i + 1:]))
+
+        self.dfa        = {}      # NT → {configurações: DFAState}
+        self.start_of   = {}      # NT → DFAState inicial
+        self.decision   = {}      # NT → estatísticas
+        self.last_depth = 0       # tokens de lookahead usados na última predição
+
+    # ── Simulação ─────────────────────────────────────────────────────
+
+    def _closure(self, configs):
+        """Expande não-terminais e marcas de retorno até cada pilha começar num terminal."""
+        out, seen, work = set(), set(), list(configs)
+        while work:
+            config = work.pop()
+            if config in seen:
+                continue
+            seen.add(config)
+            alt, stack = config
+            if not stack:
+                out.add(config)                          # '$' já consumido
+                continue
+            top = stack[0]
+            if top in self.nts:
+                for rhs in self.rhs[top]:
+                    work.append((alt, rhs + stack[1:]))
+            elif type(top) is tuple:                     # ('↑', X): regressa a um chamador
+                X = top[1]
+                for head, tail in self.callers.get(X, ()):
+                    work.append((alt, tail + (('↑', head),)))
+                if X == self.start:
+                    work.append((alt, ('$',)))
+            else:
+                out.add(config)
+        return frozenset(out)
+
+    def _move(self, configs, tipo):
+        return self._closure([(alt, stack[1:]) for alt, stack in configs
+                              if stack and stack[0] == tipo])
+
+    def _state(self, nt, configs):
+        states = self.dfa[nt]
+        st = states.get(configs)
+        if st is None:
+            st = states[configs] = DFAState(configs)
+        return st
+
+    def _start(self, nt):
+        st = self.start_of.get(nt)
+        if st is None:
+            self.dfa[nt] = {}
+            self.decision[nt] = {'predictions': 0, 'hits': 0, 'misses': 0,
+                                 'max_lookahead': 0, 'full_ll': 0, 'ambiguous': 0}
+            marker = ('↑', nt)
+            st = self._state(nt, self._closure(
+                [(alt, rhs + (marker,)) for alt, rhs in enumerate(self.rhs[nt])]
+            ))
+            self.start_of[nt] = st
+        return st
+
+    # ── Predição ──────────────────────────────────────────────────────
+
+    def predict(self, nt, tokens, pos, context=None):
+        """
+        Índice da alternativa de nt a usar em tokens[pos:], ou None se
+        nenhuma for viável. context: função sem argumentos que devolve a
+        pilha real abaixo de nt (topo primeiro); só é chamada se a fase
+        SLL terminar em conflito.
+        """
+        st    = self._start(nt)
+        stats = self.decision[nt]
+        stats['predictions'] += 1
+
+        i = pos
+        while st.prediction is None and not st.conflict and st.alts:
+            tipo = tokens[i][0]
+            i += 1
+            nxt  = st.edges.get(tipo)
+            if nxt is None:
+                nxt = st.edges[tipo] = self._state(nt, self._move(st.configs, tipo))
+                stats['misses'] += 1
+            else:
+                stats['hits'] += 1
+            st = nxt
+            if tipo == '$':
+                break
+
+        self.last_depth = i - pos
+        stats['max_lookahead'] = max(stats['max_lookahead'], self.last_depth)
+        if st.prediction is not None:
+            return st.prediction
+        if not st.alts:
+            return None
+
+        if context is not None:
+            stats['full_ll'] += 1
+            alt = self._predict_ll(nt, tokens, pos, tuple(context()))
+            if alt is not None:
+                return alt
+        stats['ambiguous'] += 1
+        return min(st.alts)
+
+    def _predict_ll(self, nt, tokens, pos, context):
+        """LL completo: as mesmas configurações, mas sobre a pilha real (sem cache)."""
+        configs = self._closure([(alt, rhs + context) for alt, rhs in enumerate(self.rhs[nt])])
+        i = pos
+        while True:
+            alts = {alt for alt, _ in configs}
+            if len(alts) <= 1:
+                return next(iter(alts), None)
+            if _all_conflict(configs):
+                return None
+            tipo    = tokens[i][0]
+            configs = self._move(configs, tipo)
+            i += 1
+            self.last_depth = max(self.last_depth, i - pos)
+            if tipo == '$':
+                alts = {alt for alt, _ in configs}
+                return next(iter(alts)) if len(alts) == 1 else None
+
+    # ── Estatísticas ──────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        """Por decisão: predições, arestas em cache vs calculadas, lookahead máximo..."""
+        return {
+            nt: dict(s, states=len(self.dfa[nt]),
+                     edges=sum(len(st.edges) for st in self.dfa[nt].values()))
+            for nt, s in self.decision.items()
+        }
+
+    def cache_size(self) -> dict:
+        return {
+            'decisions': len(self.dfa),
+            'states':    sum(len(states) for states in self.dfa.values()),
+            'edges':     sum(len(st.edges) for states in self.dfa.values()
+                             for st in states.values()),
+        }
+
+
+def build_predictor(grammar, first) -> AdaptivePredictor:
+    return AdaptivePredictor(grammar, first)
+
+
+def conflicting_decisions(grammar, first, follow):
+    """Não-terminais com alternativas cujos lookaheads LL(1) se sobrepõem."""
+    nts    = grammar.get_nonterminals()
+    result = set()
+    for rule in grammar.get_rules():
+        nt, seen = rule.get_head_name(), set()
+        for seq in rule.altlist.sequences:
+            la = {_tipo(t) for t in _lookahead(seq, nt, first, follow, nts)}
+            if la & seen:
+                result.add(nt)
+            seen |= la
+    return result
+
+
+# ── Código gerado ─────────────────────────────────────────────────────
+
+def emit_predictor(w, predictor):
+    """
+    Emite _predict(nt) para o parser RD gerado: a mesma simulação SLL com
+    DFA em cache e, em conflito, LL completo sobre _ctx (a pilha de
+    continuações que o parser gerado mantém em modo adaptativo).
+    """
+    w('')
+    w('# ── Predição adaptativa (SLL, DFA de lookahead em cache por decisão) ──')
+    w('')
+    w('_RHS = {')
+    for nt, alts in predictor.rhs.items():
+        w(f'    {nt!r}: {alts!r},')
+    w('}')
+    w('_CALLERS = {')
+    for nt, callers in predictor.callers.items():
+        w(f'    {nt!r}: {callers!r},')
+    w('}')
+    w(f'_START_NT = {predictor.start!r}')
+    w('_DFA = {}   # NT → (estado inicial, {configurações: estado})')
+    w('_ctx = []   # o que falta de cada alternativa em curso (contexto para o LL completo)')
+    w('')
+    w('')
+    w('def _all_conflict(configs):')
+    w('    by_stack = {}')
+    w('    for alt, stack in configs:')
+    w('        by_stack.setdefault(stack, set()).add(alt)')
+    w('    return all(len(a) > 1 for a in by_stack.values())')
+    w('')
+    w('')
+    w('class _DFAState:')
+    w("    __slots__ = ('configs', 'alts', 'edges', 'prediction', 'conflict')")
+    w('')
+    w('    def __init__(self, configs):')
+    w('        self.configs    = configs')
+    w('        self.alts       = {alt for alt, _ in configs}')
+    w('        self.edges      = {}')
+    w('        self.prediction = next(iter(self.alts)) if len(self.alts) == 1 else None')
+    w('        self.conflict   = self.prediction is None and bool(self.alts) and _all_conflict(configs)')
+    w('')
+    w('')
+    w('def _closure(configs):')
+    w('    out, seen, work = set(), set(), list(configs)')
+    w('    while work:')
+    w('        config = work.pop()')
+    w('        if config in seen:')
+    w('            continue')
+    w('        seen.add(config)')
+    w('        alt, stack = config')
+    w('        if not stack:')
+    w('            out.add(config)')
+    w('            continue')
+    w('        top = stack[0]')
+    w('        if type(top) is tuple:                 # marca de retorno: qualquer chamador')
+    w('            for head, tail in _CALLERS.get(top[1], ()):')
+    w("                work.append((alt, tail + (('↑', head),)))")
+    w('            if top[1] == _START_NT:')
+    w("                work.append((alt, ('$',)))")
+    w('        elif top in _RHS:')
+    w('            for rhs in _RHS[top]:')
+    w('                work.append((alt, rhs + stack[1:]))')
+    w('        else:')
+    w('            out.add(config)')
+    w('    return frozenset(out)')
+    w('')
+    w('')
+    w('def _predict(nt):')
+    w('    entry = _DFA.get(nt)')
+    w('    if entry is None:')
+    w("        configs = _closure([(alt, rhs + (('↑', nt),)) for alt, rhs in enumerate(_RHS[nt])])")
+    w('        start   = _DFAState(configs)')
+    w('        entry   = _DFA[nt] = (start, {configs: start})')
+    w('    st, states = entry')
+    w('    i = token_pos')
+    w('    while st.prediction is None and not st.conflict and st.alts:')
+    w('        tipo = token_stream[i][0]')
+    w('        i += 1')
+    w('        nxt  = st.edges.get(tipo)')
+    w('        if nxt is None:')
+    w('            configs = _closure([(alt, stack[1:]) for alt, stack in st.configs')
+    w('                                if stack and stack[0] == tipo])')
+    w('            nxt = states.get(configs)')
+    w('            if nxt is None:')
+    w('                nxt = states[configs] = _DFAState(configs)')
+    w('            st.edges[tipo] = nxt')
+    w('        st = nxt')
+    w("        if tipo == '$':")
+    w('            break')
+    w('    if st.prediction is not None:')
+    w('        return st.prediction')
+    w('    if not st.alts:')
+    w('        return None')
+    w('    return _predict_ll(nt, min(st.alts))')
+    w('')
+    w('')
+    w('def _predict_ll(nt, default):')
+    w('    # Conflito SLL: mesma simulação sobre o contexto real, sem cache')
+    w("    context = tuple(sym for tail in reversed(_ctx) for sym in tail) + ('$',)")
+    w('    configs = _closure([(alt, rhs + context) for alt, rhs in enumerate(_RHS[nt])])')
+    w('    i = token_pos')
+    w('    while True:')
+    w('        alts = {alt for alt, _ in configs}')
+    w('        if len(alts) == 1:')
+    w('            return alts.pop()')
+    w('        if not alts or _all_conflict(configs):')
+    w('            return default')
+    w('        tipo = token_stream[i][0]')
+    w('        i += 1')
+    w('        configs = _closure([(alt, stack[1:]) for alt, stack in configs')
+    w('                            if stack and stack[0] == tipo])')
+    w('')
+    w('')
+    w('def dfa_stats():')
+    w('    """Estados e arestas em cache por decisão."""')
+    w('    return {nt: {"states": len(states),')
+    w('                 "edges": sum(len(s.edges) for s in states.values())}')
+    w('            for nt, (_, states) in _DFA.items()}')
+    w('')
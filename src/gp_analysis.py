@@ -1,4 +1,6 @@
 from gp_ast import SpecNode, SeqNode, SymbolNode
+from gp_transform import (rules_of, rule_text, left_recursive_sccs, eliminate_left_recursion_scc,
+                          left_factor_trie, fresh_name)
 
 
 def compute_first(grammar):
@@ -75,50 +77,67 @@ def check_ll1(grammar, first, follow):
     nts = grammar.get_nonterminals()
     conflicts = []
     for rule in grammar.get_rules():
-        A = rule.get_head_name()
-        seqs = rule.altlist.sequences
-        n = len(seqs)
-        seq_firsts = [first_of_seq(seq.symbols, first, nts) for seq in seqs]
-
-        # 1. Conflito FIRST/FIRST: duas alternativas com terminais em comum
-        for i in range(n):
-            for j in range(i + 1, n):
-                intersection = (seq_firsts[i] - {'ε'}) & (seq_firsts[j] - {'ε'})
-                if intersection:
-                    conflicts.append({
-                        'type': 'FIRST/FIRST',
-                        'nonterminal': A,
-                        'alts': (repr(seqs[i]), repr(seqs[j])),
-                        'symbols': intersection,
-                    })
-
-        # 2. Conflito FIRST/FOLLOW: alternativa anulável cujo FOLLOW
-        #    interseta com o FIRST de outra alternativa
-        for i in range(n):
-            if 'ε' in seq_firsts[i]:
-                all_other_firsts = set()
-                for j in range(n):
-                    if j != i:
-                        all_other_firsts |= (seq_firsts[j] - {'ε'})
-                intersection = follow[A] & all_other_firsts
-                if intersection:
-                    conflicts.append({
-                        'type': 'FIRST/FOLLOW',
-                        'nonterminal': A,
-                        'alts': (repr(seqs[i]),),
-                        'symbols': intersection,
-                    })
-
-        # 3. Múltiplas alternativas anuláveis: se mais de uma alternativa
-        #    pode derivar ε, há conflito para todos os tokens do FOLLOW
-        nullable_indices = [i for i in range(n) if 'ε' in seq_firsts[i]]
-        if len(nullable_indices) > 1 and follow[A]:
-            conflicts.append({
-                'type': 'FIRST/FOLLOW',
-                'nonterminal': A,
-                'alts': tuple(repr(seqs[i]) for i in nullable_indices),
-                'symbols': follow[A].copy(),
-            })
+        conflicts.extend(check_rule_ll1(rule.get_head_name(), rule.altlist.sequences,
+                                        first, follow, nts))
+    return conflicts
+
+
+def check_rule_ll1(A, seqs, first, follow, nts):
+    """
+    Conflitos LL(1) de um bloco de regra (A -> seqs).
+    Indexa as alternativas por terminal, para que regras com centenas de
+    alternativas sem conflitos custem O(Σ |FIRST|) e não O(n²).
+    """
+    conflicts = []
+    n = len(seqs)
+    seq_firsts = [first_of_seq(seq.symbols, first, nts) for seq in seqs]
+
+    owners = {}   # terminal → alternativas cujo FIRST o contém
+    for i, sf in enumerate(seq_firsts):
+        for t in sf:
+            if t != 'ε':
+                owners.setdefault(t, []).append(i)
+
+    # 1. Conflito FIRST/FIRST: duas alternativas com terminais em comum
+    shared = {}
+    for t, alts in owners.items():
+        for x in range(len(alts)):
+            for y in range(x + 1, len(alts)):
+                shared.setdefault((alts[x], alts[y]), set()).add(t)
+    for i, j in sorted(shared):
+        conflicts.append({
+            'type': 'FIRST/FIRST',
+            'nonterminal': A,
+            'alts': (repr(seqs[i]), repr(seqs[j])),
+            'symbols': shared[(i, j)],
+        })
+
+    # 2. Conflito FIRST/FOLLOW: alternativa anulável cujo FOLLOW
+    #    interseta com o FIRST de outra alternativa
+    for i in range(n):
+        if 'ε' in seq_firsts[i]:
+            intersection = {
+                t for t in follow[A]
+                if len(owners.get(t, ())) - (t in seq_firsts[i]) > 0
+            }
+            if intersection:
+                conflicts.append({
+                    'type': 'FIRST/FOLLOW',
+                    'nonterminal': A,
+                    'alts': (repr(seqs[i]),),
+                    'symbols': intersection,
+                })
+
+    # 3. Múltiplas alternativas anuláveis: se mais de uma alternativa
+    #    pode derivar ε, há conflito para todos os tokens do FOLLOW
+    nullable_indices = [i for i in range(n) if 'ε' in seq_firsts[i]]
+    if len(nullable_indices) > 1 and follow[A]:
+        conflicts.append({
+            'type': 'FIRST/FOLLOW',
+            'nonterminal': A,
+            'alts': tuple(repr(seqs[i]) for i in nullable_indices),
+            'symbols': follow[A].copy(),
+        })
 
     return conflicts
 
@@ -223,83 +242,12 @@ def _seq_to_str(symbols):
     return ' '.join(s.get_value() for s in symbols) if symbols else 'ε'
 
 
-def longest_common_prefix_syms(sequences):
-    """Devolve lista de valores (str) do prefixo comum mais longo entre as sequências."""
-    if not sequences:
-        return []
-    min_len = min(len(seq) for seq in sequences)
-    prefix = []
-    for i in range(min_len):
-        val = sequences[0][i]
-        if all(seq[i] == val for seq in sequences):
-            prefix.append(val)
-        else:
-            break
-    return prefix
-
-
-def left_factor_recursive(rule_name, alt_lists, prime_counter):
-    """
-    alt_lists: lista de listas de str (símbolos de cada alternativa).
-    Devolve lista de strings "NT -> alt1 | alt2 | ..." prontas a inserir na gramática.
-    Fatoriza recursivamente até não haver prefixo comum.
-    """
-    # Agrupar por primeiro símbolo
-    groups = {}
-    for syms in alt_lists:
-        key = syms[0] if syms else 'ε'
-        groups.setdefault(key, []).append(syms)
-
-    new_rules = []
-    main_alts = []
-
-    for key, group in groups.items():
-        if len(group) == 1:
-            s = ' '.join(group[0]) if group[0] else 'ε'
-            main_alts.append(s)
-        else:
-            prefix = longest_common_prefix_syms(group)
-            if not prefix:
-                for syms in group:
-                    s = ' '.join(syms) if syms else 'ε'
-                    main_alts.append(s)
-                continue
-
-            prime_counter[0] += 1
-            prime_name = rule_name + "'" * prime_counter[0]
-
-            prefix_str = ' '.join(prefix)
-            main_alts.append(f"{prefix_str} {prime_name}")
-
-            remainders = []
-            for syms in group:
-                rest = syms[len(prefix):]
-                remainders.append(rest if rest else [])  # [] = ε
-
-            # Verificar se os restos ainda têm conflito → fatorizar recursivamente
-            # Agrupar restos por primeiro símbolo para detetar se há prefixo
-            rem_groups = {}
-            for r in remainders:
-                k = r[0] if r else 'ε'
-                rem_groups.setdefault(k, []).append(r)
-
-            needs_more = any(len(v) > 1 for v in rem_groups.values())
-
-            if needs_more:
-                sub_rules = left_factor_recursive(prime_name, remainders, prime_counter)
-                new_rules.extend(sub_rules)
-            else:
-                rem_strs = [' '.join(r) if r else 'ε' for r in remainders]
-                new_rules.append(f"{prime_name} -> {' | '.join(rem_strs)}")
-
-    new_rules.insert(0, f"{rule_name} -> {' | '.join(main_alts)}")
-    return new_rules
-
-
-def left_factor(rule_name, sequences):
+def left_factor(rule_name, sequences, taken=None):
     """
     Ponto de entrada para fatorização à esquerda.
     sequences: lista de SeqNode
+    taken: nomes já usados na gramática (os NT' novos não colidem com eles)
+    Devolve lista de strings "NT -> alt1 | alt2 | ..." prontas a inserir na gramática.
     """
     # Converter SeqNode → lista de str
     alt_lists = []
@@ -309,8 +257,8 @@ def left_factor(rule_name, sequences):
         else:
             alt_lists.append([s.get_value() for s in seq.symbols])
 
-    prime_counter = [0]
-    return left_factor_recursive(rule_name, alt_lists, prime_counter)
+    factored = left_factor_trie(rule_name, alt_lists, set(taken or ()))
+    return [rule_text(nt, alts) for nt, alts in factored.items()]
 
 
 def has_left_recursion(rule_name, sequences):
@@ -329,10 +277,17 @@ def has_any_direct_left_recursion(grammar):
     return False
 
 
-def eliminate_left_recursion(rule_name, sequences):
+def has_any_left_recursion(grammar):
+    """True se algum não-terminal é recursivo à esquerda, direta ou indiretamente
+    (ciclos no grafo de canto esquerdo, incluindo prefixos anuláveis)."""
+    return bool(left_recursive_sccs(rules_of(grammar)))
+
+
+def eliminate_left_recursion(rule_name, sequences, taken=None):
     """
     Elimina recursividade à esquerda directa.
     Devolve lista de regras em texto, ou None se não houver recursão.
+    taken: nomes já usados na gramática (o NT' novo não colide com eles)
     """
     recursive = []
     nonrecursive = []
@@ -345,7 +300,7 @@ def eliminate_left_recursion(rule_name, sequences):
     if not recursive:
         return None
 
-    prime = f"{rule_name}'"
+    prime = fresh_name(rule_name, taken or ())
     base_alts = []
     for seq in nonrecursive:
         seq_str = _seq_to_str(seq.symbols)
@@ -374,19 +329,52 @@ def suggest_fixes(grammar, conflicts):
     suggestions = []
     seen = set()
 
+    # Ciclos à esquerda com mais de um NT (A -> B α, B -> A β): tratados por componente
+    rules    = rules_of(grammar)
+    indirect = {nt: scc for scc in left_recursive_sccs(rules) if len(scc) > 1 for nt in scc}
+
     for c in conflicts:
         A = c['nonterminal']
         if A in seen:
             continue
         seen.add(A)
 
+        if A in indirect:
+            scc = indirect[A]
+            seen.update(scc)
+            cycle = ' → '.join(scc + [scc[0]])
+            result = eliminate_left_recursion_scc(rules, scc)
+            if result is None:
+                suggestions.append({
+                    'nonterminal': A,
+                    'type': c['type'],
+                    'technique': 'Sem correção automática possível',
+                    'aplicavel': False,
+                    'message': (
+                        f'Recursividade à esquerda escondida atrás de prefixos '
+                        f'anuláveis no ciclo {cycle}: elimina primeiro as '
+                        f'produções ε desses não-terminais.'
+                    ),
+                    'new_rules': [],
+                })
+            else:
+                suggestions.append({
+                    'nonterminal': A,
+                    'type': c['type'],
+                    'technique': 'Eliminação de recursividade à esquerda indireta',
+                    'aplicavel': True,
+                    'message': f'Ciclo {cycle}',
+                    'new_rules': [rule_text(nt, alts) for nt, alts in result.items()],
+                })
+            continue
+
         rule = next(r for r in grammar.get_rules() if r.get_head_name() == A)
         seqs = rule.altlist.sequences
         original = f"{A} -> {' | '.join(_seq_to_str(s.symbols) for s in seqs)}"
 
         # Tentar eliminar recursividade à esquerda
         if has_left_recursion(A, seqs):
-            result = eliminate_left_recursion(A, seqs)
+            result = eliminate_left_recursion(A, seqs, taken=rules)
             suggestions.append({
                 'nonterminal': A,
                 'type': c['type'],
@@ -399,7 +387,7 @@ def suggest_fixes(grammar, conflicts):
 
         # Tentar fatorização à esquerda (só faz sentido para FIRST/FIRST)
         if c['type'] == 'FIRST/FIRST':
-            new_rules = left_factor(A, seqs)
+            new_rules = left_factor(A, seqs, taken=rules)
             # Verificar se houve alteração real
             if len(new_rules) == 1 and new_rules[0] == original:
                 suggestions.append({
@@ -469,7 +457,7 @@ def check_llk(grammar, max_k=5):
 
     nts = grammar.get_nonterminals()
 
-    if has_any_direct_left_recursion(grammar):
+    if has_any_left_recursion(grammar):
         return None, conflicts_1
 
     for k in range(2, max_k + 1):
@@ -48,9 +48,38 @@ class EpsilonNode:
         print(prefix + c + repr(self))
 
 
+class EbnfNode:
+    """Primary EBNF: ( AltList ) ou símbolo com operador '*', '+' ou '?' (op '' = só grupo)."""
+
+    def __init__(self, altlist, op=''):
+        self.altlist = altlist    # AltListNode
+        self.op      = op
+
+    @property
+    def value(self):
+        seqs = self.altlist.sequences
+        if len(seqs) == 1 and len(seqs[0].symbols) == 1 and self.op:
+            return f'{seqs[0]}{self.op}'
+        return f"({' | '.join(repr(s) for s in seqs)}){self.op}"
+
+    def __repr__(self):
+        return f'EBNF: {self.value}'
+
+    def __eq__(self, other):
+        return (isinstance(other, EbnfNode) and
+                self.op == other.op and
+                self.altlist == other.altlist)
+
+    def print_tree(self, prefix="", is_last=True):
+        c = "└── " if is_last else "├── "
+        ext = "    " if is_last else "│   "
+        print(prefix + c + (f"EBNF: '{self.op}'" if self.op else "Group"))
+        self.altlist.print_tree(prefix + ext, is_last=True)
+
+
 
 class SymbolNode:
-    """Symbol → NON_TERMINAL | TERMINAL | 'quoted' | epsilon"""
+    """Symbol → NON_TERMINAL | TERMINAL | 'quoted' | epsilon | EBNF"""
 
     def __init__(self, child):
         self.child = child
@@ -259,6 +288,7 @@ class SpecNode:
         self.axioma       = axioma        # AxiomaNode
         self.rulelist     = rulelist      # RuleListNode
         self.tokensection = tokensection  # TokenSectionNode
+        self.ebnf_helpers = {}            # NT auxiliar → operador EBNF de origem
 
     def __repr__(self):
         return f'SpecNode(axioma={self.axioma}, rules={self.rulelist}, tokens={self.tokensection})'
@@ -0,0 +1,384 @@
+"""
+gp_batch.py — Parsing de muitas frases contra uma gramática compilada uma vez.
+
+A gramática é analisada uma única vez (ASA, FIRST/FOLLOW, tabela LL(1) e
+scanner); cada frase custa apenas a tokenização e o parse. Com workers > 0
+as frases são distribuídas por um ParseService partilhado entre pedidos
+(shared_service): os processos compilam a gramática uma vez, no
+initializer, e servem os pedidos seguintes com a mesma gramática. Os
+resultados são devolvidos à medida que terminam (não pela ordem de
+entrada — usar 'index'), ou pela ordem de entrada com ordered=True.
+
+Os pools usam sempre o método de arranque 'spawn': são criados dentro de
+pedidos do Flask (processo com várias threads), onde um fork pode copiar
+locks apanhados a meio por outra thread. Cada worker recebe o texto da
+gramática no initializer; para 'td' isso é só mapear o ficheiro .gpk já
+gravado pelo pai (gp_packed), sem recompilar. O processo guarda os
+SERVICES_KEEP serviços mais recentes, por (source_hash, parser_type); os
+outros fecham quando o último pedido que os usa termina.
+
+    compiled = compile_grammar(src, parser_type='td')
+    compiled.check(0, "x := 1")        # {'index': 0, 'ok': True, 'error': None, 'time_ms': ...}
+
+    for r in parse_batch(src, phrases, workers=4):
+        ...
+
+    read_phrases(linhas_ndjson)        # cada linha: "frase" ou {"phrase": "..."}
+
+Para validar corpora grandes em máquinas com muitos núcleos, ParseService
+mantém um pool persistente e devolve os resultados pela ordem de entrada.
+
+    with ParseService(src, workers=32) as service:
+        for r in service.map(frases):
+            ...
+
+    with shared_service(src, 'rd', workers=4) as service:   # reaproveitado entre pedidos
+        ...
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import multiprocessing as mp
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from gp_parser    import parse_grammar, get_parse_errors
+from gp_analysis  import compute_first, compute_follow, check_ll1, build_parse_table
+from gp_parser_td import TableParser
+from gp_engine    import compile_rd
+from gp_packrat   import compile_packrat
+from gp_adaptive  import AdaptivePredictor
+from gp_lr        import compile_lr
+from gp_earley    import compile_earley
+from gp_scanner   import Scanner, grammar_scanner_rules
+from gp_packed    import get_packed
+from gp_helpers   import source_hash
+from gp_table     import compress_table
+
+
+class CompiledGrammar:
+    """Gramática analisada uma vez, pronta para parsear muitas frases."""
+
+    def __init__(self, grammar, parser_type='td'):
+        if parser_type not in ('td', 'adaptive', 'rd', 'packrat', 'lr', 'earley'):
+            raise ValueError(f"Tipo de parser inválido: {parser_type!r}")
+
+        self.grammar     = grammar
+        self.parser_type = parser_type
+        self.src         = None   # texto original (preenchido por compile_grammar)
+        self.first       = compute_first(grammar)
+        self.follow      = compute_follow(grammar, self.first)
+
+        if parser_type == 'rd':
+            self.engine = compile_rd(grammar, self.first, self.follow)
+            self.scanner = self.engine.scanner
+        elif parser_type == 'packrat':
+            self.engine  = compile_packrat(grammar, self.first, self.follow)
+            self.scanner = self.engine.scanner
+        elif parser_type == 'lr':
+            self.engine  = compile_lr(grammar, 'lalr')
+            self.scanner = self.engine.scanner
+        elif parser_type == 'earley':
+            self.engine  = compile_earley(grammar)
+            self.scanner = self.engine.scanner
+        else:
+            # 'td' escolhe uma só produção por célula e ficaria em ciclo numa
+            # recursão à esquerda; o 'adaptive' resolve os conflitos com lookahead
+            # (e rejeita a recursão à esquerda no AdaptivePredictor)
+            conflicts = check_ll1(grammar, self.first, self.follow) if parser_type == 'td' else []
+            if conflicts:
+                raise ValueError(f"A gramática tem {len(conflicts)} conflito(s) LL(1): "
+                                 f"o parser 'td' precisa de uma gramática LL(1).")
+            self.table   = compress_table(build_parse_table(grammar, self.first, self.follow),
+                                          grammar)
+            self.scanner = Scanner(grammar_scanner_rules(grammar))
+            # 'adaptive': o cache de DFAs do preditor é partilhado por todas as frases
+            self.predictor = (AdaptivePredictor(grammar, self.first)
+                              if parser_type == 'adaptive' else None)
+
+    def parse(self, phrase):
+        """Devolve a árvore de derivação (TreeNode) ou levanta SyntaxError."""
+        tokens = self.scanner.tokenize(phrase)
+        if self.parser_type in ('rd', 'packrat', 'lr'):
+            return self.engine.parse_tokens(tokens)
+        if self.parser_type == 'earley':
+            return self.engine.parse(tokens=tokens)
+        return TableParser(self.grammar, self.table, phrase,
+                           tokens=tokens, trace=False, predictor=self.predictor).parse()
+
+    def check(self, index, phrase, svg=False):
+        """Resultado serializável de uma frase: aceite/rejeitada, erro e tempo."""
+        t0 = time.perf_counter()
+        try:
+            tree  = self.parse(phrase)
+            error = None
+        except SyntaxError as e:
+            tree  = None
+            error = str(e)
+        result = {
+            'index':   index,
+            'ok':      error is None,
+            'error':   error,
+            'time_ms': round((time.perf_counter() - t0) * 1e3, 3),
+        }
+        if svg and tree is not None:
+            from gp_svg import tree_to_svg
+            result['tree_svg'] = tree_to_svg(tree)
+        return result
+
+
+def compile_grammar(src, parser_type='td'):
+    """
+    Analisa o texto da gramática; levanta ValueError com os erros se inválida.
+
+    Para 'td' devolve a gramática empacotada (gp_packed): o ficheiro
+    <source_hash>.gpk é mapeado só de leitura e partilhado por todos os
+    processos que servem a mesma gramática.
+    """
+    if parser_type == 'td':
+        return get_packed(src)
+    grammar = parse_grammar(src)
+    if grammar is None:
+        raise ValueError('\n'.join(get_parse_errors()) or 'Gramática inválida')
+    compiled = CompiledGrammar(grammar, parser_type)
+    compiled.src = src
+    return compiled
+
+
+def read_phrases(lines):
+    """
+    Gera as frases de um fluxo NDJSON (linhas vazias são ignoradas).
+    Uma linha que não seja JSON, ou um objeto sem 'phrase', levanta
+    ValueError com o número da linha.
+    """
+    for n, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+            yield item['phrase'] if isinstance(item, dict) else str(item)
+        except (json.JSONDecodeError, KeyError) as e:
+            raise ValueError(f"Linha {n} do NDJSON inválida: {e}") from None
+
+
+# ── Pool de processos ─────────────────────────────────────────────────
+
+_compiled = None   # gramática compilada de cada processo do pool (só nos workers)
+
+
+def _init_worker(src, parser_type):
+    global _compiled
+    _compiled = compile_grammar(src, parser_type)
+
+
+def _worker_args(compiled):
+    """Argumentos do initializer: o texto da gramática e o tipo de parser."""
+    if compiled.src is None:
+        raise ValueError("A gramática compilada não tem o texto original (usar compile_grammar)")
+    return compiled.src, compiled.parser_type
+
+
+def _check_chunk(chunk, svg):
+    return [_compiled.check(i, phrase, svg) for i, phrase in chunk]
+
+
+def _chunks(phrases, size):
+    chunk = []
+    for item in enumerate(phrases):
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_batch(src, phrases, parser_type='td', workers=0, svg=False, chunksize=64,
+                compiled=None, ordered=False):
+    """
+    Gera um resultado por frase (ver CompiledGrammar.check).
+
+    workers=0 parseia no próprio processo, pela ordem de entrada. Com
+    workers > 0 as frases seguem em blocos de 'chunksize' para o
+    ParseService partilhado desta gramática (shared_service) e os
+    resultados saem à medida que cada bloco termina (ou pela ordem de
+    entrada com ordered=True). 'phrases' pode ser um iterável preguiçoso
+    (ex.: read_phrases sobre um stream): só são lidos os blocos
+    necessários para manter o pool ocupado.
+
+    A gramática é compilada antes do primeiro resultado (ou reaproveitada
+    de 'compiled'), pelo que uma gramática inválida levanta ValueError
+    logo na primeira iteração.
+    """
+    if compiled is None:
+        compiled = compile_grammar(src, parser_type)
+
+    if workers <= 0:
+        for i, phrase in enumerate(phrases):
+            yield compiled.check(i, phrase, svg)
+        return
+
+    with shared_service(compiled, workers=workers) as service:
+        yield from service.map(phrases, svg=svg, ordered=ordered, chunksize=chunksize)
+
+
+class ParseService:
+    """
+    Pool persistente de processos que servem uma gramática.
+
+    Os workers arrancam com 'spawn' e compilam a gramática no initializer a
+    partir do texto (para 'td', mapeiam o .gpk que o pai já gravou). Nada
+    é partilhado através de variáveis globais do pai, pelo que vários
+    serviços podem coexistir no mesmo processo.
+
+    map() distribui blocos de 'chunksize' frases com no máximo
+    workers × 4 blocos em voo e devolve os resultados pela ordem de entrada
+    (ou à medida que cada bloco termina, com ordered=False). Vários pedidos
+    podem usar o mesmo serviço ao mesmo tempo (ver shared_service).
+    """
+
+    def __init__(self, grammar, parser_type='td', workers=None, chunksize=256, svg=False):
+        if isinstance(grammar, str):
+            compiled = compile_grammar(grammar, parser_type)
+        else:
+            compiled = grammar
+
+        self.compiled  = compiled
+        self.workers   = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.svg       = svg
+
+        self.pool = mp.get_context('spawn').Pool(self.workers, initializer=_init_worker,
+                                                 initargs=_worker_args(compiled))
+
+    def map(self, phrases, svg=None, ordered=True, chunksize=None):
+        """Gera um resultado por frase (ver CompiledGrammar.check), pela ordem de entrada."""
+        svg    = self.svg if svg is None else svg
+        chunks = _chunks(phrases, chunksize or self.chunksize)
+        limit  = self.workers * 4
+        if not ordered:
+            yield from self._unordered(chunks, svg, limit)
+            return
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(self.pool.apply_async(_check_chunk, (chunk, svg)))
+            if len(in_flight) >= limit:
+                yield from in_flight.popleft().get()
+        while in_flight:
+            yield from in_flight.popleft().get()
+
+    def _unordered(self, chunks, svg, limit):
+        done, pending = queue.SimpleQueue(), 0
+
+        def take():
+            result = done.get()
+            if isinstance(result, BaseException):
+                raise result
+            return result
+
+        for chunk in chunks:
+            self.pool.apply_async(_check_chunk, (chunk, svg),
+                                  callback=done.put, error_callback=done.put)
+            pending += 1
+            if pending >= limit:
+                pending -= 1
+                yield from take()
+        while pending:
+            pending -= 1
+            yield from take()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self.pool.terminate()
+
+
+# ── Serviços partilhados entre pedidos ────────────────────────────────
+
+_services      = OrderedDict()   # (source_hash, parser_type) → ParseService (LRU)
+_service_users = {}              # ParseService → nº de pedidos a usá-lo
+_retired       = set()           # fora do LRU: fecham quando o último pedido terminar
+_services_lock = threading.Lock()
+
+SERVICES_KEEP = int(os.environ.get('PARSE_SERVICES_KEEP', 4))   # pools vivos por processo
+
+
+def _retire(service, closing):
+    """Tira o serviço do LRU; fecha-o já se ninguém o estiver a usar (com o lock)."""
+    if _service_users.get(service):
+        _retired.add(service)
+    else:
+        _service_users.pop(service, None)
+        closing.append(service)
+
+
+@contextmanager
+def shared_service(compiled, parser_type='td', workers=None):
+    """
+    ParseService persistente para a gramática ('compiled' ou o texto), por
+    (source_hash, parser_type): os pedidos seguintes com a mesma gramática
+    reaproveitam os processos, sem voltar a compilar. Um pedido com outro nº
+    de workers substitui o serviço. Ao sair do LRU (SERVICES_KEEP), o serviço
+    fecha quando o último pedido que o usa terminar.
+    """
+    if isinstance(compiled, str):
+        compiled = compile_grammar(compiled, parser_type)
+    src, parser_type = _worker_args(compiled)
+    key     = (source_hash(src), parser_type)
+    workers = workers or os.cpu_count() or 1
+    closing = []
+    with _services_lock:
+        service = _services.get(key)
+        if service is not None and service.workers != workers:
+            _retire(_services.pop(key), closing)
+            service = None
+        if service is None:
+            service = _services[key] = ParseService(compiled, workers=workers)
+        _services.move_to_end(key)
+        _service_users[service] = _service_users.get(service, 0) + 1
+        while len(_services) > SERVICES_KEEP:
+            _retire(_services.popitem(last=False)[1], closing)
+    for old in closing:
+        old.close()
+
+    try:
+        yield service
+    finally:
+        with _services_lock:
+            _service_users[service] -= 1
+            done = service in _retired and not _service_users[service]
+            if done:
+                _retired.discard(service)
+                del _service_users[service]
+        if done:
+            service.close()
+
+
+def close_services():
+    """Fecha todos os serviços partilhados (à saída do processo e nos testes)."""
+    with _services_lock:
+        services = list(_services.values()) + list(_retired)
+        _services.clear()
+        _retired.clear()
+        _service_users.clear()
+    for service in services:
+        service.pool.terminate()
+        service.pool.join()
+
+
+atexit.register(close_services)
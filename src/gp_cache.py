@@ -0,0 +1,173 @@
+"""
+gp_cache.py — Cache LRU dos resultados de parse (árvore, passos, SVG).
+
+Os utilizadores alternam entre os separadores RD/TD, voltam a correr o
+visitor e recarregam a página com a mesma gramática e a mesma frase; cada
+pedido repetia o parse completo. ParseCache guarda o resultado com a chave
+
+    (sha256 da gramática, sha256 da frase, tipo de parser, opções)
+
+e limita a memória em bytes: os campos são guardados serializados e
+comprimidos (zlib), e a árvore num formato compacto (pack_tree) — uma
+tabela de strings sem repetições e um array de int32 em pré-ordem, em vez
+de um objeto TreeNode por nó.
+
+    cache = ParseCache(max_bytes=32 << 20, ttl=600)
+    key   = cache.key(src, phrase, 'rd', {'simplify': True})
+    hit   = cache.get(key)                    # dict com os campos, ou None
+    cache.put(key, tree=tree, steps=steps, tree_svg=svg)
+    cache.stats()   # {'entries', 'bytes', 'hits', 'misses', 'hit_rate', 'evictions', 'expired', ...}
+
+As entradas saem pela ordem LRU quando se ultrapassa max_bytes ou
+max_entries, e ao fim de ttl segundos (verificado no get).
+"""
+
+import hashlib
+import json
+import struct
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+from gp_helpers   import source_hash
+from gp_parser_td import TreeNode
+
+
+# ── Árvores compactas ─────────────────────────────────────────────────
+
+def pack_tree(tree) -> bytes:
+    """
+    Pré-ordem iterativa: por nó, o índice do rótulo e a seguir o nº de
+    filhos (≥ 0) ou -1 - índice do lexema (folha de terminal).
+    """
+    strings, index = [], {}
+    codes = array('i')
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        for s in (node.label, node.lexema):
+            if s is not None and s not in index:
+                index[s] = len(strings)
+                strings.append(s)
+        codes.append(index[node.label])
+        if node.lexema is not None:
+            codes.append(-1 - index[node.lexema])
+        else:
+            codes.append(len(node.children))
+            stack.extend(reversed(node.children))
+    table = json.dumps(strings, ensure_ascii=False).encode()
+    return zlib.compress(struct.pack('<I', len(table)) + table + codes.tobytes(), 1)
+
+
+def unpack_tree(data: bytes):
+    """Inverso de pack_tree (iterativo: a profundidade da árvore não conta)."""
+    raw      = zlib.decompress(data)
+    n        = struct.unpack_from('<I', raw)[0]
+    strings  = json.loads(raw[4:4 + n])
+    codes    = array('i')
+    codes.frombytes(raw[4 + n:])
+    root, pending = None, []          # [nó, filhos que faltam]
+    for i in range(0, len(codes), 2):
+        label, v = strings[codes[i]], codes[i + 1]
+        node = TreeNode(label, lexema=strings[-1 - v]) if v < 0 else TreeNode(label)
+        if pending:
+            top = pending[-1]
+            top[0].children.append(node)
+            top[1] -= 1
+            if not top[1]:
+                pending.pop()
+        else:
+            root = node
+        if v > 0:
+            pending.append([node, v])
+    return root
+
+
+def _pack_value(value) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode(), 1)
+
+
+def _unpack_value(data: bytes):
+    return json.loads(zlib.decompress(data))
+
+
+# ── Cache ─────────────────────────────────────────────────────────────
+
+class ParseCache:
+    """LRU limitada em bytes e em nº de entradas, com TTL e métricas."""
+
+    def __init__(self, max_bytes=32 << 20, max_entries=1024, ttl=600.0, clock=time.monotonic):
+        self.max_bytes   = max_bytes
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self.clock       = clock
+        self._entries    = OrderedDict()     # chave → (expira, bytes, {campo: bytes})
+        self._lock       = threading.Lock()
+        self.clear()
+
+    @staticmethod
+    def key(src, phrase, parser_type, options=None) -> tuple:
+        """Chave do resultado: texto exato da gramática, frase, parser e opções."""
+        return (source_hash(src), hashlib.sha256(phrase.encode()).hexdigest(), parser_type,
+                json.dumps(options or {}, sort_keys=True))
+
+    def get(self, key):
+        """Campos guardados (a árvore já reconstruída), ou None se não houver / tiver expirado."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                self._drop(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            fields = entry[2]
+        return {name: unpack_tree(data) if name == 'tree' else _unpack_value(data)
+                for name, data in fields.items()}
+
+    def put(self, key, **values) -> bool:
+        """Guarda os campos (tree=TreeNode, restantes serializáveis em JSON); False se não couber."""
+        fields = {name: pack_tree(v) if name == 'tree' else _pack_value(v)
+                  for name, v in values.items()}
+        size   = sum(map(len, fields.values())) + sum(len(str(k)) for k in key)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (self.clock() + self.ttl, size, fields)
+            self.bytes += size
+            while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = self.hits = self.misses = self.evictions = self.expired = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries':     len(self._entries),
+                'bytes':       self.bytes,
+                'max_bytes':   self.max_bytes,
+                'max_entries': self.max_entries,
+                'ttl':         self.ttl,
+                'hits':        self.hits,
+                'misses':      self.misses,
+                'hit_rate':    round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions':   self.evictions,
+                'expired':     self.expired,
+            }
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
@@ -0,0 +1,589 @@
+"""
+gp_earley.py — Parsing geral (Earley) com floresta partilhada (SPPF).
+
+Funciona com qualquer SpecNode: gramáticas ambíguas, com conflitos LL(1)
+ou LR, recursivas à esquerda ou à direita, com produções ε.
+
+    earley = compile_earley(grammar)
+    forest = earley.parse_forest("a + b + c")   # SPPFNode raiz (ou SyntaxError)
+    forest.count()                              # nº de árvores (inf se cíclica)
+    forest.tree()                               # uma árvore (TreeNode)
+    earley.recognize("a + b + c")               # só aceita/rejeita (com Leo)
+
+A floresta segue Scott (2008), "SPPF-style parsing from Earley recognisers":
+os nós são identificados por (símbolo ou item, início, fim), pelo que cada
+sub-árvore partilhada aparece uma única vez e a ambiguidade fica em famílias
+alternativas (nós 'packed') do mesmo nó, sem enumerar árvores.
+
+Ambos os modos usam a otimização de Leo (itens transitivos para caminhos
+de redução determinísticos), que torna a recursividade à direita linear;
+na floresta, os nós que a cadeia salta são reconstruídos só quando lidos.
+Gramáticas LR-regulares sem ambiguidade ficam em tempo linear.
+"""
+
+from gp_parser_rd import _tipo
+from gp_parser_td import TreeNode
+from gp_helpers   import is_epsilon_seq, flatten_helpers
+from gp_scanner   import Scanner, grammar_scanner_rules
+
+
+class SPPFNode:
+    """
+    Nó da floresta. label = (s, início, fim), onde s é um não-terminal,
+    um terminal ou um item (produção, ponto) para os nós intermédios.
+    families: alternativas (produção, esquerda, direita); 'esquerda' pode
+    ser None, e (produção, None, None) é a família ε.
+
+    Famílias adiadas (cadeias de Leo, ver parse_forest) só são construídas
+    quando 'families' é lido.
+    """
+
+    __slots__ = ('label', '_families', '_seen', '_lazy', 'lexema')
+
+    def __init__(self, label, lexema=None):
+        self.label     = label
+        self._families = []
+        self._seen     = set()
+        self._lazy     = None
+        self.lexema    = lexema
+
+    def add_family(self, prod, left, right):
+        key = (prod, id(left), id(right))
+        if key not in self._seen:
+            self._seen.add(key)
+            self._families.append((prod, left, right))
+
+    def defer(self, expand, *args):
+        if self._lazy is None:
+            self._lazy = []
+        self._lazy.append((expand, args))
+
+    @property
+    def families(self):
+        while self._lazy:
+            expand, args = self._lazy.pop()
+            expand(*args)
+        return self._families
+
+    @property
+    def ambiguous(self):
+        return len(self.families) > 1
+
+    def __repr__(self):
+        return f'SPPFNode{self.label}'
+
+
+class Forest:
+    """Resultado do parse: raiz da SPPF e utilitários de extração."""
+
+    def __init__(self, root, parser):
+        self.root   = root
+        self.parser = parser
+
+    def nodes(self):
+        """Todos os nós alcançáveis a partir da raiz (sem repetições)."""
+        seen, stack, out = set(), [self.root], []
+        while stack:
+            node = stack.pop()
+            if node is None or id(node) in seen:
+                continue
+            seen.add(id(node))
+            out.append(node)
+            for _, left, right in node.families:
+                stack.append(left)
+                stack.append(right)
+        return out
+
+    def count(self):
+        """Número de árvores de derivação (float('inf') se a gramática for cíclica)."""
+        memo  = {}             # id → total; None = em curso (antepassado na pilha)
+        stack = [self.root]
+
+        def value(child):
+            if child is None or not child.families:
+                return 1
+            total = memo[id(child)]
+            return float('inf') if total is None else total
+
+        # Pós-ordem iterativa: listas longas dariam recursão muito profunda
+        while stack:
+            node = stack[-1]
+            key  = id(node)
+            if key not in memo:
+                memo[key] = None
+                for _, left, right in node.families:
+                    for child in (left, right):
+                        if child is not None and child.families and id(child) not in memo:
+                            stack.append(child)
+                continue
+            stack.pop()
+            if memo[key] is None:
+                memo[key] = sum(value(l) * value(r) for _, l, r in node.families)
+
+        return value(self.root)
+
+    def is_ambiguous(self):
+        return any(n.ambiguous for n in self.nodes())
+
+    def tree(self):
+        """
+        Uma árvore (primeira família de cada nó que não volta ao mesmo ciclo).
+        Iterativa: uma lista recursiva à esquerda tem a profundidade da frase.
+        """
+        prods  = self.parser.productions
+        choice = self._choices()
+        root   = []
+        stack  = [(self.root, root)]          # (nó, lista de filhos onde acrescentar)
+        while stack:
+            node, out = stack.pop()
+            s = node.label[0]
+            if not isinstance(s, tuple):
+                if not node.families:                 # terminal
+                    out.append(TreeNode(s, lexema=node.lexema))
+                    continue
+                tree = TreeNode(s)
+                out.append(tree)
+                out = tree.children
+            prod, left, right = choice[id(node)]
+            if not isinstance(s, tuple) and not prods[prod][1]:
+                out.append(TreeNode('ε'))
+                continue
+            # Nó intermédio: os filhos da família vão para a lista do pai.
+            # A esquerda sai primeiro da pilha e acaba antes de a direita começar.
+            if right is not None:
+                stack.append((right, out))
+            if left is not None:
+                stack.append((left, out))
+        return root[0]
+
+    def _choices(self):
+        """
+        Família usada por tree() em cada nó: a primeira cujos filhos não
+        estejam na mesma componente fortemente conexa do nó (numa floresta
+        sem ciclos, sempre a primeira). Num ciclo (A -> A, ou ε à esquerda
+        de uma recursão) usa a primeira que desce de altura mínima, o que
+        garante uma árvore finita.
+
+        Os nós são identificados por (símbolo, início, fim); as componentes
+        vêm do algoritmo de Tarjan iterativo, que as fecha já em ordem
+        topológica inversa (filhos primeiro), pelo que as alturas de cada
+        componente só dependem das já calculadas.
+        """
+        def kids(fam):
+            return [c for c in fam[1:] if c is not None]
+
+        def height(fam):
+            return max((rank[c.label] for c in kids(fam)), default=0)
+
+        index, low, comp, rank = {}, {}, {}, {}
+        on_stack, scc_stack    = set(), []
+        choice = {}
+
+        def close(members):
+            cid = members[0].label
+            for n in members:
+                comp[n.label] = cid
+            inner = [n for n in members if n.families]
+            for n in members:
+                if not n.families:
+                    rank[n.label] = 0
+            cyclic = len(members) > 1 or any(
+                c.label == cid for fam in members[0].families for c in kids(fam))
+            if not cyclic:
+                for n in inner:
+                    rank[n.label] = 1 + min(height(f) for f in n.families)
+            else:
+                # Ponto fixo dentro da componente (alturas mínimas)
+                for n in inner:
+                    rank[n.label] = float('inf')
+                changed = True
+                while changed:
+                    changed = False
+                    for n in inner:
+                        r = 1 + min(height(f) for f in n.families)
+                        if r < rank[n.label]:
+                            rank[n.label] = r
+                            changed = True
+            for n in inner:
+                fams = n.families
+                choice[id(n)] = next(
+                    (f for f in fams if all(comp.get(c.label) != cid for c in kids(f))),
+                    None) or next(f for f in fams if height(f) < rank[n.label])
+
+        counter = 0
+        for v in self.nodes():
+            if v.label in index:
+                continue
+            index[v.label] = low[v.label] = counter
+            counter += 1
+            scc_stack.append(v)
+            on_stack.add(v.label)
+            work = [(v, iter([c for fam in v.families for c in kids(fam)]))]
+            while work:
+                node, it = work[-1]
+                for w in it:
+                    if w.label not in index:
+                        index[w.label] = low[w.label] = counter
+                        counter += 1
+                        scc_stack.append(w)
+                        on_stack.add(w.label)
+                        work.append((w, iter([c for fam in w.families for c in kids(fam)])))
+                        break
+                    if w.label in on_stack:
+                        low[node.label] = min(low[node.label], index[w.label])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0].label
+                        low[parent] = min(low[parent], low[node.label])
+                    if low[node.label] == index[node.label]:
+                        members = []
+                        while True:
+                            n = scc_stack.pop()
+                            on_stack.discard(n.label)
+                            members.append(n)
+                            if n is node:
+                                break
+                        members.reverse()
+                        close(members)
+        return choice
+
+
+class EarleyParser:
+    """Parser de Earley sobre as produções da gramática (terminais = tipos de token)."""
+
+    def __init__(self, grammar):
+        self.start       = grammar.get_start()
+        self.nonterminals = set(grammar.get_nonterminals())
+        self.helpers     = getattr(grammar, 'ebnf_helpers', {})
+
+        # Produção 0: S' -> S (o item S' -> S· em E_n é o teste de aceitação)
+        aug = self.start + "'"
+        while aug in self.nonterminals:
+            aug += "'"
+        self.nonterminals.add(aug)
+        self.productions = [(aug, (self.start,))]
+        for rule in grammar.get_rules():
+            head = rule.get_head_name()
+            for seq in rule.altlist.sequences:
+                rhs = () if is_epsilon_seq(seq) else tuple(
+                    s.get_value() if not s.get_is_terminal() else _tipo(s.get_value())
+                    for s in seq.symbols
+                )
+                self.productions.append((head, rhs))
+
+        self.by_head = {}
+        for p, (head, _) in enumerate(self.productions):
+            self.by_head.setdefault(head, []).append(p)
+        self.nullable = self._nullable()
+        self.scanner  = Scanner(grammar_scanner_rules(grammar))
+
+    def _nullable(self):
+        nullable = set()
+        changed  = True
+        while changed:
+            changed = False
+            for head, rhs in self.productions:
+                if head not in nullable and all(s in nullable for s in rhs):
+                    nullable.add(head)
+                    changed = True
+        return nullable
+
+    def tokenize(self, source):
+        return self.scanner.tokenize(source)
+
+    # ── Floresta (Scott 2008) ─────────────────────────────────────────
+
+    def parse_forest(self, source=None, tokens=None):
+        """
+        Devolve a Forest da frase, ou levanta SyntaxError.
+
+        Conclusões em caminhos de redução determinísticos seguem a cadeia
+        de Leo até ao item do topo, como em recognize(); os nós completos
+        intermédios da cadeia ficam como uma família adiada do nó do topo e
+        só são criados se a floresta chegar a lê-los. Assim a recursão à
+        direita não cria os O(n²) nós de prefixos que nunca chegam à raiz.
+        """
+        if tokens is None:
+            tokens = self.tokenize(source)
+        words = [t for t, _ in tokens[:-1]]
+        n     = len(words)
+        prods = self.productions
+        nts   = self.nonterminals
+
+        nodes = {}   # (s, j, i) → SPPFNode — os rótulos são únicos globalmente
+
+        def node(label, lexema=None):
+            v = nodes.get(label)
+            if v is None:
+                v = nodes[label] = SPPFNode(label, lexema)
+            return v
+
+        def make_node(p, dot, j, i, w, v):
+            # Item B ::= αx·β com x já reconhecido em [.., i]; w = esquerda, v = x
+            head, rhs = prods[p]
+            if dot == len(rhs):
+                s = head
+            elif dot == 1:
+                return v                              # α = ε e β ≠ ε
+            else:
+                s = (p, dot)
+            y = node((s, j, i))
+            y.add_family(p, w, v)
+            return y
+
+        def expand_chain(entry, w, i):
+            # Nós completos da cadeia de Leo, do fundo (entry) até ao topo
+            while entry is not None:
+                (q, qdot, k, z), entry = entry[0], entry[1]
+                w = make_node(q, qdot + 1, k, i, z, w)
+
+        def starts_with_terminal(rhs, dot, i):
+            return dot < len(rhs) and rhs[dot] not in nts and i < n and rhs[dot] == words[i]
+
+        def at_nt_or_end(rhs, dot):
+            return dot == len(rhs) or rhs[dot] in nts
+
+        sets     = [set() for _ in range(n + 1)]       # E_i: (p, dot, origem, w)
+        waiting  = [dict() for _ in range(n + 1)]      # E_i por símbolo após o ponto
+        leo      = [dict() for _ in range(n + 1)]      # cadeia memorizada por (conjunto, símbolo)
+        next_q   = []
+
+        def add(i, item, R):
+            if item not in sets[i]:
+                sets[i].add(item)
+                p, dot, _, _ = item
+                rhs = prods[p][1]
+                if dot < len(rhs):
+                    waiting[i].setdefault(rhs[dot], []).append(item)
+                R.append(item)
+
+        def topmost(j, B):
+            # (item à espera de B em E_j, cadeia acima, produção do topo, origem do topo)
+            memo = leo[j]
+            if B in memo:
+                return memo[B]
+            memo[B] = None
+            cands = waiting[j].get(B, ())
+            if len(cands) != 1:
+                return None
+            item = cands[0]
+            q, qdot, k, _ = item
+            if qdot + 1 != len(prods[q][1]):
+                return None
+            upper = topmost(k, prods[q][0]) if k < j else None
+            if upper is None:
+                memo[B] = (item, None, q, k)
+            else:
+                memo[B] = (item, upper, upper[2], upper[3])
+            return memo[B]
+
+        R0 = []
+        add(0, (0, 0, 0, None), R0)
+
+        for i in range(n + 1):
+            H  = {}
+            R  = list(sets[i]) if i else R0
+            Q, next_q = next_q, []
+            predicted = set()
+
+            while R:
+                item = R.pop()
+                p, dot, h, w = item
+                rhs = prods[p][1]
+
+                if dot < len(rhs):
+                    C = rhs[dot]                       # C é não-terminal (itens em E_i)
+                    if C not in predicted:
+                        predicted.add(C)
+                        for q in self.by_head.get(C, []):
+                            delta = prods[q][1]
+                            if at_nt_or_end(delta, 0):
+                                add(i, (q, 0, i, None), R)
+                            elif starts_with_terminal(delta, 0, i):
+                                Q.append((q, 0, i, None))
+                    if C in H:
+                        y = make_node(p, dot + 1, h, i, w, H[C])
+                        nxt = (p, dot + 1, h, y)
+                        if at_nt_or_end(rhs, dot + 1):
+                            add(i, nxt, R)
+                        elif starts_with_terminal(rhs, dot + 1, i):
+                            Q.append(nxt)
+                    continue
+
+                # Item completo D ::= α·
+                D = prods[p][0]
+                if w is None:
+                    w = node((D, i, i))
+                    w.add_family(p, None, None)
+                if h == i:
+                    H[D] = w
+                else:
+                    chain = topmost(h, D)
+                    if chain is not None:
+                        tp, tk = chain[2], chain[3]
+                        top = node((prods[tp][0], tk, i))
+                        top.defer(expand_chain, chain, w, i)
+                        add(i, (tp, len(prods[tp][1]), tk, top), R)
+                        continue
+                for it in list(waiting[h].get(D, ())):
+                    q, qdot, k, z = it
+                    y     = make_node(q, qdot + 1, k, i, z, w)
+                    nxt   = (q, qdot + 1, k, y)
+                    qrhs  = prods[q][1]
+                    if at_nt_or_end(qrhs, qdot + 1):
+                        add(i, nxt, R)
+                    elif starts_with_terminal(qrhs, qdot + 1, i):
+                        Q.append(nxt)
+
+            if i == n:
+                break
+
+            # Scan de words[i]
+            v    = node((words[i], i, i + 1), lexema=tokens[i][1])
+            R1   = []
+            seen = set()
+            for item in Q:
+                if item in seen:
+                    continue
+                seen.add(item)
+                p, dot, h, w = item
+                rhs = prods[p][1]
+                y   = make_node(p, dot + 1, h, i + 1, w, v)
+                nxt = (p, dot + 1, h, y)
+                if at_nt_or_end(rhs, dot + 1):
+                    add(i + 1, nxt, R1)
+                elif starts_with_terminal(rhs, dot + 1, i + 1):
+                    next_q.append(nxt)
+
+            if not sets[i + 1] and not next_q:
+                tipo, lexema = tokens[i]
+                raise SyntaxError(
+                    f"Símbolo {tipo!r} ({lexema!r}) inesperado na posição {i + 1}. "
+                    f"Esperado um de: {self._expected(sets[i], Q, i)}"
+                )
+
+        accept = nodes.get((prods[0][0], 0, n))
+        if accept is None:
+            raise SyntaxError(
+                f"Fim inesperado da frase. Esperado um de: {self._expected(sets[n], [], n)}"
+            )
+        return Forest(accept.families[0][2], self)
+
+    def _expected(self, items, scanned, i):
+        """Terminais que poderiam seguir na posição i (para mensagens de erro)."""
+        out = set()
+        for p, dot, _, _ in items:
+            rhs = self.productions[p][1]
+            if dot < len(rhs) and rhs[dot] not in self.nonterminals:
+                out.add(rhs[dot])
+        for p, dot, _, _ in scanned:
+            out.add(self.productions[p][1][dot])
+        # Terminais iniciais dos não-terminais previstos
+        frontier = [self.productions[p][1][dot] for p, dot, _, _ in items
+                    if dot < len(self.productions[p][1])
+                    and self.productions[p][1][dot] in self.nonterminals]
+        seen = set()
+        while frontier:
+            A = frontier.pop()
+            if A in seen:
+                continue
+            seen.add(A)
+            for q in self.by_head.get(A, []):
+                for sym in self.productions[q][1]:
+                    if sym in self.nonterminals:
+                        frontier.append(sym)
+                        if sym not in self.nullable:
+                            break
+                    else:
+                        out.add(sym)
+                        break
+        return sorted(out)
+
+    def parse(self, source=None, tokens=None):
+        """Uma árvore de derivação (TreeNode); ver parse_forest para todas."""
+        return flatten_helpers(self.parse_forest(source, tokens).tree(), self.helpers)
+
+    # ── Reconhecedor com a otimização de Leo ──────────────────────────
+
+    def recognize(self, source=None, tokens=None):
+        """
+        True/False sem construir a floresta. Itens (p, ponto, origem); as
+        conclusões seguem os itens transitivos de Leo quando o caminho de
+        redução é determinístico, evitando o custo quadrático da recursão
+        à direita. Os nulos são tratados como em Aycock & Horspool.
+        """
+        if tokens is None:
+            tokens = self.tokenize(source)
+        words    = [t for t, _ in tokens[:-1]]
+        n        = len(words)
+        prods    = self.productions
+        nts      = self.nonterminals
+        nullable = self.nullable
+
+        sets    = [[] for _ in range(n + 1)]
+        members = [set() for _ in range(n + 1)]
+        waiting = [dict() for _ in range(n + 1)]
+        leo     = [dict() for _ in range(n + 1)]   # topo memorizado por (conjunto, símbolo)
+
+        def add(i, item):
+            if item not in members[i]:
+                members[i].add(item)
+                sets[i].append(item)
+                p, dot, _ = item
+                rhs = prods[p][1]
+                if dot < len(rhs):
+                    waiting[i].setdefault(rhs[dot], []).append(item)
+
+        def topmost(j, B):
+            # Item completo no topo do caminho determinístico a partir de (j, B)
+            memo = leo[j]
+            if B in memo:
+                return memo[B]
+            memo[B] = None
+            cands = waiting[j].get(B, ())
+            if len(cands) != 1:
+                return None
+            p, dot, k = cands[0]
+            if dot + 1 != len(prods[p][1]):
+                return None
+            A      = prods[p][0]
+            result = topmost(k, A) if k < j else None
+            memo[B] = result or (p, dot + 1, k)
+            return memo[B]
+
+        add(0, (0, 0, 0))
+
+        for i in range(n + 1):
+            k = 0
+            while k < len(sets[i]):
+                p, dot, origin = sets[i][k]
+                k += 1
+                rhs = prods[p][1]
+                if dot < len(rhs):
+                    sym = rhs[dot]
+                    if sym in nts:
+                        for q in self.by_head.get(sym, []):
+                            add(i, (q, 0, i))
+                        if sym in nullable:
+                            add(i, (p, dot + 1, origin))
+                    elif i < n and sym == words[i]:
+                        add(i + 1, (p, dot + 1, origin))
+                    continue
+
+                B = prods[p][0]
+                t = topmost(origin, B) if origin < i else None
+                if t is not None:
+                    add(i, t)
+                    continue
+                for q, qdot, qorigin in list(waiting[origin].get(B, ())):
+                    add(i, (q, qdot + 1, qorigin))
+
+            if i < n and not sets[i + 1]:
+                return False
+
+        return (0, 1, 0) in members[n]
+
+
+def compile_earley(grammar) -> EarleyParser:
+    return EarleyParser(grammar)
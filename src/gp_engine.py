@@ -0,0 +1,211 @@
+"""
+gp_engine.py — Motor de parsing recursivo descendente em processo.
+
+Transforma a ASA da gramática (SpecNode) diretamente num grafo de closures,
+uma por não-terminal, cada uma com a sua tabela de predição tipo → alternativa.
+Usa o mesmo lookahead que gp_parser_rd._lookahead e o mesmo scanner do parser
+gerado, mas sem gerar código-fonte nem fazer exec.
+
+    engine = compile_rd(grammar, first, follow)
+    tree   = engine.parse("x := 1")           # TreeNode (label/children/lexema)
+
+Os NTs auxiliares do EBNF (grammar.ebnf_helpers) não criam nós: devolvem a
+lista de filhos, que o chamador junta aos seus. X* (H -> α H | ε) é
+compilado para um ciclo, pelo que uma lista longa não aprofunda a pilha.
+
+Com simplify (gp_simplify.TreeSimplifier) cada nó é simplificado quando é
+construído, em vez de numa segunda passagem pela árvore. Com pratt=True, os
+níveis de operadores binários (gp_pratt) são reconhecidos por precedence
+climbing e dão a árvore binária compacta.
+"""
+
+from gp_parser_rd import _lookahead, _is_epsilon_seq, _tipo
+from gp_parser_td import TreeNode, _cst_node
+from gp_scanner   import Scanner, grammar_scanner_rules
+from gp_pratt     import expression_families, precedence_table
+
+
+class CompiledRD:
+    """Parser RD compilado em closures. Reutilizável para muitas frases."""
+
+    def __init__(self, grammar, first, follow, simplify=None, pratt=False):
+        self.start    = grammar.get_start()
+        self.scanner  = Scanner(grammar_scanner_rules(grammar))
+        self.parsers  = {}
+        self.helpers  = getattr(grammar, 'ebnf_helpers', {})
+        self.simplify = simplify
+        self._build   = simplify.node if simplify else _cst_node
+        # NTs compilados para um ciclo: X* do EBNF e, com simplify, as listas X -> α X
+        self._loops   = {nt for nt, op in self.helpers.items() if op == '*'}
+        if simplify:
+            self._loops |= simplify.spines
+
+        nts = grammar.get_nonterminals()
+        for rule in grammar.get_rules():
+            nt = rule.get_head_name()
+            self.parsers[nt] = self._compile_rule(nt, rule.altlist.sequences,
+                                                  first, follow, nts)
+        self.families = expression_families(grammar) if pratt else []
+        for family in self.families:
+            self._compile_climber(family)
+        # o axioma é um nível: a raiz pode ser um nó de outro nível ou do primário
+        self._wrap_root = any(lv[0] == self.start for f in self.families for lv in f['levels'])
+
+    # ── Compilação ────────────────────────────────────────────────────
+
+    def _compile_seq(self, nt, seq):
+        parsers, helpers, build = self.parsers, self.helpers, self._build
+        symbols = seq.symbols
+        if nt in self._loops and symbols and symbols[-1].get_value() == nt:
+            symbols = symbols[:-1]             # X -> α X: a repetição é o ciclo de parse_nt
+        steps   = tuple(
+            (s.get_is_terminal(), _tipo(s.get_value()) if s.get_is_terminal() else s.get_value(),
+             s.get_value() in helpers)
+            for s in symbols
+        )
+        is_helper = nt in helpers or nt in self._loops    # devolve a lista de filhos
+
+        def run(toks, pos):
+            children = []
+            for is_term, val, spliced in steps:
+                if is_term:
+                    tipo, lex = toks[pos]
+                    if tipo != val:
+                        raise SyntaxError(f"Esperado '{val}', encontrado '{tipo}' ('{lex}')")
+                    children.append(TreeNode(val, lexema=lex))
+                    if pos < len(toks) - 1:
+                        pos += 1
+                elif spliced:
+                    items, pos = parsers[val](toks, pos)
+                    children.extend(items)
+                else:
+                    node, pos = parsers[val](toks, pos)
+                    if node is not None:
+                        children.append(node)
+            if is_helper:
+                return children, pos
+            return build(nt, children), pos
+
+        return run
+
+    def _compile_rule(self, nt, seqs, first, follow, nts):
+        branches = {}
+        default  = None
+        has_eps  = False
+        has_alt  = False
+        tails    = set()       # alternativas α X que continuam o ciclo
+
+        # Mesma ordem de decisão do parser gerado: alternativas não-ε pela
+        # ordem da regra (a primeira ganha), depois ε com FOLLOW.
+        for seq in seqs:
+            if _is_epsilon_seq(seq):
+                has_eps = True
+                continue
+            la = _lookahead(seq, nt, first, follow, nts)
+            if not la:
+                continue
+            has_alt = True
+            run = self._compile_seq(nt, seq)
+            if seq.symbols[-1].get_value() == nt:
+                tails.add(run)
+            for t in la:
+                branches.setdefault(_tipo(t), run)
+
+        follow_tokens = sorted(follow.get(nt, set()))
+        if has_eps:
+            if nt in self.helpers or nt in self._loops:
+                def run_eps(toks, pos):
+                    return [], pos
+            else:
+                build = self._build
+
+                def run_eps(toks, pos):
+                    return build(nt, []), pos
+            for t in follow_tokens:
+                branches.setdefault(_tipo(t), run_eps)
+            if not follow_tokens:
+                default = run_eps
+
+        prefix = f"Erro em {nt}: token inesperado "
+        suffix = ''
+        if has_eps and has_alt:
+            suffix = f' (esperado FOLLOW={[_tipo(t) for t in follow_tokens]})'
+
+        def parse_nt(toks, pos):
+            run = branches.get(toks[pos][0], default)
+            if run is None:
+                raise SyntaxError(prefix + toks[pos][0] + suffix)
+            return run(toks, pos)
+
+        if nt not in self._loops:
+            return parse_nt
+
+        build = None if nt in self.helpers else self._build
+
+        def parse_loop(toks, pos):
+            children = []
+            while True:
+                run = branches.get(toks[pos][0], default)
+                if run is None:
+                    raise SyntaxError(prefix + toks[pos][0] + suffix)
+                start = pos
+                items, pos = run(toks, pos)
+                children.extend(items)
+                if run not in tails or pos == start:   # ε/β, ou α anulável sem consumir nada
+                    return (build(nt, children) if build else children), pos
+
+        return parse_loop
+
+    def _compile_climber(self, family):
+        """parse_L de cada nível passa a ser climb(min_prec = nível)."""
+        parsers = self.parsers
+        prec    = precedence_table(family)
+        primary = family['primary']
+        if primary in parsers:
+            operand = parsers[primary]
+        else:
+            tipo = _tipo(primary)
+
+            def operand(toks, pos):
+                t, lex = toks[pos]
+                if t != tipo:
+                    raise SyntaxError(f"Esperado '{tipo}', encontrado '{t}' ('{lex}')")
+                return TreeNode(tipo, lexema=lex), pos + 1
+
+        def climb(toks, pos, min_prec):
+            left, pos = operand(toks, pos)
+            while True:
+                tipo, lex = toks[pos]
+                entry = prec.get(tipo)
+                if entry is None or entry[0] < min_prec:
+                    return left, pos
+                right, pos = climb(toks, pos + 1, entry[0] + 1)   # associativo à esquerda
+                left = TreeNode(entry[1], children=[left, TreeNode(tipo, lexema=lex), right])
+
+        for level, (nt, _, _) in enumerate(family['levels']):
+            parsers[nt] = lambda toks, pos, level=level: climb(toks, pos, level)
+
+    # ── Interface ─────────────────────────────────────────────────────
+
+    def tokenize(self, source):
+        return self.scanner.tokenize(source)
+
+    def parse_tokens(self, tokens):
+        try:
+            tree, pos = self.parsers[self.start](tokens, 0)
+        except RecursionError:
+            raise SyntaxError("Frase demasiado profunda para o parser recursivo descendente")
+        if tokens[pos][0] != '$':
+            raise SyntaxError(f"Tokens extra após o fim: {tokens[pos][0]}")
+        if self.simplify:
+            return self.simplify.finish(tree)
+        if self._wrap_root and (tree.label != self.start or tree.lexema is not None):
+            tree = TreeNode(self.start, children=[tree])
+        return tree
+
+    def parse(self, source):
+        return self.parse_tokens(self.tokenize(source))
+
+
+def compile_rd(grammar, first, follow, simplify=None, pratt=False):
+    return CompiledRD(grammar, first, follow, simplify, pratt)
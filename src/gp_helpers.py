@@ -1,7 +1,8 @@
 import re
 import hashlib
 
-from gp_analysis import first_of_seq
+from gp_analysis  import first_of_seq
+from gp_transform import rule_text, parse_rule_text
 
 
 CHAR_MAP = {
@@ -76,6 +77,30 @@ def seq_repr(seq) -> str:
     return 'ε' if is_epsilon_seq(seq) else ' '.join(s.get_value() for s in seq.symbols)
 
 
+def flatten_helpers(tree, helpers):
+    """
+    Funde na árvore os nós dos NTs auxiliares do EBNF (grammar.ebnf_helpers):
+    os filhos de X* / X+ / X? / ( … ) passam a ser filhos diretos do nó que
+    os usa, em lista. Iterativo (a cadeia de X* tem a profundidade da lista).
+    """
+    if not helpers or tree is None:
+        return tree
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if any(c.label in helpers and c.lexema is None for c in node.children):
+            flat, work = [], node.children[::-1]
+            while work:
+                child = work.pop()
+                if child.label in helpers and child.lexema is None:
+                    work.extend(child.children[::-1])
+                elif child.label != 'ε' or child.children:
+                    flat.append(child)
+            node.children = flat or [type(node)('ε')]
+        stack.extend(node.children)
+    return tree
+
+
 def compute_lookahead_table(grammar, first, follow) -> list[dict]:
     nts = grammar.get_nonterminals()
     result = []
@@ -119,20 +144,38 @@ def ser_suggestions(suggestions) -> list[dict]:
 
 
 def ser_table(table, grammar) -> dict:
-    nts       = sorted(grammar.get_nonterminals())
-    terminals = sorted({t for (_, t) in table})
-    rows = []
-    for nt in nts:
-        cells = {}
-        for t in terminals:
-            seqs = table.get((nt, t), [])
-            if not seqs:
-                continue
-            seq = seqs[0]
-            rhs = seq_repr(seq)
-            cells[t] = f'{nt} → {rhs}' + (' ⚠' if len(seqs) > 1 else '')
-        rows.append({'nt': nt, 'cells': cells})
-    return {'terminals': terminals, 'rows': rows}
+    """
+    Formato compacto para a UI. Cada linha guarda só as células preenchidas,
+    como pares [índice do terminal, índice da produção]. As produções vêm
+    uma vez em 'productions', em vez de repetir "NT → rhs" por célula.
+    'conflicts' lista os índices dos terminais com mais de uma produção.
+    Percorre só as células preenchidas (dict de build_parse_table ou
+    CompressedTable).
+    """
+    productions = []
+    prod_id     = {}
+    for rule in grammar.get_rules():
+        nt = rule.get_head_name()
+        for seq in rule.altlist.sequences:
+            prod_id[id(seq)] = len(productions)
+            productions.append(f'{nt} → {seq_repr(seq)}')
+
+    filled    = [(nt, t, seqs) for (nt, t), seqs in table.items() if seqs]
+    terminals = sorted({t for _, t, _ in filled})
+    t_index   = {t: i for i, t in enumerate(terminals)}
+
+    rows = {nt: {'nt': nt, 'cells': []} for nt in sorted(grammar.get_nonterminals())}
+    for nt, t, seqs in filled:
+        row = rows[nt]
+        row['cells'].append([t_index[t], prod_id[id(seqs[0])]])
+        if len(seqs) > 1:
+            row.setdefault('conflicts', []).append(t_index[t])
+
+    for row in rows.values():
+        row['cells'].sort()
+        if 'conflicts' in row:
+            row['conflicts'].sort()
+    return {'terminals': terminals, 'productions': productions, 'rows': list(rows.values())}
 
 
 def grammar_hash(src: str) -> str:
@@ -141,44 +184,83 @@ def grammar_hash(src: str) -> str:
     return hashlib.sha256(normalised.encode()).hexdigest()
 
 
-def rebuild_grammar(src: str, replacements: dict) -> str:
+def source_hash(src: str) -> str:
     """
-    Substitui as regras de cada NT presente em `replacements`
-    pelas novas strings, preservando a secção de tokens.
+    SHA-256 do texto exato. Para caches de resultados: grammar_hash junta
+    também o whitespace dentro de literais e regexes ('a b' e 'a  b').
+    """
+    return hashlib.sha256(src.encode()).hexdigest()
+
+
+TOKEN_LINE_RE = re.compile(r"^[A-Za-z][A-Za-z0-9_]*\s*=\s*/")
+RULE_LINE_RE  = re.compile(r"^([A-Za-z][A-Za-z0-9_']*)\s*(->|→)")
+START_LINE_RE = re.compile(r"^start\s*:")
+
+
+def split_spec_blocks(src: str) -> list[tuple]:
     """
-    lines    = src.splitlines()
-    TOKEN_RE = re.compile(r"^[A-Za-z][A-Za-z0-9_]*\s*=\s*/")
-    RULE_RE  = re.compile(r"^([A-Za-z][A-Za-z0-9_']*)\s*(->|→)")
+    Divide o texto da gramática em blocos (kind, nome, linha, linhas):
+
+        ('start', None, ...)   linha 'start: X'
+        ('rule',  NT,   ...)   'NT -> ...' e as linhas seguintes começadas por '|'
+                               (com linhas vazias pelo meio, como no lexer)
+        ('token', NOME, ...)   'NOME = /regex/' (a secção começa na primeira destas)
+        (None,    None, ...)   linha vazia ou comentário
+        ('other', None, ...)   qualquer outra linha (erro de sintaxe)
 
-    rule_lines, token_lines, in_tokens = [], [], False
-    for line in lines:
-        if not in_tokens and TOKEN_RE.match(line.strip()):
+    'linha' é o número (1-based) da primeira linha do bloco.
+    """
+    lines = src.splitlines()
+    blocks, i, in_tokens = [], 0, False
+    while i < len(lines):
+        line, s = lines[i], lines[i].strip()
+        blank   = not s or s.startswith('#')
+        if not in_tokens and TOKEN_LINE_RE.match(s):
             in_tokens = True
-        (token_lines if in_tokens else rule_lines).append(line)
-
-    blocks, i = [], 0
-    while i < len(rule_lines):
-        line = rule_lines[i]
-        m    = RULE_RE.match(line.strip())
-        if m:
-            nt, block_lines = m.group(1), [line]
+        if in_tokens:
+            if TOKEN_LINE_RE.match(s):
+                blocks.append(('token', s.split('=', 1)[0].strip(), i + 1, [line]))
+            else:
+                blocks.append((None if blank else 'other', None, i + 1, [line]))
             i += 1
-            while i < len(rule_lines):
-                nxt = rule_lines[i].strip()
-                if nxt.startswith('|') or (rule_lines[i] and rule_lines[i][0] in (' ', '\t')):
-                    block_lines.append(rule_lines[i]); i += 1
+            continue
+        m = RULE_LINE_RE.match(s)
+        if m and not START_LINE_RE.match(s):
+            j = end = i + 1
+            while j < len(lines):
+                nxt = lines[j].strip()
+                if nxt.startswith('|'):
+                    j = end = j + 1
+                elif not nxt:
+                    j += 1
                 else:
                     break
-            blocks.append((nt, block_lines))
-        else:
-            blocks.append((None, [line])); i += 1
+            blocks.append(('rule', m.group(1), i + 1, lines[i:end]))
+            i = end
+            continue
+        kind = 'start' if START_LINE_RE.match(s) else (None if blank else 'other')
+        blocks.append((kind, None, i + 1, [line]))
+        i += 1
+    return blocks
+
+
+def rebuild_grammar(src: str, replacements: dict) -> str:
+    """
+    Substitui as regras de cada NT presente em `replacements`
+    pelas novas strings, preservando a secção de tokens.
+    """
+    blocks = split_spec_blocks(src)
+    tokens = next((k for k, b in enumerate(blocks) if b[0] == 'token'), len(blocks))
+    token_lines = [line for b in blocks[tokens:] for line in b[3]]
 
     pending, out_rules = dict(replacements), []
-    for nt, block_lines in blocks:
-        if nt is not None and nt in pending:
+    for kind, nt, _, block_lines in blocks[:tokens]:
+        if kind == 'rule' and nt in pending:
             out_rules.extend(pending.pop(nt))
-            for new_nt in [k for k in list(pending) if k.startswith(nt)]:
+            for new_nt in [k for k in list(pending) if k.rstrip("'") == nt]:
                 out_rules.extend(pending.pop(new_nt))
+        elif kind == 'rule' and nt in replacements:
+            continue            # outro bloco de um NT já substituído
         else:
             out_rules.extend(block_lines)
 
@@ -190,4 +272,58 @@ def rebuild_grammar(src: str, replacements: dict) -> str:
             out_rules.append('')
         out_rules.extend(token_lines)
 
-    return '\n'.join(out_rules)
\ No newline at end of file
+    return '\n'.join(out_rules)
+
+
+def define_helpers(replacements: dict, rules: dict, helpers) -> dict:
+    """
+    Completa `replacements` (para rebuild_grammar) numa gramática com EBNF.
+    Os auxiliares (<cabeça>_rep1, _opt1, _grp1) só existem na ASA: o texto
+    tem o X*, (…) ou X? na regra que os usa. Por isso:
+
+      - cada auxiliar referido pelas linhas novas passa a regra explícita,
+        logo a seguir à linha que o usa;
+      - a regra que usa um auxiliar substituído ou referido é reescrita em
+        BNF (sem o EBNF, que voltaria a criar outro auxiliar).
+
+    'rules' são as regras atuais ({NT: [[símbolo, ...]]}), 'helpers' os
+    nomes dos auxiliares (grammar.ebnf_helpers).
+    """
+    if not helpers:
+        return replacements
+    owner = {}                          # auxiliar → regra que o usa
+    for head, alts in rules.items():
+        for alt in alts:
+            for sym in alt:
+                if sym in helpers and sym != head:
+                    owner.setdefault(sym, head)
+
+    def root(h):
+        seen = set()
+        while h in helpers and h in owner and h not in seen:
+            seen.add(h)
+            h = owner[h]
+        return h
+
+    out     = {nt: list(lines) for nt, lines in replacements.items()}
+    defined = set(out)
+    work    = list(out)
+    while work:
+        key  = work.pop()
+        refs = [key] if key in helpers else []
+        for line in out[key]:
+            if '->' in line:
+                refs += [sym for alt in parse_rule_text(line)[1] for sym in alt]
+        for h in refs:
+            if h not in helpers:
+                continue
+            r = root(h)
+            if r in rules and r not in defined:
+                out[r] = [rule_text(r, rules[r])]
+                defined.add(r)
+                work.append(r)
+            if h not in defined and h in rules:
+                out[key].append(rule_text(h, rules[h]))
+                defined.add(h)
+                work.append(key)
+    return out
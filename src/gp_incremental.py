@@ -0,0 +1,689 @@
+"""
+gp_incremental.py — Reanálise incremental quando só algumas regras mudam.
+
+IncrementalAnalysis guarda FIRST, FOLLOW, conflitos e linhas da tabela
+LL(1) da última gramática analisada. update() compara a nova lista de
+regras com a anterior, NT a NT (RuleNode reaproveitados — ver
+gp_normalize — custam só uma comparação de identidade), e só recalcula o que a alteração pode ter
+afetado:
+
+  · FIRST — os NT alterados e os que dependem deles pelo canto esquerdo
+    (B num prefixo só de NTs de uma alternativa de A), componente a
+    componente (Tarjan), das dependências para os dependentes;
+  · FOLLOW — os NT que aparecem nas regras alteradas ou antes de um NT
+    cujo FIRST mudou, e os que herdam o FOLLOW deles (fim da alternativa),
+    só onde as entradas de uma componente mudaram de facto;
+  · conflitos e linhas da tabela — os NT cujas regras mudaram ou cujos
+    conjuntos de que dependem mudaram.
+
+    analysis = IncrementalAnalysis(grammar)
+    analysis.update(parse_grammar(novo_src))
+    analysis.first, analysis.follow, analysis.conflicts, analysis.table
+    analysis.last_update   # {'changed', 'first', 'follow', 'rechecked', 'time_ms'}
+
+Os resultados são iguais aos de compute_first / compute_follow /
+check_ll1 / build_parse_table sobre a gramática completa.
+
+IncrementalParser faz o mesmo para o texto: divide a especificação em
+blocos (split_spec_blocks), só volta a passar pelo PLY os blocos cujo
+texto mudou e monta um SpecNode novo com os RuleNode / TokenDeclNode dos
+restantes — os mesmos objetos, que IncrementalAnalysis.update reconhece
+por identidade. A fusão de regras e a validação só revêem os nomes
+tocados pelos blocos que entraram ou saíram.
+
+    front = IncrementalParser()
+    grammar = front.parse(src)        # mesmo resultado, erros e avisos que parse_grammar
+    front.last_update                 # {'blocks', 'reparsed', 'full', 'time_ms'}
+
+IncrementalPhrase faz o mesmo para as frases, sobre o motor RD compilado
+(gp_engine): guarda os tokens e as chamadas parse_X da última análise e,
+numa edição (offset, nº de caracteres apagados, texto inserido), só volta
+a passar pelo scanner a zona alterada e reaproveita as subárvores cujos
+tokens — incluindo o token de lookahead a seguir — não mudaram. Num
+parser LL(1) o resultado de parse_X numa posição só depende desses
+tokens, pelo que a árvore é a mesma da análise completa.
+
+    phrase = IncrementalPhrase(grammar, first, follow)
+    tree   = phrase.parse("x := 1 + 2")
+    tree   = phrase.edit(9, 1, "20")    # x := 1 + 20
+    phrase.last_update                  # {'tokens', 'relexed', 'reparsed', 'reused', 'full', 'time_ms'}
+"""
+
+import contextlib
+import io
+import time
+from bisect import bisect_left, bisect_right
+
+import gp_parser
+from gp_ast       import (IdentifierNode, TerminalNameNode, AltListNode, RuleNode,
+                          RuleListNode, TokenDeclNode, TokenSectionNode, SpecNode)
+from gp_analysis  import first_of_seq, _first_of_seq, check_rule_ll1
+from gp_engine    import compile_rd
+from gp_helpers   import split_spec_blocks
+from gp_transform import strongly_connected_components
+
+
+def _is_nt_symbol(sym):
+    return not sym.get_is_terminal() and not sym.get_is_epsilon()
+
+
+class IncrementalAnalysis:
+    """Análise LL(1) de uma gramática, atualizável regra a regra."""
+
+    def __init__(self, grammar=None):
+        self.grammar   = None
+        self.start     = None
+        self.nts       = set()
+        self.blocks    = {}    # NT → [RuleNode] (pela ordem da gramática)
+        self.refs      = {}    # NT → {B: [(símbolos, posição de B)]} nas suas regras
+        self.uses      = {}    # B → {cabeça: [(símbolos, posição de B)]}
+        self.corner    = {}    # A → Bs num prefixo só de NTs (FIRST(A) depende de FIRST(B))
+        self.corner_rev = {}
+        self.tail      = {}    # A → Bs seguidos só de NTs (FOLLOW(A) flui para FOLLOW(B))
+        self.tail_rev  = {}
+        self.first     = {}
+        self.follow    = {}
+        self.rule_conflicts = {}   # NT → conflitos
+        self.rows      = {}        # NT → {terminal: [índice da alternativa, ...]}
+        self.last_update = {}
+        if grammar is not None:
+            self.update(grammar)
+
+    def fork(self):
+        """Cópia independente (os conjuntos só são substituídos, nunca alterados in situ)."""
+        other = IncrementalAnalysis()
+        for name, value in vars(self).items():
+            setattr(other, name, dict(value) if isinstance(value, dict) else value)
+        other.uses       = {k: dict(v) for k, v in self.uses.items()}
+        other.corner_rev = {k: set(v) for k, v in self.corner_rev.items()}
+        other.tail_rev   = {k: set(v) for k, v in self.tail_rev.items()}
+        return other
+
+    # ── Resultados (mesmo formato que gp_analysis) ────────────────────
+
+    @property
+    def conflicts(self):
+        return [c for nt in self.blocks for c in self.rule_conflicts.get(nt, ())]
+
+    @property
+    def table(self):
+        table = {}
+        for nt, rules in self.blocks.items():
+            seqs = [seq for rule in rules for seq in rule.altlist.sequences]
+            for t, idxs in self.rows.get(nt, {}).items():
+                table[(nt, t)] = [seqs[i] for i in idxs]
+        return table
+
+    # ── Atualização ───────────────────────────────────────────────────
+
+    def update(self, grammar):
+        t0 = time.perf_counter()
+        blocks = {}
+        for rule in grammar.get_rules():
+            blocks.setdefault(rule.get_head_name(), []).append(rule)
+
+        # RuleNode reaproveitados (mesmo objeto) comparam-se por identidade;
+        # os restantes por igualdade estrutural da ASA
+        old     = self.blocks
+        added   = blocks.keys() - old.keys()
+        removed = old.keys() - blocks.keys()
+        changed = {nt for nt, rules in blocks.items() if old.get(nt) != rules} | removed
+        for nt in added | removed:
+            changed |= self.uses.get(nt, {}).keys()   # o símbolo muda de classificação
+
+        old_refs = {nt: self.refs.get(nt, {}).keys() for nt in changed}
+        self.grammar, self.blocks = grammar, blocks
+        self.nts = set(blocks)
+        for nt in changed:
+            self._index(nt)
+
+        start_changed = self.start != grammar.get_start()
+        old_start, self.start = self.start, grammar.get_start()
+
+        first_changed = self._update_first(changed) | added | removed
+
+        seeds = set()
+        for nt in changed:
+            seeds |= old_refs[nt] | self.refs.get(nt, {}).keys()
+        for y in first_changed:
+            seeds |= self._preceding(y)
+        if start_changed:
+            seeds |= {old_start, self.start}
+        follow_changed = self._update_follow((seeds | changed) & self.nts)
+
+        recheck = (changed | follow_changed) & self.nts
+        for y in first_changed:
+            recheck |= self.uses.get(y, {}).keys() & self.nts
+        for nt in removed:
+            for d in (self.first, self.follow, self.rule_conflicts, self.rows):
+                d.pop(nt, None)
+        for nt in recheck:
+            self._check(nt)
+
+        self.last_update = {
+            'changed':   len(changed),
+            'first':     len(first_changed),
+            'follow':    len(follow_changed),
+            'rechecked': len(recheck),
+            'time_ms':   round((time.perf_counter() - t0) * 1e3, 3),
+        }
+        return self
+
+    def _index(self, nt):
+        """Atualiza refs/uses/corner/tail de uma cabeça alterada."""
+        for y in self.refs.pop(nt, ()):
+            self.uses.get(y, {}).pop(nt, None)
+        for b in self.tail.pop(nt, ()):
+            self.tail_rev.get(b, set()).discard(nt)
+        for b in self.corner.pop(nt, ()):
+            self.corner_rev.get(b, set()).discard(nt)
+        if nt not in self.blocks:
+            return
+
+        refs, corner, tail = {}, set(), set()
+        for rule in self.blocks[nt]:
+            for seq in rule.altlist.sequences:
+                syms = seq.symbols
+                for sym in syms:
+                    if not _is_nt_symbol(sym):
+                        break
+                    corner.add(sym.get_value())
+                for sym in reversed(syms):
+                    if not _is_nt_symbol(sym):
+                        break
+                    tail.add(sym.get_value())
+                for j, sym in enumerate(syms):
+                    if _is_nt_symbol(sym):
+                        refs.setdefault(sym.get_value(), []).append((syms, j))
+        self.refs[nt], self.corner[nt], self.tail[nt] = refs, corner, tail
+        for y, places in refs.items():
+            self.uses.setdefault(y, {})[nt] = places
+        for b in corner:
+            self.corner_rev.setdefault(b, set()).add(nt)
+        for b in tail:
+            self.tail_rev.setdefault(b, set()).add(nt)
+
+    def _update_first(self, changed):
+        return self._propagate({nt for nt in changed if nt in self.nts},
+                               self.corner_rev, self.corner, self.first, self._first_of)
+
+    def _update_follow(self, seeds):
+        return self._propagate(seeds, self.tail, self.tail_rev, self.follow, self._follow_of)
+
+    def _propagate(self, seeds, succ, pred, values, recompute):
+        """
+        Recalcula 'values' para as sementes e, componente a componente pela
+        ordem das dependências, para os sucessores cujas entradas mudaram.
+        Devolve os NTs cujo conjunto ficou diferente.
+        """
+        affected, work = set(), list(seeds)
+        while work:
+            nt = work.pop()
+            if nt not in affected:
+                affected.add(nt)
+                work.extend(succ.get(nt, ()))
+
+        graph   = {nt: [p for p in pred.get(nt, ()) if p in affected] for nt in affected}
+        changed = set()
+        for scc in strongly_connected_components(graph):
+            if not any(nt in seeds or any(p in changed for p in graph[nt]) for nt in scc):
+                continue
+            old = {nt: values.get(nt) for nt in scc}
+            for nt in scc:
+                values[nt] = set()
+            cyclic = len(scc) > 1 or scc[0] in graph[scc[0]]
+            again  = True
+            while again:
+                again = False
+                for nt in scc:
+                    before = len(values[nt])
+                    recompute(nt)
+                    again |= cyclic and len(values[nt]) > before
+            changed.update(nt for nt in scc if values[nt] != old[nt])
+        return changed
+
+    def _preceding(self, y):
+        """NTs X com X γ y numa alternativa, γ só de NTs: FIRST(y) entra no FOLLOW(X)."""
+        result = set()
+        for places in self.uses.get(y, {}).values():
+            for syms, j in places:
+                i = j - 1
+                while i >= 0 and _is_nt_symbol(syms[i]):
+                    result.add(syms[i].get_value())
+                    i -= 1
+        return result
+
+    def _first_of(self, nt):
+        result = self.first[nt]
+        for rule in self.blocks[nt]:
+            for seq in rule.altlist.sequences:
+                _first_of_seq(seq.symbols, self.first, self.nts, result)
+
+    def _follow_of(self, b):
+        result = self.follow[b]
+        if b == self.start:
+            result.add('$')
+        for head, places in self.uses.get(b, {}).items():
+            if head not in self.blocks:
+                continue
+            for syms, j in places:
+                beta = first_of_seq(syms[j + 1:], self.first, self.nts)
+                result |= beta - {'ε'}
+                if 'ε' in beta:
+                    result |= self.follow[head]
+
+    def _check(self, nt):
+        conflicts, row, idx = [], {}, 0
+        for rule in self.blocks[nt]:
+            seqs = rule.altlist.sequences
+            conflicts.extend(check_rule_ll1(nt, seqs, self.first, self.follow, self.nts))
+            for seq in seqs:
+                sf = first_of_seq(seq.symbols, self.first, self.nts)
+                la = sf - {'ε'}
+                if 'ε' in sf:
+                    la = la | self.follow[nt]
+                for t in la:
+                    row.setdefault(t, []).append(idx)
+                idx += 1
+        self.rule_conflicts[nt] = conflicts
+        self.rows[nt] = row
+
+
+# ── Front end incremental ─────────────────────────────────────────────
+
+class _Block:
+    """Nó de um bloco de texto e o que contribui para a validação."""
+    __slots__ = ('node', 'refs', 'terms')
+
+    def __init__(self, node):
+        self.node  = node
+        self.refs  = set()    # NTs referidos
+        self.terms = set()    # terminais com nome (não 'inline') usados
+        if isinstance(node, RuleNode):
+            for seq in node.altlist.sequences:
+                for sym in seq.symbols:
+                    if isinstance(sym.child, IdentifierNode):
+                        self.refs.add(sym.get_value())
+                    elif isinstance(sym.child, TerminalNameNode) and \
+                            not sym.get_value().startswith(("'", '"')):
+                        self.terms.add(sym.get_value())
+
+
+def _parse_block(kind, text, lineno):
+    """Passa um bloco isolado pelo parser PLY; None se tiver qualquer erro."""
+    header = '' if kind == 'start' else 'start: S\n'
+    gp_parser._parse_errors.clear()
+    gp_parser.lexer.lineno = lineno - header.count('\n')
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec = gp_parser.parser.parse(header + text + '\n', lexer=gp_parser.lexer)
+    if spec is None or gp_parser._parse_errors:
+        return None
+    rules, decls = spec.rulelist.rules, spec.tokensection.decls
+    if kind == 'start':
+        return spec.axioma if not rules and not decls else None
+    if kind == 'rule':
+        # Regras com EBNF: os nomes dos auxiliares dependem da gramática toda
+        ok = len(rules) == 1 and not decls and not gp_parser.has_ebnf(rules[0])
+        return rules[0] if ok else None
+    return decls[0] if len(decls) == 1 and not rules else None
+
+
+class IncrementalParser:
+    """parse_grammar que só volta a analisar os blocos de texto alterados."""
+
+    def __init__(self):
+        self._reset()
+        self.last_update = {}
+
+    def _reset(self):
+        self._cache   = {}      # (kind, texto) → _Block
+        self._active  = {}      # id(_Block) → _Block da última gramática
+        self._merged  = {}      # NT → (ids das partes, RuleNode fundido, partes)
+        self._refs    = {}      # NT → nº de blocos que o referem
+        self._terms   = {}      # terminal → nº de blocos que o usam
+        self._parts   = {}      # NT → nº de blocos que o definem
+        self._tokens  = {}      # terminal → nº de declarações
+        self._start   = None
+        self._undefined, self._unused, self._undeclared = set(), set(), set()
+
+    def parse(self, src):
+        t0     = time.perf_counter()
+        blocks = split_spec_blocks(src)
+        kinds  = [b[0] for b in blocks if b[0]]
+        # O parser completo exige 'start:' na primeira linha (nem comentários antes)
+        if (not blocks or blocks[0][0] != 'start' or 'start' in kinds[1:] or 'other' in kinds
+                or 'rule' not in kinds):
+            return self._full(src, t0, len(blocks))
+
+        cache, entries, reparsed = {}, [], 0
+        for kind, _, lineno, lines in blocks:
+            if kind is None:
+                continue
+            key   = (kind, '\n'.join(lines))
+            entry = self._cache.pop(key, None)
+            if entry is None:
+                node = _parse_block(kind, key[1], lineno)
+                if node is None:
+                    return self._full(src, t0, len(blocks))
+                entry = _Block(node)
+                reparsed += 1
+            cache.setdefault(key, entry)
+            entries.append((kind, entry))
+        self._cache = cache
+
+        grammar = self._assemble(entries)
+        self.last_update = {
+            'blocks':   len(entries),
+            'reparsed': reparsed,
+            'full':     False,
+            'time_ms':  round((time.perf_counter() - t0) * 1e3, 3),
+        }
+        return grammar
+
+    def _full(self, src, t0, n_blocks):
+        """Fallback: parse completo (erros e linhas exatamente como parse_grammar)."""
+        self._reset()
+        grammar = gp_parser.parse_grammar(src)
+        self.last_update = {
+            'blocks':   n_blocks,
+            'reparsed': n_blocks,
+            'full':     True,
+            'time_ms':  round((time.perf_counter() - t0) * 1e3, 3),
+        }
+        return grammar
+
+    def _assemble(self, entries):
+        axioma = next(e.node for k, e in entries if k == 'start')
+        decls  = [e.node for k, e in entries if k == 'token']
+        parts  = {}
+        for kind, entry in entries:
+            if kind == 'rule':
+                parts.setdefault(entry.node.get_head_name(), []).append(entry.node)
+
+        # Fusão: uma regra só com um bloco é o próprio RuleNode; as outras
+        # só são refeitas se alguma das partes mudou
+        rules, merged = [], {}
+        for nt, nodes in parts.items():
+            if len(nodes) == 1:
+                rules.append(nodes[0])
+                continue
+            ids = tuple(map(id, nodes))
+            old = self._merged.get(nt)
+            if old is not None and old[0] == ids:
+                merged[nt] = old
+            else:
+                merged[nt] = (ids, RuleNode(IdentifierNode(nt), AltListNode(
+                    [seq for node in nodes for seq in node.altlist.sequences])), nodes)
+            rules.append(merged[nt][1])
+        self._merged = merged
+
+        spec = SpecNode(axioma, RuleListNode(rules), TokenSectionNode(decls))
+        errors, warnings = self._validate(spec, entries)
+
+        gp_parser._parse_errors.clear()
+        gp_parser._parse_warnings.clear()
+        for e in errors:
+            msg = f"[ERRO SEMÂNTICO] {e}"
+            gp_parser._parse_errors.append(msg)
+            print(msg)
+        for w in warnings:
+            msg = f"[AVISO] {w}"
+            gp_parser._parse_warnings.append(msg)
+            print(msg)
+        return None if errors else spec
+
+    def _validate(self, spec, entries):
+        """SpecNode.validate, com contadores atualizados só pelos blocos que mudaram."""
+        active  = {id(e): e for _, e in entries}
+        touched = set()
+        for sign, group in ((-1, self._active.keys() - active.keys()),
+                            (+1, active.keys() - self._active.keys())):
+            source = self._active if sign < 0 else active
+            for key in group:
+                entry = source[key]
+                node  = entry.node
+                if isinstance(node, RuleNode):
+                    _bump(self._parts, node.get_head_name(), sign)
+                    touched.add(node.get_head_name())
+                    for nt in entry.refs:
+                        _bump(self._refs, nt, sign)
+                    for t in entry.terms:
+                        _bump(self._terms, t, sign)
+                    touched |= entry.refs | entry.terms
+                elif isinstance(node, TokenDeclNode):
+                    _bump(self._tokens, node.name.value, sign)
+                    touched.add(node.name.value)
+        self._active = active
+
+        start = spec.get_start()
+        if start != self._start:
+            touched |= {start, self._start}
+            self._start = start
+        for name in touched:
+            for problems, bad in (
+                (self._undefined,  self._refs.get(name) and not self._parts.get(name)),
+                (self._unused,     self._parts.get(name) and not self._refs.get(name)
+                                   and name != start),
+                (self._undeclared, self._terms.get(name) and not self._tokens.get(name)),
+            ):
+                if bad:
+                    problems.add(name)
+                else:
+                    problems.discard(name)
+
+        errors, warnings = [], []
+        if not self._parts.get(start):
+            errors.append(f"O símbolo inicial '{start}' não tem nenhuma regra definida.")
+        for nt in sorted(self._undefined):
+            errors.append(
+                f"O não-terminal '{nt}' é usado nas produções mas não tem regra definida."
+            )
+        for t in sorted(self._undeclared):
+            warnings.append(
+                f"O terminal '{t}' é usado nas produções mas não tem padrão regex "
+                f"declarado na TokenSection."
+            )
+        seen_tokens = set()
+        for decl in spec.tokensection.decls:
+            name = decl.name.value
+            if name in seen_tokens:
+                warnings.append(
+                    f"O terminal '{name}' está declarado mais que uma vez na TokenSection."
+                )
+            seen_tokens.add(name)
+        for nt in sorted(self._unused):
+            warnings.append(
+                f"O não-terminal '{nt}' tem regra definida mas nunca é referenciado."
+            )
+        return errors, warnings
+
+
+def _bump(counter, key, delta):
+    n = counter.get(key, 0) + delta
+    if n:
+        counter[key] = n
+    else:
+        counter.pop(key, None)
+
+
+# ── Frases ────────────────────────────────────────────────────────────
+
+class _Span:
+    """Uma chamada parse_X: valor devolvido, nº de tokens consumidos e chamadas filhas."""
+    __slots__ = ('nt', 'value', 'width', 'parent', 'kids', 'alive', 'seen')
+
+    def __init__(self, nt, parent, gen):
+        self.nt     = nt
+        self.value  = None
+        self.width  = 0
+        self.parent = parent
+        self.kids   = []          # durante a chamada: (filho, início, fim)
+        self.alive  = False       # concluída e com todos os tokens inalterados
+        self.seen   = gen         # última análise em que fez parte da árvore
+
+
+class IncrementalPhrase:
+    """Frase analisada pelo motor RD compilado, atualizável por edições de texto."""
+
+    def __init__(self, grammar, first, follow, simplify=None, pratt=False):
+        self.engine = compile_rd(grammar, first, follow, simplify, pratt)
+        self.text   = ''
+        self.tree   = None
+        self.tokens = None        # None: a próxima edição analisa o texto todo
+        self.last_update = {}
+        self._gen    = 0
+        self._stack  = [_Span(None, None, 0)]      # sentinela (nunca está viva)
+        self._killed = []         # chamadas mortas cujos filhos podem ter ficado órfãos
+        parsers = self.engine.parsers
+        for nt, inner in list(parsers.items()):
+            parsers[nt] = self._wrap(nt, inner)
+
+    # ── Interface ─────────────────────────────────────────────────────
+
+    def parse(self, text):
+        """Análise completa de text (também repõe o estado depois de um erro léxico)."""
+        t0 = time.perf_counter()
+        self.text, self.tokens, self.tree = text, None, None
+        scanned = list(self.engine.scanner.scan(text))
+        self.tokens  = [(tipo, lex) for tipo, lex, _ in scanned] + [('$', '$')]
+        self._starts = [p for _, _, p in scanned] + [len(text)]
+        n = len(self.tokens)
+        self._slots  = [{} for _ in range(n)]     # início → {NT: _Span}
+        self._owner  = [None] * n                 # token → chamada mais interna que o consome
+        self._ends   = [[] for _ in range(n)]     # token → chamadas que o têm como lookahead
+        self._killed = []
+        return self._run(t0, n, True)
+
+    def edit(self, offset, deleted, inserted):
+        """Substitui text[offset:offset+deleted] por inserted e reanalisa só o necessário."""
+        if not 0 <= offset <= offset + deleted <= len(self.text):
+            raise ValueError(f"Edição fora do texto: offset={offset}, apagados={deleted}, "
+                             f"comprimento={len(self.text)}")
+        t0   = time.perf_counter()
+        text = self.text[:offset] + inserted + self.text[offset + deleted:]
+        if self.tokens is None:
+            return self.parse(text)
+
+        tokens, starts = self.tokens, self._starts
+        n_old    = len(tokens)
+        delta    = len(inserted) - deleted
+        edit_end = offset + len(inserted)
+        # Um token antes do da edição é sempre relexado: o anterior pode crescer ("12" + "3")
+        a = max(0, bisect_right(starts, offset) - 2)
+
+        mid, mid_starts, b = [], [], n_old
+        try:
+            for tipo, lex, p in self.engine.scanner.scan(text, min(starts[a], offset)):
+                mid.append((tipo, lex))
+                mid_starts.append(p)
+                if p >= edit_end:
+                    # Mesmo texto daqui em diante: se um token antigo começava aqui, os
+                    # tokens seguintes são os antigos
+                    j = bisect_left(starts, p - delta, a)
+                    if j < n_old - 1 and starts[j] == p - delta and tokens[j] == (tipo, lex):
+                        b = j + 1
+                        break
+            else:
+                mid.append(('$', '$'))
+                mid_starts.append(len(text))
+        except SyntaxError:
+            self.text, self.tokens, self.tree = text, None, None
+            raise
+
+        self._invalidate(a, b)
+        tokens[a:b]      = mid
+        starts[a:]       = mid_starts + [p + delta for p in starts[b:]]
+        self._slots[a:b] = [{} for _ in mid]
+        self._owner[a:b] = [None] * len(mid)
+        self._ends[a:b]  = [[] for _ in mid]
+        self.text = text
+        return self._run(t0, len(mid), False)
+
+    # ── Reaproveitamento ──────────────────────────────────────────────
+
+    def _wrap(self, nt, inner):
+        stack = self._stack
+
+        def parse_nt(toks, pos):
+            parent = stack[-1]
+            span   = self._slots[pos].get(nt)
+            if span is not None and span.alive:
+                end = pos + span.width
+                span.parent, span.seen = parent, self._gen
+                parent.kids.append((span, pos, end))
+                self._reused += 1
+                return span.value, end
+            span = _Span(nt, parent, self._gen)
+            stack.append(span)
+            try:
+                value, end = inner(toks, pos)
+            except BaseException:
+                span.kids = [k for k, _, _ in span.kids]
+                self._killed.append(span)        # os filhos já concluídos ficam órfãos
+                raise
+            finally:
+                stack.pop()
+            self._record(span, value, pos, end)
+            parent.kids.append((span, pos, end))
+            return value, end
+
+        return parse_nt
+
+    def _record(self, span, value, start, end):
+        span.value, span.width, span.alive = value, end - start, True
+        self._slots[start][span.nt] = span
+        owner, pos = self._owner, start
+        for _, s, e in span.kids:         # tokens entre os filhos: consumidos pela própria chamada
+            for t in range(pos, s):
+                owner[t] = span
+            pos = max(pos, e)
+        for t in range(pos, end):
+            owner[t] = span
+        span.kids = [k for k, _, _ in span.kids]
+        ends = self._ends[end]
+        if len(ends) > 8:
+            ends[:] = [x for x in ends if x.alive]
+        ends.append(span)
+        self._reparsed += 1
+
+    def _invalidate(self, a, b):
+        """Mata as chamadas que consomem ou olham para os tokens antigos [a, b) e as que as contêm."""
+        killed = self._killed
+        for t in range(a, b):
+            for span in (self._owner[t], *self._ends[t]):
+                while span is not None and span.alive:
+                    span.alive = False
+                    killed.append(span)
+                    span = span.parent
+
+    def _sweep(self, spans):
+        """Filhos de chamadas mortas que a nova árvore não reaproveitou morrem também."""
+        gen, work = self._gen, [k for s in spans for k in s.kids]
+        while work:
+            span = work.pop()
+            if span.seen == gen or not span.alive:
+                continue
+            span.alive = False
+            work.extend(span.kids)
+
+    def _run(self, t0, relexed, full):
+        self._gen += 1
+        self._reused = self._reparsed = 0
+        killed, self._killed = self._killed, []
+        self._stack[0].kids = []
+        try:
+            self.tree = self.engine.parse_tokens(self.tokens)
+        except SyntaxError:
+            self.tree = None
+            raise
+        finally:
+            self._sweep(killed)
+            self.last_update = {
+                'tokens':   len(self.tokens),
+                'relexed':  relexed,
+                'reparsed': self._reparsed,
+                'reused':   self._reused,
+                'full':     full,
+                'time_ms':  round((time.perf_counter() - t0) * 1e3, 3),
+            }
+        return self.tree
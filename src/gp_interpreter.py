@@ -1,12 +1,20 @@
 """
-gp_interpreter.py — Interpreta frases usando os parsers gerados.
+gp_interpreter.py — Interpreta frases com o parser recursivo descendente.
 
-parse_with_rd() usa o código produzido por generate_rd_parser(),
-executado num namespace isolado. A assinatura pública é idêntica
-à anterior para não quebrar app.py.
+parse_with_rd() usa o motor compilado de gp_engine (closures construídas
+a partir da ASA, sem gerar código nem exec). A assinatura pública é
+idêntica à anterior para não quebrar app.py.
+
+parse_with_earley() é a alternativa para gramáticas com conflitos: devolve
+também o número de derivações da frase (ver gp_earley).
+
+Ambas aceitam simplify (gp_simplify.TreeSimplifier): os passos são então
+os da árvore simplificada. parse_with_rd aceita ainda pratt (ver gp_pratt).
 """
 
-from gp_parser_rd import generate_rd_parser
+from gp_engine  import compile_rd
+from gp_earley  import compile_earley
+from gp_helpers import flatten_helpers
 
 
 def steps_from_tree(tree, steps=None, counter=None):
@@ -48,19 +56,34 @@ def steps_from_tree(tree, steps=None, counter=None):
     return steps
 
 
-def parse_with_rd(grammar, first, follow, phrase: str, patterns: dict):
-    rd_code = generate_rd_parser(grammar, first, follow)
+def parse_with_rd(grammar, first, follow, phrase: str, patterns: dict, engine=None,
+                  simplify=None, pratt=False):
+    if engine is None:
+        engine = compile_rd(grammar, first, follow, simplify, pratt)
+    tree = engine.parse(phrase)
 
-    # Executar o código gerado num namespace isolado
-    ns = {}
-    exec(compile(rd_code, '<rd_parser>', 'exec'), ns)
+    # Reconstruir steps a partir da árvore para a UI
+    steps = steps_from_tree(tree)
+    steps.append({
+        'step':   len(steps) + 1,
+        'stack':  [],
+        'input':  '$',
+        'action': 'ACEITE',
+    })
+    return tree, steps
 
-    # Tokenizar e parsear com as classes geradas
-    lex    = ns['Lexer'](phrase)
-    parser = ns['Parser'](lex.tokens)
-    tree   = parser.parse()
 
-    # Reconstruir steps a partir da árvore para a UI
+def parse_with_earley(grammar, phrase: str, engine=None, simplify=None):
+    """(árvore, passos, nº de derivações — float('inf') se a gramática for cíclica)."""
+    if engine is None:
+        engine = compile_earley(grammar)
+    forest = engine.parse_forest(phrase)
+    tree   = forest.tree()
+    if simplify is not None:
+        tree = simplify.simplify(tree)
+    else:
+        tree = flatten_helpers(tree, engine.helpers)
+
     steps = steps_from_tree(tree)
     steps.append({
         'step':   len(steps) + 1,
@@ -68,4 +91,4 @@ def parse_with_rd(grammar, first, follow, phrase: str, patterns: dict):
         'input':  '$',
         'action': 'ACEITE',
     })
-    return tree, steps
\ No newline at end of file
+    return tree, steps, forest.count()
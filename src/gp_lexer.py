@@ -12,6 +12,11 @@ tokens = (
     'COLON',
     'EPSILON',
     'NEWLINE',
+    'STAR',
+    'PLUS',
+    'QUESTION',
+    'LPAREN',
+    'RPAREN',
 )
 
 t_ignore = ' \t'
@@ -27,6 +32,14 @@ def t_PIPE(t):
     return t
 
 
+# Operadores EBNF: repetição, opcional e agrupamento
+t_STAR     = r'\*'
+t_PLUS     = r'\+'
+t_QUESTION = r'\?'
+t_LPAREN   = r'\('
+t_RPAREN   = r'\)'
+
+
 def t_REGEX(t):
     r'/\S+/'
     t.value = t.value[1:-1]   # remove as barras delimitadoras
@@ -0,0 +1,375 @@
+"""
+gp_lr.py — Tabelas SLR / LALR(1) e parser shift-reduce.
+
+Alternativa ao pipeline LL(1) para gramáticas recursivas à esquerda
+(ex.: Expr -> Expr '+' Term), que aqui são aceites sem transformação e
+em tempo linear.
+
+    tables  = build_lr_tables(grammar, method='lalr')   # ou 'slr'
+    tables.conflicts                                    # mesmo formato que check_ll1
+    parser  = compile_lr(grammar)
+    tree    = parser.parse("1 + 2 * 3")                 # TreeNode (label/children/lexema)
+
+Construção:
+    1. coleção canónica LR(0) (closure/goto sobre itens (produção, ponto));
+    2. SLR: reduzir A -> α· em FOLLOW(A);
+       LALR(1): lookaheads dos itens de kernel por geração espontânea e
+       propagação (algoritmo do "Dragon Book", §4.7.5), sem construir LR(1).
+    3. Conflitos resolvidos como no yacc (shift ganha a reduce; entre reduces,
+       a produção que aparece primeiro) e reportados como em check_ll1.
+
+Ações codificadas como inteiros: a >= 0 é shift para o estado a; a < 0 é
+reduce pela produção -a-1 (a produção 0, S' -> S, é o ACEITE).
+"""
+
+from gp_parser_rd import _tipo
+from gp_parser_td import TreeNode
+from gp_helpers   import is_epsilon_seq, flatten_helpers
+from gp_scanner   import Scanner, grammar_scanner_rules
+
+
+METHODS = {'slr': 'SLR(1)', 'lalr': 'LALR(1)'}
+
+_PROBE = '#'   # lookahead fictício usado para detetar propagação
+
+
+class LRTables:
+    """Autómato LR(0), tabelas ACTION/GOTO e conflitos de uma gramática."""
+
+    def __init__(self, grammar, method='lalr'):
+        if method not in METHODS:
+            raise ValueError(f"Método LR inválido: {method!r}")
+        self.method = method
+
+        # ── Produções (terminais já normalizados para o tipo do token) ──
+        nts   = grammar.get_nonterminals()
+        start = grammar.get_start()
+        aug   = start + "'"
+        while aug in nts:
+            aug += "'"
+
+        self.start       = aug
+        self.nonterminals = set(nts) | {aug}
+        self.productions = [(aug, (start,))]
+        for rule in grammar.get_rules():
+            head = rule.get_head_name()
+            for seq in rule.altlist.sequences:
+                rhs = () if is_epsilon_seq(seq) else tuple(
+                    s.get_value() if not s.get_is_terminal() else _tipo(s.get_value())
+                    for s in seq.symbols
+                )
+                self.productions.append((head, rhs))
+
+        self.by_head = {}
+        for p, (head, _) in enumerate(self.productions):
+            self.by_head.setdefault(head, []).append(p)
+
+        self._compute_first_follow()
+        self._build_lr0()
+        self._build_tables()
+
+    # ── FIRST / FOLLOW sobre as produções normalizadas ────────────────
+
+    def _compute_first_follow(self):
+        nts      = self.nonterminals
+        nullable = set()
+        first    = {nt: set() for nt in nts}
+
+        changed = True
+        while changed:
+            changed = False
+            for head, rhs in self.productions:
+                before = (head in nullable, len(first[head]))
+                for sym in rhs:
+                    if sym in nts:
+                        first[head] |= first[sym]
+                        if sym not in nullable:
+                            break
+                    else:
+                        first[head].add(sym)
+                        break
+                else:
+                    nullable.add(head)
+                if (head in nullable, len(first[head])) != before:
+                    changed = True
+
+        self.nullable = nullable
+        self.first    = first
+
+        follow = {nt: set() for nt in nts}
+        follow[self.start].add('$')
+        changed = True
+        while changed:
+            changed = False
+            for head, rhs in self.productions:
+                for i, sym in enumerate(rhs):
+                    if sym not in nts:
+                        continue
+                    before = len(follow[sym])
+                    rest_first, rest_nullable = self._first_seq(rhs[i + 1:])
+                    follow[sym] |= rest_first
+                    if rest_nullable:
+                        follow[sym] |= follow[head]
+                    if len(follow[sym]) > before:
+                        changed = True
+        self.follow = follow
+
+    def _first_seq(self, symbols):
+        """(FIRST da sequência sem ε, se é anulável)."""
+        result = set()
+        for sym in symbols:
+            if sym in self.nonterminals:
+                result |= self.first[sym]
+                if sym not in self.nullable:
+                    return result, False
+            else:
+                result.add(sym)
+                return result, False
+        return result, True
+
+    # ── Autómato LR(0) ────────────────────────────────────────────────
+
+    def _closure(self, kernel):
+        items = list(kernel)
+        seen  = set(items)
+        for p, d in items:
+            rhs = self.productions[p][1]
+            if d < len(rhs) and rhs[d] in self.nonterminals:
+                for q in self.by_head[rhs[d]]:
+                    if (q, 0) not in seen:
+                        seen.add((q, 0))
+                        items.append((q, 0))
+        return items
+
+    def _build_lr0(self):
+        self.kernels     = [((0, 0),)]
+        self.transitions = []            # transitions[s] = {símbolo: estado}
+        index = {self.kernels[0]: 0}
+
+        s = 0
+        while s < len(self.kernels):
+            moves = {}
+            for p, d in self._closure(self.kernels[s]):
+                rhs = self.productions[p][1]
+                if d < len(rhs):
+                    moves.setdefault(rhs[d], []).append((p, d + 1))
+            trans = {}
+            for sym, items in moves.items():
+                kernel = tuple(sorted(set(items)))
+                if kernel not in index:
+                    index[kernel] = len(self.kernels)
+                    self.kernels.append(kernel)
+                trans[sym] = index[kernel]
+            self.transitions.append(trans)
+            s += 1
+
+    # ── Lookaheads ────────────────────────────────────────────────────
+
+    def _closure1(self, items):
+        """Closure LR(1) de [(p, d, lookahead)]."""
+        result = list(items)
+        seen   = set(result)
+        for p, d, la in result:
+            rhs = self.productions[p][1]
+            if d >= len(rhs) or rhs[d] not in self.nonterminals:
+                continue
+            firsts, rest_nullable = self._first_seq(rhs[d + 1:])
+            if rest_nullable:
+                firsts = firsts | {la}
+            for q in self.by_head[rhs[d]]:
+                for b in firsts:
+                    if (q, 0, b) not in seen:
+                        seen.add((q, 0, b))
+                        result.append((q, 0, b))
+        return result
+
+    def _lalr_lookaheads(self):
+        """Lookaheads dos itens de kernel: geração espontânea + propagação."""
+        la    = {(s, item): set() for s, kernel in enumerate(self.kernels) for item in kernel}
+        links = {key: [] for key in la}
+        la[(0, (0, 0))].add('$')
+
+        for s, kernel in enumerate(self.kernels):
+            for item in kernel:
+                for p, d, a in self._closure1([(item[0], item[1], _PROBE)]):
+                    rhs = self.productions[p][1]
+                    if d >= len(rhs):
+                        continue
+                    target = (self.transitions[s][rhs[d]], (p, d + 1))
+                    if a == _PROBE:
+                        links[(s, item)].append(target)
+                    else:
+                        la[target].add(a)
+
+        changed = True
+        while changed:
+            changed = False
+            for src, targets in links.items():
+                for dst in targets:
+                    before = len(la[dst])
+                    la[dst] |= la[src]
+                    if len(la[dst]) > before:
+                        changed = True
+        return la
+
+    def _reductions(self):
+        """[(estado, produção, lookaheads)] para todos os itens completos."""
+        result = []
+        if self.method == 'slr':
+            for s, kernel in enumerate(self.kernels):
+                for p, d in self._closure(kernel):
+                    if d == len(self.productions[p][1]):
+                        result.append((s, p, self.follow[self.productions[p][0]]))
+            return result
+
+        kernel_la = self._lalr_lookaheads()
+        for s, kernel in enumerate(self.kernels):
+            items = [(p, d, a) for p, d in kernel for a in kernel_la[(s, (p, d))]]
+            by_prod = {}
+            for p, d, a in self._closure1(items):
+                if d == len(self.productions[p][1]):
+                    by_prod.setdefault(p, set()).add(a)
+            result.extend((s, p, las) for p, las in by_prod.items())
+        return result
+
+    # ── Tabelas e conflitos ───────────────────────────────────────────
+
+    def _build_tables(self):
+        n = len(self.kernels)
+        self.action = [{} for _ in range(n)]
+        self.goto   = [{} for _ in range(n)]
+        found = {}   # (estado, tipo, produções) → símbolos
+
+        for s, trans in enumerate(self.transitions):
+            for sym, t in trans.items():
+                if sym in self.nonterminals:
+                    self.goto[s][sym] = t
+                else:
+                    self.action[s][sym] = t
+
+        for s, p, lookaheads in sorted(self._reductions(), key=lambda r: (r[0], r[1])):
+            for a in lookaheads:
+                current = self.action[s].get(a)
+                if current is None:
+                    self.action[s][a] = -p - 1
+                elif current >= 0:
+                    found.setdefault((s, 'SHIFT/REDUCE', (p,)), set()).add(a)
+                else:
+                    q = -current - 1
+                    found.setdefault((s, 'REDUCE/REDUCE', (q, p)), set()).add(a)
+
+        self.conflicts = []
+        for (s, kind, prods), symbols in sorted(found.items(), key=lambda kv: kv[0][:2]):
+            alts = tuple(self.production_repr(p) for p in prods)
+            if kind == 'SHIFT/REDUCE':
+                message = (f"Estado {s}: shift de {sorted(symbols)} ou reduce por {alts[0]} "
+                           f"(resolvido com shift)")
+            else:
+                message = (f"Estado {s}: reduce por {alts[0]} ou {alts[1]} em {sorted(symbols)} "
+                           f"(resolvido com a primeira)")
+            self.conflicts.append({
+                'type':        kind,
+                'nonterminal': self.productions[prods[-1]][0],
+                'alts':        alts,
+                'symbols':     symbols,
+                'state':       s,
+                'message':     message,
+            })
+
+    def production_repr(self, p):
+        head, rhs = self.productions[p]
+        return f"{head} -> {' '.join(rhs) if rhs else 'ε'}"
+
+    def expected(self, state):
+        return sorted(self.action[state])
+
+
+def build_lr_tables(grammar, method='lalr') -> LRTables:
+    return LRTables(grammar, method)
+
+
+def check_lr(grammar, method='lalr'):
+    """Conflitos SLR/LALR(1) no formato de check_ll1 (mais 'state' e 'message')."""
+    return LRTables(grammar, method).conflicts
+
+
+class LRParser:
+    """Parser shift-reduce dirigido pelas tabelas; reutilizável para muitas frases."""
+
+    def __init__(self, grammar, method='lalr', tables=None, simplify=None):
+        self.tables   = tables or LRTables(grammar, method)
+        self.scanner  = Scanner(grammar_scanner_rules(grammar))
+        self.helpers  = getattr(grammar, 'ebnf_helpers', {})
+        self.simplify = simplify     # gp_simplify.TreeSimplifier: nós simplificados ao reduzir
+        self.steps    = []
+
+    def tokenize(self, source):
+        return self.scanner.tokenize(source)
+
+    def parse_tokens(self, tokens, trace=False):
+        tables  = self.tables
+        action  = tables.action
+        goto    = tables.goto
+        prods   = tables.productions
+        states  = [0]
+        nodes   = []
+        pos     = 0
+        self.steps = steps = []
+
+        while True:
+            tipo, lexema = tokens[pos]
+            a = action[states[-1]].get(tipo)
+
+            if trace:
+                steps.append({
+                    'step':   len(steps) + 1,
+                    'stack':  [n.label if n is not None else 'ε' for n in nodes],
+                    'input':  lexema,
+                    'action': '',
+                })
+
+            if a is None:
+                raise SyntaxError(
+                    f"Símbolo {tipo!r} ({lexema!r}) inesperado. "
+                    f"Esperado um de: {tables.expected(states[-1])}"
+                )
+
+            if a >= 0:
+                states.append(a)
+                nodes.append(TreeNode(tipo, lexema=lexema))
+                pos += 1
+                if trace:
+                    steps[-1]['action'] = f'avança: {tipo!r} = {lexema!r}'
+                continue
+
+            p = -a - 1
+            if p == 0:
+                if trace:
+                    steps[-1]['action'] = 'ACEITE'
+                if self.simplify:
+                    return self.simplify.finish(nodes[-1])
+                return flatten_helpers(nodes[-1], self.helpers)
+
+            head, rhs = prods[p]
+            if rhs:
+                n        = len(rhs)
+                children = nodes[-n:]
+                del nodes[-n:]
+                del states[-n:]
+            else:
+                children = [] if self.simplify else [TreeNode('ε')]
+            if self.simplify:
+                # None = nó vazio que desapareceu; a pilha de estados continua alinhada
+                nodes.append(self.simplify.node(head, [c for c in children if c is not None]))
+            else:
+                nodes.append(TreeNode(head, children=children))
+            states.append(goto[states[-1]][head])
+            if trace:
+                steps[-1]['action'] = f'produção: {tables.production_repr(p)} (reduz)'
+
+    def parse(self, source, trace=False):
+        return self.parse_tokens(self.tokenize(source), trace)
+
+
+def compile_lr(grammar, method='lalr', simplify=None) -> LRParser:
+    return LRParser(grammar, method, simplify=simplify)
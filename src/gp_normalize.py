@@ -0,0 +1,144 @@
+"""
+gp_normalize.py — Aplica as sugestões de correção até a gramática ser LL(1).
+
+Cada ronda analisa a gramática (FIRST/FOLLOW e conflitos), pede as
+sugestões a suggest_fixes e aplica as aplicáveis diretamente na ASA: só
+as regras alteradas são reconstruídas, as restantes RuleNode são
+reaproveitadas de ronda para ronda, e a análise (IncrementalAnalysis)
+só recalcula as regras reescritas e os NTs que dependem delas. Pára quando não há conflitos, quando
+nenhuma sugestão muda uma regra (ou volta a um estado já visto) ou ao fim
+de max_rounds.
+
+    result = normalize(src)
+    result['grammar']    # texto final (secção de tokens e comentários preservados)
+    result['ll1']        # True se já não há conflitos
+    result['rounds']     # [{'round', 'conflicts', 'applied', 'time_ms'}, ...]
+"""
+
+import re
+import time
+
+from gp_ast         import (IdentifierNode, TerminalNameNode, EpsilonNode, SymbolNode,
+                            SeqNode, AltListNode, RuleNode, RuleListNode, SpecNode)
+from gp_parser      import parse_grammar, get_parse_errors
+from gp_analysis    import suggest_fixes
+from gp_transform   import rules_of, rule_text, parse_rule_text
+from gp_helpers     import rebuild_grammar, define_helpers
+from gp_incremental import IncrementalAnalysis
+
+
+_TERMINAL_RE = re.compile(r"[A-Z][A-Z0-9_]+")
+
+
+def _symbol(text):
+    """Mesma classificação que o lexer: 'x' e MAIÚSCULAS (2+) são terminais."""
+    if text[0] in "'\"" or _TERMINAL_RE.fullmatch(text.rstrip("'")):
+        return SymbolNode(TerminalNameNode(text))
+    return SymbolNode(IdentifierNode(text))
+
+
+def _rule_node(nt, alts):
+    seqs = [SeqNode([_symbol(s) for s in alt]) if alt else SeqNode([SymbolNode(EpsilonNode())])
+            for alt in alts]
+    return RuleNode(IdentifierNode(nt), AltListNode(seqs))
+
+
+def grammar_text(grammar) -> str:
+    """Texto da gramática a partir da ASA (quando não há texto original)."""
+    lines = [f"start: {grammar.get_start()}"]
+    lines += [rule_text(nt, alts) for nt, alts in rules_of(grammar).items()]
+    patterns = grammar.get_token_patterns()
+    if patterns:
+        lines.append('')
+        lines += [f"{name} = /{regex}/" for name, regex in patterns.items()]
+    return '\n'.join(lines) + '\n'
+
+
+def normalize(src, max_rounds=20):
+    """Analisa o texto da gramática e normaliza-o; ValueError se for inválido."""
+    grammar = parse_grammar(src)
+    if grammar is None:
+        raise ValueError('\n'.join(get_parse_errors()) or 'Gramática inválida')
+    return normalize_grammar(grammar, src, max_rounds)
+
+
+def normalize_grammar(grammar, src=None, max_rounds=20):
+    """
+    Devolve {'grammar', 'spec', 'll1', 'conflicts', 'rounds', 'time_ms'}.
+
+    'spec' é a ASA final; 'grammar' é 'src' com as regras alteradas
+    substituídas (ou o texto gerado da ASA se src for None).
+    """
+    t_start  = time.perf_counter()
+    rules    = rules_of(grammar)
+    nodes    = {}                      # NT → [RuleNode] (reaproveitados se inalterados)
+    for rule in grammar.get_rules():
+        nodes.setdefault(rule.get_head_name(), []).append(rule)
+    changed  = {}
+    seen     = {_state(rules)}
+    rounds   = []
+    spec     = grammar
+    analysis = IncrementalAnalysis(grammar)
+
+    while True:
+        t0        = time.perf_counter()
+        conflicts = analysis.conflicts
+        if not conflicts or len(rounds) == max_rounds:
+            break
+
+        updates, applied = {}, []
+        for s in suggest_fixes(spec, conflicts):
+            if not s.get('aplicavel', True):
+                continue
+            new = [parse_rule_text(r) for r in s.get('new_rules', [])
+                   if '->' in r and not r.startswith('⚠')]
+            if not new:
+                continue
+            updates.update(new)
+            applied.append({
+                'nonterminal': s['nonterminal'],
+                'technique':   s['technique'],
+                'new_rules':   s['new_rules'],
+            })
+        updates = {nt: alts for nt, alts in updates.items() if rules.get(nt) != alts}
+        state   = _state({**rules, **updates})
+        if state in seen:
+            updates = {}               # voltaria a uma gramática já vista: não há progresso
+
+        rounds.append({
+            'round':     len(rounds) + 1,
+            'conflicts': len(conflicts),
+            'applied':   applied if updates else [],
+            'time_ms':   round((time.perf_counter() - t0) * 1e3, 3),
+        })
+        if not updates:
+            break
+
+        seen.add(state)
+        rules.update(updates)
+        changed.update(updates)
+        for nt, alts in updates.items():
+            nodes[nt] = [_rule_node(nt, alts)]
+        spec = SpecNode(grammar.axioma,
+                        RuleListNode([r for nt in rules for r in nodes[nt]]),
+                        grammar.tokensection)
+        analysis.update(spec)
+
+    if src is None:
+        text = grammar_text(spec)
+    else:
+        replacements = {nt: [rule_text(nt, alts)] for nt, alts in changed.items()}
+        text = rebuild_grammar(src, define_helpers(replacements, rules, getattr(grammar, 'ebnf_helpers', {})))
+
+    return {
+        'grammar':   text,
+        'spec':      spec,
+        'll1':       not conflicts,
+        'conflicts': conflicts,
+        'rounds':    rounds,
+        'time_ms':   round((time.perf_counter() - t_start) * 1e3, 3),
+    }
+
+
+def _state(rules):
+    return tuple((nt, tuple(map(tuple, alts))) for nt, alts in rules.items())
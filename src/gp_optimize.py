@@ -0,0 +1,689 @@
+"""
+gp_optimize.py — Otimizações da gramática antes da geração dos parsers.
+
+Fusão de NTs equivalentes: NTs com as mesmas alternativas a menos de
+renomeação (Term e Factor2 copiados um do outro) são detetados por
+refinamento de partições, como na minimização de DFAs, e substituídos
+por um só representante.
+
+    result = merge_equivalent(grammar, src)
+    result['renames']          # {'Factor2': 'Term', ...}
+    result['table']            # {'before': {...}, 'after': {...}} (linhas/células LL(1))
+
+Tokens a partir de sub-linguagens regulares: um NT sem recursão (ou só
+com recursão na cauda, A -> x A | y) cujos terminais têm todos padrão
+(tokens declarados ou literais) deriva uma linguagem regular e pode ser
+reconhecido pelo scanner num só token.
+
+    regular_nonterminals(grammar)              # {NT: regex}
+    result = hoist_tokens(grammar, src)        # opt-in: reescreve a gramática
+    result['hoisted']                          # {'NUMBER_LIT': 'NumberLit', ...}
+    expand_tokens(tree, result['expansions'])  # sub-árvores de volta (Earley)
+
+Inlining: cada NT custa uma chamada no parser RD, um push/pop no
+TableParser e um nó na árvore. São substituídos no sítio onde aparecem:
+
+    • produções unitárias  A -> B          ⇒  A -> β1 | β2 | ...
+    • NTs usados uma só vez A -> α B γ     ⇒  A -> α β γ
+      (com várias alternativas só se B estiver no início: A -> β1 γ | β2 γ)
+
+Uma substituição só é aceite se a regra de A continuar sem conflitos
+LL(1). Como a linguagem de cada NT não muda, FIRST e FOLLOW dos restantes
+NTs também não (o FOLLOW de um B que fique só pode diminuir), pelo que
+basta rever a regra de A com os conjuntos calculados no início.
+
+    result = inline_nonterminals(grammar, src)
+    result['spec'], result['grammar']   # ASA e texto otimizados
+    result['inlined']                   # [{'nonterminal', 'into', 'kind'}, ...]
+    expand_tree(tree, result['expansions'])   # árvore com a forma original
+
+'expansions' indica, para cada alternativa alterada, onde ficavam os nós
+dos NTs eliminados: NT → {rótulos dos filhos: molde}, em que o molde é uma
+lista de símbolos (um filho cada) e de pares [NT, molde].
+"""
+
+import re
+import string
+import time
+from collections import deque
+from itertools   import islice, product
+
+from gp_ast       import (IdentifierNode, TerminalNameNode, RegexNode, EpsilonNode, SymbolNode,
+                          SeqNode, AltListNode, RuleNode, RuleListNode, TokenDeclNode,
+                          TokenSectionNode, AxiomaNode, SpecNode)
+from gp_analysis  import compute_first, compute_follow, check_rule_ll1, build_parse_table
+from gp_helpers   import rebuild_grammar, define_helpers, split_spec_blocks, TOKEN_LINE_RE
+from gp_transform import rule_text, rules_of, nullable_set, strongly_connected_components
+from gp_earley    import compile_earley
+from gp_scanner   import IGNORE
+
+
+def _is_nt(sym):
+    return isinstance(sym.child, IdentifierNode)
+
+
+def _seq(alt):
+    return SeqNode(alt) if alt else SeqNode([SymbolNode(EpsilonNode())])
+
+
+def _label(value):
+    """Rótulo do nó na árvore: os terminais entre aspas aparecem sem elas."""
+    if len(value) > 1 and value[0] in "'\"" and value[-1] == value[0]:
+        return value[1:-1]
+    return value
+
+
+def _key(alt):
+    return tuple(_label(s.get_value()) for s in alt) or ('ε',)
+
+
+def _replace_leaf(template, j, item):
+    """Molde com a j-ésima folha (símbolo da alternativa) trocada por 'item'."""
+    out = []
+    for x in template:
+        if j < 0:
+            out.append(x)
+        elif isinstance(x, str):
+            out.append(item if j == 0 else x)
+            j -= 1
+        else:
+            n = _leaves(x[1])
+            out.append([x[0], _replace_leaf(x[1], j, item)] if j < n else x)
+            j = -1 if j < n else j - n
+    return out
+
+
+def _leaves(template):
+    return sum(1 if isinstance(x, str) else _leaves(x[1]) for x in template)
+
+
+def inline_nonterminals(grammar, src=None) -> dict:
+    """
+    Devolve {'spec', 'grammar', 'inlined', 'expansions', 'time_ms'}.
+
+    'grammar' é 'src' com as regras alteradas reescritas e as eliminadas
+    retiradas (ou o texto gerado da ASA se src for None).
+    """
+    t0     = time.perf_counter()
+    start  = grammar.get_start()
+    first  = compute_first(grammar)
+    follow = compute_follow(grammar, first)
+
+    rules, heads = {}, {}
+    for rule in grammar.get_rules():
+        nt = rule.get_head_name()
+        heads[nt] = rule.head
+        rules[nt] = [[] if not seq.symbols or seq.symbols[0].get_is_epsilon()
+                     else list(seq.symbols) for seq in rule.altlist.sequences]
+    nts       = set(rules)
+    templates = {nt: [[s.get_value() for s in alt] for alt in alts] for nt, alts in rules.items()}
+    uses      = {}
+    for alts in rules.values():
+        _count(uses, alts, 1)
+    # Regras que já têm conflitos não são tocadas (nada garantiria não piorar)
+    conflicted = {nt for nt, alts in rules.items()
+                  if check_rule_ll1(nt, [_seq(a) for a in alts], first, follow, nts)}
+
+    inlined, changed, removed = [], set(), []
+    progress = True
+    while progress:
+        progress = False
+        for A in list(rules):
+            if A not in rules or A in conflicted:
+                continue
+            i = 0
+            while i < len(rules[A]):
+                step = _try_inline(A, i, rules, uses, start, first, follow, nts)
+                if step is None:
+                    i += 1
+                    continue
+                j, B, new_alts, single = step
+                alt = rules[A][i]
+                rules[A][i:i + 1] = new_alts
+                templates[A][i:i + 1] = [_replace_leaf(templates[A][i], j, [B, tb])
+                                         for tb in templates[B]]
+                _count(uses, [alt], -1)
+                _count(uses, new_alts, 1)
+                inlined.append({'nonterminal': B, 'into': A,
+                                'kind': 'unit' if len(alt) == 1 else 'single-use'})
+                changed.add(A)
+                if single or uses.get(B, 0) == 0:
+                    removed.extend(_remove_unused(B, rules, templates, uses, start))
+                progress = True
+
+    # Moldes só para as alternativas que deixaram de ter a forma original
+    expansions = {}
+    for nt, alts in rules.items():
+        for alt, template in zip(alts, templates[nt]):
+            if any(not isinstance(x, str) for x in template):
+                expansions.setdefault(nt, {})[_key(alt)] = template
+
+    changed &= set(rules)
+    out = []
+    for rule in grammar.get_rules():
+        nt = rule.get_head_name()
+        if nt in changed:
+            out.append(RuleNode(heads[nt], AltListNode([_seq(a) for a in rules[nt]])))
+        elif nt in rules:
+            out.append(rule)
+    spec = SpecNode(grammar.axioma, RuleListNode(out), grammar.tokensection)
+
+    if src is None:
+        from gp_normalize import grammar_text
+        text = grammar_text(spec)
+    else:
+        replacements = {nt: [] for nt in removed}
+        for nt in changed:
+            replacements[nt] = [rule_text(nt, [[s.get_value() for s in a] for a in rules[nt]])]
+        helpers = getattr(grammar, 'ebnf_helpers', {})
+        text = rebuild_grammar(src, define_helpers(replacements, rules_of(spec), helpers))
+
+    return {
+        'spec':       spec,
+        'grammar':    text,
+        'inlined':    inlined,
+        'expansions': expansions,
+        'time_ms':    round((time.perf_counter() - t0) * 1e3, 3),
+    }
+
+
+def _try_inline(A, i, rules, uses, start, first, follow, nts):
+    """(posição, B, novas alternativas, B usado uma só vez) ou None."""
+    alt = rules[A][i]
+    for j, sym in enumerate(alt):
+        B = sym.get_value()
+        if not _is_nt(sym) or B == A or B == start or B not in rules:
+            continue
+        balts = rules[B]
+        if any(_is_nt(s) and s.get_value() == B for b in balts for s in b):
+            continue                    # B recursivo: não há forma finita
+        single = uses.get(B, 0) == 1
+        if not (single or len(alt) == 1) or (len(balts) > 1 and j > 0):
+            continue
+        new_alts = [alt[:j] + b + alt[j + 1:] for b in balts]
+        if any(a and _is_nt(a[0]) and a[0].get_value() == A for a in new_alts):
+            continue                    # criaria recursividade à esquerda
+        candidate = rules[A][:i] + new_alts + rules[A][i + 1:]
+        if check_rule_ll1(A, [_seq(a) for a in candidate], first, follow, nts):
+            continue
+        return j, B, new_alts, single
+    return None
+
+
+def _count(uses, alts, delta):
+    for alt in alts:
+        for s in alt:
+            if _is_nt(s):
+                name = s.get_value()
+                uses[name] = uses.get(name, 0) + delta
+
+
+def _remove_unused(B, rules, templates, uses, start):
+    """Retira B (e, em cascata, os NTs que só B usava); devolve os nomes retirados."""
+    removed, work = [], [B]
+    while work:
+        nt = work.pop()
+        if nt not in rules or nt == start or uses.get(nt, 0) > 0:
+            continue
+        alts = rules.pop(nt)
+        del templates[nt]
+        removed.append(nt)
+        _count(uses, alts, -1)
+        work.extend(s.get_value() for alt in alts for s in alt if _is_nt(s))
+    return removed
+
+
+# ── Fusão de NTs equivalentes ─────────────────────────────────────────
+
+def equivalent_blocks(rules) -> list:
+    """
+    Classes de NTs estruturalmente equivalentes ({NT: [[símbolo, ...]]}).
+
+    Refinamento de partições: a assinatura de um NT são as suas
+    alternativas com os terminais tal como estão e os NTs substituídos
+    pelo bloco atual. Um bloco só é revisto quando algum NT que os seus
+    membros usam mudou de bloco, e aí só se recalculam as assinaturas
+    desses membros: os restantes continuam iguais entre si e ficam no
+    bloco, com os que mantiveram a mesma assinatura. As classes
+    saem pela ordem da gramática, com os membros também por essa ordem.
+    """
+    block = {nt: 0 for nt in rules}
+    users = {}
+    for head, alts in rules.items():
+        for alt in alts:
+            for s in alt:
+                if s in rules:
+                    users.setdefault(s, set()).add(head)
+
+    def sig(nt):
+        return tuple(sorted({tuple(('n', block[s]) if s in block else ('t', s) for s in alt)
+                             for alt in rules[nt]}))
+
+    members = {0: set(rules)}
+    dirty   = {0: set(rules)} if rules else {}
+    while dirty:
+        b, changed = dirty.popitem()
+        groups = {}
+        for nt in changed:
+            groups.setdefault(sig(nt), []).append(nt)
+        clean = next((nt for nt in members[b] if nt not in changed), None)
+        if clean is not None:
+            groups.pop(sig(clean), None)      # os que não mudam ficam no bloco
+        else:
+            del groups[max(groups, key=lambda k: len(groups[k]))]
+        moved = []
+        for part in groups.values():
+            new = len(members)
+            members[new] = set(part)
+            members[b].difference_update(part)
+            for nt in part:
+                block[nt] = new
+            moved.extend(part)
+        for nt in moved:
+            for u in users.get(nt, ()):
+                dirty.setdefault(block[u], set()).add(u)
+
+    order   = {nt: i for i, nt in enumerate(rules)}
+    classes = [sorted(ms, key=order.__getitem__) for ms in members.values()]
+    return sorted(classes, key=lambda ms: order[ms[0]])
+
+
+def table_size(grammar) -> dict:
+    """Linhas, células ocupadas e entradas da tabela LL(1)."""
+    first  = compute_first(grammar)
+    table  = build_parse_table(grammar, first, compute_follow(grammar, first))
+    return {
+        'rows':    len(grammar.get_nonterminals()),
+        'cells':   sum(1 for v in table.values() if v),
+        'entries': sum(len(v) for v in table.values()),
+    }
+
+
+def merge_equivalent(grammar, src=None) -> dict:
+    """
+    Devolve {'spec', 'grammar', 'renames', 'table', 'time_ms'}.
+
+    Cada classe fica com o seu primeiro NT (ou com o símbolo inicial, se
+    lá estiver); as ocorrências dos outros são renomeadas e as
+    alternativas que ficam repetidas numa regra são retiradas.
+    """
+    t0      = time.perf_counter()
+    start   = grammar.get_start()
+    renames = {}
+    for members in equivalent_blocks(rules_of(grammar)):
+        rep = start if start in members else members[0]
+        renames.update({nt: rep for nt in members if nt != rep})
+
+    spec, changed = grammar, []
+    if renames:
+        out = []
+        for rule in grammar.get_rules():
+            if rule.get_head_name() in renames:
+                continue
+            seqs, seen, touched = [], set(), False
+            for seq in rule.altlist.sequences:
+                syms = [SymbolNode(IdentifierNode(renames[s.get_value()]))
+                        if _is_nt(s) and s.get_value() in renames else s
+                        for s in seq.symbols]
+                key = tuple(s.get_value() for s in syms)
+                touched |= key in seen or any(a is not b for a, b in zip(syms, seq.symbols))
+                if key not in seen:
+                    seen.add(key)
+                    seqs.append(SeqNode(syms))
+            if touched:
+                rule = RuleNode(rule.head, AltListNode(seqs))
+                changed.append(rule)
+            out.append(rule)
+        spec = SpecNode(grammar.axioma, RuleListNode(out), grammar.tokensection)
+
+    if src is None:
+        from gp_normalize import grammar_text
+        text = grammar_text(spec)
+    else:
+        replacements = {nt: [] for nt in renames}
+        for rule in changed:
+            nt = rule.get_head_name()
+            replacements[nt] = [rule_text(nt, [[] if seq.symbols[0].get_is_epsilon()
+                                             else [x.get_value() for x in seq.symbols]
+                                             for seq in rule.altlist.sequences])]
+        helpers = getattr(grammar, 'ebnf_helpers', {})
+        text = rebuild_grammar(src, define_helpers(replacements, rules_of(spec), helpers))
+
+    return {
+        'spec':    spec,
+        'grammar': text,
+        'renames': renames,
+        'table':   {'before': table_size(grammar), 'after': table_size(spec)},
+        'time_ms': round((time.perf_counter() - t0) * 1e3, 3),
+    }
+
+
+# ── Tokens a partir de sub-linguagens regulares ───────────────────────
+
+# Entre os símbolos o scanner salta os caracteres de IGNORE: o token
+# combinado aceita-os nos mesmos sítios
+_SEP = '[' + ''.join(f'\\x{ord(c):02x}' for c in IGNORE) + ']*'
+
+
+def _literal(text):
+    """Literal para um padrão re.VERBOSE sem espaços (a REGEX da gramática é /\\S+/)."""
+    return ''.join(f'\\x{ord(c):02x}' if c.isspace() else re.escape(c) for c in text)
+
+
+def _nt_regex(nt, alts, patterns, regex):
+    """Regex de 'nt' a partir das dos seus símbolos, ou None se não for regular."""
+    loop, exits = [], []
+    for alt in alts:
+        if alt == [nt]:
+            continue                         # A -> A não acrescenta nada
+        body, target = (alt[:-1], loop) if alt and alt[-1] == nt else (alt, exits)
+        parts = []
+        for s in body:
+            if s in regex:
+                parts.append(regex[s])
+            elif s in patterns:
+                parts.append(f'(?:{patterns[s]})')
+            elif s[0] in "'\"":
+                parts.append(_literal(s[1:-1]))
+            else:
+                return None                  # o próprio nt fora da cauda, NT não regular ou token sem padrão
+        target.append(parts)
+    if not exits:
+        return None
+    # O re fica com o primeiro ramo que casa: os mais longos primeiro ('a' | 'a' 'b')
+    exits = [_SEP.join(p) for p in sorted(exits, key=len, reverse=True)]
+    loop  = [_SEP.join(p) for p in sorted(loop, key=len, reverse=True)]
+    result = f"(?:{'|'.join(exits)})" if exits != [''] else ''
+    if loop:
+        result = f"(?:{'|'.join(b + _SEP for b in loop)})*" + result
+    return result
+
+
+def regular_nonterminals(grammar) -> dict:
+    """
+    {NT: regex} dos NTs cuja linguagem é regular por construção: fora de
+    ciclos com outros NTs, com recursão só na última posição e com todos
+    os terminais com padrão. As componentes saem de Tarjan por ordem de
+    dependências, pelo que cada regex usa as dos NTs de que depende.
+    """
+    rules    = rules_of(grammar)
+    patterns = grammar.get_token_patterns()
+    graph    = {nt: [s for alt in alts for s in alt if s in rules and s != nt]
+                for nt, alts in rules.items()}
+    regex = {}
+    for scc in strongly_connected_components(graph):
+        if len(scc) == 1:
+            r = _nt_regex(scc[0], rules[scc[0]], patterns, regex)
+            if r is not None:
+                regex[scc[0]] = r
+    return {nt: regex[nt] for nt in rules if nt in regex}
+
+
+# Padrões que reconhecem exatamente um carácter: classe, escape ou carácter simples
+_SINGLE_CHAR = re.compile(r"\[\^?\]?(?:\\.|[^\]\\])*\]|\\[^bBAZz0-9]|[^\\.^$*+?{}\[\]|()]|\.")
+
+# Tamanho máximo da regex de um token convertido
+HOIST_MAX_REGEX = 200
+
+# Verificação da regex (_whole_match): frases até este nº de terminais, no
+# máximo este nº de frases, e os caracteres de teste das classes
+HOIST_CHECK_TERMS = 6
+HOIST_CHECK_FORMS = 400
+_PROBE            = string.ascii_letters + string.digits + string.punctuation
+
+
+def _char_level(sym, patterns):
+    """O terminal reconhece um único carácter (literal de um carácter ou padrão simples)."""
+    if sym[0] in "'\"":
+        return len(sym) == 3
+    return sym in patterns and _SINGLE_CHAR.fullmatch(patterns[sym]) is not None
+
+
+def _sentences(nt, rules, max_terms=HOIST_CHECK_TERMS, limit=HOIST_CHECK_FORMS):
+    """Frases de 'nt' (tuplos de terminais) com até max_terms símbolos, em largura."""
+    out, queue, seen = [], deque([(nt,)]), set()
+    while queue and len(out) < limit:
+        form = queue.popleft()
+        i = next((k for k, s in enumerate(form) if s in rules), None)
+        if i is None:
+            out.append(form)
+            continue
+        for alt in rules[form[i]]:
+            new = form[:i] + tuple(alt) + form[i + 1:]
+            if (new not in seen and len(new) <= 2 * max_terms
+                    and sum(s not in rules for s in new) <= max_terms):
+                seen.add(new)
+                queue.append(new)
+    return out
+
+
+def _whole_match(nt, regex, rules, patterns):
+    """
+    O re casa cada frase curta de 'nt' por inteiro. Fica com o primeiro ramo
+    que casa, não com o mais longo: um ramo que é prefixo de outro (ou um
+    ciclo que pára cedo) faria o token parar a meio e a gramática deixaria
+    de aceitar frases que aceitava. Cada terminal é experimentado com os
+    literais do fecho que reconhece e um carácter próprio.
+    """
+    sentences = _sentences(nt, rules)
+    terms     = {t for f in sentences for t in f}
+    literals  = [t[1] for t in terms if t[0] in "'\""]
+    chars     = {}
+    for t in terms:
+        if t[0] in "'\"":
+            chars[t] = [t[1]]
+        else:
+            pat      = re.compile(patterns[t], re.VERBOSE)
+            own      = next((c for c in _PROBE if pat.fullmatch(c)), None)
+            chars[t] = [c for c in literals if pat.fullmatch(c)] + ([own] if own else [])
+    compiled = re.compile(regex, re.VERBOSE)
+    for form in sentences:
+        for combo in islice(product(*(chars[t] for t in form)), HOIST_CHECK_FORMS):
+            text = ''.join(combo)
+            m = compiled.match(text)
+            if m is None or m.end() != len(text):
+                return False
+    return True
+
+
+def _token_name(nt, taken):
+    base = re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', nt.replace("'", '_P')).upper()
+    name = base if len(base) > 1 else f'{base}_TOK'
+    while name in taken:
+        name += '_'
+    return name
+
+
+def hoist_tokens(grammar, src=None, only=None) -> dict:
+    """
+    Devolve {'spec', 'grammar', 'hoisted', 'regexes', 'expansions', 'time_ms'}.
+
+    Um NT regular (e não anulável: o token não pode reconhecer a cadeia
+    vazia) só é convertido se for dono exclusivo do que usa: os NTs e os
+    terminais do seu fecho não aparecem em mais nenhuma regra, para que o
+    scanner não deixe de produzir tokens de que o resto da gramática
+    precisa. Só se convertem sub-linguagens ao nível do carácter (todos
+    os terminais do fecho reconhecem um carácter, como LETTER ou '.') com
+    regex até HOIST_MAX_REGEX; frases inteiras (listas de instruções sobre
+    ID e NUMBER) ficam na gramática. A regex tem de casar por inteiro as
+    frases curtas do NT (_whole_match): o re fica com o primeiro ramo que
+    casa, e 'a' | 'a' 'b' como (?:a|ab) deixaria de aceitar "ab". Os menores
+    fechos são escolhidos primeiro. 'only' limita a conversão a esses NTs.
+
+    O token novo é declarado depois dos existentes (menor prioridade entre
+    os padrões); se outros tokens reconhecerem o mesmo texto, convém rever.
+    A verificação é limitada (frases até HOIST_CHECK_TERMS terminais) e a
+    regex não reproduz as fronteiras de maximal munch entre as partes nem
+    com o texto seguinte: a linguagem da gramática convertida pode diferir
+    da original, e convém confirmar com frases de teste.
+    """
+    t0       = time.perf_counter()
+    rules    = rules_of(grammar)
+    start    = grammar.get_start()
+    regex    = regular_nonterminals(grammar)
+    nullable = nullable_set(rules)
+    users    = {}
+    for head, alts in rules.items():
+        for alt in alts:
+            for s in alt:
+                users.setdefault(s, set()).add(head)
+
+    def closure(nt):
+        seen, work = {nt}, [nt]
+        while work:
+            for alt in rules[work.pop()]:
+                for s in alt:
+                    if s in rules and s not in seen:
+                        seen.add(s)
+                        work.append(s)
+        return seen
+
+    patterns   = grammar.get_token_patterns()
+    order      = {nt: i for i, nt in enumerate(rules)}
+    candidates = [nt for nt in regex
+                  if nt != start and nt not in nullable and (only is None or nt in only)
+                  and len(regex[nt]) <= HOIST_MAX_REGEX]
+    closures   = {nt: closure(nt) for nt in candidates}
+    candidates = [nt for nt in candidates
+                  if all(_char_level(s, patterns) for n in closures[nt] for alt in rules[n]
+                         for s in alt if s not in rules)
+                  and _whole_match(nt, regex[nt], rules, patterns)]
+    candidates.sort(key=lambda nt: (len(closures[nt]), order[nt]))
+
+    taken    = set(patterns) | {s for alts in rules.values() for a in alts for s in a
+                                if s not in rules}
+    removed, dropped, hoisted, name_of = set(), set(), {}, {}
+    for c in candidates:
+        cl = closures[c]
+        if cl & removed or not users.get(c, set()) - cl:
+            continue
+        terms = {s for nt in cl for alt in rules[nt] for s in alt if s not in rules}
+        if any(users[nt] - cl for nt in cl if nt != c) or any(users[t] - cl for t in terms):
+            continue
+        name = _token_name(c, taken)
+        taken.add(name)
+        name_of[c] = name
+        hoisted[name] = c
+        removed |= cl
+        dropped |= terms & set(patterns)
+
+    out, changed = [], []
+    for rule in grammar.get_rules():
+        if rule.get_head_name() in removed:
+            continue
+        if any(s.get_value() in name_of for seq in rule.altlist.sequences for s in seq.symbols
+               if _is_nt(s)):
+            rule = RuleNode(rule.head, AltListNode([
+                SeqNode([SymbolNode(TerminalNameNode(name_of[s.get_value()]))
+                         if _is_nt(s) and s.get_value() in name_of else s for s in seq.symbols])
+                for seq in rule.altlist.sequences]))
+            changed.append(rule)
+        out.append(rule)
+    decls = [d for d in grammar.tokensection.decls if d.name.value not in dropped]
+    decls += [TokenDeclNode(TerminalNameNode(name), RegexNode(regex[nt]))
+              for name, nt in hoisted.items()]
+    spec = SpecNode(grammar.axioma, RuleListNode(out), TokenSectionNode(decls))
+
+    # Sub-gramáticas originais de cada token, para reconstruir as árvores
+    expansions = {}
+    for name, nt in hoisted.items():
+        sub = [r for r in grammar.get_rules() if r.get_head_name() in closures[nt]]
+        toks = [d for d in grammar.tokensection.decls if d.name.value in dropped]
+        expansions[name] = SpecNode(AxiomaNode(IdentifierNode(nt)), RuleListNode(sub),
+                                    TokenSectionNode(toks))
+
+    if not hoisted:
+        text = src
+    elif src is None:
+        from gp_normalize import grammar_text
+        text = grammar_text(spec)
+    else:
+        text = _rewrite_text(src, removed, dropped, changed, hoisted, regex)
+
+    return {
+        'spec':       spec if hoisted else grammar,
+        'grammar':    text,
+        'hoisted':    hoisted,
+        'regexes':    {name: regex[nt] for name, nt in hoisted.items()},
+        'expansions': expansions,
+        'time_ms':    round((time.perf_counter() - t0) * 1e3, 3),
+    }
+
+
+def _rewrite_text(src, removed, dropped, changed, hoisted, regex):
+    new_rules = {r.get_head_name(): rule_text(r.get_head_name(), [
+        [] if seq.symbols[0].get_is_epsilon() else [x.get_value() for x in seq.symbols]
+        for seq in r.altlist.sequences]) for r in changed}
+    out, done = [], set()
+    for kind, name, _, lines in split_spec_blocks(src):
+        if kind == 'rule' and name in removed:
+            continue
+        if kind == 'rule' and name in new_rules:
+            if name not in done:             # os blocos seguintes do mesmo NT já estão incluídos
+                out.append(new_rules[name])
+                done.add(name)
+            continue
+        if kind == 'token' and name in dropped:
+            continue
+        out.extend(lines)
+    while out and not out[-1].strip():
+        out.pop()
+    if not any(TOKEN_LINE_RE.match(line.strip()) for line in out):
+        out.append('')
+    out += [f"{name} = /{regex[nt]}/" for name, nt in hoisted.items()]
+    return '\n'.join(out) + '\n'
+
+
+def expand_tokens(tree, expansions):
+    """
+    Substitui (no próprio objeto) cada folha de um token criado por
+    hoist_tokens pela sub-árvore do NT original, obtida parseando o lexema
+    com a sub-gramática (Earley, compilado uma vez por token).
+    """
+    parsers = {}
+    stack   = [tree]
+    while stack:
+        node = stack.pop()
+        for i, child in enumerate(node.children):
+            sub = expansions.get(child.label)
+            if sub is None or child.lexema is None:
+                stack.append(child)
+                continue
+            if child.label not in parsers:
+                parsers[child.label] = compile_earley(sub)
+            node.children[i] = parsers[child.label].parse(child.lexema)
+    return tree
+
+
+# ── Reconstrução da árvore ────────────────────────────────────────────
+
+def expand_tree(tree, expansions):
+    """
+    Repõe na árvore (no próprio objeto) os nós dos NTs eliminados pelo
+    inlining, para visitors escritos para a gramática original. Funciona
+    com qualquer TreeNode(label, children, lexema).
+    """
+    make  = tree.__class__
+    stack = [tree]
+    while stack:
+        node     = stack.pop()
+        children = node.children
+        table    = expansions.get(node.label)
+        template = table and children and table.get(tuple(_label(c.label) for c in children))
+        if template:
+            # Os nós criados pelo molde já têm a forma original: só se
+            # continua pelos filhos que vieram da árvore
+            kids = iter([] if children[0].label == 'ε' else children)
+            node.children = _fill(template, kids, make) or [make('ε')]
+        stack.extend(children)
+    return tree
+
+
+def _fill(template, kids, make):
+    out = []
+    for x in template:
+        if isinstance(x, str):
+            out.append(next(kids))
+        else:
+            out.append(make(x[0], _fill(x[1], kids, make) or [make('ε')]))
+    return out
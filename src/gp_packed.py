@@ -0,0 +1,411 @@
+"""
+gp_packed.py — Formato binário empacotado de uma gramática compilada.
+
+Um ficheiro .gpk guarda tudo o que o parser LL(1) precisa, em arrays de
+int32 prontos a usar diretamente a partir de um mmap só de leitura:
+
+    cabeçalho   magic b'GPPK', versão, ordem dos bytes, nº de secções,
+                sha256 do texto da gramática (source_hash) e diretório de secções
+    META        n_symbols, n_terms, start, n_prods, n_rules
+    STRO/STRB   tabela de strings: offsets + bytes UTF-8
+                (símbolos, depois nome e regex de cada regra léxica)
+    PHED        cabeça de cada produção
+    POFF/PRHS   lado direito de cada produção (já invertido, pronto a empilhar)
+    TBAS/TCHK/TVAL  tabela LL(1) comprimida (comb vector, ver gp_table):
+                i = base[nt - n_terms] + terminal → value[i] se check[i] == nt - n_terms
+    LEXT        tipo (id de terminal) de cada regra léxica
+    HELP        NTs auxiliares do EBNF (fundidos na árvore, como no TableParser)
+
+Carregar é O(1): mmap + leitura do cabeçalho. As páginas do ficheiro são
+partilhadas por todos os processos que o abrem (workers do gunicorn ou do
+ParseService), e os ficheiros ficam em PACK_DIR com o nome <source_hash>.gpk
+(no máximo PACKS_KEEP por pasta, apagando os menos usados).
+
+    packed = get_packed(src)              # carrega ou compila e grava
+    packed.parse("x := 1")                # TreeNode, como o TableParser
+    packed.check(0, "x := 1")             # resultado do lote (ver gp_batch)
+"""
+
+import os
+import mmap
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from gp_parser    import parse_grammar, get_parse_errors
+from gp_analysis  import compute_first, compute_follow, check_ll1, build_parse_table
+from gp_parser_td import TreeNode, compact_tables
+from gp_scanner   import Scanner, grammar_scanner_rules
+from gp_helpers   import source_hash, flatten_helpers
+from gp_table     import comb_compress
+
+_HERE    = os.path.dirname(os.path.abspath(__file__))
+PACK_DIR = os.environ.get('GRAMMAR_PACKS', os.path.join(_HERE, '..', 'db', 'packs'))
+PACK_DIR = os.path.normpath(PACK_DIR)
+
+MAGIC   = b'GPPK'
+VERSION = 4   # v4: secção HELP (v3: só gramáticas LL(1))
+
+_HEADER  = struct.Struct('<4sIBxxxI32s')   # magic, versão, byteorder, nº secções, hash
+_SECTION = struct.Struct('<4sII')          # tag, offset, nº de elementos
+_ORDERS  = {'little': 0, 'big': 1}
+
+
+# ── Escrita ───────────────────────────────────────────────────────────
+
+def _int32(values):
+    return struct.pack(f'={len(values)}i', *values)
+
+
+def build_pack(grammar, src_hash='') -> bytes:
+    """
+    Compila a gramática (FIRST/FOLLOW, tabela, scanner) e devolve o ficheiro
+    empacotado. Levanta ValueError se houver conflitos LL(1): a tabela
+    guardaria uma só produção por célula (e com recursão à esquerda o
+    parse nunca terminaria).
+    """
+    first     = compute_first(grammar)
+    follow    = compute_follow(grammar, first)
+    conflicts = check_ll1(grammar, first, follow)
+    if conflicts:
+        raise ValueError(f"A gramática tem {len(conflicts)} conflito(s) LL(1): "
+                         f"o parser 'td' precisa de uma gramática LL(1).")
+    table  = build_parse_table(grammar, first, follow)
+    rules  = grammar_scanner_rules(grammar)
+
+    symbols, n_terms, prods, rows = compact_tables(
+        grammar, table, extra_terminals=[tipo for _, _, tipo in rules]
+    )
+    sym_id = {s: i for i, s in enumerate(symbols)}
+    base, check, value = comb_compress(rows)
+
+    strings = list(symbols)
+    for nome, pat, _ in rules:
+        strings += [nome, pat]
+    blobs   = [s.encode('utf-8') for s in strings]
+    offsets = [0]
+    for b in blobs:
+        offsets.append(offsets[-1] + len(b))
+
+    prod_off = [0]
+    prod_rhs = []
+    for _, rhs, _ in prods:
+        prod_rhs.extend(reversed(rhs))
+        prod_off.append(len(prod_rhs))
+
+    sections = [
+        (b'META', _int32([len(symbols), n_terms, sym_id[grammar.get_start()],
+                          len(prods), len(rules)])),
+        (b'STRO', _int32(offsets)),
+        (b'STRB', b''.join(blobs)),
+        (b'PHED', _int32([head for head, _, _ in prods])),
+        (b'POFF', _int32(prod_off)),
+        (b'PRHS', _int32(prod_rhs)),
+        (b'TBAS', _int32(base)),
+        (b'TCHK', _int32(check)),
+        (b'TVAL', _int32(value)),
+        (b'LEXT', _int32([sym_id[tipo] for _, _, tipo in rules])),
+        (b'HELP', _int32([sym_id[nt] for nt in getattr(grammar, 'ebnf_helpers', {})
+                          if nt in sym_id])),
+    ]
+
+    # Secções alinhadas a 8 bytes (o mmap começa alinhado à página)
+    pos       = _HEADER.size + _SECTION.size * len(sections)
+    directory = []
+    body      = []
+    for tag, data in sections:
+        pad  = -pos % 8
+        body.append(b'\0' * pad)
+        pos += pad
+        count = len(data) if tag == b'STRB' else len(data) // 4
+        directory.append(_SECTION.pack(tag, pos, count))
+        body.append(data)
+        pos += len(data)
+
+    header = _HEADER.pack(MAGIC, VERSION, _ORDERS[sys.byteorder], len(sections),
+                          bytes.fromhex(src_hash) if src_hash else b'\0' * 32)
+    return header + b''.join(directory) + b''.join(body)
+
+
+def write_pack(path, data: bytes) -> None:
+    """Escrita atómica: ficheiro temporário na mesma pasta + os.replace."""
+    folder = os.path.dirname(path) or '.'
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# ── Leitura ───────────────────────────────────────────────────────────
+
+class PackedGrammar:
+    """
+    Parser LL(1) que corre diretamente sobre o buffer empacotado (mmap ou
+    bytes). Os arrays são memoryviews int32 sobre o próprio buffer; só os
+    nomes dos símbolos e o scanner são materializados, no primeiro uso.
+    """
+
+    parser_type = 'td'
+
+    def __init__(self, buffer, src=None):
+        view = memoryview(buffer)
+        magic, version, order, n_sections, digest = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError("Ficheiro não é uma gramática empacotada")
+        if version != VERSION:
+            raise ValueError(f"Versão do formato não suportada: {version}")
+        if order != _ORDERS[sys.byteorder]:
+            raise ValueError("Gramática empacotada noutra ordem de bytes")
+
+        self.buffer = buffer
+        self.src    = src
+        self.hash   = digest.hex()
+
+        sec = {}
+        for i in range(n_sections):
+            tag, off, count = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            size = count if tag == b'STRB' else count * 4
+            data = view[off:off + size]
+            sec[tag] = data if tag == b'STRB' else data.cast('i')
+
+        n_symbols, self.n_terms, self.start, self.n_prods, self.n_rules = sec[b'META']
+        self.n_symbols = n_symbols
+        self._str_off  = sec[b'STRO']
+        self._str_blob = sec[b'STRB']
+        self.prod_head = sec[b'PHED']
+        self.prod_off  = sec[b'POFF']
+        self.prod_rhs  = sec[b'PRHS']
+        self.table_base  = sec[b'TBAS']
+        self.table_check = sec[b'TCHK']
+        self.table_value = sec[b'TVAL']
+        self.lex_types = sec[b'LEXT']
+        self.helpers   = frozenset(self.string(i) for i in sec[b'HELP'])
+
+        self._symbols = None
+        self._scanner = None
+
+    def string(self, i) -> str:
+        return bytes(self._str_blob[self._str_off[i]:self._str_off[i + 1]]).decode('utf-8')
+
+    @property
+    def symbols(self):
+        if self._symbols is None:
+            self._symbols = tuple(self.string(i) for i in range(self.n_symbols))
+        return self._symbols
+
+    @property
+    def scanner(self):
+        if self._scanner is None:
+            base  = self.n_symbols
+            rules = [
+                (self.string(base + 2 * r), self.string(base + 2 * r + 1),
+                 self.symbols[self.lex_types[r]])
+                for r in range(self.n_rules)
+            ]
+            self._scanner = Scanner(rules)
+        return self._scanner
+
+    def productions(self):
+        """[(cabeça, lado direito pela ordem da regra)] — para inspeção e testes."""
+        return [
+            (self.prod_head[p], tuple(reversed(self.prod_rhs[self.prod_off[p]:self.prod_off[p + 1]])))
+            for p in range(self.n_prods)
+        ]
+
+    def _expected(self, topo):
+        r = topo - self.n_terms
+        b = self.table_base[r]
+        return sorted(self.symbols[t] for t in range(self.n_terms) if self.table_check[b + t] == r)
+
+    # ── Parsing ───────────────────────────────────────────────────────
+
+    def tokenize(self, source):
+        return self.scanner.tokenize(source)
+
+    def parse_tokens(self, tokens, build_tree=True):
+        symbols = self.symbols
+        sym_id  = {s: i for i, s in enumerate(symbols[:self.n_terms])}
+        ids     = [sym_id.get(tipo, -1) for tipo, _ in tokens]
+        base, check, value = self.table_base, self.table_check, self.table_value
+        n_terms = self.n_terms
+        offs, rhs_all = self.prod_off, self.prod_rhs
+
+        raiz  = TreeNode(symbols[self.start]) if build_tree else None
+        stack = [0, self.start]
+        nodes = [None, raiz]
+        pos   = 0
+        la    = ids[0]
+
+        while True:
+            topo = stack[-1]
+
+            if topo < n_terms:
+                if topo != la:
+                    tipo, lexema = tokens[pos]
+                    if topo == 0:
+                        raise SyntaxError(f"Tokens extra: {tipo!r} ({lexema!r})")
+                    raise SyntaxError(
+                        f"Esperado {symbols[topo]!r}, encontrado {tipo!r} ({lexema!r})"
+                    )
+                if topo == 0:
+                    return flatten_helpers(raiz, self.helpers) if build_tree else True
+                stack.pop()
+                if build_tree:
+                    nodes.pop().lexema = tokens[pos][1]
+                pos += 1
+                la = ids[pos]
+                continue
+
+            r = topo - n_terms
+            i = base[r] + la
+            if la < 0 or check[i] != r:
+                raise SyntaxError(
+                    f"Símbolo {tokens[pos][0]!r} inesperado ao expandir {symbols[topo]!r}. "
+                    f"Esperado um de: {self._expected(topo)}"
+                )
+
+            p   = value[i]
+            rhs = rhs_all[offs[p]:offs[p + 1]]
+            stack.pop()
+            stack.extend(rhs)
+            if build_tree:
+                no = nodes.pop()
+                if not rhs:
+                    no.children.append(TreeNode('ε'))
+                    continue
+                filhos = [TreeNode(symbols[s]) for s in rhs]
+                nodes.extend(filhos)
+                filhos.reverse()
+                no.children.extend(filhos)
+
+    def parse(self, source, build_tree=True):
+        return self.parse_tokens(self.tokenize(source), build_tree)
+
+    def check(self, index, phrase, svg=False):
+        """Mesmo resultado que gp_batch.CompiledGrammar.check."""
+        t0 = time.perf_counter()
+        try:
+            tree  = self.parse(phrase, build_tree=svg)
+            error = None
+        except SyntaxError as e:
+            tree  = None
+            error = str(e)
+        result = {
+            'index':   index,
+            'ok':      error is None,
+            'error':   error,
+            'time_ms': round((time.perf_counter() - t0) * 1e3, 3),
+        }
+        if svg and tree is not None:
+            from gp_svg import tree_to_svg
+            result['tree_svg'] = tree_to_svg(tree)
+        return result
+
+
+def load_pack(path, src=None) -> PackedGrammar:
+    """Abre o ficheiro com mmap só de leitura (páginas partilhadas entre processos)."""
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return PackedGrammar(mm, src)
+
+
+# ── Cache por source_hash ─────────────────────────────────────────────
+
+_loaded      = OrderedDict()   # (pasta, hash) → PackedGrammar já mapeada neste processo (LRU)
+_loaded_lock = threading.Lock()
+
+LOADED_KEEP = 32                                              # gramáticas mapeadas por processo
+PACKS_KEEP  = int(os.environ.get('GRAMMAR_PACKS_KEEP', 256))  # ficheiros .gpk por pasta
+
+
+def pack_path(src_hash, directory=None) -> str:
+    return os.path.join(directory or PACK_DIR, f'{src_hash}.gpk')
+
+
+def prune_packs(directory=None, keep=None) -> int:
+    """
+    Apaga os .gpk menos usados da pasta (o mtime é atualizado a cada uso)
+    até restarem 'keep', e os temporários de escritas interrompidas há
+    mais de uma hora. Quem ainda tiver um ficheiro apagado mapeado
+    continua a lê-lo (POSIX). Devolve o nº de ficheiros apagados.
+    """
+    folder = directory or PACK_DIR
+    keep   = PACKS_KEEP if keep is None else keep
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return 0
+    now, packs, stale = time.time(), [], []
+    for name in names:
+        path = os.path.join(folder, name)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+        if name.endswith('.gpk'):
+            packs.append((mtime, path))
+        elif name.endswith('.tmp') and now - mtime > 3600:
+            stale.append(path)
+    packs.sort(reverse=True)
+    removed = 0
+    for path in stale + [path for _, path in packs[keep:]]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def get_packed(src, directory=None) -> PackedGrammar:
+    """
+    Devolve a gramática empacotada para 'src': mapeada deste processo, do
+    ficheiro <source_hash>.gpk, ou compilada e gravada atomicamente.
+    Levanta ValueError se a gramática for inválida ou não for LL(1). Se a
+    pasta não puder ser escrita, usa o pacote em memória.
+
+    Cada processo mantém as LOADED_KEEP gramáticas mais recentes; ao gravar
+    um pacote novo, a pasta é reduzida aos PACKS_KEEP mais usados.
+    """
+    h   = source_hash(src)
+    key = (directory or PACK_DIR, h)
+    with _loaded_lock:
+        if key in _loaded:
+            _loaded.move_to_end(key)
+            return _loaded[key]
+
+    path   = pack_path(h, directory)
+    packed = None
+    if os.path.exists(path):
+        try:
+            packed = load_pack(path, src)
+            os.utime(path)
+        except (ValueError, struct.error, OSError):
+            packed = None   # versão antiga, corrompido ou apagado entretanto: recompilar
+
+    if packed is None:
+        grammar = parse_grammar(src)
+        if grammar is None:
+            raise ValueError('\n'.join(get_parse_errors()) or 'Gramática inválida')
+        data = build_pack(grammar, h)
+        try:
+            write_pack(path, data)
+            packed = load_pack(path, src)
+            prune_packs(directory)
+        except OSError:
+            packed = PackedGrammar(data, src)
+
+    with _loaded_lock:
+        _loaded[key] = packed
+        while len(_loaded) > LOADED_KEEP:
+            _loaded.popitem(last=False)   # o mmap fecha quando deixar de ser usado
+    return packed
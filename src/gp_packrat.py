@@ -0,0 +1,451 @@
+"""
+gp_packrat.py — Parser recursivo descendente com backtracking memorizado (packrat).
+
+Para gramáticas que não são LL(1) (ex.: LL(k), prefixos comuns): cada
+não-terminal tenta as alternativas pela ordem da regra e recua se uma
+falhar. O resultado de cada (não-terminal, posição) é memorizado, pelo que
+cada par é avaliado uma única vez (linear no nº de tokens quando cada par
+tem poucos fins possíveis).
+
+O resultado memorizado não é só o primeiro prefixo reconhecido (PEG), mas
+todas as posições onde o não-terminal pode acabar, cada uma com a árvore
+da primeira alternativa que lá chega. Assim A -> 'a' | 'a' 'b' em
+S -> A B continua a aceitar "a b": se B falhar depois de A = 'a', a
+sequência continua a partir do outro fim de A. Sem recursividade à
+esquerda, a linguagem reconhecida é a da gramática; a ordem das
+alternativas só escolhe a árvore.
+
+As alternativas são podadas pelo mesmo lookahead do parser RD
+(gp_parser_rd._lookahead: FIRST, mais FOLLOW se anulável), e as ε ficam
+para o fim, como na ordem de decisão do RD/TD.
+
+    engine = compile_packrat(grammar, first, follow)
+    tree   = engine.parse("a b c")          # TreeNode (ou SyntaxError)
+    engine.parsers['A'](tokens, 0)          # ((TreeNode, fim), ...) por ordem de preferência
+    engine.stats                            # chamadas, acertos na memo, memória...
+
+    code = generate_packrat_parser(grammar, first, follow)   # módulo Python
+
+A recursividade à esquerda (direta ou indireta) não é suportada: levanta
+ValueError ao compilar.
+"""
+
+import sys
+
+from gp_parser_rd import (_lookahead, _is_epsilon_seq, _tipo, _nt_func, _is_inline,
+                          _inline_inner, _inline_ply_name, _collect_terminals, _emit_lexer)
+from gp_parser_td import TreeNode
+from gp_scanner   import Scanner, grammar_scanner_rules
+from gp_helpers   import flatten_helpers
+from gp_transform import rules_of, left_recursive_sccs
+
+
+def left_recursive_nonterminals(grammar, first):
+    """Não-terminais que se alcançam a si próprios sem consumir tokens."""
+    nullable = {nt for nt in grammar.get_nonterminals() if 'ε' in first.get(nt, set())}
+    return {nt for scc in left_recursive_sccs(rules_of(grammar), nullable) for nt in scc}
+
+
+def _alternatives(nt, seqs, first, follow, nts):
+    """
+    [(seq, lookahead)] pela ordem de tentativa: não-ε pela ordem da regra,
+    depois ε (seq=None). lookahead=None significa 'tentar sempre'.
+    """
+    alts, has_eps = [], False
+    for seq in seqs:
+        if _is_epsilon_seq(seq):
+            has_eps = True
+            continue
+        la = _lookahead(seq, nt, first, follow, nts)
+        if la:
+            alts.append((seq, frozenset(_tipo(t) for t in la)))
+    if has_eps:
+        follow_tokens = follow.get(nt, set())
+        alts.append((None, frozenset(_tipo(t) for t in follow_tokens) or None))
+    return alts
+
+
+def _check_left_recursion(grammar, first):
+    cycles = left_recursive_nonterminals(grammar, first)
+    if cycles:
+        raise ValueError(
+            f"Recursividade à esquerda em {', '.join(sorted(cycles))}: "
+            "o modo packrat não a suporta (aplica as sugestões primeiro)."
+        )
+
+
+class CompiledPackrat:
+    """Parser packrat compilado em closures. Reutilizável para muitas frases."""
+
+    def __init__(self, grammar, first, follow):
+        _check_left_recursion(grammar, first)
+        self.start   = grammar.get_start()
+        self.scanner = Scanner(grammar_scanner_rules(grammar))
+        self.helpers = getattr(grammar, 'ebnf_helpers', {})
+        self.parsers = {}
+        self.stats   = {}
+
+        nts = grammar.get_nonterminals()
+        self._n_nts = len(grammar.get_rules())
+        for idx, rule in enumerate(grammar.get_rules()):
+            nt = rule.get_head_name()
+            self.parsers[nt] = self._compile_rule(idx, nt, rule.altlist.sequences,
+                                                  first, follow, nts)
+        self._reset()
+
+    def _reset(self):
+        self._memo       = {}
+        self._calls      = 0
+        self._hits       = 0
+        self._pruned     = 0
+        self._backtracks = 0
+        self._farthest   = 0
+        self._expected   = set()
+
+    def _expect(self, pos, tipos):
+        if pos > self._farthest:
+            self._farthest = pos
+            self._expected = set(tipos)
+        elif pos == self._farthest:
+            self._expected.update(tipos)
+
+    # ── Compilação ────────────────────────────────────────────────────
+
+    def _compile_seq(self, nt, seq):
+        parsers = self.parsers
+        steps   = tuple(
+            (s.get_is_terminal(), _tipo(s.get_value()) if s.get_is_terminal() else s.get_value())
+            for s in seq.symbols
+        )
+
+        def run(toks, pos):
+            # Prefixos reconhecidos até aqui: (filhos, posição), um por posição
+            partial = [((), pos)]
+            for is_term, val in steps:
+                ends = {}
+                for children, p in partial:
+                    if is_term:
+                        tipo, lex = toks[p]
+                        if tipo != val:
+                            self._expect(p, (val,))
+                        elif p + 1 not in ends:
+                            ends[p + 1] = children + (TreeNode(val, lexema=lex),)
+                    else:
+                        for node, q in parsers[val](toks, p):
+                            if q not in ends:
+                                ends[q] = children + (node,)
+                if not ends:
+                    return ()
+                partial = [(children, q) for q, children in ends.items()]
+            return tuple((TreeNode(nt, children=list(children)), q) for children, q in partial)
+
+        return run
+
+    def _compile_rule(self, idx, nt, seqs, first, follow, nts):
+        alts = []
+        for seq, la in _alternatives(nt, seqs, first, follow, nts):
+            if seq is None:
+                run = lambda toks, pos: ((TreeNode(nt, children=[TreeNode('ε')]), pos),)
+            else:
+                run = self._compile_seq(nt, seq)
+            alts.append((la, run))
+        expected = set().union(*(la for la, _ in alts if la is not None))
+        n = self._n_nts
+
+        def parse_nt(toks, pos):
+            memo = self._memo
+            key  = pos * n + idx
+            if key in memo:
+                self._hits += 1
+                return memo[key]
+            self._calls += 1
+            memo[key] = ()            # recursão sem consumir tokens falha em vez de ciclar
+
+            tipo    = toks[pos][0]
+            results = {}              # fim → árvore da primeira alternativa que lá chega
+            for la, run in alts:
+                if la is not None and tipo not in la:
+                    self._pruned += 1
+                    continue
+                found = run(toks, pos)
+                if not found:
+                    self._backtracks += 1
+                for node, end in found:
+                    results.setdefault(end, node)
+            if not results:
+                self._expect(pos, expected)
+            memo[key] = result = tuple((node, end) for end, node in results.items())
+            return result
+
+        return parse_nt
+
+    # ── Interface ─────────────────────────────────────────────────────
+
+    def tokenize(self, source):
+        return self.scanner.tokenize(source)
+
+    def parse_tokens(self, tokens):
+        self._reset()
+        try:
+            result = self.parsers[self.start](tokens, 0)
+        except RecursionError:
+            raise SyntaxError("Frase demasiado profunda para o parser recursivo descendente")
+        finally:
+            self.stats = self._collect_stats(len(tokens))
+
+        for node, end in result:
+            if tokens[end][0] == '$':
+                return flatten_helpers(node, self.helpers)
+        end = max((end for _, end in result), default=-1)
+        if end >= self._farthest:
+            raise SyntaxError(f"Tokens extra após o fim: {tokens[end][0]}")
+        tipo, lexema = tokens[self._farthest]
+        if tipo == '$':
+            raise SyntaxError(f"Fim inesperado da frase. Esperado um de: {sorted(self._expected)}")
+        raise SyntaxError(
+            f"Símbolo {tipo!r} ({lexema!r}) inesperado na posição {self._farthest + 1}. "
+            f"Esperado um de: {sorted(self._expected)}"
+        )
+
+    def parse(self, source):
+        return self.parse_tokens(self.tokenize(source))
+
+    def _collect_stats(self, n_tokens):
+        memo    = self._memo
+        lookups = self._calls + self._hits
+        return {
+            'tokens':       n_tokens,
+            'calls':        self._calls,
+            'hits':         self._hits,
+            'hit_rate':     round(self._hits / lookups, 4) if lookups else 0.0,
+            'pruned':       self._pruned,
+            'backtracks':   self._backtracks,
+            'entries':      len(memo),
+            'memory_bytes': sys.getsizeof(memo) + sum(
+                sys.getsizeof(k) + sys.getsizeof(v) for k, v in memo.items()
+            ),
+        }
+
+
+def compile_packrat(grammar, first, follow):
+    return CompiledPackrat(grammar, first, follow)
+
+
+# ── Gerador ───────────────────────────────────────────────────────────
+
+def generate_packrat_parser(grammar, first, follow, standalone_lexer=False):
+    """
+    Módulo Python com o mesmo esqueleto do parser RD gerado (TreeNode,
+    tokenizer, parse(), Lexer/Parser, main), mas com funções
+    parse_X(pos) → ((TreeNode, fim), ...) e memo por (NT, posição).
+    Levanta ValueError se a gramática for recursiva à esquerda.
+    """
+    _check_left_recursion(grammar, first)
+    nts      = grammar.get_nonterminals()
+    start    = grammar.get_start()
+    rules    = grammar.get_rules()
+    patterns = grammar.get_token_patterns()
+    all_terminals = _collect_terminals(rules, patterns)
+
+    inline_tokens = {}
+    for t in all_terminals:
+        if _is_inline(t):
+            inner = _inline_inner(t)
+            inline_tokens[_inline_ply_name(inner)] = inner
+
+    lines = []
+    w = lines.append
+
+    w('"""')
+    w('Parser Recursivo Descendente com backtracking (packrat) — gerado pelo Grammar Playground.')
+    w('')
+    w('  parse_X(pos)  — reconhece o NT X a partir do token pos; devolve')
+    w('                  ((TreeNode, próxima posição), ...), um por fim possível,')
+    w('                  pela ordem das alternativas (vazio se falhar)')
+    w('  _memo         — resultado de cada (NT, posição): cada par é avaliado uma vez')
+    w('  memo_stats()  — chamadas, acertos na memo e memória da última frase')
+    w('"""')
+    w('')
+    w('import sys')
+    w('')
+
+    w('class TreeNode:')
+    w('    def __init__(self, label, children=None, lexema=None):')
+    w('        self.label    = label       # nome do NT ou tipo do terminal')
+    w('        self.children = children or []')
+    w('        self.lexema   = lexema      # preenchido nos nós folha (terminais)')
+    w('')
+    w('    def print_tree(self, prefix="", last=True):')
+    w('        branch = "└── " if last else "├── "')
+    w('        show   = f"{self.label}: {self.lexema}" if self.lexema is not None else self.label')
+    w('        print(prefix + branch + show)')
+    w('        ext = "    " if last else "│   "')
+    w('        for i, child in enumerate(self.children):')
+    w('            child.print_tree(prefix + ext, last=(i == len(self.children) - 1))')
+    w('')
+
+    _emit_lexer(w, patterns, inline_tokens, standalone_lexer)
+
+    w('')
+    w('')
+    w('token_stream = []')
+    w('_memo  = {}')
+    w("_stats = {'calls': 0, 'hits': 0, 'pruned': 0, 'backtracks': 0}")
+    w('_farthest = [0, set()]   # posição da falha mais à frente e tipos esperados')
+    w('')
+    w('')
+    w('def _expect(pos, tipos):')
+    w('    if pos > _farthest[0]:')
+    w('        _farthest[0] = pos')
+    w('        _farthest[1] = set(tipos)')
+    w('    elif pos == _farthest[0]:')
+    w('        _farthest[1].update(tipos)')
+    w('')
+    w('')
+    w('def rec(t, pos):')
+    w('    tipo, lex = token_stream[pos]')
+    w('    if tipo == t:')
+    w('        return ((TreeNode(t, lexema=lex), pos + 1),)')
+    w('    _expect(pos, (t,))')
+    w('    return ()')
+    w('')
+    w('')
+    w('def _then(partial, parse, *args):')
+    w('    """Estende cada prefixo {fim: filhos} com os resultados de parse(*args, fim)."""')
+    w('    ends = {}')
+    w('    for p, children in partial.items():')
+    w('        for node, q in parse(*args, p):')
+    w('            ends.setdefault(q, children + (node,))')
+    w('    return ends')
+    w('')
+
+    n = len(rules)
+    for idx, rule in enumerate(rules):
+        nt   = rule.get_head_name()
+        seqs = rule.altlist.sequences
+        fn   = _nt_func(nt)
+        alts = _alternatives(nt, seqs, first, follow, nts)
+
+        rhs_str = ' | '.join(
+            'ε' if _is_epsilon_seq(s)
+            else ' '.join(x.get_value() for x in s.symbols)
+            for s in seqs
+        )
+
+        # Uma função por alternativa: sai com () quando nenhum prefixo continua
+        for k, (seq, _) in enumerate(alts):
+            w('')
+            w(f'def _{fn}_{k}(pos):')
+            if seq is None:
+                w(f'    return ((TreeNode("{nt}", children=[TreeNode("ε")]), pos),)')
+                continue
+            w('    partial = {pos: ()}')
+            for sym in seq.symbols:
+                if sym.get_is_terminal():
+                    w(f'    partial = _then(partial, rec, "{_tipo(sym.get_value())}")')
+                else:
+                    w(f'    partial = _then(partial, parse_{_nt_func(sym.get_value())})')
+                w('    if not partial:')
+                w('        return ()')
+            w(f'    return tuple((TreeNode("{nt}", children=list(c)), q) for q, c in partial.items())')
+
+        expected = sorted(set().union(*(la for _, la in alts if la is not None)))
+        w('')
+        w('')
+        w(f'def parse_{fn}(pos):')
+        w(f'    # {nt} -> {rhs_str}')
+        w(f'    key = pos * {n} + {idx}')
+        w('    if key in _memo:')
+        w("        _stats['hits'] += 1")
+        w('        return _memo[key]')
+        w("    _stats['calls'] += 1")
+        w('    _memo[key] = ()')
+        w('    tipo    = token_stream[pos][0]')
+        w('    results = {}   # fim → árvore da primeira alternativa que lá chega')
+        for k, (seq, la) in enumerate(alts):
+            cond = f'tipo in {tuple(sorted(la))!r}' if la is not None else 'True'
+            w(f'    if {cond}:')
+            w(f'        found = _{fn}_{k}(pos)')
+            w(f"        _stats['backtracks'] += not found")
+            w(f'        for node, end in found:')
+            w(f'            results.setdefault(end, node)')
+            w(f'    else:')
+            w(f"        _stats['pruned'] += 1")
+        w('    if not results:')
+        w(f'        _expect(pos, {tuple(expected)!r})')
+        w('    _memo[key] = result = tuple((node, end) for end, node in results.items())')
+        w('    return result')
+        w('')
+
+    w('')
+    w('def _run(tokens):')
+    w('    global token_stream, _farthest')
+    w('    token_stream = tokens')
+    w('    _memo.clear()')
+    w('    for k in _stats:')
+    w('        _stats[k] = 0')
+    w('    _farthest = [0, set()]')
+    w(f'    result = parse_{_nt_func(start)}(0)')
+    w('    for node, end in result:')
+    w('        if tokens[end][0] == "$":')
+    w('            return node')
+    w('    end = max((end for _, end in result), default=-1)')
+    w('    if end >= _farthest[0]:')
+    w('        raise SyntaxError(f"Tokens extra após o fim: {tokens[end][0]}")')
+    w('    tipo, lexema = tokens[_farthest[0]]')
+    w('    if tipo == "$":')
+    w('        raise SyntaxError(f"Fim inesperado da frase. Esperado um de: {sorted(_farthest[1])}")')
+    w('    raise SyntaxError(')
+    w('        f"Símbolo {tipo!r} ({lexema!r}) inesperado na posição {_farthest[0] + 1}. "')
+    w('        f"Esperado um de: {sorted(_farthest[1])}"')
+    w('    )')
+    w('')
+    w('')
+    w('def parse(source):')
+    w('    return _run(tokenizer(source))')
+    w('')
+    w('')
+    w('def memo_stats():')
+    w('    lookups = _stats["calls"] + _stats["hits"]')
+    w('    return dict(_stats,')
+    w('                hit_rate=round(_stats["hits"] / lookups, 4) if lookups else 0.0,')
+    w('                entries=len(_memo),')
+    w('                memory_bytes=sys.getsizeof(_memo) + sum(')
+    w('                    sys.getsizeof(k) + sys.getsizeof(v) for k, v in _memo.items()))')
+    w('')
+
+    w('')
+    w('class Lexer:')
+    w('    """Wrapper do tokenizer. Lexer(source).tokens devolve lista de (tipo, lexema)."""')
+    w('    def __init__(self, source):')
+    w('        self.tokens = tokenizer(source)')
+    w('')
+    w('')
+    w('class Parser:')
+    w('    """Parser packrat. Parser(tokens).parse() → TreeNode."""')
+    w('')
+    w('    def __init__(self, tokens):')
+    w('        self._tokens = tokens')
+    w('')
+    w('    def parse(self):')
+    w('        return _run(self._tokens)')
+    w('')
+
+    w('')
+    w('def main():')
+    w('    if len(sys.argv) > 1:')
+    w('        with open(sys.argv[1], encoding="utf-8") as f:')
+    w('            source = f.read()')
+    w('    else:')
+    w('        source = input("? ")')
+    w('    try:')
+    w('        tree = parse(source)')
+    w('        tree.print_tree()')
+    w('        print(f"memo: {memo_stats()}", file=sys.stderr)')
+    w('    except (ValueError, SyntaxError) as e:')
+    w('        print(f"Erro: {e}", file=sys.stderr)')
+    w('')
+    w('if __name__ == "__main__":')
+    w('    main()')
+
+    return '\n'.join(lines) + '\n'
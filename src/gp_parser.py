@@ -3,7 +3,7 @@ from gp_lexer import tokens, lexer
 from gp_ast import (
     SpecNode, AxiomaNode, RuleListNode, RuleNode,
     AltListNode, SeqNode, SymbolNode,
-    IdentifierNode, TerminalNameNode, EpsilonNode,
+    IdentifierNode, TerminalNameNode, EpsilonNode, EbnfNode,
     TokenSectionNode, TokenDeclNode, RegexNode,
 )
 
@@ -87,16 +87,35 @@ def p_symbollist_empty(p):
 
 
 
-def p_symbol_nonterm(p):
-    """symbol : NON_TERMINAL"""
+def p_symbol_primary(p):
+    """symbol : primary"""
+    p[0] = p[1]
+
+
+def p_symbol_ebnf(p):
+    """symbol : primary STAR
+              | primary PLUS
+              | primary QUESTION"""
+    inner = p[1].child.altlist if isinstance(p[1].child, EbnfNode) and not p[1].child.op \
+        else AltListNode([SeqNode([p[1]])])
+    p[0] = SymbolNode(EbnfNode(inner, p[2]))
+
+
+def p_primary_nonterm(p):
+    """primary : NON_TERMINAL"""
     p[0] = SymbolNode(IdentifierNode(p[1]))
 
 
-def p_symbol_terminal(p):
-    """symbol : TERMINAL"""
+def p_primary_terminal(p):
+    """primary : TERMINAL"""
     p[0] = SymbolNode(TerminalNameNode(p[1]))
 
 
+def p_primary_group(p):
+    """primary : LPAREN altlist RPAREN"""
+    p[0] = SymbolNode(EbnfNode(AltListNode(p[2])))
+
+
 
 def p_tokensection_nonempty(p):
     """tokensection : tokendecl tokensection"""
@@ -162,6 +181,99 @@ def _merge_rules(rules):
 
 
 
+_HELPER_KINDS = {'*': 'rep', '+': 'rep', '?': 'opt', '': 'grp'}
+
+
+def has_ebnf(rule) -> bool:
+    """True se alguma alternativa da regra usa *, +, ? ou ( … )."""
+    return any(isinstance(sym.child, EbnfNode)
+               for seq in rule.altlist.sequences for sym in seq.symbols)
+
+
+def desugar_ebnf(rules):
+    """
+    Traduz os operadores EBNF para BNF equivalente: (regras, {NT auxiliar → op}).
+
+        X*       →  H -> X H | ε          (o ciclo de repetição)
+        X+       →  X H                   (H como em X*)
+        X?       →  H -> X | ε
+        ( a | b) →  H -> a | b            (um grupo só com uma alternativa fica inline)
+
+    Os auxiliares chamam-se <cabeça>_rep1, <cabeça>_opt2, … e ficam logo
+    a seguir à regra que os usa. FIRST/FOLLOW, a tabela LL(1) e os parsers
+    trabalham sobre esta forma; os geradores reconhecem os auxiliares
+    (compilados para ciclos) e as árvores ficam com os filhos em lista.
+    """
+    if not any(has_ebnf(r) for r in rules):
+        return rules, {}
+    taken   = {r.get_head_name() for r in rules}
+    helpers = {}
+    result  = []
+    for rule in rules:
+        if not has_ebnf(rule):
+            result.append(rule)
+            continue
+        extra = []
+        state = (rule.get_head_name().rstrip("'"), extra, helpers, taken)
+        seqs  = [_desugar_seq(seq, state) for seq in rule.altlist.sequences]
+        result.append(RuleNode(rule.head, AltListNode(seqs)))
+        result.extend(extra)
+    return result, helpers
+
+
+def _desugar_seq(seq, state):
+    symbols = []
+    for sym in seq.symbols:
+        if isinstance(sym.child, EbnfNode):
+            symbols.extend(_desugar_node(sym.child, state))
+        else:
+            symbols.append(sym)
+    return SeqNode(symbols or [SymbolNode(EpsilonNode())])
+
+
+def _desugar_node(node, state):
+    """Símbolos que substituem o nó EBNF (criando as regras auxiliares)."""
+    base, extra, helpers, taken = state
+    seqs = [_desugar_seq(seq, state) for seq in node.altlist.sequences]
+    body = [s for s in seqs if not _is_epsilon(s)]
+
+    if node.op == '' or node.op == '+':
+        if len(seqs) == 1:
+            inline = [] if _is_epsilon(seqs[0]) else list(seqs[0].symbols)
+        else:
+            inline = [_helper(base, '', seqs, state)]
+        if node.op == '':
+            return inline
+        loop = _helper(base, '+', [SeqNode(list(s.symbols)) for s in body], state)
+        return inline + [loop]
+
+    if node.op == '*':
+        return [_helper(base, '*', [SeqNode(list(s.symbols)) for s in body], state)]
+    return [_helper(base, '?', body, state)]
+
+
+def _helper(base, op, seqs, state):
+    _, extra, helpers, taken = state
+    k = 1
+    while f'{base}_{_HELPER_KINDS[op]}{k}' in taken:
+        k += 1
+    name = f'{base}_{_HELPER_KINDS[op]}{k}'
+    taken.add(name)
+    helpers[name] = '*' if op == '+' else op
+    sym = SymbolNode(IdentifierNode(name))
+    if op in ('*', '+'):
+        for seq in seqs:
+            seq.symbols.append(sym)          # H -> α H
+    if op in ('*', '+', '?'):
+        seqs = seqs + [SeqNode([SymbolNode(EpsilonNode())])]
+    extra.append(RuleNode(IdentifierNode(name), AltListNode(seqs)))
+    return sym
+
+
+def _is_epsilon(seq):
+    return all(sym.get_is_epsilon() for sym in seq.symbols)
+
+
 _parse_warnings = []
 
 
@@ -169,7 +281,7 @@ def parse_grammar(source: str) -> SpecNode | None:
     """
     Recebe o texto da gramática e devolve a ASA (SpecNode) ou None em caso de erro.
         1. Parsing (lexer + parser PLY)
-        2. Fusão de regras do mesmo não-terminal
+        2. Tradução dos operadores EBNF e fusão de regras do mesmo não-terminal
         3. Validação semântica
     """
     _parse_errors.clear()
@@ -180,8 +292,9 @@ def parse_grammar(source: str) -> SpecNode | None:
     if result is None:
         return None
 
-    # Fundir regras do mesmo não-terminal
-    result.rulelist.rules = _merge_rules(result.rulelist.rules)
+    # Operadores EBNF → regras auxiliares; depois fundir regras do mesmo não-terminal
+    rules, result.ebnf_helpers = desugar_ebnf(result.rulelist.rules)
+    result.rulelist.rules = _merge_rules(rules)
 
     # Validação semântica
     errors, warnings = result.validate()
@@ -1,6 +1,7 @@
 import re
 from gp_analysis import first_of_seq
 from gp_helpers import inline_token_name
+from gp_scanner import scanner_rules, emit_scanner
 
 def _collect_terminals(rules, patterns):
     result = list(patterns.keys())
@@ -41,11 +42,82 @@ def _inline_inner(val):
     return val[1:-1]
 
 
+def _tipo(t):
+    return _inline_inner(t) if _is_inline(t) else t
+
+
 def _inline_ply_name(inner: str) -> str:
     return inline_token_name(inner)
 
 
-def generate_rd_parser(grammar, first, follow):
+def _emit_lexer(w, patterns, inline_tokens, standalone_lexer=False):
+    """
+    Emite o tokenizer(source) do módulo gerado.
+    Por omissão usa PLY; com standalone_lexer=True emite um scanner só com
+    a biblioteca re (mesma tokenização, sem dependências nem introspeção).
+    Em ambos as regras são tentadas pela ordem de gp_scanner.scanner_rules:
+    literais inline do mais comprido para o mais curto e depois os padrões
+    declarados pela ordem da declaração (o PLY tenta as funções t_ pela
+    ordem em que são definidas).
+    """
+    if standalone_lexer:
+        emit_scanner(w, scanner_rules(patterns, inline_tokens))
+        return
+
+    w('import ply.lex as lex')
+    w('')
+    w('tokens = (')
+    for nome in patterns:
+        w(f"    '{nome}',")
+    for nome_ply in inline_tokens:
+        w(f"    '{nome_ply}',")
+    w(')')
+    w('')
+    for nome_ply, inner in sorted(inline_tokens.items(), key=lambda x: -len(x[1])):
+        w(f'def t_{nome_ply}(t):')
+        w(f'    r"{re.escape(inner)}"')
+        w(f'    return t')
+        w('')
+    for nome, pat in patterns.items():
+        w(f'def t_{nome}(t):')
+        w(f'    r"{pat}"')
+        w(f'    return t')
+        w('')
+    w('t_ignore = " \\t\\n"')
+    w('')
+    w('def t_error(t):')
+    w('    raise SyntaxError(f"Símbolo inválido: {t.value[0]}")')
+    w('')
+    w('lexer = lex.lex()')
+    w('')
+    w('inline_map = {')
+    for nome_ply, inner in inline_tokens.items():
+        w(f'    "{nome_ply}": "{inner}",')
+    w('}')
+    w('')
+    w('def tokenizer(source):')
+    w('    lexer.input(source)')
+    w('    result = []')
+    w('    for token in lexer:')
+    w('        tipo = inline_map.get(token.type, token.type)')
+    w('        result.append((tipo, token.value))')
+    w('    result.append(("$", "$"))')
+    w('    return result')
+    w('')
+
+
+def generate_rd_parser(grammar, first, follow, standalone_lexer=False, adaptive=False,
+                       pratt=False):
+    """
+    Com adaptive=True, as decisões com conflito LL(1) usam predição
+    adaptativa (gp_adaptive): _predict(NT) simula as alternativas sobre os
+    tokens seguintes e guarda o DFA de lookahead em cache.
+
+    Com pratt=True, os níveis de operadores binários (gp_pratt) são
+    reconhecidos por uma função _climb_X de precedence climbing, que constrói
+    a árvore binária compacta. Não se aplica em conjunto com a predição
+    adaptativa (o ciclo não mantém o contexto _ctx).
+    """
     nts      = grammar.get_nonterminals()
     start    = grammar.get_start()
     rules    = grammar.get_rules()
@@ -89,47 +161,14 @@ def generate_rd_parser(grammar, first, follow):
     w('            child.print_tree(prefix + ext, last=(i == len(self.children) - 1))')
     w('')
 
-    # ── LEXER (PLY — idêntico ao original) ───────────────────────────
-    w('import ply.lex as lex')
-    w('')
-    w('tokens = (')
-    for nome in patterns:
-        w(f"    '{nome}',")
-    for nome_ply in inline_tokens:
-        w(f"    '{nome_ply}',")
-    w(')')
-    w('')
-    for nome, pat in sorted(patterns.items(), key=lambda x: -len(x[1])):
-        w(f'def t_{nome}(t):')
-        w(f'    r"{pat}"')
-        w(f'    return t')
-        w('')
-    for nome_ply, inner in sorted(inline_tokens.items(), key=lambda x: -len(x[1])):
-        w(f'def t_{nome_ply}(t):')
-        w(f'    r"{re.escape(inner)}"')
-        w(f'    return t')
-        w('')
-    w('t_ignore = " \\t\\n"')
-    w('')
-    w('def t_error(t):')
-    w('    raise SyntaxError(f"Símbolo inválido: {t.value[0]}")')
-    w('')
-    w('lexer = lex.lex()')
-    w('')
-    w('inline_map = {')
-    for nome_ply, inner in inline_tokens.items():
-        w(f'    "{nome_ply}": "{inner}",')
-    w('}')
-    w('')
-    w('def tokenizer(source):')
-    w('    lexer.input(source)')
-    w('    result = []')
-    w('    for token in lexer:')
-    w('        tipo = inline_map.get(token.type, token.type)')
-    w('        result.append((tipo, token.value))')
-    w('    result.append(("$", "$"))')
-    w('    return result')
-    w('')
+    _emit_lexer(w, patterns, inline_tokens, standalone_lexer)
+
+    adaptive_nts = set()
+    if adaptive:
+        from gp_adaptive import AdaptivePredictor, conflicting_decisions, emit_predictor
+        adaptive_nts = conflicting_decisions(grammar, first, follow)
+        if adaptive_nts:
+            emit_predictor(w, AdaptivePredictor(grammar, first))
 
     # ── Estado global (interface legada) ─────────────────────────────
     w('')
@@ -154,7 +193,16 @@ def generate_rd_parser(grammar, first, follow):
     w("    raise SyntaxError(f\"Esperado '{t}', encontrado '{actual_tipo}' ('{actual_lex}')\")")
     w('')
 
+    climbers = {}
+    if pratt and not adaptive_nts:
+        from gp_pratt import expression_families
+        for family in expression_families(grammar):
+            climbers.update(_emit_climber(w, family, nts))
+
     # ── Funções parse_NT (interface legada com globais) ───────────────
+    # Os NTs auxiliares do EBNF devolvem a lista de filhos (o chamador faz
+    # children.extend) e X* é um ciclo while em vez de recursão à direita.
+    helpers = getattr(grammar, 'ebnf_helpers', {})
     for rule in rules:
         nt   = rule.get_head_name()
         seqs = rule.altlist.sequences
@@ -169,6 +217,22 @@ def generate_rd_parser(grammar, first, follow):
         w(f'def parse_{fn}():')
         w(f'    # {nt} -> {rhs_str}')
 
+        if nt in adaptive_nts:
+            _emit_adaptive_body(w, nt, seqs, helpers)
+            continue
+        if nt in climbers:
+            w(f'    return {climbers[nt]}')
+            continue
+
+        loop = helpers.get(nt) == '*'
+        pad  = '        ' if loop else '    '
+        if loop:
+            w(f'    children = []')
+            w(f'    while True:')
+            w(f'        inicio = token_pos')
+        eps_ret = ('return children' if loop else 'return []' if nt in helpers
+                   else f'return TreeNode("{nt}", children=[TreeNode("ε")])')
+
         first_branch  = True
         eps_seq       = None
         follow_tokens = sorted(follow.get(nt, set()))
@@ -182,24 +246,19 @@ def generate_rd_parser(grammar, first, follow):
             if not la:
                 continue
 
-            def _tipo(t):
-                return _inline_inner(t) if _is_inline(t) else t
-
             cond = ' or '.join(f'actual_tipo == "{_tipo(t)}"' for t in la)
             kw = 'if' if first_branch else 'elif'
             first_branch = False
-            w(f'    {kw} {cond}:')
+            w(f'{pad}{kw} {cond}:')
+            if loop:
+                symbols = seq.symbols[:-1] if seq.symbols[-1].get_value() == nt else seq.symbols
+                _emit_symbols(w, symbols, bool(adaptive_nts), helpers, pad + '    ')
+                if not symbols:
+                    w(f'{pad}    pass')
+                continue
             w(f'        children = []')
-
-            for sym in seq.symbols:
-                if sym.get_is_terminal():
-                    val  = sym.get_value()
-                    tipo = _inline_inner(val) if _is_inline(val) else val
-                    w(f'        children.append(TreeNode("{tipo}", lexema=rec("{tipo}")))')
-                else:
-                    w(f'        children.append(parse_{_nt_func(sym.get_value())}())')
-
-            w(f'        return TreeNode("{nt}", children=children)')
+            _emit_symbols(w, seq.symbols, bool(adaptive_nts), helpers)
+            w(f'        {_seq_return(nt, seq, helpers)}')
 
         if eps_seq is not None:
             follow_cond = ' or '.join(
@@ -207,20 +266,24 @@ def generate_rd_parser(grammar, first, follow):
             ) if follow_tokens else 'True'
 
             if first_branch:
-                w(f'    if {follow_cond}:')
-                w(f'        return TreeNode("{nt}", children=[TreeNode("ε")])')
-                w(f'    raise SyntaxError(f"Erro em {nt}: token inesperado {{actual_tipo}}")')
+                w(f'{pad}if {follow_cond}:')
+                w(f'{pad}    {eps_ret}')
+                w(f'{pad}raise SyntaxError(f"Erro em {nt}: token inesperado {{actual_tipo}}")')
             else:
-                w(f'    elif {follow_cond}:')
-                w(f'        return TreeNode("{nt}", children=[TreeNode("ε")])')
-                w(f'    else:')
-                w(f'        raise SyntaxError(f"Erro em {nt}: token inesperado {{actual_tipo}} (esperado FOLLOW={{{repr(follow_tokens)}}})")')
+                w(f'{pad}elif {follow_cond}:')
+                w(f'{pad}    {eps_ret}')
+                w(f'{pad}else:')
+                esperado = f' (esperado FOLLOW={[_tipo(t) for t in follow_tokens]})'
+                w(f'{pad}    raise SyntaxError(f"Erro em {nt}: token inesperado {{actual_tipo}}" + {esperado!r})')
         else:
             if first_branch:
-                w(f'    raise SyntaxError(f"Erro em {nt}: token inesperado {{actual_tipo}}")')
+                w(f'{pad}raise SyntaxError(f"Erro em {nt}: token inesperado {{actual_tipo}}")')
             else:
-                w(f'    else:')
-                w(f'        raise SyntaxError(f"Erro em {nt}: token inesperado {{actual_tipo}}")')
+                w(f'{pad}else:')
+                w(f'{pad}    raise SyntaxError(f"Erro em {nt}: token inesperado {{actual_tipo}}")')
+        if loop:
+            w(f'        if token_pos == inicio:   # α anulável sem consumir nada')
+            w(f'            return children')
 
     # ── Função parse() global (interface legada) ──────────────────────
     w('')
@@ -228,19 +291,22 @@ def generate_rd_parser(grammar, first, follow):
     w('    global token_stream, token_pos, actual_tipo, actual_lex')
     w('    token_stream = tokenizer(source)')
     w('    token_pos    = 0')
+    if adaptive_nts:
+        w('    _ctx.clear()')
     w('    actual_tipo, actual_lex = token_stream[0]')
     w(f'    tree = parse_{_nt_func(start)}()')
     w('    if actual_tipo != "$":')
     w('        raise SyntaxError(f"Tokens extra após o fim: {actual_tipo}")')
+    _emit_wrap_root(w, start, climbers, '    ')
     w('    return tree')
     w('')
 
     # ── Classe Lexer ──────────────────────────────────────────────────
-    # Envolve o tokenizer PLY já gerado acima numa classe com interface
+    # Envolve o tokenizer já gerado acima numa classe com interface
     # Lexer(source).tokens — usada por gp_interpreter.
     w('')
     w('class Lexer:')
-    w('    """Wrapper do tokenizer PLY. Lexer(source).tokens devolve lista de (tipo, lexema)."""')
+    w('    """Wrapper do tokenizer. Lexer(source).tokens devolve lista de (tipo, lexema)."""')
     w('    def __init__(self, source):')
     w('        self.tokens = tokenizer(source)')
     w('')
@@ -261,6 +327,8 @@ def generate_rd_parser(grammar, first, follow):
     w('        global token_stream, token_pos, actual_tipo, actual_lex')
     w('        token_stream = self._tokens')
     w('        token_pos    = self._pos')
+    if adaptive_nts:
+        w('        _ctx.clear()')
     w('        if token_stream:')
     w('            actual_tipo, actual_lex = token_stream[token_pos]')
     w('')
@@ -270,6 +338,7 @@ def generate_rd_parser(grammar, first, follow):
     w('        global actual_tipo')
     w('        if actual_tipo != "$":')
     w('            raise SyntaxError(f"Tokens extra após o fim: {actual_tipo}")')
+    _emit_wrap_root(w, start, climbers, '        ')
     w('        return tree')
     w('')
 
@@ -288,4 +357,86 @@ def generate_rd_parser(grammar, first, follow):
     w('if __name__ == "__main__":')
     w('    main()')
 
-    return '\n'.join(lines)
\ No newline at end of file
+    return '\n'.join(lines)
+
+
+def _emit_climber(w, family, nts):
+    """
+    Tabela de precedências e função _climb_X de uma família de níveis
+    (X = nível de menor precedência). Devolve {nível: chamada a usar em parse_nível}.
+    """
+    from gp_pratt import precedence_table
+    root    = _nt_func(family['levels'][0][0])
+    primary = family['primary']
+    table   = dict(sorted(precedence_table(family).items()))
+    w('')
+    w(f'# ── Precedence climbing: {" < ".join(lv[0] for lv in family["levels"])} (operando: {primary}) ──')
+    w(f'_PREC_{root} = {table!r}')
+    w('')
+    w(f'def _climb_{root}(min_prec):')
+    if primary in nts:
+        w(f'    left = parse_{_nt_func(primary)}()')
+    else:
+        w(f'    left = TreeNode("{_tipo(primary)}", lexema=rec("{_tipo(primary)}"))')
+    w(f'    while actual_tipo in _PREC_{root} and _PREC_{root}[actual_tipo][0] >= min_prec:')
+    w(f'        prec, label = _PREC_{root}[actual_tipo]')
+    w(f'        op    = TreeNode(actual_tipo, lexema=rec(actual_tipo))')
+    w(f'        right = _climb_{root}(prec + 1)   # associativo à esquerda')
+    w(f'        left  = TreeNode(label, children=[left, op, right])')
+    w(f'    return left')
+    w('')
+    return {nt: f'_climb_{root}({i})' for i, (nt, _, _) in enumerate(family['levels'])}
+
+
+def _emit_wrap_root(w, start, climbers, pad):
+    """Com o axioma num nível de precedence climbing, a raiz é sempre um nó do axioma."""
+    if start in climbers:
+        w(f'{pad}if tree.label != "{start}" or tree.lexema is not None:')
+        w(f'{pad}    tree = TreeNode("{start}", children=[tree])')
+
+
+def _emit_adaptive_body(w, nt, seqs, helpers=()):
+    """Corpo de parse_X para uma decisão com conflito: alternativa escolhida por _predict."""
+    w(f'    alt = _predict("{nt}")')
+    for k, seq in enumerate(seqs):
+        w(f'    if alt == {k}:')
+        if _is_epsilon_seq(seq):
+            w('        return []' if nt in helpers else
+              f'        return TreeNode("{nt}", children=[TreeNode("ε")])')
+            continue
+        w(f'        children = []')
+        _emit_symbols(w, seq.symbols, True, helpers)
+        w(f'        {_seq_return(nt, seq, helpers)}')
+    w(f'    raise SyntaxError(f"Erro em {nt}: nenhuma alternativa viável para {{actual_tipo}}")')
+
+
+def _seq_return(nt, seq, helpers):
+    """Fim de uma alternativa: lista (auxiliar EBNF) ou TreeNode (ε se a lista ficou vazia)."""
+    if nt in helpers:
+        return 'return children'
+    if any(s.get_value() in helpers for s in seq.symbols):
+        return f'return TreeNode("{nt}", children=children or [TreeNode("ε")])'
+    return f'return TreeNode("{nt}", children=children)'
+
+
+def _emit_symbols(w, symbols, track_ctx, helpers=(), pad='        '):
+    """
+    Reconhece os símbolos de uma alternativa. Com track_ctx (modo adaptativo),
+    cada chamada parse_B() empilha em _ctx o que falta da alternativa após B:
+    é o contexto real que _predict usa no LL completo. Os auxiliares EBNF
+    juntam os seus filhos aos da alternativa (children.extend).
+    """
+    for i, sym in enumerate(symbols):
+        if sym.get_is_terminal():
+            tipo = _tipo(sym.get_value())
+            w(f'{pad}children.append(TreeNode("{tipo}", lexema=rec("{tipo}")))')
+            continue
+        add = 'extend' if sym.get_value() in helpers else 'append'
+        if track_ctx:
+            tail = tuple(_tipo(s.get_value()) if s.get_is_terminal() else s.get_value()
+                         for s in symbols[i + 1:])
+            w(f'{pad}_ctx.append({tail!r})')
+            w(f'{pad}children.{add}(parse_{_nt_func(sym.get_value())}())')
+            w(f'{pad}_ctx.pop()')
+        else:
+            w(f'{pad}children.{add}(parse_{_nt_func(sym.get_value())}())')
@@ -1,13 +1,22 @@
 import re
 from gp_analysis import build_parse_table
 from gp_helpers  import is_epsilon_seq
+from gp_table    import comb_compress
 
 from gp_parser_rd import (
     _collect_terminals, _nt_func, _is_inline, _inline_inner, _inline_ply_name,
+    _emit_lexer,
 )
 
 
-def generate_table_parser(grammar, first, follow):
+def generate_table_parser(grammar, first, follow, standalone_lexer=False, compact=True):
+    """
+    Gera o módulo do parser dirigido por tabela.
+    compact=True  — ids inteiros, tabela comprimida (comb vector) e produções
+                    pré-resolvidas
+                    (modo por omissão; parse(source, build_tree=False) só valida)
+    compact=False — tabela legível parsing_table[NT][tipo] = [símbolos]
+    """
     nts      = grammar.get_nonterminals()
     start    = grammar.get_start()
     rules    = grammar.get_rules()
@@ -28,10 +37,16 @@ def generate_table_parser(grammar, first, follow):
     w('"""')
     w('Parser Top-Down Dirigido por Tabela — gerado pelo Grammar Playground.')
     w('')
-    w('  parsing_table  — tabela LL(1): parsing_table[NT][tipo] = [símbolos]')
-    w('  stack          — lista de strings (topo = stack[-1])')
-    w('  actual_tipo    — tipo do token actual')
-    w('  actual_lex     — lexema do token actual')
+    if compact:
+        w('  SYMBOLS        — nomes dos símbolos; ids < N_TERMINALS são terminais')
+        w('  PRODUCTIONS    — PRODUCTIONS[p] = (cabeça, lado direito invertido)')
+        w('  TABLE_*        — tabela LL(1) comprimida (comb vector): base/check/value')
+        w('  parse(source, build_tree=True) — devolve TreeNode (ou True sem árvore)')
+    else:
+        w('  parsing_table  — tabela LL(1): parsing_table[NT][tipo] = [símbolos]')
+        w('  stack          — lista de strings (topo = stack[-1])')
+        w('  actual_tipo    — tipo do token actual')
+        w('  actual_lex     — lexema do token actual')
     w('"""')
     w('')
     w('import sys')
@@ -54,48 +69,18 @@ def generate_table_parser(grammar, first, follow):
     w('            child.print_tree(prefix + ext, last=(i == len(self.children) - 1))')
     w('')
 
+    helpers = getattr(grammar, 'ebnf_helpers', {})
+    if helpers:
+        _emit_flatten(w, helpers)
+
     w('# LEXER')
     w('')
-    w('import ply.lex as lex')
-    w('')
-    w('tokens = (')
-    for nome in patterns:
-        w(f"    '{nome}',")
-    for nome_ply in inline_tokens:
-        w(f"    '{nome_ply}',")
-    w(')')
-    w('')
-    for nome, pat in sorted(patterns.items(), key=lambda x: -len(x[1])):
-        w(f'def t_{nome}(t):')
-        w(f'    r"{pat}"')
-        w(f'    return t')
-        w('')
-    for nome_ply, inner in sorted(inline_tokens.items(), key=lambda x: -len(x[1])):
-        w(f'def t_{nome_ply}(t):')
-        w(f'    r"{re.escape(inner)}"')
-        w(f'    return t')
-        w('')
-    w('t_ignore = " \\t\\n"')
-    w('')
-    w('def t_error(t):')
-    w('    raise SyntaxError(f"Símbolo inválido: {t.value[0]}")')
-    w('')
-    w('lexer = lex.lex()')
-    w('')
-    w('inline_map = {')
-    for nome_ply, inner in inline_tokens.items():
-        w(f'    "{nome_ply}": "{inner}",')
-    w('}')
-    w('')
-    w('def tokenizer(source):')
-    w('    lexer.input(source)')
-    w('    result = []')
-    w('    for token in lexer:')
-    w('        tipo = inline_map.get(token.type, token.type)')
-    w('        result.append((tipo, token.value))')
-    w('    result.append(("$", "$"))')
-    w('    return result')
-    w('')
+    _emit_lexer(w, patterns, inline_tokens, standalone_lexer)
+
+    if compact:
+        _emit_compact_table_parser(w, grammar, table)
+        _emit_main(w)
+        return '\n'.join(lines)
 
     w('# Tabela LL(1)')
     w('# parsing_table[NT][tipo] = lista de símbolos do lado direito ([] = ε)')
@@ -158,7 +143,7 @@ def generate_table_parser(grammar, first, follow):
     w('')
     w('        # ACEITE')
     w('        if topo == "$" and actual_tipo == "$":')
-    w('            return raiz')
+    w('            return _flatten(raiz)' if helpers else '            return raiz')
     w('')
     w('        if topo == "$":')
     w('            raise SyntaxError(f"Tokens extra: \'{actual_tipo}\' (\'{actual_lex}\')")')
@@ -196,6 +181,34 @@ def generate_table_parser(grammar, first, follow):
     w('                stack.append((sym, filho))')
     w('')
 
+    _emit_main(w)
+    return '\n'.join(lines)
+
+
+def _emit_flatten(w, helpers):
+    """_flatten: a mesma fusão dos auxiliares EBNF que gp_helpers.flatten_helpers."""
+    w('# Auxiliares EBNF (X*, X+, X?, ( … )): os filhos passam para o nó que os usa')
+    w('EBNF_HELPERS = {' + ', '.join(repr(h) for h in sorted(helpers)) + '}')
+    w('')
+    w('def _flatten(raiz):')
+    w('    stack = [raiz]')
+    w('    while stack:')
+    w('        no = stack.pop()')
+    w('        if any(c.label in EBNF_HELPERS and c.lexema is None for c in no.children):')
+    w('            plano, work = [], no.children[::-1]')
+    w('            while work:')
+    w('                c = work.pop()')
+    w('                if c.label in EBNF_HELPERS and c.lexema is None:')
+    w('                    work.extend(c.children[::-1])')
+    w('                elif c.label != "ε" or c.children:')
+    w('                    plano.append(c)')
+    w('            no.children = plano or [TreeNode("ε")]')
+    w('        stack.extend(no.children)')
+    w('    return raiz')
+    w('')
+
+
+def _emit_main(w):
     w('def main():')
     w('    if len(sys.argv) > 1:')
     w('        with open(sys.argv[1], encoding="utf-8") as f:')
@@ -211,7 +224,145 @@ def generate_table_parser(grammar, first, follow):
     w('if __name__ == "__main__":')
     w('    main()')
 
-    return '\n'.join(lines)
+
+def compact_tables(grammar, table, extra_terminals=()):
+    """
+    Numeração inteira da gramática, partilhada pelo parser compacto gerado
+    e pelo formato empacotado (gp_packed).
+
+    Devolve (symbols, n_terms, prods, rows):
+      symbols — terminais primeiro ($ = 0, inline sem aspas), depois os NTs
+      prods   — [(cabeça, lado direito, rótulo)] pela ordem das regras
+      rows    — rows[nt - n_terms][terminal] = id da produção (-1 = erro)
+    Em células com conflito fica a primeira produção, como no TableParser.
+    """
+    def tipo(t):
+        return _inline_inner(t) if _is_inline(t) else t
+
+    terminals = {tipo(t) for t in grammar.get_terminals()} | set(extra_terminals)
+    terminals = ['$'] + sorted(terminals - {'$'})
+    nts       = sorted(grammar.get_nonterminals())
+    symbols   = terminals + nts
+    sym_id    = {s: i for i, s in enumerate(symbols)}
+    n_terms   = len(terminals)
+
+    prods   = []
+    prod_id = {}
+    for rule in grammar.get_rules():
+        for seq in rule.altlist.sequences:
+            prod_id[id(seq)] = len(prods)
+            rhs = () if is_epsilon_seq(seq) else tuple(
+                sym_id[tipo(s.get_value())] for s in seq.symbols
+            )
+            prods.append((sym_id[rule.get_head_name()], rhs, f'{rule.get_head_name()} -> {seq!r}'))
+
+    rows = [[-1] * n_terms for _ in nts]
+    for (nt, terminal), seqs in table.items():
+        if seqs:
+            rows[sym_id[nt] - n_terms][sym_id[tipo(terminal)]] = prod_id[id(seqs[0])]
+
+    return symbols, n_terms, prods, rows
+
+
+def _emit_compact_table_parser(w, grammar, table):
+    """
+    Tabelas com ids inteiros: o teste "é não-terminal?" é uma comparação,
+    cada célula guarda o id da produção e cada produção o lado direito já
+    invertido, pronto para stack.extend() — o ciclo sem árvore não aloca.
+    """
+    symbols, n_terms, prods, rows = compact_tables(grammar, table)
+    nts    = symbols[n_terms:]
+    sym_id = {s: i for i, s in enumerate(symbols)}
+    base, check, value = comb_compress(rows)
+
+    w('# Símbolos: ids 0..N_TERMINALS-1 são terminais ($ = 0), os restantes NTs')
+    w('')
+    w('SYMBOLS = (')
+    for i, s in enumerate(symbols):
+        w(f'    {s!r},  # {i}')
+    w(')')
+    w('SYMBOL_ID = {s: i for i, s in enumerate(SYMBOLS)}')
+    w(f'N_TERMINALS = {n_terms}')
+    w(f'START = {sym_id[grammar.get_start()]}  # {grammar.get_start()}')
+    w('')
+    w('# PRODUCTIONS[p] = (cabeça, lado direito invertido — pronto a empilhar)')
+    w('PRODUCTIONS = (')
+    for i, (head, rhs, label) in enumerate(prods):
+        w(f'    ({head}, {tuple(reversed(rhs))!r}),  # {i}: {label}')
+    w(')')
+    w('')
+    w('# Tabela LL(1) comprimida (comb vector), linha r = nt - N_TERMINALS:')
+    w('#   i = TABLE_BASE[r] + terminal; produção = TABLE_VALUE[i] se TABLE_CHECK[i] == r, senão erro')
+    w('TABLE_BASE = (')
+    for nt, b in zip(nts, base):
+        w(f'    {b},  # {nt}')
+    w(')')
+    w(f'TABLE_CHECK = {tuple(check)!r}')
+    w(f'TABLE_VALUE = {tuple(value)!r}')
+    w('')
+
+    w('def _expected(topo):')
+    w('    r = topo - N_TERMINALS')
+    w('    b = TABLE_BASE[r]')
+    w('    return [SYMBOLS[t] for t in range(N_TERMINALS) if TABLE_CHECK[b + t] == r]')
+    w('')
+    w('def parse(source, build_tree=True):')
+    w('    tokens = tokenizer(source)')
+    w('    ids    = [SYMBOL_ID.get(tipo, -1) for tipo, _ in tokens]')
+    w('    base, check, value = TABLE_BASE, TABLE_CHECK, TABLE_VALUE')
+    w('    prods, n_terms = PRODUCTIONS, N_TERMINALS')
+    w('')
+    w('    raiz  = TreeNode(SYMBOLS[START]) if build_tree else None')
+    w('    stack = [0, START]')
+    w('    nodes = [None, raiz]')
+    w('    pos   = 0')
+    w('    la    = ids[0]')
+    w('')
+    w('    while True:')
+    w('        topo = stack[-1]')
+    w('')
+    w('        # AVANÇA / ACEITE — topo é terminal')
+    w('        if topo < n_terms:')
+    w('            if topo != la:')
+    w('                tipo, lexema = tokens[pos]')
+    w('                if topo == 0:')
+    w('                    raise SyntaxError(f"Tokens extra: \'{tipo}\' (\'{lexema}\')")')
+    w('                raise SyntaxError(')
+    w('                    f"Esperado \'{SYMBOLS[topo]}\', encontrado \'{tipo}\' (\'{lexema}\')"')
+    w('                )')
+    w('            if topo == 0:')
+    if getattr(grammar, 'ebnf_helpers', {}):
+        w('                return _flatten(raiz) if build_tree else True')
+    else:
+        w('                return raiz if build_tree else True')
+    w('            stack.pop()')
+    w('            if build_tree:')
+    w('                nodes.pop().lexema = tokens[pos][1]')
+    w('            pos += 1')
+    w('            la = ids[pos]')
+    w('            continue')
+    w('')
+    w('        r = topo - n_terms')
+    w('        i = base[r] + la')
+    w('        if la < 0 or check[i] != r:')
+    w('            raise SyntaxError(')
+    w('                f"Erro ao expandir \'{SYMBOLS[topo]}\': \'{tokens[pos][0]}\' inesperado. "')
+    w('                f"Esperado um de: {_expected(topo)}"')
+    w('            )')
+    w('')
+    w('        rhs = prods[value[i]][1]')
+    w('        stack.pop()')
+    w('        stack.extend(rhs)')
+    w('        if build_tree:')
+    w('            no = nodes.pop()')
+    w('            if not rhs:')
+    w('                no.children.append(TreeNode("ε"))')
+    w('                continue')
+    w('            filhos = [TreeNode(SYMBOLS[s]) for s in rhs]')
+    w('            nodes.extend(filhos)')
+    w('            filhos.reverse()')
+    w('            no.children.extend(filhos)')
+    w('')
 
 
 
@@ -264,20 +415,45 @@ class TreeNode:
             child.print_tree(prefix + ext, last=(i == len(self.children) - 1))
 
 
-class TableParser:
-    """Parser LL(1) dirigido por tabela."""
+def _cst_node(label, children):
+    """Nó da árvore de derivação completa (ε explícito nas produções vazias)."""
+    return TreeNode(label, children=children or [TreeNode('ε')])
+
 
-    def __init__(self, grammar, table, source, extra_patterns=None):
+class TableParser:
+    """
+    Parser LL(1) dirigido por tabela. 'table' pode ser o dict de
+    build_parse_table ou a CompressedTable de gp_table (mesma interface).
+    Com um predictor (gp_adaptive.AdaptivePredictor), as células com
+    conflito são decididas por predição adaptativa em vez da 1.ª produção.
+
+    A árvore é construída de baixo para cima: cada expansão empilha, por
+    baixo dos símbolos, uma marca de fim de produção; quando a marca chega
+    ao topo, os nós acabados desde a expansão passam a filhos do nó do NT.
+    Com simplify (gp_simplify.TreeSimplifier) os nós são simplificados
+    nesse momento. Os auxiliares EBNF e a cauda X de X -> α X (listas, com
+    simplify) não empilham marca: os filhos ficam no nó de fora e a pilha
+    não cresce com a lista.
+    """
+
+    def __init__(self, grammar, table, source, extra_patterns=None, tokens=None, trace=True,
+                 predictor=None, simplify=None):
         self.nts   = grammar.get_nonterminals()
         self.start = grammar.get_start()
         self.table = table
-
-        patterns = dict(grammar.get_token_patterns())
-        if extra_patterns:
-            patterns.update(extra_patterns)
-
-        lex = Lexer(source, patterns)
-        self.tokens = lex.tokens
+        self.helpers = getattr(grammar, 'ebnf_helpers', {})
+        self.trace = trace   # False: não regista passos (modo batch)
+        self.predictor = predictor
+        self.simplify  = simplify
+
+        # tokens já calculados (ex.: gp_scanner) dispensam o Lexer
+        if tokens is None:
+            patterns = dict(grammar.get_token_patterns())
+            if extra_patterns:
+                patterns.update(extra_patterns)
+            tokens = Lexer(source, patterns).tokens
+
+        self.tokens = tokens
         self.pos    = 0
         self.steps  = []
 
@@ -294,26 +470,44 @@ class TableParser:
         return val
 
     def parse(self):
-        raiz  = TreeNode(self.start)
-        stack = [('$', None), (self.start, raiz)]
-        step  = 0
+        simplify = self.simplify
+        build    = simplify.node if simplify else _cst_node
+        spines   = simplify.spines if simplify else ()
+        helpers  = self.helpers
+        values   = []      # nós acabados, à espera do nó pai
+        # (símbolo, é a cauda de uma lista) ou (None, (NT, início em values)) = fim de produção
+        stack    = [('$', False), (self.start, False)]
+        step     = 0
 
         while True:
-            topo, topo_no = stack[-1]
+            topo, info = stack[-1]
+
+            if topo is None:
+                stack.pop()
+                nt, h = info
+                node  = build(nt, values[h:])
+                del values[h:]
+                if node is not None:
+                    values.append(node)
+                continue
+
             la_tipo, la_lex = self._current()
 
-            step += 1
-            self.steps.append({
-                'step':   step,
-                'stack':  [s for s, _ in reversed(stack)],
-                'input':  la_lex or '$',
-                'action': '',
-            })
+            if self.trace:
+                step += 1
+                self.steps.append({
+                    'step':   step,
+                    'stack':  [s for s, _ in reversed(stack) if s is not None],
+                    'input':  la_lex or '$',
+                    'action': '',
+                })
 
             # ACEITE
             if topo == '$' and la_tipo == '$':
-                self.steps[-1]['action'] = 'ACEITE'
-                return raiz
+                if self.trace:
+                    self.steps[-1]['action'] = 'ACEITE'
+                raiz = values[0] if values else None
+                return simplify.finish(raiz) if simplify else raiz
 
             if topo == '$':
                 raise SyntaxError(f"Tokens extra: {la_tipo!r} ({la_lex!r})")
@@ -322,9 +516,9 @@ class TableParser:
                 topo_norm = self._normalize_terminal(topo)
                 if la_tipo == topo_norm:
                     stack.pop()
-                    if topo_no is not None:
-                        topo_no.lexema = la_lex
-                    self.steps[-1]['action'] = f'avança: {la_tipo!r} = {la_lex!r}'
+                    values.append(TreeNode(topo_norm, lexema=la_lex))
+                    if self.trace:
+                        self.steps[-1]['action'] = f'avança: {la_tipo!r} = {la_lex!r}'
                     self.advance()
                 else:
                     raise SyntaxError(
@@ -346,20 +540,33 @@ class TableParser:
                 )
 
             seq = cell[0]
-            self.steps[-1]['action'] = f'produção: {topo} -> {repr(seq)}'
+            if len(cell) > 1 and self.predictor is not None:
+                seq = self._predict(topo, stack)
+            if self.trace:
+                self.steps[-1]['action'] = f'produção: {topo} -> {repr(seq)}'
+                if len(cell) > 1 and self.predictor is not None:
+                    self.steps[-1]['action'] += f' (predição adaptativa, k={self.predictor.last_depth})'
 
             stack.pop()
-            if is_epsilon_seq(seq):  # ← was self._is_eps(seq)
-                if topo_no is not None:
-                    topo_no.children.append(TreeNode('ε'))
-            else:
-                syms   = seq.symbols
-                filhos = [TreeNode(self._normalize_terminal(s.get_value())) for s in syms]
-                if topo_no is not None:
-                    topo_no.children.extend(filhos)
-                for sym, filho in reversed(list(zip(syms, filhos))):
-                    key = self._normalize_terminal(sym.get_value())
-                    stack.append((key, filho))
+            if not info and topo not in helpers:
+                stack.append((None, (topo, len(values))))
+            if not is_epsilon_seq(seq):
+                syms = seq.symbols
+                tail = topo in spines and syms[-1].get_value() == topo
+                stack.append((self._normalize_terminal(syms[-1].get_value()), tail))
+                for sym in reversed(syms[:-1]):
+                    stack.append((self._normalize_terminal(sym.get_value()), False))
+
+    def _predict(self, topo, stack):
+        # Contexto real (topo primeiro) para o LL completo, só se o SLL não decidir
+        alt = self.predictor.predict(topo, self.tokens, self.pos,
+                                     lambda: [s for s, _ in reversed(stack[:-1]) if s is not None])
+        if alt is None:
+            la_tipo, la_lex = self._current()
+            raise SyntaxError(
+                f"Nenhuma alternativa de {topo!r} é viável a partir de {la_tipo!r} ({la_lex!r})"
+            )
+        return self.predictor.alternatives[topo][alt]
 
     def print_steps(self):
         for s in self.steps:
@@ -0,0 +1,83 @@
+"""
+gp_pratt.py — Deteção de níveis de operadores binários (precedence climbing).
+
+Depois de eliminar a recursividade à esquerda, uma gramática de expressões
+fica com um par de regras por nível de precedência:
+
+    Expr  -> Term ExprR                 ExprR -> '+' Term ExprR | '-' Term ExprR | ε
+    Term  -> Factor TermR               TermR -> '*' Factor TermR | ε
+
+Cada operando custa uma chamada e um nó por nível. expression_families
+encontra estas cadeias na ASA; o motor RD (compile_rd(..., pratt=True)) e o
+parser gerado (generate_rd_parser(..., pratt=True)) substituem parse_Expr e
+parse_Term por um único ciclo de precedence climbing sobre o primário
+(Factor), que constrói a árvore binária compacta, associativa à esquerda:
+
+    1 - 2 * 3 - 4   →   Expr(Expr(1, '-', Term(2, '*', 3)), '-', 4)
+
+Um operando sem operadores é o próprio nó do primário. A recursão só
+aprofunda um nível por nível de precedência, não por operando.
+"""
+
+from gp_parser_rd import _tipo
+from gp_transform import rules_of, nullable_set
+
+
+def _level(nt, alts, rules, terminals):
+    """(N, LR, operadores) se nt -> N LR e LR -> op N LR | … | ε; senão None."""
+    if len(alts) != 1 or len(alts[0]) != 2:
+        return None
+    n, tail = alts[0]
+    if tail not in rules or tail == nt or n == tail:
+        return None
+    ops, eps = [], 0
+    for alt in rules[tail]:
+        if not alt:
+            eps += 1
+        elif len(alt) == 3 and alt[0] in terminals and alt[1] == n and alt[2] == tail:
+            ops.append(_tipo(alt[0]))
+        else:
+            return None
+    if eps != 1 or not ops:
+        return None
+    return n, tail, ops
+
+
+def expression_families(grammar) -> list:
+    """
+    [{'levels': [(L, LR, [operadores]), ...], 'primary': P}, ...], do nível de
+    menor precedência para o de maior. Os operadores de uma família são
+    todos distintos e os operandos não são anuláveis.
+    """
+    rules     = rules_of(grammar)
+    terminals = grammar.get_terminals()
+    nullable  = nullable_set(rules)
+    helpers   = getattr(grammar, 'ebnf_helpers', {})
+    levels    = {}
+    for nt, alts in rules.items():
+        info = _level(nt, alts, rules, terminals)
+        if info is not None and info[0] not in nullable and info[0] not in helpers:
+            levels[nt] = info
+
+    inner    = {info[0] for info in levels.values()}
+    families = []
+    for nt in rules:
+        if nt not in levels or nt in inner:
+            continue
+        chain, seen, ops = [], set(), set()
+        cur = nt
+        while cur in levels and cur not in seen:
+            seen.add(cur)
+            n, tail, level_ops = levels[cur]
+            chain.append((cur, tail, level_ops))
+            ops.update(level_ops)
+            cur = n
+        if cur in seen or len(ops) != sum(len(lv[2]) for lv in chain):
+            continue                      # ciclo entre níveis ou operador repetido
+        families.append({'levels': chain, 'primary': cur})
+    return families
+
+
+def precedence_table(family) -> dict:
+    """{tipo do operador: (precedência, NT do nó binário)}; 0 = menor precedência."""
+    return {op: (i, nt) for i, (nt, _, ops) in enumerate(family['levels']) for op in ops}
@@ -0,0 +1,93 @@
+"""
+gp_reduce.py — Símbolos inúteis: anuláveis, produtivos e alcançáveis.
+
+Um não-terminal é inútil se não deriva nenhuma cadeia de terminais
+(improdutivo) ou se nenhuma derivação a partir do símbolo inicial passa
+por ele (inalcançável). Os conjuntos são calculados em tempo linear no
+tamanho da gramática, com contadores por alternativa (gp_transform).
+
+    info = useless_symbols(grammar)
+    info['unproductive'], info['unreachable']     # pela ordem da gramática
+    pruned, info = prune_useless(grammar)         # SpecNode sem as regras inúteis
+
+A poda segue a ordem clássica: primeiro saem os improdutivos e as
+alternativas que os usam, depois o que deixou de ser alcançável. A
+linguagem não muda; as RuleNode inalteradas são reaproveitadas e a
+TokenSection fica intacta (o scanner reconhece os mesmos tokens).
+"""
+
+from gp_ast       import IdentifierNode, AltListNode, RuleNode, RuleListNode, SpecNode
+from gp_transform import rules_of, nullable_set, productive_set, reachable_set
+
+
+def useless_symbols(grammar) -> dict:
+    """
+    {'nullable', 'productive', 'reachable', 'unproductive', 'unreachable', 'empty'}.
+
+    'reachable' é calculado já sem as alternativas improdutivas, pelo que
+    'unreachable' são os NTs produtivos que a poda retira no segundo passo.
+    'empty' indica que o próprio símbolo inicial é improdutivo.
+    """
+    rules      = rules_of(grammar)
+    start      = grammar.get_start()
+    productive = productive_set(rules)
+    useful     = {nt: [a for a in alts if all(s in productive for s in a if s in rules)]
+                  for nt, alts in rules.items() if nt in productive}
+    reachable  = reachable_set(useful, start)
+    return {
+        'nullable':     nullable_set(rules),
+        'productive':   productive,
+        'reachable':    reachable,
+        'unproductive': [nt for nt in rules if nt not in productive],
+        'unreachable':  [nt for nt in rules if nt in productive and nt not in reachable],
+        'empty':        start not in productive,
+    }
+
+
+def useless_warnings(grammar, info=None) -> list:
+    """Avisos no registo de SpecNode.validate (sem repetir os NTs nunca referenciados)."""
+    info       = useless_symbols(grammar) if info is None else info
+    start      = grammar.get_start()
+    referenced = grammar.get_all_referenced_nonterminals()
+    warnings   = []
+    if info['empty']:
+        warnings.append(
+            f"O símbolo inicial '{start}' não deriva nenhuma frase: a linguagem é vazia."
+        )
+    for nt in info['unproductive']:
+        if nt != start:
+            warnings.append(
+                f"O não-terminal '{nt}' é improdutivo (não deriva nenhuma cadeia de terminais)."
+            )
+    for nt in info['unreachable']:
+        if nt in referenced:
+            warnings.append(
+                f"O não-terminal '{nt}' é inalcançável a partir do símbolo inicial '{start}'."
+            )
+    return warnings
+
+
+def prune_useless(grammar, info=None):
+    """
+    (SpecNode reduzida, info). Devolve a própria gramática se não houver
+    nada a podar ou se a linguagem for vazia (não há gramática reduzida
+    com o símbolo inicial).
+    """
+    info = useless_symbols(grammar) if info is None else info
+    if info['empty'] or not (info['unproductive'] or info['unreachable']):
+        return grammar, info
+
+    productive, keep = info['productive'], info['reachable']
+    rules = []
+    for rule in grammar.get_rules():
+        if rule.get_head_name() not in keep:
+            continue
+        seqs = [seq for seq in rule.altlist.sequences
+                if all(s.get_value() in productive for s in seq.symbols
+                       if isinstance(s.child, IdentifierNode))]
+        if len(seqs) < len(rule.altlist.sequences):
+            rule = RuleNode(rule.head, AltListNode(seqs))
+        rules.append(rule)
+    spec = SpecNode(grammar.axioma, RuleListNode(rules), grammar.tokensection)
+    spec.ebnf_helpers = {nt: op for nt, op in grammar.ebnf_helpers.items() if nt in keep}
+    return spec, info
@@ -0,0 +1,427 @@
+"""
+Scanner autónomo (sem PLY) para as frases das gramáticas do utilizador.
+
+Reproduz exatamente a tokenização do lexer PLY emitido pelos geradores:
+as regras são experimentadas pela mesma ordem (primeiro os terminais inline,
+do mais comprido para o mais curto, depois os padrões declarados pela ordem
+da declaração), compiladas numa única alternância com re.VERBOSE, e os
+caracteres de t_ignore são saltados.
+
+  scanner_rules(patterns, inline_tokens) — regras ordenadas (nome, regex, tipo)
+  Scanner(rules).tokenize(source)        — lista de (tipo, lexema) terminada em $
+  Scanner(rules).scan(source, pos)       — os mesmos tokens a partir de pos, com o offset
+  build_dfa(rules)                       — DFA equivalente à alternância (ou None)
+  emit_scanner(w, rules)                 — escreve o mesmo scanner como código Python
+
+O código emitido é, sempre que possível, um DFA dirigido por tabela (nem
+sequer importa re); padrões com âncoras, lookarounds, referências ou flags
+caem na alternância re pré-compilada.
+"""
+
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+try:
+    from re import _parser as _sre_parse, _constants as _sre
+except ImportError:                      # Python < 3.11
+    import sre_parse as _sre_parse
+    import sre_constants as _sre
+
+from gp_helpers import inline_token_name
+
+
+IGNORE = " \t\n"
+
+
+def inline_tokens_of(grammar) -> dict:
+    """{nome_ply: conteúdo} para todos os terminais inline ('(' → TOK_LPAREN)."""
+    result = {}
+    for rule in grammar.get_rules():
+        for seq in rule.altlist.sequences:
+            for sym in seq.symbols:
+                if not sym.get_is_terminal():
+                    continue
+                v = sym.get_value()
+                if v.startswith(("'", '"')):
+                    inner = v[1:-1]
+                    result.setdefault(inline_token_name(inner), inner)
+    return result
+
+
+def scanner_rules(patterns: dict, inline_tokens: dict) -> list[tuple[str, str, str]]:
+    """
+    Devolve [(nome_regra, regex, tipo)] pela ordem em que o PLY as tentaria.
+    O tipo é o que o tokenizer devolve (o conteúdo sem aspas, para inline).
+    Os literais inline têm prioridade ('<=' antes de '<'); os padrões
+    declarados mantêm a ordem da declaração (DIR = /dir/ antes de NAME).
+    """
+    rules = [
+        (nome_ply, re.escape(inner), inner)
+        for nome_ply, inner in sorted(inline_tokens.items(), key=lambda x: -len(x[1]))
+    ]
+    rules += [(nome, pat, nome) for nome, pat in patterns.items()]
+    return rules
+
+
+def grammar_scanner_rules(grammar) -> list[tuple[str, str, str]]:
+    return scanner_rules(grammar.get_token_patterns(), inline_tokens_of(grammar))
+
+
+def master_pattern(rules) -> str:
+    """Alternância única '(?P<NOME>regex)|...' — o lastgroup identifica a regra."""
+    return '|'.join(f'(?P<{nome}>{pat})' for nome, pat, _ in rules)
+
+
+class Scanner:
+    """Tokenizador compilado uma vez e reutilizável para muitas frases."""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.regex = re.compile(master_pattern(self.rules), re.VERBOSE)
+        self.types = {nome: tipo for nome, _, tipo in self.rules}
+
+    def tokenize(self, source: str) -> list[tuple[str, str]]:
+        result = []
+        pos, end = 0, len(source)
+        match = self.regex.match
+        types = self.types
+        while pos < end:
+            if source[pos] in IGNORE:
+                pos += 1
+                continue
+            m = match(source, pos)
+            if m is None or m.end() == pos:
+                raise SyntaxError(f"Símbolo inválido: {source[pos]}")
+            result.append((types[m.lastgroup], m.group()))
+            pos = m.end()
+        result.append(('$', '$'))
+        return result
+
+    def scan(self, source: str, pos: int = 0):
+        """Gera (tipo, lexema, início) a partir de pos, sem o $ final (re-lexing parcial)."""
+        end   = len(source)
+        match = self.regex.match
+        types = self.types
+        while pos < end:
+            if source[pos] in IGNORE:
+                pos += 1
+                continue
+            m = match(source, pos)
+            if m is None or m.end() == pos:
+                raise SyntaxError(f"Símbolo inválido: {source[pos]}")
+            yield types[m.lastgroup], m.group(), pos
+            pos = m.end()
+
+
+# ── DFA (semântica leftmost-first do re, como no RE2) ────────────────
+
+MAX_CHAR   = 0x10FFFF
+MAX_STATES = 2000
+MAX_INSTS  = 20000
+
+
+class _Unsupported(Exception):
+    """O padrão usa construções que o DFA não representa."""
+
+
+@lru_cache(maxsize=1)
+def _every_char():
+    return ''.join(map(chr, range(MAX_CHAR + 1)))
+
+
+@lru_cache(maxsize=None)
+def _category_ranges(cat):
+    """Intervalos de códigos de \\d, \\w ou \\s, calculados pelo próprio re."""
+    pattern = {'DIGIT': r'\d+', 'WORD': r'\w+', 'SPACE': r'\s+'}[cat]
+    return tuple((m.start(), m.end() - 1) for m in re.finditer(pattern, _every_char()))
+
+
+def _complement(ranges):
+    result, nxt = [], 0
+    for lo, hi in sorted(ranges):
+        if lo > nxt:
+            result.append((nxt, lo - 1))
+        nxt = max(nxt, hi + 1)
+    if nxt <= MAX_CHAR:
+        result.append((nxt, MAX_CHAR))
+    return result
+
+
+def _category(av):
+    name = str(av).upper()
+    for cat in ('DIGIT', 'WORD', 'SPACE'):
+        if name.endswith('NOT_' + cat):
+            return _complement(_category_ranges(cat))
+        if name.endswith(cat):
+            return list(_category_ranges(cat))
+    raise _Unsupported(name)
+
+
+def _charset(items):
+    ranges, negate = [], False
+    for op, av in items:
+        if op is _sre.NEGATE:
+            negate = True
+        elif op is _sre.LITERAL:
+            ranges.append((av, av))
+        elif op is _sre.RANGE:
+            ranges.append(av)
+        elif op is _sre.CATEGORY:
+            ranges.extend(_category(av))
+        else:
+            raise _Unsupported(str(op))
+    return _complement(ranges) if negate else ranges
+
+
+class _NFA:
+    """Programa à Thompson: ('char', ranges, nxt) | ('split', [alvos]) | ('match', regra)."""
+
+    def __init__(self, dotall=False):
+        self.insts  = []
+        self.dotall = dotall
+
+    def add(self, inst):
+        if len(self.insts) >= MAX_INSTS:
+            raise _Unsupported('NFA demasiado grande')
+        self.insts.append(inst)
+        return len(self.insts) - 1
+
+    def char(self, ranges, nxt):
+        return self.add(('char', tuple(ranges), nxt))
+
+    def seq(self, items, nxt):
+        for op, av in reversed(list(items)):
+            nxt = self.item(op, av, nxt)
+        return nxt
+
+    def item(self, op, av, nxt):
+        if op is _sre.LITERAL:
+            return self.char([(av, av)], nxt)
+        if op is _sre.NOT_LITERAL:
+            return self.char(_complement([(av, av)]), nxt)
+        if op is _sre.ANY:
+            return self.char([(0, MAX_CHAR)] if self.dotall
+                             else _complement([(10, 10)]), nxt)
+        if op is _sre.IN:
+            return self.char(_charset(av), nxt)
+        if op is _sre.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            if add_flags or del_flags:
+                raise _Unsupported('flags locais')
+            return self.seq(sub, nxt)
+        if op is _sre.BRANCH:
+            split = self.add(('split', []))
+            self.insts[split] = ('split', [self.seq(alt, nxt) for alt in av[1]])
+            return split
+        if op in (_sre.MAX_REPEAT, _sre.MIN_REPEAT):
+            lo, hi, sub = av
+            greedy = op is _sre.MAX_REPEAT
+            if hi == _sre.MAXREPEAT:
+                loop = self.add(('split', []))
+                body = self.seq(sub, loop)
+                self.insts[loop] = ('split', [body, nxt] if greedy else [nxt, body])
+                tail = loop
+            else:
+                tail = nxt
+                for _ in range(hi - lo):
+                    opt  = self.add(('split', []))
+                    body = self.seq(sub, tail)
+                    self.insts[opt] = ('split', [body, tail] if greedy else [tail, body])
+                    tail = opt
+            for _ in range(lo):
+                tail = self.seq(sub, tail)
+            return tail
+        raise _Unsupported(str(op))
+
+
+def build_dfa(rules):
+    """
+    Constrói um DFA para a alternância das regras, com a mesma semântica do
+    re (o primeiro ramo que casa ganha; quantificadores gulosos/preguiçosos).
+    Cada estado é a lista ordenada de threads do NFA, cortada após o primeiro
+    'match' (as threads de menor prioridade já não podem ganhar).
+
+    Devolve (accept, bounds, targets) ou None se algum padrão não for suportado:
+      accept[s]  — índice da regra aceite no estado s (-1 se nenhuma)
+      bounds[s]  — inícios dos intervalos de códigos (o primeiro é sempre 0)
+      targets[s] — estado seguinte por intervalo (-1 = morto)
+    """
+    try:
+        parsed = [_sre_parse.parse(pat, re.VERBOSE) for _, pat, _ in rules]
+    except re.error:
+        return None
+    flags = 0
+    for p in parsed:
+        flags |= p.state.flags
+    if flags & ~(re.VERBOSE | re.UNICODE | re.DOTALL):
+        return None
+
+    nfa = _NFA(dotall=bool(flags & re.DOTALL))
+    try:
+        starts = [nfa.seq(p.data, nfa.add(('match', i))) for i, p in enumerate(parsed)]
+    except (_Unsupported, RecursionError):
+        return None
+    start = nfa.add(('split', starts))
+    insts = nfa.insts
+
+    def closure(pcs, out, seen):
+        stack = list(reversed(pcs))
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            inst = insts[pc]
+            if inst[0] == 'split':
+                stack.extend(reversed(inst[1]))
+            else:
+                out.append(pc)
+                if inst[0] == 'match':
+                    return True
+        return False
+
+    def cut(pcs):
+        out = []
+        closure(pcs, out, set())
+        return tuple(out)
+
+    # Partição do espaço de códigos em intervalos elementares
+    cuts = {0}
+    for inst in insts:
+        if inst[0] == 'char':
+            for lo, hi in inst[1]:
+                cuts.add(lo)
+                if hi < MAX_CHAR:
+                    cuts.add(hi + 1)
+    bounds = sorted(cuts)
+
+    member = {}
+    for pc, inst in enumerate(insts):
+        if inst[0] == 'char':
+            ids = set()
+            for lo, hi in inst[1]:
+                a = bisect_right(bounds, lo) - 1
+                b = bisect_right(bounds, hi) - 1
+                ids.update(range(a, b + 1))
+            member[pc] = ids
+
+    states = {}
+    order  = []
+
+    def state_id(threads):
+        if threads not in states:
+            if len(order) >= MAX_STATES:
+                raise _Unsupported('DFA demasiado grande')
+            states[threads] = len(order)
+            order.append(threads)
+        return states[threads]
+
+    try:
+        state_id(cut([start]))
+        accept, s_bounds, s_targets = [], [], []
+        i = 0
+        while i < len(order):
+            threads = order[i]
+            last = insts[threads[-1]] if threads else None
+            accept.append(last[1] if last and last[0] == 'match' else -1)
+            row_b, row_t = [], []
+            for k in range(len(bounds)):
+                out, seen = [], set()
+                for pc in threads:
+                    if insts[pc][0] == 'char' and k in member[pc]:
+                        if closure([insts[pc][2]], out, seen):
+                            break
+                target = state_id(tuple(out)) if out else -1
+                if not row_t or row_t[-1] != target:
+                    row_b.append(bounds[k])
+                    row_t.append(target)
+            s_bounds.append(tuple(row_b))
+            s_targets.append(tuple(row_t))
+            i += 1
+    except _Unsupported:
+        return None
+    return tuple(accept), tuple(s_bounds), tuple(s_targets)
+
+
+def emit_scanner(w, rules):
+    """
+    Emite um tokenizer(source) equivalente ao do PLY sem dependências externas:
+    um DFA em tabelas quando build_dfa() o consegue construir, senão uma
+    alternância re pré-compilada.
+    """
+    dfa = build_dfa(rules)
+    if dfa is not None:
+        _emit_dfa_scanner(w, rules, dfa)
+        return
+
+    w('import re')
+    w('')
+    w('# Uma única alternância pré-compilada; o lastgroup identifica a regra.')
+    w(f'_TOKEN_RE = re.compile({master_pattern(rules)!r}, re.VERBOSE)')
+    w('_TOKEN_TYPES = {')
+    for nome, _, tipo in rules:
+        w(f'    {nome!r}: {tipo!r},')
+    w('}')
+    w(f'_IGNORE = {IGNORE!r}')
+    w('')
+    w('def tokenizer(source):')
+    w('    result = []')
+    w('    pos, end = 0, len(source)')
+    w('    match = _TOKEN_RE.match')
+    w('    while pos < end:')
+    w('        if source[pos] in _IGNORE:')
+    w('            pos += 1')
+    w('            continue')
+    w('        m = match(source, pos)')
+    w('        if m is None or m.end() == pos:')
+    w('            raise SyntaxError(f"Símbolo inválido: {source[pos]}")')
+    w('        result.append((_TOKEN_TYPES[m.lastgroup], m.group()))')
+    w('        pos = m.end()')
+    w('    result.append(("$", "$"))')
+    w('    return result')
+    w('')
+
+
+def _emit_dfa_scanner(w, rules, dfa):
+    accept, bounds, targets = dfa
+    w('from bisect import bisect_right')
+    w('')
+    w('# DFA do scanner: por estado, inícios dos intervalos de códigos e destinos.')
+    w(f'_ACCEPT  = {accept!r}')
+    w(f'_BOUNDS  = {bounds!r}')
+    w(f'_TARGETS = {targets!r}')
+    w(f'_TYPES   = {tuple(tipo for _, _, tipo in rules)!r}')
+    w(f'_IGNORE  = {IGNORE!r}')
+    w('_CACHE   = [{} for _ in _ACCEPT]')
+    w('')
+    w('def _step(state, ch):')
+    w('    cache = _CACHE[state]')
+    w('    nxt = cache.get(ch)')
+    w('    if nxt is None:')
+    w('        nxt = cache[ch] = _TARGETS[state][bisect_right(_BOUNDS[state], ord(ch)) - 1]')
+    w('    return nxt')
+    w('')
+    w('def tokenizer(source):')
+    w('    result = []')
+    w('    pos, end = 0, len(source)')
+    w('    while pos < end:')
+    w('        if source[pos] in _IGNORE:')
+    w('            pos += 1')
+    w('            continue')
+    w('        state, i = 0, pos')
+    w('        rule, stop = _ACCEPT[0], pos')
+    w('        while i < end:')
+    w('            state = _step(state, source[i])')
+    w('            if state < 0:')
+    w('                break')
+    w('            i += 1')
+    w('            if _ACCEPT[state] >= 0:')
+    w('                rule, stop = _ACCEPT[state], i')
+    w('        if rule < 0 or stop == pos:')
+    w('            raise SyntaxError(f"Símbolo inválido: {source[pos]}")')
+    w('        result.append((_TYPES[rule], source[pos:stop]))')
+    w('        pos = stop')
+    w('    result.append(("$", "$"))')
+    w('    return result')
+    w('')
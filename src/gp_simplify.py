@@ -0,0 +1,147 @@
+"""
+gp_simplify.py — Simplificação da árvore de derivação (CST → AST).
+
+Os parsers constroem cada nó de baixo para cima através de um construtor;
+passando um TreeSimplifier, a simplificação é feita nesse momento, sem uma
+segunda travessia da árvore:
+
+    simp = TreeSimplifier(grammar)                              # tudo ligado
+    tree = TableParser(grammar, table, src, simplify=simp).parse()
+    tree = compile_rd(grammar, first, follow, simplify=simp).parse(src)
+    tree = LRParser(grammar, simplify=simp).parse(src)
+    tree = simp.simplify(earley_tree)                           # árvore já construída
+
+Opções:
+    epsilon — não há folhas ε; um nó que fica sem filhos desaparece
+    chains  — um nó com um único filho é substituído por esse filho
+    lists   — X -> α X | β (recursão à direita só na cauda): a espinha
+              X(α, X(α, X(β))) fica um único nó X(α, α, β)
+    keep    — NTs que nunca são colapsados (as listas também não)
+
+Os NTs auxiliares do EBNF (grammar.ebnf_helpers) são sempre fundidos no
+nó que os usa, como em gp_helpers.flatten_helpers.
+"""
+
+from gp_parser_td import TreeNode
+from gp_transform import rules_of
+
+
+def list_spines(grammar) -> set:
+    """NTs com recursão à direita só na cauda (X -> α X), candidatos a nó-lista."""
+    helpers = getattr(grammar, 'ebnf_helpers', {})
+    spines  = set()
+    for nt, alts in rules_of(grammar).items():
+        if nt in helpers:
+            continue
+        if any(a and a[-1] == nt for a in alts) and all(nt not in a[:-1] for a in alts):
+            spines.add(nt)
+    return spines
+
+
+def tree_size(tree) -> int:
+    """Número de nós da árvore (iterativo)."""
+    n, stack = 0, [tree]
+    while stack:
+        node = stack.pop()
+        n += 1
+        stack.extend(node.children)
+    return n
+
+
+class TreeSimplifier:
+    """Construtor de nós com as simplificações escolhidas."""
+
+    def __init__(self, grammar, epsilon=True, chains=True, lists=True, keep=()):
+        self.start   = grammar.get_start()
+        self.epsilon = epsilon
+        self.chains  = chains
+        self.helpers = getattr(grammar, 'ebnf_helpers', {})
+        self.spines  = list_spines(grammar) if lists else set()
+        self.keep    = set(keep) | self.spines
+        self._splice_labels = set(self.helpers) | self.spines
+
+    def node(self, label, children):
+        """
+        Nó de 'label' com os filhos já construídos (sem None). Pode devolver
+        o único filho (cadeia) ou None (nó vazio, com epsilon=True).
+        """
+        labels = self._splice_labels
+        if labels and any(c.label in labels and c.lexema is None for c in children):
+            children = self._splice(label, children)
+        if label in self.helpers:
+            return TreeNode(label, children)          # fundido no pai
+        if not children:
+            return None if self.epsilon else TreeNode(label, [TreeNode('ε')])
+        if self.chains and len(children) == 1 and label not in self.keep:
+            return children[0]
+        return TreeNode(label, children)
+
+    def finish(self, root):
+        """Raiz final: é sempre o nó do axioma (sem filhos se a frase for vazia)."""
+        if root is None:
+            return TreeNode(self.start)
+        if root.lexema is None and root.label in self.spines:
+            self._flatten_spine(root)
+        if root.label != self.start or root.lexema is not None:
+            return TreeNode(self.start, [root])     # o axioma colapsou numa cadeia
+        return root
+
+    def simplify(self, tree):
+        """As mesmas simplificações sobre uma árvore já construída (pós-ordem iterativa)."""
+        built = {}
+        stack = [(tree, False)]
+        while stack:
+            node, done = stack.pop()
+            if not done:
+                stack.append((node, True))
+                stack.extend((c, False) for c in node.children
+                             if c.lexema is None and c.children)
+                continue
+            kids = []
+            for c in node.children:
+                if c.lexema is not None:
+                    kids.append(c)
+                elif c.children:
+                    r = built.pop(id(c))
+                    if r is not None:
+                        kids.append(r)
+                elif c.label != 'ε':
+                    r = self.node(c.label, [])
+                    if r is not None:
+                        kids.append(r)
+            built[id(node)] = self.node(node.label, kids)
+        return self.finish(built[id(tree)])
+
+    # ── Listas ────────────────────────────────────────────────────────
+
+    def _splice(self, label, children):
+        """Funde os auxiliares EBNF e achata as espinhas X(α, X(…)) dos filhos."""
+        helpers, spines = self.helpers, self.spines
+        out, last = [], len(children) - 1
+        for i, c in enumerate(children):
+            if c.lexema is not None:
+                out.append(c)
+            elif c.label in helpers:
+                work = c.children[::-1]
+                while work:
+                    g = work.pop()
+                    if g.lexema is None and g.label in helpers:
+                        work.extend(g.children[::-1])
+                    else:
+                        out.append(g)
+            elif c.label in spines and not (c.label == label and i == last):
+                out.append(self._flatten_spine(c))
+            else:
+                out.append(c)     # a cauda X de X -> α X é achatada pelo X de fora
+        return out
+
+    @staticmethod
+    def _flatten_spine(node):
+        label, out, cur = node.label, [], node
+        while cur.children and cur.children[-1].label == label and cur.children[-1].lexema is None:
+            out.extend(cur.children[:-1])
+            cur = cur.children[-1]
+        if cur is not node:
+            out.extend(c for c in cur.children if c.label != 'ε' or c.children)
+            node.children = out
+        return node
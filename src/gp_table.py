@@ -0,0 +1,147 @@
+"""
+gp_table.py — Tabela LL(1) comprimida (comb vector / deslocamento de linhas).
+
+A tabela densa NT × terminal é quase toda vazia. Cada linha é deslocada
+para um 'base' tal que as suas células não vazias não colidam com as das
+linhas já colocadas, e todas partilham dois vetores:
+
+    i = base[nt] + terminal
+    produção = value[i] if check[i] == nt else -1
+
+A procura é O(1) e o espaço é ~ nº de células preenchidas (mais uma linha
+de folga). Usado pelo TableParser (CompressedTable), pelo parser TD gerado
+e pelo formato empacotado (gp_packed).
+"""
+
+from collections.abc import Mapping
+
+
+def comb_compress(rows, empty=-1):
+    """
+    Comprime linhas densas (listas do mesmo comprimento) em (base, check, value).
+    Colocação first-fit, das linhas mais cheias para as mais vazias.
+    check[i] guarda o índice da linha dona da posição i (-1 = livre).
+    """
+    n_cols = len(rows[0]) if rows else 0
+    base   = [0] * len(rows)
+    check  = []
+    value  = []
+    used   = 0   # bitmask das posições ocupadas (teste de colisão num só passo)
+
+    order = sorted(range(len(rows)), key=lambda r: -sum(v != empty for v in rows[r]))
+    for r in order:
+        cols = [c for c, v in enumerate(rows[r]) if v != empty]
+        mask = sum(1 << c for c in cols)
+        b = 0
+        while (used >> b) & mask:
+            b += 1
+        used |= mask << b
+        base[r] = b
+        # folga até base + n_cols: a procura nunca sai dos vetores
+        missing = b + n_cols - len(check)
+        if missing > 0:
+            check.extend([-1] * missing)
+            value.extend([empty] * missing)
+        for c in cols:
+            check[b + c] = r
+            value[b + c] = rows[r][c]
+
+    return base, check, value
+
+
+def comb_lookup(base, check, value, row, col, empty=-1):
+    i = base[row] + col
+    return value[i] if check[i] == row else empty
+
+
+class CompressedTable(Mapping):
+    """
+    Tabela LL(1) comprimida com a mesma interface de leitura que o dict de
+    build_parse_table: table[(NT, terminal)] → lista de SeqNode (só existem
+    chaves para células preenchidas). Células com conflito guardam a lista
+    completa à parte; as restantes guardam apenas o índice da produção.
+    """
+
+    def __init__(self, nonterminals, terminals, productions, base, check, value, conflicts=None):
+        self.nonterminals = list(nonterminals)
+        self.terminals    = list(terminals)
+        self.productions  = list(productions)   # [(cabeça, SeqNode)]
+        self.base         = base
+        self.check        = check
+        self.value        = value
+        self.conflicts    = conflicts or {}     # (linha, coluna) → [SeqNode, ...]
+        self.nt_id        = {nt: i for i, nt in enumerate(self.nonterminals)}
+        self.t_id         = {t: i for i, t in enumerate(self.terminals)}
+
+    @classmethod
+    def from_table(cls, table, grammar):
+        nts       = sorted(grammar.get_nonterminals())
+        terminals = sorted({t for (_, t) in table})
+        nt_id     = {nt: i for i, nt in enumerate(nts)}
+        t_id      = {t: i for i, t in enumerate(terminals)}
+
+        productions = []
+        prod_id     = {}
+        for rule in grammar.get_rules():
+            for seq in rule.altlist.sequences:
+                prod_id[id(seq)] = len(productions)
+                productions.append((rule.get_head_name(), seq))
+
+        rows      = [[-1] * len(terminals) for _ in nts]
+        conflicts = {}
+        for (nt, t), seqs in table.items():
+            if not seqs:
+                continue
+            r, c = nt_id[nt], t_id[t]
+            rows[r][c] = prod_id[id(seqs[0])]
+            if len(seqs) > 1:
+                conflicts[(r, c)] = list(seqs)
+
+        base, check, value = comb_compress(rows)
+        return cls(nts, terminals, productions, base, check, value, conflicts)
+
+    def production(self, nt, terminal) -> int:
+        """Índice da produção na célula (-1 se vazia). O(1)."""
+        r = self.nt_id.get(nt)
+        c = self.t_id.get(terminal)
+        if r is None or c is None:
+            return -1
+        return comb_lookup(self.base, self.check, self.value, r, c)
+
+    def get(self, key, default=None):
+        # Sem KeyError no caminho quente do TableParser (células vazias são comuns)
+        nt, terminal = key
+        p = self.production(nt, terminal)
+        if p < 0:
+            return default
+        if self.conflicts:
+            extra = self.conflicts.get((self.nt_id[nt], self.t_id[terminal]))
+            if extra is not None:
+                return extra
+        return [self.productions[p][1]]
+
+    def __getitem__(self, key):
+        cell = self.get(key)
+        if cell is None:
+            raise KeyError(key)
+        return cell
+
+    def __iter__(self):
+        for r, nt in enumerate(self.nonterminals):
+            for c, t in enumerate(self.terminals):
+                if comb_lookup(self.base, self.check, self.value, r, c) >= 0:
+                    yield (nt, t)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def stats(self) -> dict:
+        return {
+            'dense':   len(self.nonterminals) * len(self.terminals),
+            'entries': sum(1 for owner in self.check if owner >= 0),
+            'size':    len(self.check),
+        }
+
+
+def compress_table(table, grammar) -> CompressedTable:
+    return CompressedTable.from_table(table, grammar)
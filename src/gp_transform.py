@@ -0,0 +1,359 @@
+"""
+gp_transform.py — Transformações de gramáticas (recursividade à esquerda, fatorização).
+
+Trabalha sobre as regras como listas de símbolos (texto tal como na
+gramática), independente da ASA:
+
+    rules = rules_of(grammar)                 # {NT: [[símbolo, ...], ...]}, [] = ε
+    for scc in left_recursive_sccs(rules):    # ciclos à esquerda (Tarjan)
+        new = eliminate_left_recursion_scc(rules, scc)
+        [rule_text(nt, alts) for nt, alts in new.items()]
+
+Um não-terminal é recursivo à esquerda se se alcança a si próprio no grafo
+de "canto esquerdo": A → B quando B aparece numa alternativa de A depois de
+um prefixo anulável. As componentes fortemente conexas desse grafo são os
+ciclos; cada uma é eliminada isoladamente (substituição ordenada de Paull
+só entre os membros da componente, seguida da eliminação direta), para que
+o resto da gramática não seja reescrito nem cresça.
+
+Tudo é linear no tamanho da gramática exceto a própria substituição, que
+fica confinada à componente.
+
+A fatorização à esquerda insere as alternativas numa trie de símbolos e
+percorre-a uma vez: cada nó com mais de um seguimento é um ponto de
+decisão e recebe um NT' novo; cadeias sem bifurcação ficam na mesma
+alternativa. Sub-tries estruturalmente iguais partilham o mesmo NT'.
+
+    left_factor_trie('S', [['a', 'b'], ['a', 'c']])   # {'S': [['a', "S'"]], "S'": [['b'], ['c']]}
+"""
+
+import re
+from collections import deque
+
+EPSILON = 'ε'
+
+
+# ── Regras em listas ──────────────────────────────────────────────────
+
+def rules_of(grammar) -> dict:
+    """{NT: [[símbolo, ...], ...]} pela ordem da gramática; ε é a lista vazia."""
+    rules = {}
+    for rule in grammar.get_rules():
+        alts = []
+        for seq in rule.altlist.sequences:
+            if not seq.symbols or (len(seq.symbols) == 1 and seq.symbols[0].get_is_epsilon()):
+                alts.append([])
+            else:
+                alts.append([s.get_value() for s in seq.symbols])
+        rules.setdefault(rule.get_head_name(), []).extend(alts)
+    return rules
+
+
+def rule_text(nt, alts) -> str:
+    return f"{nt} -> {' | '.join(' '.join(a) if a else EPSILON for a in alts)}"
+
+
+_RULE_SYM_RE = re.compile(r"""'[^']*'|"[^"]*"|\S+""")
+
+
+def parse_rule_text(text):
+    """Inverso de rule_text: "A -> x y | ε" → ('A', [['x', 'y'], []])."""
+    head, _, body = text.partition('->')
+    alts, cur = [], []
+    for sym in _RULE_SYM_RE.findall(body):
+        if sym == '|':
+            alts.append(cur)
+            cur = []
+        elif sym not in (EPSILON, 'epsilon'):
+            cur.append(sym)
+    alts.append(cur)
+    return head.strip(), alts
+
+
+def fresh_name(base, taken) -> str:
+    """base' (ou base'', ...) que ainda não exista em 'taken'."""
+    name = f"{base}'"
+    while name in taken:
+        name += "'"
+    return name
+
+
+def nullable_set(rules) -> set:
+    """Não-terminais anuláveis, com contadores por alternativa (linear)."""
+    nullable = set()
+    pending  = []                 # alternativas: [cabeça, nº de símbolos ainda não anuláveis]
+    uses     = {}                 # NT → índices das alternativas onde aparece
+    work     = []
+    for head, alts in rules.items():
+        for alt in alts:
+            if any(s not in rules for s in alt):
+                continue          # tem um terminal: nunca é anulável
+            idx = len(pending)
+            pending.append([head, len(alt)])
+            for s in alt:
+                uses.setdefault(s, []).append(idx)
+            if not alt and head not in nullable:
+                nullable.add(head)
+                work.append(head)
+    while work:
+        nt = work.pop()
+        for idx in uses.get(nt, ()):
+            entry = pending[idx]
+            entry[1] -= 1
+            if entry[1] == 0 and entry[0] not in nullable:
+                nullable.add(entry[0])
+                work.append(entry[0])
+    return nullable
+
+
+
+def productive_set(rules) -> set:
+    """Não-terminais que derivam alguma cadeia de terminais (contadores por alternativa)."""
+    productive = set()
+    pending    = []               # alternativas: [cabeça, nº de NTs ainda não produtivos]
+    uses       = {}
+    work       = []
+    for head, alts in rules.items():
+        for alt in alts:
+            nts = [s for s in alt if s in rules]
+            idx = len(pending)
+            pending.append([head, len(nts)])
+            for s in nts:
+                uses.setdefault(s, []).append(idx)
+            if not nts and head not in productive:
+                productive.add(head)
+                work.append(head)
+    while work:
+        nt = work.pop()
+        for idx in uses.get(nt, ()):
+            entry = pending[idx]
+            entry[1] -= 1
+            if entry[1] == 0 and entry[0] not in productive:
+                productive.add(entry[0])
+                work.append(entry[0])
+    return productive
+
+
+def reachable_set(rules, start) -> set:
+    """Não-terminais alcançáveis a partir de 'start'."""
+    if start not in rules:
+        return set()
+    reachable, work = {start}, [start]
+    while work:
+        for alt in rules[work.pop()]:
+            for s in alt:
+                if s in rules and s not in reachable:
+                    reachable.add(s)
+                    work.append(s)
+    return reachable
+
+# ── Grafo de canto esquerdo e componentes ─────────────────────────────
+
+def left_corner_graph(rules, nullable=None) -> dict:
+    """A → [B, ...]: B pode ser o primeiro símbolo derivado por A (prefixo anulável)."""
+    if nullable is None:
+        nullable = nullable_set(rules)
+    graph = {}
+    for head, alts in rules.items():
+        out = graph.setdefault(head, [])
+        for alt in alts:
+            for s in alt:
+                if s not in rules:
+                    break
+                if s not in out:
+                    out.append(s)
+                if s not in nullable:
+                    break
+    return graph
+
+
+def strongly_connected_components(graph) -> list:
+    """Tarjan iterativo (sem limite de recursão); componentes em ordem topológica inversa."""
+    index, low, on_stack = {}, {}, set()
+    stack, result, counter = [], [], 0
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, i = work.pop()
+            if i == 0:
+                index[v] = low[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack.add(v)
+            succs = graph.get(v, ())
+            recurse = False
+            while i < len(succs):
+                w = succs[i]
+                i += 1
+                if w not in index:
+                    work.append((v, i))
+                    work.append((w, 0))
+                    recurse = True
+                    break
+                if w in on_stack:
+                    low[v] = min(low[v], index[w])
+            if recurse:
+                continue
+            if low[v] == index[v]:
+                scc = []
+                while True:
+                    w = stack.pop()
+                    on_stack.discard(w)
+                    scc.append(w)
+                    if w == v:
+                        break
+                result.append(scc)
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[v])
+    return result
+
+
+def left_recursive_sccs(rules, nullable=None) -> list:
+    """Componentes com ciclo à esquerda, membros pela ordem da gramática."""
+    graph = left_corner_graph(rules, nullable)
+    order = {nt: i for i, nt in enumerate(rules)}
+    out   = []
+    for scc in strongly_connected_components(graph):
+        if len(scc) > 1 or scc[0] in graph.get(scc[0], ()):
+            out.append(sorted(scc, key=order.__getitem__))
+    out.sort(key=lambda scc: order[scc[0]])
+    return out
+
+
+# ── Eliminação ────────────────────────────────────────────────────────
+
+def _dedup(alts):
+    seen, out = set(), []
+    for a in alts:
+        key = tuple(a)
+        if key not in seen:
+            seen.add(key)
+            out.append(a)
+    return out
+
+
+def _eliminate_direct(nt, alts, taken):
+    """A -> A α | β  ⇒  A -> β A',  A' -> α A' | ε  (A -> A é descartada)."""
+    rec  = [a[1:] for a in alts if a and a[0] == nt and len(a) > 1]
+    base = [a for a in alts if not (a and a[0] == nt)]
+    if not rec:
+        return {nt: base}
+    prime = fresh_name(nt, taken)
+    taken.add(prime)
+    return {
+        nt:    [b + [prime] for b in base] or [[prime]],
+        prime: [r + [prime] for r in rec] + [[]],
+    }
+
+
+def eliminate_left_recursion_scc(rules, scc, taken=None):
+    """
+    Novas regras para os membros de 'scc' (e os NT' criados), ou None se
+    a recursividade estiver escondida atrás de prefixos anuláveis, caso
+    que a substituição ordenada não resolve.
+    """
+    taken   = set(rules) if taken is None else taken
+    members = set(scc)
+    current = {nt: [list(a) for a in rules[nt]] for nt in scc}
+    result  = {}
+
+    for i, ai in enumerate(scc):
+        alts = current[ai]
+        for aj in scc[:i]:
+            expanded = []
+            for alt in alts:
+                if alt and alt[0] == aj:
+                    expanded.extend(d + alt[1:] for d in current[aj])
+                else:
+                    expanded.append(alt)
+            alts = _dedup(expanded)
+        new = _eliminate_direct(ai, alts, taken)
+        current[ai] = new[ai]
+        result.update(new)
+
+    # Sobra recursão (oculta por anuláveis) entre os membros?
+    check = dict(rules)
+    check.update(result)
+    remaining = left_recursive_sccs({nt: check[nt] for nt in check})
+    if any(members & set(s) for s in remaining):
+        return None
+    return result
+
+
+# ── Fatorização à esquerda ────────────────────────────────────────────
+
+class _TrieNode:
+    __slots__ = ('children', 'end', 'eps_at')
+
+    def __init__(self):
+        self.children = {}       # símbolo → _TrieNode, pela ordem de inserção
+        self.end      = False    # alguma alternativa termina aqui
+        self.eps_at   = 0        # posição de ε entre os filhos (ordem original)
+
+
+def _signatures(root):
+    """id(nó) → inteiro igual para sub-tries com as mesmas alternativas (pós-ordem iterativa)."""
+    intern, sig = {}, {}
+    stack = [(root, False)]
+    while stack:
+        node, done = stack.pop()
+        if not done:
+            stack.append((node, True))
+            stack.extend((c, False) for c in node.children.values())
+            continue
+        key = (node.end, node.eps_at if node.end else None,
+               tuple((s, sig[id(c)]) for s, c in node.children.items()))
+        sig[id(node)] = intern.setdefault(key, len(intern))
+    return sig
+
+
+def left_factor_trie(nt, alts, taken=None) -> dict:
+    """
+    Fatoriza as alternativas de 'nt' ({NT: [[símbolo, ...], ...]}, [] = ε).
+
+    Custo proporcional ao comprimento total das alternativas. Os nomes
+    novos (nt', nt'', ...) evitam 'taken', que é atualizado.
+    """
+    taken = set() if taken is None else taken
+    taken.add(nt)
+    root = _TrieNode()
+    for alt in alts:
+        node = root
+        for sym in alt:
+            child = node.children.get(sym)
+            if child is None:
+                child = node.children[sym] = _TrieNode()
+            node = child
+        if not node.end:
+            node.end, node.eps_at = True, len(node.children)
+
+    sig    = _signatures(root)
+    names  = {}
+    result = {}
+    work   = deque([(nt, root)])
+    while work:
+        name, node = work.popleft()
+        out = []
+        for i, (sym, child) in enumerate(node.children.items()):
+            if node.end and node.eps_at == i:
+                out.append([])
+            seq = [sym]
+            while not child.end and len(child.children) == 1:
+                (sym, child), = child.children.items()
+                seq.append(sym)
+            if child.children:
+                key = sig[id(child)]
+                if key not in names:
+                    names[key] = fresh_name(nt, taken)
+                    taken.add(names[key])
+                    work.append((names[key], child))
+                seq.append(names[key])
+            out.append(seq)
+        if node.end and node.eps_at == len(node.children):
+            out.append([])
+        result[name] = out
+    return result
@@ -189,11 +189,14 @@ def generate_visitor(grammar):
     w('    """')
     w('')
 
+    helpers = getattr(grammar, 'ebnf_helpers', {})
     for rule in rules:
         nt     = rule.get_head_name()
         seqs   = rule.altlist.sequences
         func   = safe_name(nt)
         n_alts = len(seqs)
+        if nt in helpers:
+            continue            # auxiliar EBNF: os filhos estão no nó de quem o usa
 
         # Separador visual e assinatura da regra
         w(f'    # {"─" * 58}')
@@ -205,7 +208,14 @@ def generate_visitor(grammar):
         w(f'    # {nt}  →  {alts_summary}')
         w(f'    def visit_{func}(self, node):')
 
-        if n_alts == 1:
+        if any(sym.get_value() in helpers for s in seqs for sym in s.symbols):
+            w(f'        # Repetição/opcional EBNF: o número de filhos varia de frase para frase')
+            w(f'        items = [self.visit(c) for c in node.children if c.label != "\u03b5"]')
+            w(f'')
+            w(f'        # ↓ Substitui pelo resultado pretendido')
+            w(f'        return self.generic_visit(node)  # ex: return items')
+
+        elif n_alts == 1:
             seq = seqs[0]
             if is_epsilon_seq(seq):
                 w(f'        # Alternativa única: ε — sem filhos significativos.')
@@ -15,15 +15,24 @@ Demonstra todas as funcionalidades implementadas:
 Uso:
     python main.py                    # usa gramática de exemplo embutida
     python main.py grammar.txt        # lê gramática de um ficheiro
+    python main.py batch grammar.txt frases.txt [--rd|--packrat|--adaptive|--lr|--earley] [-j N] [--ordered] [--svg]
+                                      # parseia muitas frases (uma por linha,
+                                      # ou NDJSON se .ndjson/.jsonl; '-' = stdin);
+                                      # --ordered mantém a ordem de entrada
 """
 
 import sys
 import os
+import json
+import time
 from gp_parser import parse_grammar, get_parse_errors, get_parse_warnings
 from gp_analysis import *
 from gp_parser_rd import generate_rd_parser
 from gp_parser_td import TableParser, generate_table_parser
 from gp_visitor import generate_visitor
+from gp_batch import parse_batch, read_phrases
+from gp_table import compress_table
+from gp_reduce import useless_warnings
 
 YELLOW = "\033[93m"
 RESET  = "\033[0m"
@@ -89,6 +98,8 @@ def run_pipeline(source, test_phrases=None):
     print(f"Não-terminais   : [{', '.join(sorted(grammar.get_nonterminals()))}]")
     print(f"Terminais       : [{', '.join(sorted(grammar.get_terminals()))}]")
     print(f"Padrões léxicos : {grammar.get_token_patterns()}")
+    for w in useless_warnings(grammar):
+        warn(w)
 
 
     sep("FASE 2 — Conjuntos FIRST, FOLLOW e Lookahead")
@@ -167,11 +178,12 @@ def run_pipeline(source, test_phrases=None):
             vis_ns = {}
             exec(visitor_code, vis_ns)
             CodeGen = vis_ns['CodeGen']
+            compact = compress_table(table, grammar)
 
             for phrase in test_phrases:
                 print(f"\nFrase: {phrase!r}")
                 try:
-                    parser = TableParser(grammar, table, phrase)
+                    parser = TableParser(grammar, compact, phrase)
                     tree = parser.parse()
 
                     visitor = CodeGen()
@@ -186,8 +198,70 @@ def run_pipeline(source, test_phrases=None):
     print()
 
 
+def run_batch(args):
+    """Subcomando batch: escreve uma linha NDJSON por frase e um resumo em stderr."""
+    parser_type, workers, svg, ordered, files = 'td', 0, False, False, []
+    it = iter(args)
+    for a in it:
+        if a == '--rd':
+            parser_type = 'rd'
+        elif a == '--packrat':
+            parser_type = 'packrat'
+        elif a == '--adaptive':
+            parser_type = 'adaptive'
+        elif a == '--lr':
+            parser_type = 'lr'
+        elif a == '--earley':
+            parser_type = 'earley'
+        elif a == '--td':
+            parser_type = 'td'
+        elif a == '--svg':
+            svg = True
+        elif a == '--ordered':
+            ordered = True
+        elif a == '-j':
+            workers = int(next(it, '0'))
+        else:
+            files.append(a)
+
+    if len(files) != 2:
+        print("Uso: python main.py batch grammar.txt frases.txt [--rd|--packrat|--adaptive|--lr|--earley] [-j N] [--ordered] [--svg]")
+        sys.exit(2)
+
+    grammar_file, phrases_file = files
+    with open(grammar_file, encoding='utf-8') as f:
+        source = f.read()
+
+    stream = sys.stdin if phrases_file == '-' else open(phrases_file, encoding='utf-8')
+    if phrases_file.endswith(('.ndjson', '.jsonl')):
+        phrases = read_phrases(stream)
+    else:
+        phrases = (line.rstrip('\n') for line in stream if line.strip())
+
+    total = aceites = 0
+    t0 = time.perf_counter()
+    try:
+        for result in parse_batch(source, phrases, parser_type, workers, svg,
+                                  ordered=ordered):
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+            total   += 1
+            aceites += result['ok']
+    except ValueError as e:
+        print(f"Abortado: erros na gramática.\n{e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    elapsed = time.perf_counter() - t0
+    print(f"{aceites}/{total} frases aceites em {elapsed * 1e3:.1f} ms", file=sys.stderr)
+    sys.exit(0 if aceites == total else 1)
+
+
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        run_batch(sys.argv[2:])
+    elif len(sys.argv) > 1:
         filename = sys.argv[1]
         try:
             with open(filename, encoding='utf-8') as f:
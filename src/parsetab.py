@@ -6,9 +6,9 @@ _tabversion = '3.10'
 
 _lr_method = 'LALR'
 
-_lr_signature = 'specARROW COLON EPSILON EQUALS NEWLINE NON_TERMINAL PIPE REGEX START TERMINALspec : axioma newlines rulelist tokensectionaxioma : START COLON NON_TERMINALrulelist : rule rulelistrulelist : rule : NON_TERMINAL ARROW altlist newlinesrule : NON_TERMINAL ARROW altlistaltlist : body altlist_restaltlist_rest : PIPE body altlist_restaltlist_rest : body : symbol symbollistbody : EPSILONsymbollist : symbol symbollistsymbollist : symbol : NON_TERMINALsymbol : TERMINALtokensection : tokendecl tokensectiontokensection : tokendecl : TERMINAL EQUALS REGEX newlinestokendecl : TERMINAL EQUALS REGEXnewlines : NEWLINE\n               | NEWLINE newlines'
+_lr_signature = 'specARROW COLON EPSILON EQUALS LPAREN NEWLINE NON_TERMINAL PIPE PLUS QUESTION REGEX RPAREN STAR START TERMINALspec : axioma newlines rulelist tokensectionaxioma : START COLON NON_TERMINALrulelist : rule rulelistrulelist : rule : NON_TERMINAL ARROW altlist newlinesrule : NON_TERMINAL ARROW altlistaltlist : body altlist_restaltlist_rest : PIPE body altlist_restaltlist_rest : body : symbol symbollistbody : EPSILONsymbollist : symbol symbollistsymbollist : symbol : primarysymbol : primary STAR\n              | primary PLUS\n              | primary QUESTIONprimary : NON_TERMINALprimary : TERMINALprimary : LPAREN altlist RPARENtokensection : tokendecl tokensectiontokensection : tokendecl : TERMINAL EQUALS REGEX newlinestokendecl : TERMINAL EQUALS REGEXnewlines : NEWLINE\n               | NEWLINE newlines'
     
-_lr_action_items = {'START':([0,],[3,]),'$end':([1,4,5,7,8,10,12,13,15,17,19,20,21,22,23,24,25,26,27,29,30,31,32,33,34,],[0,-4,-20,-17,-4,-21,-1,-17,-3,-16,-14,-6,-9,-13,-11,-15,-19,-5,-7,-13,-10,-18,-9,-12,-8,]),'NEWLINE':([2,5,11,19,20,21,22,23,24,25,27,29,30,32,33,34,],[5,5,-2,-14,5,-9,-13,-11,-15,5,-7,-13,-10,-9,-12,-8,]),'COLON':([3,],[6,]),'TERMINAL':([4,5,7,8,10,13,15,16,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[-4,-20,14,-4,-21,14,-3,24,-14,-6,-9,24,-11,-15,-19,-5,-7,24,24,-10,-18,-9,-12,-8,]),'NON_TERMINAL':([4,5,6,8,10,16,19,20,21,22,23,24,26,27,28,29,30,32,33,34,],[9,-20,11,9,-21,19,-14,-6,-9,19,-11,-15,-5,-7,19,19,-10,-9,-12,-8,]),'ARROW':([9,],[16,]),'EQUALS':([14,],[18,]),'EPSILON':([16,28,],[23,23,]),'REGEX':([18,],[25,]),'PIPE':([19,21,22,23,24,29,30,32,33,],[-14,28,-13,-11,-15,-13,-10,28,-12,]),}
+_lr_action_items = {'START':([0,],[3,]),'$end':([1,4,5,7,8,10,12,13,15,17,19,20,21,22,23,24,25,27,28,29,31,32,33,34,35,37,38,39,40,41,],[0,-4,-25,-22,-4,-26,-1,-22,-3,-21,-18,-6,-9,-13,-11,-14,-19,-24,-5,-7,-13,-10,-15,-16,-17,-23,-9,-12,-20,-8,]),'NEWLINE':([2,5,11,19,20,21,22,23,24,25,27,29,31,32,33,34,35,38,39,40,41,],[5,5,-2,-18,5,-9,-13,-11,-14,-19,5,-7,-13,-10,-15,-16,-17,-9,-12,-20,-8,]),'COLON':([3,],[6,]),'TERMINAL':([4,5,7,8,10,13,15,16,19,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,35,37,38,39,40,41,],[-4,-25,14,-4,-26,14,-3,25,-18,-6,-9,25,-11,-14,-19,25,-24,-5,-7,25,25,-10,-15,-16,-17,-23,-9,-12,-20,-8,]),'NON_TERMINAL':([4,5,6,8,10,16,19,20,21,22,23,24,25,26,28,29,30,31,32,33,34,35,38,39,40,41,],[9,-25,11,9,-26,19,-18,-6,-9,19,-11,-14,-19,19,-5,-7,19,19,-10,-15,-16,-17,-9,-12,-20,-8,]),'ARROW':([9,],[16,]),'EQUALS':([14,],[18,]),'EPSILON':([16,26,30,],[23,23,23,]),'LPAREN':([16,19,22,24,25,26,30,31,33,34,35,40,],[26,-18,26,-14,-19,26,26,26,-15,-16,-17,-20,]),'REGEX':([18,],[27,]),'STAR':([19,24,25,40,],[-18,33,-19,-20,]),'PLUS':([19,24,25,40,],[-18,34,-19,-20,]),'QUESTION':([19,24,25,40,],[-18,35,-19,-20,]),'PIPE':([19,21,22,23,24,25,31,32,33,34,35,38,39,40,],[-18,30,-13,-11,-14,-19,-13,-10,-15,-16,-17,30,-12,-20,]),'RPAREN':([19,21,22,23,24,25,29,31,32,33,34,35,36,38,39,40,41,],[-18,-9,-13,-11,-14,-19,-7,-13,-10,-15,-16,-17,40,-9,-12,-20,-8,]),}
 
 _lr_action = {}
 for _k, _v in _lr_action_items.items():
@@ -17,7 +17,7 @@ for _k, _v in _lr_action_items.items():
       _lr_action[_x][_k] = _y
 del _lr_action_items
 
-_lr_goto_items = {'spec':([0,],[1,]),'axioma':([0,],[2,]),'newlines':([2,5,20,25,],[4,10,26,31,]),'rulelist':([4,8,],[7,15,]),'rule':([4,8,],[8,8,]),'tokensection':([7,13,],[12,17,]),'tokendecl':([7,13,],[13,13,]),'altlist':([16,],[20,]),'body':([16,28,],[21,32,]),'symbol':([16,22,28,29,],[22,29,22,29,]),'altlist_rest':([21,32,],[27,34,]),'symbollist':([22,29,],[30,33,]),}
+_lr_goto_items = {'spec':([0,],[1,]),'axioma':([0,],[2,]),'newlines':([2,5,20,27,],[4,10,28,37,]),'rulelist':([4,8,],[7,15,]),'rule':([4,8,],[8,8,]),'tokensection':([7,13,],[12,17,]),'tokendecl':([7,13,],[13,13,]),'altlist':([16,26,],[20,36,]),'body':([16,26,30,],[21,21,38,]),'symbol':([16,22,26,30,31,],[22,31,22,22,31,]),'primary':([16,22,26,30,31,],[24,24,24,24,24,]),'altlist_rest':([21,38,],[29,41,]),'symbollist':([22,31,],[32,39,]),}
 
 _lr_goto = {}
 for _k, _v in _lr_goto_items.items():
@@ -40,12 +40,17 @@ _lr_productions = [
   ('body -> EPSILON','body',1,'p_body_epsilon','gp_parser.py',74),
   ('symbollist -> symbol symbollist','symbollist',2,'p_symbollist_nonempty','gp_parser.py',80),
   ('symbollist -> <empty>','symbollist',0,'p_symbollist_empty','gp_parser.py',85),
-  ('symbol -> NON_TERMINAL','symbol',1,'p_symbol_nonterm','gp_parser.py',91),
-  ('symbol -> TERMINAL','symbol',1,'p_symbol_terminal','gp_parser.py',96),
-  ('tokensection -> tokendecl tokensection','tokensection',2,'p_tokensection_nonempty','gp_parser.py',102),
-  ('tokensection -> <empty>','tokensection',0,'p_tokensection_empty','gp_parser.py',107),
-  ('tokendecl -> TERMINAL EQUALS REGEX newlines','tokendecl',4,'p_tokendecl_with_newline','gp_parser.py',112),
-  ('tokendecl -> TERMINAL EQUALS REGEX','tokendecl',3,'p_tokendecl_without_newline','gp_parser.py',117),
-  ('newlines -> NEWLINE','newlines',1,'p_newlines','gp_parser.py',123),
-  ('newlines -> NEWLINE newlines','newlines',2,'p_newlines','gp_parser.py',124),
+  ('symbol -> primary','symbol',1,'p_symbol_primary','gp_parser.py',91),
+  ('symbol -> primary STAR','symbol',2,'p_symbol_ebnf','gp_parser.py',96),
+  ('symbol -> primary PLUS','symbol',2,'p_symbol_ebnf','gp_parser.py',97),
+  ('symbol -> primary QUESTION','symbol',2,'p_symbol_ebnf','gp_parser.py',98),
+  ('primary -> NON_TERMINAL','primary',1,'p_primary_nonterm','gp_parser.py',105),
+  ('primary -> TERMINAL','primary',1,'p_primary_terminal','gp_parser.py',110),
+  ('primary -> LPAREN altlist RPAREN','primary',3,'p_primary_group','gp_parser.py',115),
+  ('tokensection -> tokendecl tokensection','tokensection',2,'p_tokensection_nonempty','gp_parser.py',121),
+  ('tokensection -> <empty>','tokensection',0,'p_tokensection_empty','gp_parser.py',126),
+  ('tokendecl -> TERMINAL EQUALS REGEX newlines','tokendecl',4,'p_tokendecl_with_newline','gp_parser.py',131),
+  ('tokendecl -> TERMINAL EQUALS REGEX','tokendecl',3,'p_tokendecl_without_newline','gp_parser.py',136),
+  ('newlines -> NEWLINE','newlines',1,'p_newlines','gp_parser.py',142),
+  ('newlines -> NEWLINE newlines','newlines',2,'p_newlines','gp_parser.py',143),
 ]
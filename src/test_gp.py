@@ -16,7 +16,11 @@ Uso:
     python test_gp.py -v           # modo verbose
 """
 
+import os
+import shutil
+import tempfile
 import unittest
+
 from gp_lexer import lexer, tokens
 from gp_parser import parse_grammar, get_parse_errors
 from gp_ast import (
@@ -53,6 +57,31 @@ def parse(source):
     return parse_grammar(source)
 
 
+_packs_env = None
+
+
+def setUpModule():
+    """As gramáticas empacotadas (gp_packed) dos testes ficam numa pasta temporária."""
+    global _packs_env
+    import gp_packed
+    _packs_env = (os.environ.get('GRAMMAR_PACKS'), gp_packed.PACK_DIR,
+                  tempfile.mkdtemp(prefix='gp_packs_'))
+    os.environ['GRAMMAR_PACKS'] = gp_packed.PACK_DIR = _packs_env[2]   # e nos workers (spawn)
+
+
+def tearDownModule():
+    import gp_batch, gp_packed
+    gp_batch.close_services()      # os workers 'td' mapeiam pacotes da pasta temporária
+    env, pack_dir, tmp = _packs_env
+    if env is None:
+        os.environ.pop('GRAMMAR_PACKS', None)
+    else:
+        os.environ['GRAMMAR_PACKS'] = env
+    gp_packed.PACK_DIR = pack_dir
+    gp_packed._loaded.clear()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
 # =====================================================================
 # 1. Testes do Lexer
 # =====================================================================
@@ -897,4 +926,1944 @@ class TestValidation(unittest.TestCase):
         self.assertIsNone(g)
         errors = get_parse_errors()
         # Erros: X sem regra, A sem regra
-        self.assertGreaterEqual(len(errors), 2)
\ No newline at end of file
+        self.assertGreaterEqual(len(errors), 2)
+
+# =====================================================================
+# 12. Testes do Scanner autónomo (parsers gerados sem PLY)
+# =====================================================================
+
+SCANNER_GRAMMAR = """\
+start: S
+S -> Item S | epsilon
+Item -> ID | NUMBER | FLOAT | ASSIGN | '(' | ')' | ':' | 'if'
+ID     = /[a-zA-Z_][a-zA-Z0-9_]*/
+NUMBER = /[0-9]+/
+FLOAT  = /[0-9]+\\.[0-9]*|\\.[0-9]+/
+ASSIGN = /:=/
+"""
+
+
+class TestStandaloneScanner(unittest.TestCase):
+
+    def _load_module(self, code, name):
+        """Importa o código gerado a partir de um ficheiro (o PLY precisa do fonte)."""
+        import importlib.util, os, sys, tempfile
+        path = os.path.join(tempfile.mkdtemp(), f'{name}.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(code)
+        spec = importlib.util.spec_from_file_location(name, path)
+        mod  = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod
+        try:
+            spec.loader.exec_module(mod)
+        finally:
+            sys.modules.pop(name, None)
+        return mod
+
+    def _generate(self, src, standalone):
+        from gp_parser_rd import generate_rd_parser
+        g = parse(src)
+        first  = compute_first(g)
+        follow = compute_follow(g, first)
+        return generate_rd_parser(g, first, follow, standalone_lexer=standalone)
+
+    @staticmethod
+    def _tokens_or_error(tokenizer, phrase):
+        try:
+            return tokenizer(phrase)
+        except SyntaxError as e:
+            return ('erro', str(e))
+
+    def test_standalone_has_no_ply(self):
+        """O parser gerado com standalone_lexer não importa o PLY."""
+        code = self._generate(SCANNER_GRAMMAR, standalone=True)
+        self.assertNotIn('ply', code)
+        self.assertNotIn('import re', code)   # DFA em tabelas
+
+    def test_differential_random_phrases(self):
+        """A tokenização do DFA é idêntica à do PLY em frases aleatórias."""
+        import random
+        ply_mod = self._load_module(self._generate(SCANNER_GRAMMAR, False), 'gp_test_ply_rd')
+        dfa_mod = self._load_module(self._generate(SCANNER_GRAMMAR, True), 'gp_test_dfa_rd')
+        alphabet = list('abif_09.:=() \t\n@é')
+        rng = random.Random(2026)
+        for _ in range(3000):
+            phrase = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(
+                self._tokens_or_error(ply_mod.tokenizer, phrase),
+                self._tokens_or_error(dfa_mod.tokenizer, phrase),
+                f'frase {phrase!r}',
+            )
+
+    def test_dfa_leftmost_first(self):
+        """O DFA segue a semântica do re (primeiro ramo), não o match mais longo."""
+        from gp_scanner import Scanner, emit_scanner
+        rules = [('A', 'a|ab', 'A'), ('B', 'b', 'B'), ('C', 'x+?y?', 'C')]
+        lines = []
+        emit_scanner(lines.append, rules)
+        ns = {}
+        exec('\n'.join(lines), ns)
+        for phrase in ('ab', 'aab', 'xxy', 'xy b'):
+            self.assertEqual(ns['tokenizer'](phrase), Scanner(rules).tokenize(phrase))
+        self.assertEqual(ns['tokenizer']('ab')[:2], [('A', 'a'), ('B', 'b')])
+
+    def test_re_fallback_for_anchors(self):
+        """Padrões que o DFA não suporta caem na alternância re."""
+        from gp_scanner import build_dfa, emit_scanner, Scanner
+        rules = [('WORD', r'\bfoo\b', 'WORD'), ('ID', r'[a-z]+', 'ID')]
+        self.assertIsNone(build_dfa(rules))
+        lines = []
+        emit_scanner(lines.append, rules)
+        ns = {}
+        exec('\n'.join(lines), ns)
+        self.assertEqual(ns['tokenizer']('foo foobar'), Scanner(rules).tokenize('foo foobar'))
+
+    def test_declaration_order(self):
+        """Padrões declarados pela ordem da declaração; só os literais inline passam à frente."""
+        from gp_scanner import Scanner, grammar_scanner_rules
+        with open(os.path.join(os.path.dirname(__file__), '..', 'examples', 'example8.txt'),
+                  encoding='utf-8') as f:
+            g = parse(f.read())
+        tokens = Scanner(grammar_scanner_rules(g)).tokenize('dir a up')
+        self.assertEqual(tokens, [('DIR', 'dir'), ('NAME', 'a'), ('UP', 'up'), ('$', '$')])
+        g = parse("start: S\nS -> ID '<=' ID | ID '<' ID\nID = /[a-z<=]+/\n")
+        self.assertEqual(Scanner(grammar_scanner_rules(g)).tokenize('<= a')[0], ('<=', '<='))
+        ply_mod = self._load_module(self._generate(
+            "start: S\nS -> DIR NAME\nDIR = /dir/\nNAME = /[a-z]+/\n", False), 'gp_test_order')
+        self.assertEqual(ply_mod.tokenizer('dir a')[0], ('DIR', 'dir'))
+
+
+# =====================================================================
+# 13. Testes do Parser Dirigido por Tabela gerado (formato compacto)
+# =====================================================================
+
+PASCAL_GRAMMAR = """\
+start: Program
+
+Program    -> StmtList
+StmtList   -> Stmt StmtListR
+StmtListR  -> SEMI Stmt StmtListR | epsilon
+Stmt       -> ID ASSIGN Expr
+Expr       -> Term ExprR
+ExprR      -> PLUS Term ExprR | epsilon
+Term       -> ID | NUMBER | '(' Expr ')'
+
+ID     = /[a-zA-Z_][a-zA-Z0-9_]*/
+NUMBER = /[0-9]+/
+PLUS   = /[+]/
+SEMI   = /;/
+ASSIGN = /:=/
+"""
+
+
+def tree_shape(node):
+    """Forma comparável de uma árvore (label, lexema, filhos)."""
+    return (node.label, node.lexema, [tree_shape(c) for c in node.children])
+
+
+class TestCompactTDGenerator(unittest.TestCase):
+
+    def setUp(self):
+        from gp_parser_td import generate_table_parser
+        g = parse(PASCAL_GRAMMAR)
+        first  = compute_first(g)
+        follow = compute_follow(g, first)
+        self.compact, self.legacy = {}, {}
+        exec(generate_table_parser(g, first, follow, standalone_lexer=True), self.compact)
+        exec(generate_table_parser(g, first, follow, standalone_lexer=True, compact=False),
+             self.legacy)
+
+    def test_integer_tables(self):
+        """Símbolos com ids inteiros e produções pré-resolvidas."""
+        ns = self.compact
+        self.assertNotIn('parsing_table', ns)
+        self.assertEqual(ns['SYMBOLS'][0], '$')
+        self.assertTrue(all(isinstance(p, int) for p in ns['TABLE_VALUE']))
+        self.assertEqual(len(ns['TABLE_CHECK']), len(ns['TABLE_VALUE']))
+        self.assertGreaterEqual(ns['START'], ns['N_TERMINALS'])
+
+    def test_same_tree_as_legacy(self):
+        """O formato compacto produz a mesma árvore que o legível."""
+        for phrase in ('x := 5', 'x := (a + 3) + b ; y := x', 'x := ((1))'):
+            self.assertEqual(tree_shape(self.compact['parse'](phrase)),
+                             tree_shape(self.legacy['parse'](phrase)))
+
+    def test_treeless_mode(self):
+        """build_tree=False só valida a frase."""
+        self.assertIs(self.compact['parse']('x := 1 ; y := 2', build_tree=False), True)
+        with self.assertRaises(SyntaxError):
+            self.compact['parse']('x := 1 +', build_tree=False)
+
+    def test_same_errors_as_legacy(self):
+        """As mensagens de erro são as mesmas do formato legível."""
+        for phrase in ('x := ', 'x := 1 1', ':= 2', 'x := (1'):
+            with self.assertRaises(SyntaxError) as new:
+                self.compact['parse'](phrase)
+            with self.assertRaises(SyntaxError) as old:
+                self.legacy['parse'](phrase)
+            self.assertEqual(str(new.exception), str(old.exception))
+
+
+# =====================================================================
+# 14. Testes do motor RD compilado (gp_engine)
+# =====================================================================
+
+class TestCompiledRD(unittest.TestCase):
+
+    def setUp(self):
+        from gp_engine import compile_rd
+        from gp_parser_rd import generate_rd_parser
+        g = parse(PASCAL_GRAMMAR)
+        first  = compute_first(g)
+        follow = compute_follow(g, first)
+        self.engine    = compile_rd(g, first, follow)
+        self.generated = {}
+        exec(generate_rd_parser(g, first, follow, standalone_lexer=True), self.generated)
+
+    def test_same_tree_as_generated(self):
+        """O motor compilado produz a mesma árvore que o parser RD gerado."""
+        for phrase in ('x := 5', 'x := (a + 3) + b ; y := x', 'x := ((1))'):
+            self.assertEqual(tree_shape(self.engine.parse(phrase)),
+                             tree_shape(self.generated['parse'](phrase)))
+
+    def test_same_errors_as_generated(self):
+        """Erros sintáticos e léxicos com as mesmas mensagens."""
+        for phrase in ('x := ', ':= 2', 'x := (1', 'x := 1 @'):
+            with self.assertRaises(SyntaxError) as new:
+                self.engine.parse(phrase)
+            with self.assertRaises(SyntaxError) as old:
+                self.generated['parse'](phrase)
+            self.assertEqual(str(new.exception), str(old.exception))
+
+    def test_reusable_across_phrases(self):
+        """O mesmo motor serve várias frases sem estado partilhado."""
+        t1 = self.engine.parse('a := 1')
+        t2 = self.engine.parse('b := 2 ; c := 3')
+        self.assertEqual(t1.children[0].children[0].children[0].lexema, 'a')
+        self.assertEqual(t2.children[0].children[0].children[0].lexema, 'b')
+
+    def test_parse_with_rd_uses_engine(self):
+        """parse_with_rd devolve árvore e passos sem gerar código."""
+        from gp_interpreter import parse_with_rd
+        g = parse(PASCAL_GRAMMAR)
+        first  = compute_first(g)
+        follow = compute_follow(g, first)
+        tree, steps = parse_with_rd(g, first, follow, 'x := 1', {})
+        self.assertEqual(tree.label, 'Program')
+        self.assertEqual(steps[-1]['action'], 'ACEITE')
+
+
+# =====================================================================
+# 15. Parsing em lote (gp_batch)
+# =====================================================================
+
+class TestBatch(unittest.TestCase):
+
+    PHRASES = ['x := 5', 'x := ', 'x := (a + 3) + b ; y := x', 'x := 1 @']
+
+    def test_compiled_grammar_check(self):
+        """check devolve aceite/rejeitada, erro e tempo, sem SVG por omissão."""
+        from gp_batch import compile_grammar
+        compiled = compile_grammar(PASCAL_GRAMMAR)
+        ok  = compiled.check(0, 'x := 5')
+        bad = compiled.check(1, 'x := ')
+        self.assertTrue(ok['ok'])
+        self.assertIsNone(ok['error'])
+        self.assertNotIn('tree_svg', ok)
+        self.assertFalse(bad['ok'])
+        self.assertIn('Expr', bad['error'])
+        self.assertIn('tree_svg', compiled.check(0, 'x := 5', svg=True))
+
+    def test_td_and_rd_agree(self):
+        """Os dois parsers aceitam e rejeitam as mesmas frases."""
+        from gp_batch import parse_batch
+        td = [r['ok'] for r in parse_batch(PASCAL_GRAMMAR, self.PHRASES, 'td')]
+        rd = [r['ok'] for r in parse_batch(PASCAL_GRAMMAR, self.PHRASES, 'rd')]
+        self.assertEqual(td, [True, False, True, False])
+        self.assertEqual(td, rd)
+
+    def test_process_pool(self):
+        """Com workers, todos os resultados chegam (ordem arbitrária)."""
+        from gp_batch import parse_batch
+        phrases = self.PHRASES * 10
+        results = list(parse_batch(PASCAL_GRAMMAR, phrases, workers=2, chunksize=3))
+        self.assertEqual(sorted(r['index'] for r in results), list(range(len(phrases))))
+        by_index = {r['index']: r['ok'] for r in results}
+        self.assertEqual([by_index[i] for i in range(4)], [True, False, True, False])
+
+    def test_read_phrases_ndjson(self):
+        """Linhas NDJSON: strings ou objetos {"phrase": ...}; vazias ignoradas."""
+        from gp_batch import read_phrases
+        lines = ['"x := 1"\n', '\n', b'{"phrase": "y := 2"}\n']
+        self.assertEqual(list(read_phrases(lines)), ['x := 1', 'y := 2'])
+
+    def test_invalid_grammar(self):
+        from gp_batch import parse_batch
+        with self.assertRaises(ValueError):
+            list(parse_batch('start: S\nS -> ', ['x']))
+
+    def test_td_rejects_conflicts(self):
+        """Com conflitos LL(1) o 'td' é recusado (a recursão à esquerda não terminaria)."""
+        from gp_batch import compile_grammar, CompiledGrammar
+        src = "start: L\nL -> L 'x' | 'x'"
+        with self.assertRaises(ValueError):
+            compile_grammar(src, 'td')
+        with self.assertRaises(ValueError):
+            CompiledGrammar(parse_grammar(src), 'td')
+        self.assertTrue(compile_grammar(src, 'earley').check(0, 'x x x')['ok'])
+
+    def test_read_phrases_invalid_line(self):
+        """Uma linha inválida levanta ValueError com o número da linha."""
+        from gp_batch import read_phrases
+        with self.assertRaisesRegex(ValueError, 'Linha 2'):
+            list(read_phrases(['"x := 1"\n', '{"phrase": \n']))
+        with self.assertRaisesRegex(ValueError, 'Linha 1'):
+            list(read_phrases(['{"frase": "x"}\n']))
+
+
+# =====================================================================
+# 16. Serviço de parsing multi-processo (ParseService)
+# =====================================================================
+
+class TestParseService(unittest.TestCase):
+
+    def test_results_in_input_order(self):
+        """map devolve um resultado por frase, pela ordem de entrada."""
+        from gp_batch import ParseService
+        phrases = [f'x{i} := {i}' if i % 3 else 'x := ' for i in range(200)]
+        with ParseService(PASCAL_GRAMMAR, workers=2, chunksize=7) as service:
+            results = list(service.map(phrases))
+            again   = list(service.map(phrases[:5]))
+        self.assertEqual([r['index'] for r in results], list(range(200)))
+        self.assertEqual([r['ok'] for r in results], [bool(i % 3) for i in range(200)])
+        self.assertEqual([r['index'] for r in again], list(range(5)))
+
+    def test_matches_single_process(self):
+        """O resultado (sem tempos) é igual ao do parsing sequencial."""
+        from gp_batch import parse_batch
+        phrases = ['x := (a + 3) + b ; y := x', 'x := 1 @', ':= 2'] * 5
+        strip   = lambda rs: [(r['index'], r['ok'], r['error']) for r in rs]
+        seq     = strip(parse_batch(PASCAL_GRAMMAR, phrases, 'rd'))
+        par     = strip(parse_batch(PASCAL_GRAMMAR, phrases, 'rd', workers=2,
+                                    chunksize=2, ordered=True))
+        self.assertEqual(seq, par)
+
+    def test_shared_between_batches(self):
+        """Lotes seguidos com a mesma gramática usam o mesmo pool; o LRU fecha os antigos."""
+        import gp_batch
+        from unittest import mock
+        self.addCleanup(gp_batch.close_services)
+        gp_batch.close_services()
+        phrases = ['x := 1', 'x := '] * 3
+        with gp_batch.shared_service(PASCAL_GRAMMAR, 'rd', workers=2) as first:
+            self.assertEqual([r['ok'] for r in first.map(phrases)], [True, False] * 3)
+        list(gp_batch.parse_batch(PASCAL_GRAMMAR, phrases, 'rd', workers=2))
+        with gp_batch.shared_service(PASCAL_GRAMMAR, 'rd', workers=2) as again:
+            self.assertIs(again, first)
+            # Sai do LRU enquanto está a ser usado: só fecha no fim deste pedido
+            with mock.patch.object(gp_batch, 'SERVICES_KEEP', 1):
+                with gp_batch.shared_service(PASCAL_GRAMMAR, 'td', workers=1):
+                    pass
+            self.assertEqual(len(list(again.map(phrases, ordered=False))), 6)
+        with self.assertRaises(ValueError):
+            first.pool.apply_async(len, ([],))      # pool já fechado
+
+
+# =====================================================================
+# 17. Formato empacotado com mmap (gp_packed)
+# =====================================================================
+
+class TestPackedGrammar(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='gp_packs_')
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def test_same_trees_and_errors_as_table_parser(self):
+        """Árvores e mensagens de erro iguais às do TableParser."""
+        from gp_packed import get_packed
+        from gp_parser_td import TableParser
+        g      = parse(PASCAL_GRAMMAR)
+        first  = compute_first(g)
+        table  = build_parse_table(g, first, compute_follow(g, first))
+        packed = get_packed(PASCAL_GRAMMAR, self.dir)
+        for phrase in ('x := 5', 'x := (a + 3) + b ; y := x'):
+            tokens = packed.tokenize(phrase)
+            self.assertEqual(tree_shape(packed.parse(phrase)),
+                             tree_shape(TableParser(g, table, phrase, tokens=tokens).parse()))
+        for phrase in ('x := ', ':= 2', 'x := (1', 'x := 1 2'):
+            tokens = packed.tokenize(phrase)
+            with self.assertRaises(SyntaxError) as new:
+                packed.parse(phrase)
+            with self.assertRaises(SyntaxError) as old:
+                TableParser(g, table, phrase, tokens=tokens).parse()
+            self.assertEqual(str(new.exception), str(old.exception))
+
+    def test_file_keyed_by_hash_and_mmapped(self):
+        """O ficheiro <source_hash>.gpk é reutilizado e lido por mmap."""
+        import mmap
+        from gp_packed import get_packed, load_pack, pack_path
+        from gp_helpers import source_hash
+        get_packed(PASCAL_GRAMMAR, self.dir)
+        path = pack_path(source_hash(PASCAL_GRAMMAR), self.dir)
+        self.assertTrue(os.path.exists(path))
+
+        packed = load_pack(path)
+        self.assertIsInstance(packed.buffer, mmap.mmap)
+        self.assertEqual(packed.hash, source_hash(PASCAL_GRAMMAR))
+        self.assertTrue(packed.parse('x := 1', build_tree=False))
+        self.assertEqual(packed.symbols[0], '$')
+
+    def test_rejects_bad_files(self):
+        from gp_packed import PackedGrammar, build_pack, VERSION
+        data = build_pack(parse(PASCAL_GRAMMAR))
+        with self.assertRaises(ValueError):
+            PackedGrammar(b'XXXX' + data[4:])
+        with self.assertRaises(ValueError):
+            PackedGrammar(data[:4] + (VERSION + 1).to_bytes(4, 'little') + data[8:])
+
+    def test_invalid_grammar(self):
+        from gp_packed import get_packed
+        with self.assertRaises(ValueError):
+            get_packed('start: S\nS -> ', self.dir)
+
+    def test_bounded_cache_and_folder(self):
+        """Só as LOADED_KEEP mais recentes ficam mapeadas e a pasta guarda as PACKS_KEEP mais usadas."""
+        import gp_packed
+        from gp_packed import get_packed, prune_packs
+        srcs = [f"start: S\nS -> 'k{i}'" for i in range(6)]
+        old  = gp_packed.LOADED_KEEP, gp_packed.PACKS_KEEP
+        gp_packed.LOADED_KEEP, gp_packed.PACKS_KEEP = 3, 4
+        try:
+            for i, src in enumerate(srcs):
+                get_packed(src, self.dir)
+                os.utime(gp_packed.pack_path(gp_packed.source_hash(src), self.dir), (i, i))
+            mine = [k for k in gp_packed._loaded if k[0] == self.dir]
+            self.assertLessEqual(len(mine), 3)
+            files = sorted(f for f in os.listdir(self.dir) if f.endswith('.gpk'))
+            self.assertEqual(len(files), 4)
+            self.assertEqual(prune_packs(self.dir, keep=1), 3)
+            self.assertEqual(os.listdir(self.dir),
+                             [os.path.basename(gp_packed.pack_path(gp_packed.source_hash(srcs[-1])))])
+            self.assertTrue(get_packed(srcs[0], self.dir).parse('k0', build_tree=False))
+        finally:
+            gp_packed.LOADED_KEEP, gp_packed.PACKS_KEEP = old
+
+
+# =====================================================================
+# 18. Tabela LL(1) comprimida (gp_table) e formato compacto da UI
+# =====================================================================
+
+class TestCompressedTable(unittest.TestCase):
+
+    def setUp(self):
+        from gp_table import compress_table
+        self.g      = parse(PASCAL_GRAMMAR)
+        first       = compute_first(self.g)
+        self.table  = build_parse_table(self.g, first, compute_follow(self.g, first))
+        self.packed = compress_table(self.table, self.g)
+
+    def test_comb_compress_lookup(self):
+        """Todas as células (vazias e preenchidas) são recuperadas em O(1)."""
+        from gp_table import comb_compress, comb_lookup
+        rows = [[-1, 3, -1, -1], [0, -1, -1, 2], [-1, -1, -1, -1], [-1, -1, 1, -1]]
+        base, check, value = comb_compress(rows)
+        for r, row in enumerate(rows):
+            for c, v in enumerate(row):
+                self.assertEqual(comb_lookup(base, check, value, r, c), v)
+        self.assertLess(len(check), len(rows) * len(rows[0]))
+
+    def test_same_cells_as_dict(self):
+        """Mesmas chaves e mesmas produções que o dict de build_parse_table."""
+        filled = {k for k, v in self.table.items() if v}
+        self.assertEqual(set(self.packed), filled)
+        for key in filled:
+            self.assertIs(self.packed[key][0], self.table[key][0])
+        self.assertIsNone(self.packed.get(('Expr', 'ASSIGN')))
+
+    def test_conflicts_kept(self):
+        g = parse("start: S\nS -> A | A B\nA -> ID\nB -> ID\nID = /[a-z]+/")
+        first = compute_first(g)
+        table = build_parse_table(g, first, compute_follow(g, first))
+        from gp_table import compress_table
+        self.assertEqual(len(compress_table(table, g)[('S', 'ID')]), 2)
+
+    def test_table_parser_accepts_compressed(self):
+        from gp_parser_td import TableParser
+        from gp_helpers import build_patterns
+        phrase   = 'x := (a + 3) + b'
+        patterns = build_patterns(self.g)
+        self.assertEqual(tree_shape(TableParser(self.g, self.packed, phrase, patterns).parse()),
+                         tree_shape(TableParser(self.g, self.table, phrase, patterns).parse()))
+
+    def test_ser_table_uses_production_indices(self):
+        from gp_helpers import ser_table
+        data = ser_table(self.packed, self.g)
+        rows = {r['nt']: r for r in data['rows']}
+        t, p = rows['Stmt']['cells'][0]
+        self.assertEqual(data['terminals'][t], 'ID')
+        self.assertEqual(data['productions'][p], 'Stmt → ID ASSIGN Expr')
+        self.assertNotIn('conflicts', rows['Stmt'])
+        self.assertEqual(ser_table(self.table, self.g), data)
+
+
+# =====================================================================
+# 19. Tabelas SLR / LALR(1) e parser shift-reduce (gp_lr)
+# =====================================================================
+
+LR_EXPR_GRAMMAR = """\
+start: Expr
+Expr   -> Expr '+' Term | Expr '-' Term | Term
+Term   -> Term '*' Factor | Factor
+Factor -> '(' Expr ')' | NUM | ID
+NUM = /[0-9]+/
+ID  = /[a-z]+/
+"""
+
+# Clássico LALR(1) que não é SLR(1) (Dragon Book, ex. 4.48)
+LR_LALR_GRAMMAR = """\
+start: S
+S -> L '=' R | R
+L -> '*' R | ID
+R -> L
+ID = /[a-z]+/
+"""
+
+
+class TestLR(unittest.TestCase):
+
+    def test_left_recursion_without_transformation(self):
+        """Recursividade à esquerda: sem conflitos LR e árvore associativa à esquerda."""
+        from gp_lr import compile_lr, check_lr
+        g = parse(LR_EXPR_GRAMMAR)
+        self.assertTrue(check_ll1(g, compute_first(g), compute_follow(g, compute_first(g))))
+        self.assertEqual(check_lr(g, 'slr'), [])
+        self.assertEqual(check_lr(g, 'lalr'), [])
+
+        tree = compile_lr(g).parse('a - b - c')
+        self.assertEqual([c.label for c in tree.children], ['Expr', '-', 'Term'])
+        self.assertEqual([c.label for c in tree.children[0].children], ['Expr', '-', 'Term'])
+        self.assertEqual(tree.children[2].children[0].children[0].lexema, 'c')
+
+    def test_lalr_resolves_what_slr_cannot(self):
+        from gp_lr import check_lr
+        g   = parse(LR_LALR_GRAMMAR)
+        slr = check_lr(g, 'slr')
+        self.assertEqual(len(slr), 1)
+        self.assertEqual(slr[0]['type'], 'SHIFT/REDUCE')
+        self.assertEqual(slr[0]['nonterminal'], 'R')
+        self.assertEqual(slr[0]['symbols'], {'='})
+        self.assertEqual(check_lr(g, 'lalr'), [])
+
+    def test_reduce_reduce_conflict(self):
+        from gp_lr import check_lr
+        g = parse("start: S\nS -> A | B\nA -> ID\nB -> ID\nID = /[a-z]+/")
+        conflicts = check_lr(g)
+        self.assertEqual([c['type'] for c in conflicts], ['REDUCE/REDUCE'])
+        self.assertEqual(conflicts[0]['alts'], ('A -> ID', 'B -> ID'))
+
+    def test_epsilon_and_steps(self):
+        """Produções ε dão nó 'ε'; o modo trace regista shifts, reduces e ACEITE."""
+        from gp_lr import LRParser
+        g = parse("start: S\nS -> A | epsilon\nA -> A ID | ID\nID = /[a-z]+/")
+        parser = LRParser(g)
+        self.assertEqual(parser.parse('').children[0].label, 'ε')
+        parser.parse('a b', trace=True)
+        actions = [s['action'] for s in parser.steps]
+        self.assertEqual(actions[-1], 'ACEITE')
+        self.assertIn('produção: A -> A ID (reduz)', actions)
+
+    def test_syntax_error(self):
+        from gp_lr import compile_lr
+        parser = compile_lr(parse(LR_EXPR_GRAMMAR))
+        with self.assertRaises(SyntaxError) as cm:
+            parser.parse('1 + * 2')
+        self.assertIn("Esperado um de: ['(', 'ID', 'NUM']", str(cm.exception))
+
+
+# =====================================================================
+# 20. Parsing geral com floresta partilhada (gp_earley)
+# =====================================================================
+
+EARLEY_AMBIGUOUS_GRAMMAR = """\
+start: E
+E -> E '+' E | ID
+ID = /[a-z]+/
+"""
+
+
+class TestEarley(unittest.TestCase):
+
+    def test_ambiguous_counts(self):
+        """E -> E + E: o nº de derivações de n operandos é o número de Catalan."""
+        from gp_earley import compile_earley
+        earley = compile_earley(parse(EARLEY_AMBIGUOUS_GRAMMAR))
+        for k, catalan in enumerate([1, 1, 2, 5, 14, 42], start=1):
+            forest = earley.parse_forest(' + '.join(['a'] * k))
+            self.assertEqual(forest.count(), catalan)
+            self.assertEqual(forest.is_ambiguous(), catalan > 1)
+
+    def test_tree_matches_phrase(self):
+        from gp_earley import compile_earley
+        tree = compile_earley(parse(EARLEY_AMBIGUOUS_GRAMMAR)).parse('a + b + c')
+
+        def leaves(t):
+            return [t.lexema] if t.lexema is not None else [x for c in t.children for x in leaves(c)]
+
+        self.assertEqual(tree.label, 'E')
+        self.assertEqual(leaves(tree), ['a', '+', 'b', '+', 'c'])
+
+    def test_recursion_and_epsilon(self):
+        """Recursão à esquerda/direita e ε sem transformar a gramática."""
+        from gp_earley import compile_earley
+        for src in ("start: L\nL -> L ID | ID\nID = /[a-z]+/",
+                    "start: L\nL -> ID L | ID\nID = /[a-z]+/"):
+            earley = compile_earley(parse(src))
+            forest = earley.parse_forest(' '.join(['a'] * 300))
+            self.assertEqual(forest.count(), 1)
+            self.assertTrue(earley.recognize('a a a'))
+            self.assertFalse(earley.recognize(''))
+
+        earley = compile_earley(parse("start: S\nS -> A B\nA -> 'x' A | epsilon\nB -> 'y' | epsilon"))
+        tree = earley.parse('')
+        self.assertEqual([c.children[0].label for c in tree.children], ['ε', 'ε'])
+        self.assertEqual(earley.parse_forest('x x y').count(), 1)
+
+    def test_cyclic_grammar(self):
+        """S -> S torna o nº de derivações infinito; a árvore evita o ciclo."""
+        from gp_earley import compile_earley
+        earley = compile_earley(parse("start: S\nS -> S | A | epsilon\nA -> ID\nID = /[a-z]+/"))
+        forest = earley.parse_forest('a')
+        self.assertEqual(forest.count(), float('inf'))
+        self.assertEqual(forest.tree().children[0].label, 'A')
+
+    def test_tree_of_long_left_recursive_phrase(self):
+        """A árvore é construída sem recursão: 3000 tokens numa lista recursiva à esquerda."""
+        from gp_earley import compile_earley
+        earley = compile_earley(parse("start: L\nL -> L XX | XX\nXX = /x/"))
+        node, depth = earley.parse(' '.join(['x'] * 3000)), 1
+        while node.children[0].label == 'L':
+            self.assertEqual([c.label for c in node.children], ['L', 'XX'])
+            node, depth = node.children[0], depth + 1
+        self.assertEqual(depth, 3000)
+
+    def test_tree_of_mutually_cyclic_grammar(self):
+        """Ciclos A -> B -> A e ε à esquerda de uma recursão dão uma árvore finita."""
+        from gp_earley import compile_earley
+        tree = compile_earley(parse("start: A\nA -> B | 'c'\nB -> A")).parse('c')
+        self.assertEqual(tree_shape(tree), tree_shape(compile_earley(parse("start: A\nA -> 'c'")).parse('c')))
+        tree = compile_earley(parse("start: S\nS -> S S | 'a' | epsilon")).parse('a a')
+        self.assertEqual(tree_shape(tree)[0], 'S')
+
+    def test_recognize_agrees_with_forest(self):
+        from gp_earley import compile_earley
+        earley = compile_earley(parse(LR_EXPR_GRAMMAR))
+        for phrase, ok in [('1 + 2 * (a - 3)', True), ('1 +', False), ('(a', False), ('', False)]:
+            self.assertEqual(earley.recognize(phrase), ok)
+            if ok:
+                self.assertEqual(earley.parse_forest(phrase).count(), 1)
+            else:
+                with self.assertRaises(SyntaxError):
+                    earley.parse_forest(phrase)
+
+    def test_syntax_error(self):
+        from gp_earley import compile_earley
+        earley = compile_earley(parse(LR_EXPR_GRAMMAR))
+        with self.assertRaises(SyntaxError) as cm:
+            earley.parse('1 + * 2')
+        self.assertIn("inesperado na posição 3", str(cm.exception))
+        self.assertIn("Esperado um de: ['(', 'ID', 'NUM']", str(cm.exception))
+
+    def test_fallback_for_ll1_conflicts(self):
+        """Com conflitos LL(1), parse_with_earley reporta as derivações."""
+        from gp_interpreter import parse_with_earley
+        tree, steps, derivations = parse_with_earley(parse(EARLEY_AMBIGUOUS_GRAMMAR), 'a + b + c')
+        self.assertEqual(derivations, 2)
+        self.assertEqual(steps[-1]['action'], 'ACEITE')
+        self.assertEqual(tree.label, 'E')
+
+
+# =====================================================================
+# 21. RD com backtracking memorizado (gp_packrat)
+# =====================================================================
+
+# LL(2): as duas alternativas de S começam por A, que é arbitrariamente longo
+PACKRAT_GRAMMAR = """\
+start: S
+S -> A ';' | A ','
+A -> ID A | ID
+ID = /[a-z]+/
+"""
+
+
+class TestPackrat(unittest.TestCase):
+
+    def setUp(self):
+        from gp_packrat import compile_packrat, generate_packrat_parser
+        self.g = parse(PACKRAT_GRAMMAR)
+        first  = compute_first(self.g)
+        follow = compute_follow(self.g, first)
+        self.assertTrue(check_ll1(self.g, first, follow))
+        self.engine = compile_packrat(self.g, first, follow)
+        self.ns = {}
+        exec(generate_packrat_parser(self.g, first, follow, standalone_lexer=True), self.ns)
+
+    def test_backtracking(self):
+        """A segunda alternativa reaproveita A da memo em vez de o reparsear."""
+        tree = self.engine.parse('a b ,')
+        self.assertEqual([c.label for c in tree.children], ['A', ','])
+        stats = self.engine.stats
+        self.assertEqual(stats['backtracks'], 2)
+        self.assertEqual(stats['hits'], 1)
+        self.assertGreater(stats['memory_bytes'], 0)
+
+    def test_linear_calls(self):
+        """Cada (NT, posição) é avaliado no máximo uma vez."""
+        n = 200
+        self.engine.parse(' '.join(['a'] * n) + ' ;')
+        self.assertLessEqual(self.engine.stats['calls'], 2 * (n + 2))
+        self.assertEqual(self.engine.stats['entries'], self.engine.stats['calls'])
+
+    def test_generated_matches_engine(self):
+        for phrase in ('a ;', 'x y ;', 'a b c ,'):
+            self.assertEqual(tree_shape(self.ns['parse'](phrase)),
+                             tree_shape(self.engine.parse(phrase)))
+        self.assertEqual(self.ns['memo_stats']()['hits'], 1)
+        self.assertEqual(tree_shape(self.ns['Parser'](self.ns['Lexer']('a ;').tokens).parse()),
+                         tree_shape(self.engine.parse('a ;')))
+
+    def test_errors(self):
+        """Erro na falha mais à frente, com os tipos esperados nessa posição."""
+        cases = {
+            'a b':   "Fim inesperado da frase. Esperado um de: [',', ';', 'ID']",
+            ', a':   "Símbolo ',' (',') inesperado na posição 1. Esperado um de: ['ID']",
+            'a ; ,': "Tokens extra após o fim: ,",
+        }
+        for phrase, message in cases.items():
+            for parse_fn in (self.engine.parse, self.ns['parse']):
+                with self.assertRaises(SyntaxError) as cm:
+                    parse_fn(phrase)
+                self.assertEqual(str(cm.exception), message)
+
+    def test_continues_from_other_ends(self):
+        """A -> 'a' | 'a' 'b': se B falha depois de A = 'a', continua do outro fim de A."""
+        from gp_packrat import compile_packrat, generate_packrat_parser
+        with open(os.path.join(os.path.dirname(__file__), '..', 'examples', 'example.txt'),
+                  encoding='utf-8') as f:
+            g = parse(f.read())
+        first, ns = compute_first(g), {}
+        follow    = compute_follow(g, first)
+        engine    = compile_packrat(g, first, follow)
+        exec(generate_packrat_parser(g, first, follow, standalone_lexer=True), ns)
+        for phrase in ('a', 'a b', 'a c', 'a b c'):
+            tree = engine.parse(phrase)
+            self.assertEqual([c.label for c in tree.children], ['A', 'B'])
+            self.assertEqual(tree_shape(ns['parse'](phrase)), tree_shape(tree))
+        for phrase in ('b', 'a b b', 'a c c'):
+            for parse_fn in (engine.parse, ns['parse']):
+                with self.assertRaises(SyntaxError):
+                    parse_fn(phrase)
+
+    def test_same_language_as_earley(self):
+        """Nos exemplos sem recursão à esquerda aceita exatamente as frases do Earley."""
+        import glob, random
+        from gp_packrat import compile_packrat, generate_packrat_parser, left_recursive_nonterminals
+        from gp_earley import compile_earley
+        from gp_transform import rules_of
+        from gp_parser_rd import _tipo
+        rnd = random.Random(7)
+
+        def sentence(rules, sym, depth=0):
+            if sym not in rules:
+                return [_tipo(sym)]
+            alts = rules[sym] if depth < 8 else [min(rules[sym], key=len)]
+            return [t for s in rnd.choice(alts) for t in sentence(rules, s, depth + 1)]
+
+        folder = os.path.join(os.path.dirname(__file__), '..', 'examples')
+        for path in sorted(glob.glob(os.path.join(folder, '*.txt'))):
+            with open(path, encoding='utf-8') as f:
+                g = parse(f.read())
+            first = compute_first(g)
+            if left_recursive_nonterminals(g, first):
+                continue
+            follow = compute_follow(g, first)
+            engine, earley, ns = compile_packrat(g, first, follow), compile_earley(g), {}
+            exec(generate_packrat_parser(g, first, follow, standalone_lexer=True), ns)
+            rules = rules_of(g)
+            terms = sorted({_tipo(x) for alts in rules.values() for alt in alts
+                            for x in alt if x not in rules})
+            for _ in range(150):
+                types = sentence(rules, g.get_start())
+                if types and rnd.random() < 0.5:      # mutação: frases inválidas ou ambíguas
+                    types.insert(rnd.randrange(len(types) + 1), rnd.choice(terms))
+                tokens   = [(t, t) for t in types] + [('$', '$')]
+                accepted = []
+                for parse_fn in (lambda: earley.parse(tokens=tokens),
+                                 lambda: engine.parse_tokens(tokens),
+                                 lambda: ns['_run'](tokens)):
+                    try:
+                        parse_fn()
+                        accepted.append(True)
+                    except SyntaxError:
+                        accepted.append(False)
+                self.assertEqual(len(set(accepted)), 1, (os.path.basename(path), types, accepted))
+
+    def test_left_recursion_rejected(self):
+        from gp_packrat import compile_packrat, left_recursive_nonterminals
+        g = parse("start: E\nE -> T '+' E | F\nF -> G E | ID\nG -> epsilon\nT -> ID\nID = /[a-z]+/")
+        first = compute_first(g)
+        self.assertEqual(left_recursive_nonterminals(g, first), {'E', 'F'})
+        with self.assertRaises(ValueError):
+            compile_packrat(g, first, compute_follow(g, first))
+
+
+# =====================================================================
+# 22. Predição adaptativa com DFAs de lookahead (gp_adaptive)
+# =====================================================================
+
+# A decisão de A só é resolvida com o contexto real: com 'y' à esquerda,
+# "c a" é A -> 'c' 'a'; com 'x', o 'a' pertence a S.
+ADAPTIVE_LL_GRAMMAR = """\
+start: S
+S -> 'x' A 'a' | 'y' A
+A -> 'c' | 'c' 'a'
+"""
+
+
+class TestAdaptivePrediction(unittest.TestCase):
+
+    def _table_parse(self, src, phrases):
+        from gp_adaptive import AdaptivePredictor
+        from gp_parser_td import TableParser
+        from gp_scanner import Scanner, grammar_scanner_rules
+        g         = parse(src)
+        first     = compute_first(g)
+        table     = build_parse_table(g, first, compute_follow(g, first))
+        predictor = AdaptivePredictor(g, first)
+        scanner   = Scanner(grammar_scanner_rules(g))
+        trees = [TableParser(g, table, p, tokens=scanner.tokenize(p), predictor=predictor).parse()
+                 for p in phrases]
+        return trees, predictor
+
+    def test_arbitrary_lookahead(self):
+        """S precisa de ver o fim de A; o DFA em cache serve as frases seguintes."""
+        trees, predictor = self._table_parse(PACKRAT_GRAMMAR, ['a b c ,', 'x y z ;', 'p q r ,'])
+        self.assertEqual([t.children[1].label for t in trees], [',', ';', ','])
+        stats = predictor.stats()['S']
+        self.assertEqual(stats['predictions'], 3)
+        self.assertEqual(stats['max_lookahead'], 4)
+        # IDs repetidos voltam ao mesmo estado (ciclo no DFA); ',' e ';' criam uma aresta cada
+        self.assertEqual(stats['misses'], 4)
+        self.assertEqual(stats['full_ll'], 0)
+        self.assertEqual(predictor.cache_size()['decisions'], 2)
+
+    def test_full_ll_fallback(self):
+        """Conflito SLL resolvido com a pilha real do TableParser."""
+        trees, predictor = self._table_parse(ADAPTIVE_LL_GRAMMAR, ['y c a', 'x c a', 'x c a a'])
+        shapes = [[c.label for c in t.children[1].children] for t in trees]
+        self.assertEqual(shapes, [['c', 'a'], ['c'], ['c', 'a']])
+        self.assertEqual(predictor.stats()['A']['full_ll'], 2)
+
+    def test_trace_marks_adaptive_steps(self):
+        from gp_adaptive import AdaptivePredictor
+        from gp_helpers import build_patterns
+        from gp_parser_td import TableParser
+        g = parse(PACKRAT_GRAMMAR)
+        first  = compute_first(g)
+        parser = TableParser(g, build_parse_table(g, first, compute_follow(g, first)), 'a b ;',
+                             build_patterns(g), predictor=AdaptivePredictor(g, first))
+        parser.parse()
+        self.assertIn("produção: S -> A ';' (predição adaptativa, k=3)",
+                      [s['action'] for s in parser.steps])
+
+    def test_generated_rd(self):
+        """O RD gerado com adaptive=True decide como o TableParser, incluindo o LL completo."""
+        from gp_parser_rd import generate_rd_parser
+        for src, phrases in [(PACKRAT_GRAMMAR, ['a b c ,', 'a ;']),
+                             (ADAPTIVE_LL_GRAMMAR, ['y c a', 'x c a', 'x c a a', 'y c'])]:
+            g = parse(src)
+            first, ns = compute_first(g), {}
+            exec(generate_rd_parser(g, first, compute_follow(g, first),
+                                    standalone_lexer=True, adaptive=True), ns)
+            trees, _ = self._table_parse(src, phrases)
+            for phrase, tree in zip(phrases, trees):
+                self.assertEqual(tree_shape(ns['parse'](phrase)), tree_shape(tree))
+            self.assertTrue(ns['dfa_stats']())
+
+    def test_ll1_grammar_unchanged(self):
+        """Sem conflitos, o código gerado é o mesmo com ou sem adaptive."""
+        from gp_parser_rd import generate_rd_parser
+        g = parse(PASCAL_GRAMMAR)
+        first  = compute_first(g)
+        follow = compute_follow(g, first)
+        self.assertEqual(generate_rd_parser(g, first, follow, adaptive=True),
+                         generate_rd_parser(g, first, follow))
+
+
+# =====================================================================
+# 23. Recursividade à esquerda indireta (gp_transform)
+# =====================================================================
+
+# S -> A 'a' -> S 'c' 'a': ciclo S → A → S sem recursão direta em nenhum NT
+INDIRECT_LR_GRAMMAR = """\
+start: S
+S -> A 'a' | 'b'
+A -> S 'c' | 'd'
+"""
+
+
+class TestIndirectLeftRecursion(unittest.TestCase):
+
+    def test_sccs(self):
+        from gp_transform import rules_of, left_recursive_sccs
+        self.assertEqual(left_recursive_sccs(rules_of(parse(INDIRECT_LR_GRAMMAR))), [['S', 'A']])
+        self.assertEqual(left_recursive_sccs(rules_of(parse(PASCAL_GRAMMAR))), [])
+
+    def test_nullable_prefix_cycle(self):
+        """B anulável à frente de S também fecha o ciclo."""
+        from gp_transform import left_recursive_sccs
+        rules = {'S': [['B', 'S', "'x'"], ["'y'"]], 'B': [[], ["'b'"]]}
+        self.assertEqual(left_recursive_sccs(rules), [['S']])
+
+    def test_deep_chain_iterative(self):
+        """Milhares de NT num só ciclo: Tarjan iterativo, sem RecursionError."""
+        from gp_transform import left_recursive_sccs
+        n = 5000
+        rules = {f'A{i}': [[f'A{(i + 1) % n}', "'x'"], ["'y'"]] for i in range(n)}
+        sccs = left_recursive_sccs(rules)
+        self.assertEqual(len(sccs), 1)
+        self.assertEqual(len(sccs[0]), n)
+
+    def test_suggestion_removes_cycle(self):
+        from gp_helpers import rebuild_grammar
+        from gp_analysis import has_any_left_recursion
+        g = parse(INDIRECT_LR_GRAMMAR)
+        first = compute_first(g)
+        sugs = suggest_fixes(g, check_ll1(g, first, compute_follow(g, first)))
+        self.assertEqual(len(sugs), 1)
+        self.assertEqual(sugs[0]['technique'], 'Eliminação de recursividade à esquerda indireta')
+        self.assertEqual(sugs[0]['new_rules'],
+                         ["S -> A 'a' | 'b'", "A -> 'b' 'c' A' | 'd' A'", "A' -> 'a' 'c' A' | ε"])
+
+        replacements = {}
+        for rule in sugs[0]['new_rules']:
+            replacements.setdefault(rule.split('->')[0].strip(), []).append(rule)
+        fixed = parse(rebuild_grammar(INDIRECT_LR_GRAMMAR, replacements))
+        self.assertIsNotNone(fixed)
+        self.assertFalse(has_any_left_recursion(fixed))
+
+    def test_check_llk_rejects_indirect(self):
+        from gp_analysis import check_llk
+        k, conflicts = check_llk(parse(INDIRECT_LR_GRAMMAR))
+        self.assertIsNone(k)
+        self.assertTrue(conflicts)
+
+
+# =====================================================================
+# 24. Fatorização à esquerda com trie (gp_transform)
+# =====================================================================
+
+class TestTrieLeftFactoring(unittest.TestCase):
+
+    def test_nested_prefixes(self):
+        from gp_transform import left_factor_trie
+        self.assertEqual(left_factor_trie('S', [['a'], ['a', 'b'], ['a', 'b', 'c']]),
+                         {'S': [['a', "S'"]], "S'": [[], ['b', "S''"]], "S''": [[], ['c']]})
+
+    def test_fresh_names_avoid_existing(self):
+        from gp_transform import left_factor_trie
+        taken = {'S', "S'"}
+        result = left_factor_trie('S', [['a', 'b'], ['a', 'c']], taken)
+        self.assertEqual(list(result), ['S', "S''"])
+        self.assertIn("S''", taken)
+
+    def test_shared_subtries(self):
+        """Restos iguais depois de prefixos diferentes usam o mesmo NT novo."""
+        from gp_transform import left_factor_trie
+        result = left_factor_trie('S', [['x', 'b', 'c'], ['x', 'b', 'd'],
+                                        ['y', 'b', 'c'], ['y', 'b', 'd'], []])
+        self.assertEqual(result, {'S': [['x', 'b', "S'"], ['y', 'b', "S'"], []],
+                                  "S'": [['c'], ['d']]})
+
+    def test_end_at_first_position_not_shared(self):
+        """Um resto que pode acabar (ε na posição 0) não é igual a um que não pode."""
+        from gp_transform import left_factor_trie
+        result = left_factor_trie('S', [['x', 'b'], ['x', 'b', 'c'], ['x', 'b', 'd'],
+                                        ['y', 'b', 'c'], ['y', 'b', 'd']])
+        self.assertEqual(result, {'S': [['x', 'b', "S'"], ['y', 'b', "S''"]],
+                                  "S'": [[], ['c'], ['d']], "S''": [['c'], ['d']]})
+
+    def test_long_shared_prefix(self):
+        """Centenas de alternativas com um prefixo longo: um único NT novo."""
+        from gp_transform import left_factor_trie
+        alts = [['p'] * 200 + [f"'t{i}'"] for i in range(500)]
+        result = left_factor_trie('S', alts)
+        self.assertEqual(result['S'], [['p'] * 200 + ["S'"]])
+        self.assertEqual(len(result["S'"]), 500)
+
+    def test_suggestion_is_ll1(self):
+        from gp_helpers import rebuild_grammar
+        src = "start: S\nS -> ID NUMBER | ID PLUS | ID\nS' -> PLUS\nID = /x/\nNUMBER = /n/\nPLUS = /p/\n"
+        g = parse(src)
+        first = compute_first(g)
+        sugs = suggest_fixes(g, check_ll1(g, first, compute_follow(g, first)))
+        self.assertEqual(sugs[0]['new_rules'], ["S -> ID S''", "S'' -> NUMBER | PLUS | ε"])
+        fixed = parse(rebuild_grammar(src, {'S': sugs[0]['new_rules']}))
+        first = compute_first(fixed)
+        self.assertEqual(check_ll1(fixed, first, compute_follow(fixed, first)), [])
+
+
+# =====================================================================
+# 25. Normalização LL(1) em ponto fixo (gp_normalize)
+# =====================================================================
+
+class TestNormalize(unittest.TestCase):
+
+    EXPR = """\
+start: E
+E -> E '+' T | T
+T -> T '*' F | F
+F -> '(' E ')' | ID | ID '[' E ']'
+
+ID = /[a-z]+/
+"""
+
+    def test_reaches_ll1(self):
+        from gp_normalize import normalize
+        result = normalize(self.EXPR)
+        self.assertTrue(result['ll1'])
+        self.assertEqual(len(result['rounds']), 1)
+        self.assertEqual([a['nonterminal'] for a in result['rounds'][0]['applied']],
+                         ['E', 'T', 'F'])
+        self.assertIn("E' -> '+' T E' | ε", result['grammar'])
+        self.assertIn("ID = /[a-z]+/", result['grammar'])
+
+        g = parse(result['grammar'])
+        first = compute_first(g)
+        self.assertEqual(check_ll1(g, first, compute_follow(g, first)), [])
+
+    def test_reuses_unchanged_rules(self):
+        from gp_normalize import normalize_grammar
+        g = parse("start: S\nS -> A B\nA -> ID | ID NUMBER\nB -> NUMBER\n"
+                  "ID = /x/\nNUMBER = /[0-9]+/\n")
+        spec = normalize_grammar(g)['spec']
+        old = {r.get_head_name(): r for r in g.get_rules()}
+        new = {r.get_head_name(): r for r in spec.get_rules()}
+        self.assertIs(new['S'], old['S'])
+        self.assertIsNot(new['A'], old['A'])
+
+    def test_incremental_analysis_between_rounds(self):
+        """Conflitos de cada ronda vêm da análise incremental: iguais aos da análise completa."""
+        from unittest import mock
+        import gp_normalize
+        from gp_helpers import ser_conflicts
+        src = ("start: S\nS -> A | B | C ';'\nA -> ID\nB -> ID\nC -> ID | ID '=' ID\n"
+               "ID = /x/\n")
+        updates = []
+        original = gp_normalize.IncrementalAnalysis.update
+
+        def update(analysis, grammar):
+            original(analysis, grammar)
+            updates.append(analysis.last_update)
+            return analysis
+
+        with mock.patch.object(gp_normalize.IncrementalAnalysis, 'update', update):
+            result = gp_normalize.normalize(src)
+        # A primeira análise é completa; depois só C e C' (a regra reescrita e a nova)
+        self.assertEqual(len(updates), len(result['rounds']))
+        self.assertEqual(updates[0]['changed'], 4)
+        self.assertEqual([u['changed'] for u in updates[1:]], [2])
+        g     = result['spec']
+        first = compute_first(g)
+        self.assertEqual(ser_conflicts(result['conflicts']),
+                         ser_conflicts(check_ll1(g, first, compute_follow(g, first))))
+
+    def test_stops_without_progress(self):
+        """Ambiguidade real: a ronda não aplica nada e o ciclo termina."""
+        from gp_normalize import normalize
+        result = normalize("start: S\nS -> A | B\nA -> ID\nB -> ID\nID = /x/\n")
+        self.assertFalse(result['ll1'])
+        self.assertEqual(len(result['rounds']), 1)
+        self.assertEqual(result['rounds'][0]['applied'], [])
+        self.assertTrue(result['conflicts'])
+
+    def test_invalid_grammar(self):
+        from gp_normalize import normalize
+        with self.assertRaises(ValueError):
+            normalize("S -> ")
+
+
+# =====================================================================
+# 26. Reanálise incremental (gp_incremental)
+# =====================================================================
+
+class TestIncrementalAnalysis(unittest.TestCase):
+
+    BASE = """\
+start: Program
+Program -> Stmt Program | ε
+Stmt -> Assign | Print
+Assign -> ID ':=' Expr ';'
+Print -> 'print' Expr ';'
+Expr -> ID Rest
+Rest -> '+' ID Rest | ε
+
+ID = /[a-z]+/
+"""
+
+    def assertMatchesFull(self, analysis, g):
+        first  = compute_first(g)
+        follow = compute_follow(g, first)
+        self.assertEqual(analysis.first, first)
+        self.assertEqual(analysis.follow, follow)
+        self.assertEqual(analysis.conflicts, check_ll1(g, first, follow))
+        full = build_parse_table(g, first, follow)
+        self.assertEqual({k: [id(s) for s in v] for k, v in analysis.table.items()},
+                         {k: [id(s) for s in v] for k, v in full.items() if v})
+
+    def test_initial_matches_full(self):
+        from gp_incremental import IncrementalAnalysis
+        g = parse(self.BASE)
+        self.assertMatchesFull(IncrementalAnalysis(g), g)
+
+    def test_local_edit(self):
+        """Mudar Assign sem mexer no seu FIRST só revê Assign."""
+        from gp_incremental import IncrementalAnalysis
+        analysis = IncrementalAnalysis(parse(self.BASE))
+        g = parse(self.BASE.replace("Assign -> ID ':=' Expr ';'", "Assign -> ID '=' Expr ';'"))
+        analysis.update(g)
+        self.assertMatchesFull(analysis, g)
+        self.assertEqual(analysis.last_update['changed'], 1)
+        self.assertEqual(analysis.last_update['first'], 0)
+        self.assertEqual(analysis.last_update['follow'], 0)
+        self.assertEqual(analysis.last_update['rechecked'], 1)
+
+    def test_edit_propagates(self):
+        """Um terminal novo no FIRST de Print chega a Stmt, Program e aos FOLLOW."""
+        from gp_incremental import IncrementalAnalysis
+        analysis = IncrementalAnalysis(parse(self.BASE))
+        g = parse(self.BASE.replace("Print -> 'print' Expr ';'",
+                                    "Print -> 'print' Expr ';' | 'echo' Expr ';'"))
+        analysis.update(g)
+        self.assertMatchesFull(analysis, g)
+        self.assertEqual(analysis.last_update['first'], 3)
+        self.assertIn("'echo'", analysis.follow['Stmt'])
+
+    def test_edit_introduces_conflict(self):
+        from gp_incremental import IncrementalAnalysis
+        analysis = IncrementalAnalysis(parse(self.BASE))
+        g = parse(self.BASE.replace("Print -> 'print' Expr ';'",
+                                    "Print -> 'print' Expr ';' | ID '!'"))
+        analysis.update(g)
+        self.assertMatchesFull(analysis, g)
+        self.assertEqual([c['nonterminal'] for c in analysis.conflicts], ['Stmt'])
+
+    def test_add_and_remove_rules(self):
+        from gp_incremental import IncrementalAnalysis
+        analysis = IncrementalAnalysis(parse(self.BASE))
+        added = self.BASE.replace("Stmt -> Assign | Print", "Stmt -> Assign | Print | Block") \
+                         .replace("Expr -> ID Rest", "Block -> '{' Program '}'\nExpr -> ID Rest")
+        for src in (added, self.BASE):
+            g = parse(src)
+            analysis.update(g)
+            self.assertMatchesFull(analysis, g)
+
+    def test_fork_is_independent(self):
+        from gp_incremental import IncrementalAnalysis
+        base = IncrementalAnalysis(parse(self.BASE))
+        before = {k: set(v) for k, v in base.follow.items()}
+        base.fork().update(parse(self.BASE.replace("Stmt -> Assign | Print",
+                                                   "Stmt -> Assign ';' | Print")))
+        self.assertEqual(base.follow, before)
+
+    def test_reused_rule_nodes(self):
+        """RuleNode reaproveitados (ex.: gp_normalize) comparam-se por identidade."""
+        from gp_incremental import IncrementalAnalysis
+        from gp_normalize import normalize_grammar
+        g = parse("start: E\nE -> E '+' T | T\nT -> ID\nID = /[a-z]+/\n")
+        analysis = IncrementalAnalysis(g)
+        spec = normalize_grammar(g)['spec']
+        analysis.update(spec)
+        self.assertMatchesFull(analysis, spec)
+        self.assertEqual(analysis.last_update['changed'], 2)   # E e E'
+
+
+# =====================================================================
+# 27. Reparse incremental da especificação (gp_incremental)
+# =====================================================================
+
+class TestIncrementalParser(unittest.TestCase):
+
+    BASE = TestIncrementalAnalysis.BASE
+
+    def assertSameAsFull(self, front, src):
+        from gp_parser import get_parse_warnings
+        g        = front.parse(src)
+        errors   = get_parse_errors()
+        warnings = get_parse_warnings()
+        full     = parse_grammar(src)
+        self.assertEqual(g, full)
+        self.assertEqual(errors, get_parse_errors())
+        self.assertEqual(warnings, get_parse_warnings())
+        return g
+
+    def test_matches_full_parse(self):
+        from gp_incremental import IncrementalParser
+        front = IncrementalParser()
+        g = self.assertSameAsFull(front, self.BASE)
+        self.assertEqual(g.get_start(), 'Program')
+        self.assertFalse(front.last_update['full'])
+
+    def test_single_edit_reparses_one_block(self):
+        from gp_incremental import IncrementalParser
+        front = IncrementalParser()
+        g1 = front.parse(self.BASE)
+        g2 = self.assertSameAsFull(front, self.BASE.replace("'print' Expr", "'print' ID"))
+        self.assertEqual(front.last_update['reparsed'], 1)
+        # As regras não editadas são os mesmos RuleNode (IncrementalAnalysis só revê Print)
+        same = [a is b for a, b in zip(g1.get_rules(), g2.get_rules())]
+        self.assertEqual(same.count(False), 1)
+
+    def test_split_rule_and_semantic_messages(self):
+        """Regras repartidas por blocos, NT indefinido e terminal sem regex."""
+        from gp_incremental import IncrementalParser
+        front = IncrementalParser()
+        self.assertSameAsFull(front, self.BASE)
+        src = self.BASE.replace("Rest -> '+' ID Rest | ε",
+                                "Rest -> '+' ID Rest\nPrint -> 'echo' Missing ';'\nRest -> NUM")
+        self.assertSameAsFull(front, src)
+        self.assertTrue(any('Missing' in e for e in get_parse_errors()))
+        self.assertSameAsFull(front, self.BASE)
+        self.assertEqual(get_parse_errors(), [])
+
+    def test_syntax_error_falls_back(self):
+        from gp_incremental import IncrementalParser
+        front = IncrementalParser()
+        front.parse(self.BASE)
+        self.assertSameAsFull(front, self.BASE.replace("Stmt -> Assign", "Stmt -> -> Assign"))
+        self.assertTrue(front.last_update['full'])
+        self.assertTrue(get_parse_errors())
+        self.assertSameAsFull(front, self.BASE)
+
+    def test_rebuild_grammar_blocks(self):
+        from gp_helpers import split_spec_blocks, rebuild_grammar
+        kinds = [b[0] for b in split_spec_blocks(self.BASE)]
+        self.assertEqual(kinds, ['start'] + ['rule'] * 6 + [None, 'token'])
+        out = rebuild_grammar(self.BASE, {'Rest': ["Rest -> '+' ID Rest | '-' ID Rest | ε"]})
+        self.assertIn("'-' ID Rest", out)
+        self.assertIn("ID = /[a-z]+/", out)
+        self.assertIsNotNone(parse(out))
+
+
+# =====================================================================
+# 28. Símbolos inúteis (gp_reduce)
+# =====================================================================
+
+class TestUselessSymbols(unittest.TestCase):
+
+    SRC = """\
+start: S
+S -> A 'a' | B 'b' | ε
+A -> 'x' | C
+B -> B 'y'
+C -> D 'z'
+D -> C
+Orphan -> 'o' Island
+Island -> 'i'
+"""
+
+    def test_sets(self):
+        from gp_reduce import useless_symbols
+        info = useless_symbols(parse(self.SRC))
+        self.assertEqual(info['unproductive'], ['B', 'C', 'D'])
+        self.assertEqual(info['unreachable'], ['Orphan', 'Island'])
+        self.assertEqual(info['nullable'], {'S'})
+        self.assertEqual(info['reachable'], {'S', 'A'})
+        self.assertFalse(info['empty'])
+
+    def test_warnings(self):
+        from gp_reduce import useless_warnings
+        warnings = useless_warnings(parse(self.SRC))
+        self.assertEqual(len(warnings), 4)
+        self.assertTrue(any("'B' é improdutivo" in w for w in warnings))
+        self.assertTrue(any("'Island' é inalcançável" in w for w in warnings))
+        # Orphan já tem o aviso "nunca é referenciado" da validação
+        self.assertFalse(any("'Orphan'" in w for w in warnings))
+
+    def test_prune(self):
+        from gp_reduce import prune_useless
+        g = parse(self.SRC)
+        pruned, _ = prune_useless(g)
+        self.assertEqual(pruned.get_nonterminals(), {'S', 'A'})
+        rules = {r.get_head_name(): r for r in pruned.get_rules()}
+        self.assertEqual(len(rules['S'].altlist.sequences), 2)       # A 'a' | ε
+        self.assertEqual(len(rules['A'].altlist.sequences), 1)       # 'x'
+        self.assertEqual(pruned.validate()[0], [])
+        first = compute_first(pruned)
+        self.assertEqual(check_ll1(pruned, first, compute_follow(pruned, first)), [])
+
+    def test_prune_noop_and_empty_language(self):
+        from gp_reduce import prune_useless, useless_warnings
+        g = parse(TestIncrementalAnalysis.BASE)
+        self.assertIs(prune_useless(g)[0], g)
+        empty = parse("start: S\nS -> S 'a'\n")
+        pruned, info = prune_useless(empty)
+        self.assertTrue(info['empty'])
+        self.assertIs(pruned, empty)
+        self.assertIn('linguagem é vazia', useless_warnings(empty)[0])
+
+
+# =====================================================================
+# 29. Inlining de NTs (gp_optimize)
+# =====================================================================
+
+class TestInlining(unittest.TestCase):
+
+    SRC = """\
+start: Program
+Program -> StmtList
+StmtList -> Stmt StmtListR
+StmtListR -> ';' Stmt StmtListR | ε
+Stmt -> ID ':=' Expr
+Expr -> Term ExprR
+ExprR -> '+' Term ExprR | ε
+Term -> ID | NUM
+
+ID = /[a-z]+/
+NUM = /[0-9]+/
+"""
+
+    def _tree(self, g, phrase):
+        from gp_parser_td import TableParser
+        from gp_helpers import build_patterns
+        first  = compute_first(g)
+        follow = compute_follow(g, first)
+        return TableParser(g, build_parse_table(g, first, follow), phrase,
+                           build_patterns(g), trace=False).parse()
+
+    def _shape(self, t):
+        return (t.label, t.lexema, [self._shape(c) for c in t.children])
+
+    def test_inlines_chains_and_single_use(self):
+        from gp_optimize import inline_nonterminals
+        result = inline_nonterminals(parse(self.SRC), self.SRC)
+        self.assertEqual({i['nonterminal'] for i in result['inlined']}, {'StmtList', 'Expr'})
+        g = parse(result['grammar'])
+        self.assertIsNotNone(g)
+        self.assertEqual(g, result['spec'])
+        self.assertNotIn('Expr', g.get_nonterminals())
+        first = compute_first(g)
+        self.assertEqual(check_ll1(g, first, compute_follow(g, first)), [])
+        self.assertIn("ID = /[a-z]+/", result['grammar'])
+
+    def test_unchanged_rules_are_reused(self):
+        from gp_optimize import inline_nonterminals
+        g = parse(self.SRC)
+        spec = inline_nonterminals(g)['spec']
+        term = next(r for r in g.get_rules() if r.get_head_name() == 'Term')
+        self.assertTrue(any(r is term for r in spec.get_rules()))
+
+    def test_expand_tree_restores_shape(self):
+        from gp_optimize import inline_nonterminals, expand_tree
+        g = parse(self.SRC)
+        result = inline_nonterminals(g)
+        for phrase in ("x := 1", "x := a + 2 ; y := x"):
+            optimized = self._tree(result['spec'], phrase)
+            self.assertNotIn("'StmtList'", repr(self._shape(optimized)))
+            self.assertEqual(self._shape(expand_tree(optimized, result['expansions'])),
+                             self._shape(self._tree(g, phrase)))
+
+    def test_no_new_conflicts(self):
+        """O resultado continua LL(1); uma regra já em conflito não é tocada."""
+        from gp_optimize import inline_nonterminals
+        src = "start: S\nS -> A | 'b'\nA -> X 'x' | 'y'\nX -> 'a' | ε\n"
+        g = parse(src)
+        result = inline_nonterminals(g, src)
+        g2 = parse(result['grammar'])
+        first = compute_first(g2)
+        self.assertEqual(check_ll1(g2, first, compute_follow(g2, first)), [])
+        # Gramática com conflito: a regra em conflito não é tocada
+        src = "start: S\nS -> A | 'a'\nA -> 'a' 'b'\n"
+        self.assertEqual(inline_nonterminals(parse(src), src)['inlined'], [])
+
+
+# =====================================================================
+# 30. Fusão de NTs equivalentes (gp_optimize)
+# =====================================================================
+
+class TestMergeEquivalent(unittest.TestCase):
+
+    SRC = """\
+start: S
+S -> Ea | Eb ';'
+Ea -> Ta Ra
+Ra -> '+' Ta Ra | ε
+Ta -> ID | '(' Ea ')'
+Eb -> Tb Rb
+Rb -> '+' Tb Rb | ε
+Tb -> ID | '(' Eb ')'
+
+ID = /[a-z]+/
+"""
+
+    def test_renames_whole_copy(self):
+        from gp_optimize import merge_equivalent
+        result = merge_equivalent(parse(self.SRC), self.SRC)
+        self.assertEqual(result['renames'], {'Eb': 'Ea', 'Rb': 'Ra', 'Tb': 'Ta'})
+        g = parse(result['grammar'])
+        self.assertEqual(g, result['spec'])
+        self.assertEqual(g.get_nonterminals(), {'S', 'Ea', 'Ra', 'Ta'})
+        self.assertLess(result['table']['after']['cells'], result['table']['before']['cells'])
+        self.assertEqual(result['table']['after']['rows'], 4)
+
+    def test_refinement_separates_different_terminals(self):
+        """Rb com '-' separa Rb, depois Eb (usa Rb) e por fim Tb (usa Eb)."""
+        from gp_optimize import merge_equivalent, equivalent_blocks
+        from gp_transform import rules_of
+        src = self.SRC.replace("Rb -> '+'", "Rb -> '-'")
+        g = parse(src)
+        self.assertTrue(all(len(c) == 1 for c in equivalent_blocks(rules_of(g))))
+        result = merge_equivalent(g, src)
+        self.assertEqual(result['renames'], {})
+        self.assertIs(result['spec'], g)
+
+    def test_duplicate_alternatives_dropped(self):
+        from gp_optimize import merge_equivalent
+        src = "start: S\nS -> A | B\nA -> 'x' A | 'y'\nB -> 'x' B | 'y'\n"
+        result = merge_equivalent(parse(src), src)
+        self.assertEqual(result['renames'], {'B': 'A'})
+        rule = next(r for r in result['spec'].get_rules() if r.get_head_name() == 'S')
+        self.assertEqual(len(rule.altlist.sequences), 1)
+
+
+# =====================================================================
+# 31. Sub-linguagens regulares como tokens (gp_optimize)
+# =====================================================================
+
+class TestHoistTokens(unittest.TestCase):
+
+    SRC = """\
+start: Prog
+Prog -> Assign Prog | ε
+Assign -> Name '=' Number ';'
+Name -> LETTER NameR
+NameR -> LETTER NameR | ε
+Number -> Digits Frac
+Digits -> DIGIT Digits | DIGIT
+Frac -> '.' Digits | ε
+
+LETTER = /[a-z]/
+DIGIT = /[0-9]/
+"""
+
+    def _shape(self, t):
+        return (t.label, t.lexema, [self._shape(c) for c in t.children])
+
+    def test_regular_nonterminals(self):
+        import re
+        from gp_optimize import regular_nonterminals
+        regex = regular_nonterminals(parse(self.SRC))
+        self.assertIn('Digits', regex)
+        self.assertIn('Prog', regex)           # recursão só na cauda
+        self.assertTrue(re.fullmatch(regex['Number'], '12.5', re.VERBOSE))
+        self.assertTrue(re.fullmatch(regex['Number'], '1 2', re.VERBOSE))   # o scanner salta espaços
+        self.assertFalse(re.fullmatch(regex['Number'], '12.', re.VERBOSE))
+        g = parse("start: E\nE -> '(' E ')' | ID\nID = /[a-z]+/\n")
+        self.assertNotIn('E', regular_nonterminals(g))
+
+    def test_hoist_selected(self):
+        from gp_optimize import hoist_tokens, expand_tokens
+        from gp_earley import compile_earley
+        g = parse(self.SRC)
+        result = hoist_tokens(g, self.SRC, only={'Name', 'Number'})
+        self.assertEqual(result['hoisted'], {'NAME': 'Name', 'NUMBER': 'Number'})
+        g2 = parse(result['grammar'])
+        self.assertEqual(g2, result['spec'])
+        self.assertEqual(g2.get_nonterminals(), {'Prog', 'Assign'})
+        self.assertNotIn('DIGIT', g2.get_token_patterns())
+        phrase = "ab = 12.5; c = 3;"
+        original = compile_earley(g).parse(phrase)
+        hoisted  = compile_earley(g2).parse(phrase)
+        self.assertEqual(self._shape(expand_tokens(hoisted, result['expansions'])),
+                         self._shape(original))
+
+    def test_shared_terminal_not_hoisted(self):
+        """ID também é usado fora de Term: converter Term tiraria ID ao scanner."""
+        from gp_optimize import hoist_tokens
+        src = "start: S\nS -> ID '=' Term\nTerm -> ID | NUM\n\nID = /[a-z]+/\nNUM = /[0-9]+/\n"
+        g = parse(src)
+        result = hoist_tokens(g, src)
+        self.assertEqual(result['hoisted'], {})
+        self.assertIs(result['spec'], g)
+
+    def test_only_small_character_level_closures(self):
+        """Prefere os menores fechos; listas de instruções sobre ID/NUMBER não viram tokens."""
+        from gp_optimize import hoist_tokens
+        result = hoist_tokens(parse(self.SRC), self.SRC)
+        self.assertEqual(result['hoisted'], {'DIGITS': 'Digits', 'NAME': 'Name'})
+        self.assertEqual(parse(result['grammar']).get_nonterminals(),
+                         {'Prog', 'Assign', 'Number', 'Frac'})
+        src = ("start: P\nP -> S L\nL -> ';' S L | ε\nS -> ID ':=' T\nT -> ID | NUMBER\n\n"
+               "ID = /[a-z]+/\nNUMBER = /[0-9]+/\n")
+        self.assertEqual(hoist_tokens(parse(src), src)['hoisted'], {})
+
+    def test_prefix_alternatives_keep_language(self):
+        """A → 'a' | 'a' 'b': o token convertido continua a aceitar "ab" e "abc"."""
+        from gp_optimize import hoist_tokens
+        from gp_earley import compile_earley
+        with open(os.path.join(os.path.dirname(__file__), '..', 'examples', 'example.txt'),
+                  encoding='utf-8') as f:
+            src = f.read()
+        g  = parse(src)
+        result = hoist_tokens(g, src)
+        self.assertEqual(result['hoisted'], {'A_TOK': 'A'})
+        g2 = parse(result['grammar'])
+        for phrase in ('a', 'ab', 'abc', 'ac'):
+            compile_earley(g).parse(phrase)
+            compile_earley(g2).parse(phrase)
+        # Um ramo mais curto que é prefixo de outro, noutro NT: não se converte
+        src = "start: S\nS -> A ';'\nA -> X | 'a' 'b'\nX -> 'a' | 'a' 'b' 'c'\n"
+        self.assertEqual(hoist_tokens(parse(src), src, only={'A'})['hoisted'], {})
+
+
+# =====================================================================
+# 32. Operadores EBNF (gp_parser, parsers RD/LL(1))
+# =====================================================================
+
+class TestEbnf(unittest.TestCase):
+
+    SRC = """\
+start: Prog
+Prog -> Stmt* END
+Stmt -> ID ('=' Expr)? ';' | '{' Stmt+ '}'
+Expr -> NUM (('+' | '-') NUM)*
+
+ID = /[a-z]+/
+NUM = /[0-9]+/
+END = /\\$/
+"""
+
+    def _shape(self, t):
+        if t.lexema is not None:
+            return t.lexema
+        return (t.label, [self._shape(c) for c in t.children])
+
+    def _setup(self):
+        from gp_analysis import compute_first, compute_follow
+        g = parse(self.SRC)
+        first = compute_first(g)
+        return g, first, compute_follow(g, first)
+
+    def test_desugar(self):
+        from gp_transform import rules_of
+        g = parse(self.SRC)
+        rules = rules_of(g)
+        self.assertEqual(rules['Prog'], [['Prog_rep1', 'END']])
+        self.assertEqual(rules['Prog_rep1'], [['Stmt', 'Prog_rep1'], []])
+        self.assertEqual(rules['Stmt'][1], ["'{'", 'Stmt', 'Stmt_rep1', "'}'"])
+        self.assertEqual(rules['Stmt_opt1'], [["'='", 'Expr'], []])
+        self.assertEqual(rules['Expr_grp1'], [["'+'"], ["'-'"]])
+        self.assertEqual(g.ebnf_helpers, {'Prog_rep1': '*', 'Stmt_opt1': '?', 'Stmt_rep1': '*',
+                                          'Expr_grp1': '', 'Expr_rep1': '*'})
+        g2 = parse("start: S\nS -> (A B) | C?\nA -> 'a'\nB -> 'b'\nC -> 'c'\n")
+        self.assertEqual(rules_of(g2)['S'], [['A', 'B'], ['S_opt1']])
+
+    def test_ll1_and_flat_trees(self):
+        from gp_analysis import check_ll1, build_parse_table
+        from gp_parser_td import TableParser
+        from gp_engine import compile_rd
+        from gp_helpers import build_patterns
+        g, first, follow = self._setup()
+        self.assertEqual(check_ll1(g, first, follow), [])
+        phrase = "a = 1 + 2 - 3; { b; } $"
+        expected = ('Prog', [('Stmt', ['a', '=', ('Expr', ['1', '+', '2', '-', '3']), ';']),
+                             ('Stmt', ['{', ('Stmt', ['b', ';']), '}']), '$'])
+        table = build_parse_table(g, first, follow)
+        td = TableParser(g, table, phrase, extra_patterns=build_patterns(g), trace=False).parse()
+        self.assertEqual(self._shape(td), expected)
+        self.assertEqual(self._shape(compile_rd(g, first, follow).parse(phrase)), expected)
+
+    def test_generated_rd_loops(self):
+        from gp_parser_rd import generate_rd_parser
+        g, first, follow = self._setup()
+        code = generate_rd_parser(g, first, follow, standalone_lexer=True)
+        self.assertIn('while True:', code)
+        ns = {}
+        exec(code, ns)
+        tree = ns['parse']("x; y = 4; $")
+        self.assertEqual(self._shape(tree),
+                         ('Prog', [('Stmt', ['x', ';']), ('Stmt', ['y', '=', ('Expr', ['4']), ';']), '$']))
+
+    def test_long_list_constant_stack(self):
+        """Uma lista de 20000 elementos não chega perto do limite de recursão."""
+        from gp_parser_rd import generate_rd_parser
+        from gp_engine import compile_rd
+        g, first, follow = self._setup()
+        phrase = 'x = 1 + 2; ' * 20000 + '$'
+        ns = {}
+        exec(generate_rd_parser(g, first, follow, standalone_lexer=True), ns)
+        self.assertEqual(len(ns['parse'](phrase).children), 20001)
+        tree = compile_rd(g, first, follow).parse(phrase)
+        self.assertEqual(len(tree.children), 20001)
+        self.assertEqual(self._shape(tree.children[-2]),
+                         ('Stmt', ['x', '=', ('Expr', ['1', '+', '2']), ';']))
+
+    def test_packed_flat_trees(self):
+        """O pacote binário (td do lote) funde os auxiliares como o TableParser."""
+        from gp_packed import PackedGrammar, build_pack
+        packed = PackedGrammar(build_pack(parse(self.SRC)))
+        self.assertEqual(packed.helpers, frozenset(parse(self.SRC).ebnf_helpers))
+        self.assertEqual(self._shape(packed.parse("a = 1 + 2; { b; } $")),
+                         ('Prog', [('Stmt', ['a', '=', ('Expr', ['1', '+', '2']), ';']),
+                                   ('Stmt', ['{', ('Stmt', ['b', ';']), '}']), '$']))
+
+    def test_rewritten_text_defines_helpers(self):
+        """Regras reescritas que usam X_rep1 / X_opt1 levam a regra do auxiliar no texto."""
+        from gp_normalize import normalize
+        from gp_helpers import rebuild_grammar, define_helpers
+        from gp_transform import rules_of
+        src = "start: S\nS -> ID (',' ID)* | ID '=' ID\nID = /[a-z]+/\n"
+        text = normalize(src)['grammar']
+        self.assertIn("S_rep1 -> ',' ID S_rep1 | ε", text)
+        self.assertIsNotNone(parse(text))
+
+        g = parse(src)
+        replacements = {'S': ["S -> ID S'", "S' -> S_rep1 | '=' ID"]}
+        text = rebuild_grammar(src, define_helpers(replacements, rules_of(g), g.ebnf_helpers))
+        self.assertIsNotNone(parse(text))
+        self.assertEqual(rules_of(parse(text))['S_rep1'], [["','", 'ID', 'S_rep1'], []])
+
+        # Auxiliar alterado: a regra que o usa passa a BNF
+        src = "start: L\nL -> (ID | ID '=' ID)* ';'\nID = /[a-z]+/\n"
+        text = normalize(src)['grammar']
+        self.assertIn("L -> L_rep1 ';'", text)
+        self.assertTrue(normalize(text)['ll1'])
+
+    def test_plain_bnf_unchanged(self):
+        g = parse("start: S\nS -> A S | ε\nA -> ID\nID = /[a-z]+/\n")
+        self.assertEqual(g.ebnf_helpers, {})
+        self.assertIsNone(parse("start: S\nS -> A**\nA -> ID\nID = /[a-z]+/\n"))
+
+
+# =====================================================================
+# 33. Simplificação da árvore durante a construção (gp_simplify)
+# =====================================================================
+
+class TestTreeSimplifier(unittest.TestCase):
+
+    SRC = """\
+start: E
+E -> T Er
+Er -> '+' T Er | ε
+T -> F Tr
+Tr -> '*' F Tr | ε
+F -> '(' E ')' | NUM
+NUM = /[0-9]+/
+"""
+
+    def _shape(self, t):
+        if t.lexema is not None:
+            return t.lexema
+        return (t.label, [self._shape(c) for c in t.children])
+
+    def _parsers(self, **opts):
+        from gp_analysis import build_parse_table
+        from gp_parser_td import TableParser
+        from gp_engine import compile_rd
+        from gp_lr import LRParser
+        from gp_earley import compile_earley
+        from gp_helpers import build_patterns
+        from gp_simplify import TreeSimplifier
+        g = parse(self.SRC)
+        first, simp = compute_first(g), TreeSimplifier(g, **opts)
+        follow = compute_follow(g, first)
+        table = build_parse_table(g, first, follow)
+        engine = compile_rd(g, first, follow, simp)
+        return simp, {
+            'td':     lambda s: TableParser(g, table, s, build_patterns(g), trace=False,
+                                            simplify=simp).parse(),
+            'rd':     engine.parse,
+            'lr':     LRParser(g, simplify=simp).parse,
+            'earley': lambda s: simp.simplify(compile_earley(g).parse(s)),
+        }
+
+    def test_lists_and_chains(self):
+        _, parsers = self._parsers()
+        expected = ('E', [('T', [('F', ['(', ('E', ['1', ('Er', ['+', '2'])]), ')']),
+                                 ('Tr', ['*', '3', '*', '4'])]),
+                          ('Er', ['+', '5'])])
+        for name, p in parsers.items():
+            self.assertEqual(self._shape(p("(1 + 2) * 3 * 4 + 5")), expected, name)
+            self.assertEqual(self._shape(p("7")), ('E', ['7']), name)     # o axioma fica sempre
+
+    def test_options(self):
+        from gp_simplify import tree_size
+        _, full = self._parsers(epsilon=False, chains=False, lists=False)
+        _, simple = self._parsers()
+        phrase = "1 + 2 * 3 + (4 * 5)"
+        cst = full['td'](phrase)
+        self.assertEqual(tree_size(cst), tree_size(full['rd'](phrase)))
+        self.assertGreater(tree_size(cst), 2 * tree_size(simple['td'](phrase)))
+        _, no_chains = self._parsers(chains=False)
+        t = no_chains['rd']("1")
+        self.assertEqual(self._shape(t), ('E', [('T', [('F', ['1'])])]))
+
+    def test_long_list_without_recursion(self):
+        """Com listas, X -> α X é um ciclo no motor RD: 20000 elementos num só nó."""
+        _, parsers = self._parsers()
+        tree = parsers['rd'](' + '.join(['1'] * 20000))
+        self.assertEqual(len(tree.children[1].children), 2 * 19999)
+
+    def test_default_tree_unchanged(self):
+        from gp_analysis import build_parse_table
+        from gp_parser_td import TableParser
+        from gp_helpers import build_patterns
+        g = parse(self.SRC)
+        first = compute_first(g)
+        table = build_parse_table(g, first, compute_follow(g, first))
+        tree = TableParser(g, table, "1", build_patterns(g)).parse()
+        self.assertEqual(self._shape(tree),
+                         ('E', [('T', [('F', ['1']), ('Tr', [('ε', [])])]), ('Er', [('ε', [])])]))
+
+
+# =====================================================================
+# 34. Precedence climbing para níveis de operadores (gp_pratt)
+# =====================================================================
+
+class TestPratt(unittest.TestCase):
+
+    SRC = """\
+start: E
+E -> T Er
+Er -> '+' T Er | '-' T Er | ε
+T -> F Tr
+Tr -> '*' F Tr | ε
+F -> '(' E ')' | NUM
+NUM = /[0-9]+/
+"""
+
+    def _shape(self, t):
+        if t.lexema is not None:
+            return t.lexema
+        return (t.label, [self._shape(c) for c in t.children])
+
+    def _grammar(self):
+        g = parse(self.SRC)
+        first = compute_first(g)
+        return g, first, compute_follow(g, first)
+
+    def test_detects_levels(self):
+        from gp_pratt import expression_families, precedence_table
+        g, _, _ = self._grammar()
+        families = expression_families(g)
+        self.assertEqual(families, [{'levels': [('E', 'Er', ['+', '-']), ('T', 'Tr', ['*'])],
+                                     'primary': 'F'}])
+        self.assertEqual(precedence_table(families[0]),
+                         {'+': (0, 'E'), '-': (0, 'E'), '*': (1, 'T')})
+
+    def test_not_detected(self):
+        from gp_pratt import expression_families
+        # operando anulável e cauda com alternativa que não é 'op N cauda'
+        for src in ("start: A\nA -> B Ar\nAr -> '+' B Ar | ε\nB -> NUM | ε\nNUM = /[0-9]+/\n",
+                    "start: A\nA -> B Ar\nAr -> '+' B Ar | '!' | ε\nB -> NUM\nNUM = /[0-9]+/\n"):
+            self.assertEqual(expression_families(parse(src)), [])
+
+    def test_binary_tree(self):
+        from gp_engine import compile_rd
+        g, first, follow = self._grammar()
+        tree = compile_rd(g, first, follow, pratt=True).parse("1 - 2 * 3 - 4")
+        self.assertEqual(self._shape(tree),
+                         ('E', [('E', [('F', ['1']), '-', ('T', [('F', ['2']), '*', ('F', ['3'])])]),
+                                '-', ('F', ['4'])]))
+        # a raiz é sempre o axioma, mesmo sem operadores do nível de E
+        tree = compile_rd(g, first, follow, pratt=True).parse("(1 + 2) * 3")
+        self.assertEqual(self._shape(tree),
+                         ('E', [('T', [('F', ['(', ('E', [('F', ['1']), '+', ('F', ['2'])]), ')']),
+                                       '*', ('F', ['3'])])]))
+
+    def test_generated_matches_engine(self):
+        from gp_engine import compile_rd
+        from gp_parser_rd import generate_rd_parser
+        from gp_simplify import tree_size
+        g, first, follow = self._grammar()
+        ns = {}
+        exec(generate_rd_parser(g, first, follow, standalone_lexer=True, pratt=True), ns)
+        engine = compile_rd(g, first, follow, pratt=True)
+        full = compile_rd(g, first, follow)
+        for phrase in ("7", "1 + 2 * 3", "(1 - 2) * (3 + 4) * 5 - 6", "1 * 2 * 3 + 4"):
+            tree = engine.parse(phrase)
+            self.assertEqual(self._shape(ns['parse'](phrase)), self._shape(tree))
+            self.assertLess(tree_size(tree), tree_size(full.parse(phrase)))
+        for bad in ("1 +", "1 2", "(1"):
+            with self.assertRaises(SyntaxError):
+                engine.parse(bad)
+            with self.assertRaises(SyntaxError):
+                ns['parse'](bad)
+
+    def test_default_tree_unchanged(self):
+        from gp_engine import compile_rd
+        from gp_parser_rd import generate_rd_parser
+        g, first, follow = self._grammar()
+        self.assertNotIn('_climb_', generate_rd_parser(g, first, follow, standalone_lexer=True))
+        tree = compile_rd(g, first, follow).parse("1")
+        self.assertEqual(self._shape(tree),
+                         ('E', [('T', [('F', ['1']), ('Tr', [('ε', [])])]), ('Er', [('ε', [])])]))
+
+
+# =====================================================================
+# 35. Reanálise incremental de frases (gp_incremental.IncrementalPhrase)
+# =====================================================================
+
+class TestIncrementalPhrase(unittest.TestCase):
+
+    SRC = """\
+start: Program
+Program -> StmtList
+StmtList -> Stmt StmtListR
+StmtListR -> SEMI Stmt StmtListR | epsilon
+Stmt -> ID ASSIGN Expr
+Expr -> Term ExprR
+ExprR -> PLUS Term ExprR | epsilon
+Term -> ID | NUMBER | LP Expr RP
+ID = /[a-zA-Z_][a-zA-Z0-9_]*/
+NUMBER = /[0-9]+/
+PLUS = /\\+/
+SEMI = /;/
+ASSIGN = /:=/
+LP = /\\(/
+RP = /\\)/
+"""
+
+    def _shape(self, t):
+        if t.lexema is not None:
+            return t.lexema
+        return (t.label, [self._shape(c) for c in t.children])
+
+    def _setup(self, simplify=False, pratt=False):
+        from gp_engine import compile_rd
+        from gp_incremental import IncrementalPhrase
+        from gp_simplify import TreeSimplifier
+        g = parse(self.SRC)
+        first = compute_first(g)
+        follow = compute_follow(g, first)
+        simp = TreeSimplifier(g) if simplify else None
+        return (compile_rd(g, first, follow, simp, pratt),
+                IncrementalPhrase(g, first, follow, simp, pratt))
+
+    def _check(self, full, phrase, edits):
+        for offset, deleted, inserted in edits:
+            text = phrase.text[:offset] + inserted + phrase.text[offset + deleted:]
+            try:
+                expected = self._shape(full.parse(text))
+            except SyntaxError as e:
+                with self.assertRaises(SyntaxError) as ctx:
+                    phrase.edit(offset, deleted, inserted)
+                self.assertEqual(str(ctx.exception), str(e))
+            else:
+                self.assertEqual(self._shape(phrase.edit(offset, deleted, inserted)), expected)
+            self.assertEqual(phrase.text, text)
+
+    def test_edits_match_full_parse(self):
+        for opts in ({}, {'pratt': True}, {'simplify': True}):
+            full, phrase = self._setup(**opts)
+            phrase.parse("x := 1 + 2; y := (x + 3); z := y")
+            self._check(full, phrase, [
+                (10, 0, "3"),            # 1 + 23: o token anterior cresce
+                (0, 1, "abc"),
+                (14, 0, " + "),          # erro sintático
+                (14, 3, ""),             # e volta a ser válida
+                (20, 0, "("),            # parênteses desequilibrados
+                (20, 1, ""),
+                (0, 0, "w := 0; "),
+                (42, 1, "y + 7"),        # no fim da frase
+                (5, 0, " ?"),            # erro léxico
+                (5, 2, ""),
+            ])
+
+    def test_reuses_subtrees(self):
+        _, phrase = self._setup()
+        text = '; '.join(f'v{i} := {i} + (x + {i})' for i in range(200))
+        phrase.parse(text)
+        total = phrase.last_update['reparsed']
+        offset = text.index('v150 := ') + len('v150 := ')
+        phrase.edit(offset, 0, "7 + ")
+        info = phrase.last_update
+        self.assertFalse(info['full'])
+        self.assertLessEqual(info['relexed'], 6)
+        self.assertGreater(info['reused'], 0)
+        self.assertLess(info['reparsed'], total // 2)
+
+    def test_out_of_range_edit(self):
+        _, phrase = self._setup()
+        phrase.parse("x := 1")
+        with self.assertRaises(ValueError):
+            phrase.edit(4, 10, "")
+        self.assertEqual(self._shape(phrase.edit(6, 0, "0")),
+                         self._shape(self._setup()[0].parse("x := 10")))
+
+
+# =====================================================================
+# 36. Cache dos resultados de parse (gp_cache)
+# =====================================================================
+
+class TestParseCache(unittest.TestCase):
+
+    def _shape(self, t):
+        if t.lexema is not None:
+            return (t.label, t.lexema)
+        return (t.label, [self._shape(c) for c in t.children])
+
+    def test_pack_tree_roundtrip(self):
+        from gp_cache import pack_tree, unpack_tree
+        from gp_parser_td import TreeNode
+        tree = TreeNode('S', [TreeNode('A', [TreeNode('ID', lexema='x'), TreeNode('ε')]),
+                              TreeNode('NUM', lexema='42'), TreeNode('ID', lexema='çé')])
+        self.assertEqual(self._shape(unpack_tree(pack_tree(tree))), self._shape(tree))
+        # lista longa: a serialização é iterativa e repete os rótulos uma só vez
+        deep = TreeNode('L', [TreeNode('ID', lexema='a')])
+        for i in range(5000):
+            deep = TreeNode('L', [TreeNode('ID', lexema='a'), TreeNode(',', lexema=','), deep])
+        data = pack_tree(deep)
+        self.assertLess(len(data), 4 * 15001)
+        back = unpack_tree(data)
+        n = 0
+        while back.children and back.children[-1].label == 'L':
+            back, n = back.children[-1], n + 1
+        self.assertEqual(n, 5000)
+
+    def test_lru_bytes_and_ttl(self):
+        from gp_cache import ParseCache
+        now = [0.0]
+        cache = ParseCache(max_bytes=2000, ttl=10, clock=lambda: now[0])
+        keys = [cache.key("start: S\nS -> ID\n", f"x{i}", 'td') for i in range(40)]
+        for k in keys:
+            cache.put(k, steps=[{'step': 1, 'action': 'ACEITE'}], tree_svg='<svg/>' * 20)
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 2000)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertIsNone(cache.get(keys[0]))                # o mais antigo saiu
+        self.assertEqual(cache.get(keys[-1])['tree_svg'], '<svg/>' * 20)
+        now[0] = 11
+        self.assertIsNone(cache.get(keys[-1]))               # expirou
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expired']), (1, 2, 1))
+        self.assertEqual(stats['hit_rate'], round(1 / 3, 4))
+        import hashlib
+        big = ''.join(hashlib.sha256(str(i).encode()).hexdigest() for i in range(100))
+        self.assertFalse(cache.put(keys[0], tree_svg=big))     # comprimido, ainda maior que a cache
+
+    def test_key_and_fresh_trees(self):
+        from gp_cache import ParseCache
+        from gp_parser_td import TreeNode
+        cache = ParseCache()
+        k1 = cache.key("start: S\nS -> ID\n", "x", 'rd', {'simplify': True})
+        self.assertEqual(k1, cache.key("start: S\nS -> ID\n", "x", 'rd', {'simplify': True}))
+        # Texto exato: o whitespace dentro de literais muda a linguagem
+        self.assertNotEqual(cache.key("start: S\nS -> 'a b'\n", "a b", 'rd'),
+                            cache.key("start: S\nS -> 'a  b'\n", "a b", 'rd'))
+        self.assertNotEqual(k1, cache.key("start: S\nS -> ID\n", "x", 'td', {'simplify': True}))
+        self.assertNotEqual(k1, cache.key("start: S\nS -> ID\n", "x", 'rd'))
+        cache.put(k1, tree=TreeNode('S', [TreeNode('ID', lexema='x')]))
+        first = cache.get(k1)['tree']
+        first.children.clear()                              # um visitor que altera a árvore
+        self.assertEqual(self._shape(cache.get(k1)['tree']), ('S', [('ID', 'x')]))
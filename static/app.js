@@ -4,7 +4,8 @@ let grammarHash = '';          // SHA-256 da gramática activa — recebido de /
 let lastSugg = [];
 let visitorSkeleton = '';
 let lastTurtle = '';
-let activeParserType = 'td';   // 'td' ou 'rd'
+let activeParserType = 'td';   // 'td', 'rd' ou 'lr' (o servidor pode responder 'earley')
+let lrReady  = false;          // gramática sem conflitos LALR(1)
 
 let visitorEditor = null;
 
@@ -63,7 +64,7 @@ document.querySelectorAll('.tab').forEach(t =>
   t.addEventListener('click', () => showTab(t.dataset.tab)));
 
 
-// ── Toggle RD / TD ────────────────────────────────────────────────────
+// ── Toggle RD / TD / LR ───────────────────────────────────────────────
 document.querySelectorAll('.pt-btn').forEach(btn => {
   btn.addEventListener('click', () => {
     activeParserType = btn.dataset.pt;
@@ -111,11 +112,13 @@ $('btn-analyse').addEventListener('click', async () => {
   setLoading(btn, true);
   $('ff-banners').innerHTML = '';
   ready = false;
+  grammar = '';
+  const previous = grammarHash;   // o servidor reaproveita essa análise (só recalcula o que mudou)
   grammarHash = '';
   $('btn-generate').disabled = true;
 
   try {
-    const d = await post('/api/analyse', { grammar: src });
+    const d = await post('/api/analyse', { grammar: src, previous });
 
     $('ff-empty').style.display  = 'none';
     $('ff-result').style.display = 'block';
@@ -134,6 +137,7 @@ $('btn-analyse').addEventListener('click', async () => {
     if (warnings.length > 0) showBanners('ff-banners', warnings, 'warn');
 
     const $banners = $('ff-banners');
+    lrReady = d.lr.conflicts.length === 0;
     if (d.conflicts.length === 0) {
       $banners.innerHTML += `<div class="banner ok"><span>✓</span><span>Gramática LL(1) válida — sem conflitos.</span></div>`;
     } else {
@@ -143,6 +147,11 @@ $('btn-analyse').addEventListener('click', async () => {
       } else {
         msg += `  A gramática <strong>não é LL(k)</strong> para k ≤ 5.`;
       }
+      if (lrReady) {
+        msg += `  É <strong>${esc(d.lr.method)}</strong> — as frases podem ser testadas com o parser LR.`;
+      } else {
+        msg += `  As frases são testadas com o parser geral (Earley).`;
+      }
       $banners.innerHTML += `<div class="banner warn"><span>⚠</span><span>${msg}</span></div>`;
     }
 
@@ -189,10 +198,11 @@ $('btn-analyse').addEventListener('click', async () => {
       badge.style.display = 'none';
       $('conf-empty').style.display  = 'flex';
       $('conf-result').style.display = 'none';
-      $('btn-generate').disabled = false;
       ready   = true;
       grammar = src;
     }
+    grammar = src;   // com conflitos, /api/parse_phrase recorre ao Earley
+    $('btn-generate').disabled = false;   // e /api/generate ao RD packrat
 
     buildTable(d.table);
 
@@ -219,17 +229,37 @@ $('btn-apply').addEventListener('click', async () => {
   }
 });
 
-function buildTable({ terminals, rows }) {
+// Todas as rondas de uma vez no servidor (/api/normalize), em vez de uma por clique
+$('btn-normalize').addEventListener('click', async () => {
+  const btn = $('btn-normalize');
+  setLoading(btn, true);
+  try {
+    const d = await post('/api/normalize', { grammar: $('grammar').value });
+    if (!d.ok) { alert(d.errors.join('\n')); return; }
+    $('grammar').value = d.grammar;
+    $('btn-analyse').click();
+    if (!d.ll1) {
+      alert(`Sem progresso após ${d.rounds.length} ronda(s): restam ${d.conflicts.length} conflito(s).`);
+    }
+  } finally {
+    setLoading(btn, false);
+  }
+});
+
+function buildTable({ terminals, productions, rows }) {
   $('table-empty').style.display  = 'none';
   $('table-result').style.display = 'block';
   let html = `<thead><tr><th>NT \\ T</th>${terminals.map(t => `<th>${esc(t)}</th>`).join('')}</tr></thead><tbody>`;
   for (const row of rows) {
     html += `<tr><td class="ll-hd">${esc(row.nt)}</td>`;
-    for (const t of terminals) {
-      const v   = row.cells[t] || '';
-      const cls = v ? (v.includes('⚠') ? 'll-bad' : 'll-ok') : '';
+    const cells = new Map(row.cells);
+    terminals.forEach((t, i) => {
+      const p   = cells.get(i);
+      const bad = (row.conflicts || []).includes(i);
+      const v   = p === undefined ? '' : productions[p] + (bad ? ' ⚠' : '');
+      const cls = v ? (bad ? 'll-bad' : 'll-ok') : '';
       html += `<td class="${cls}">${esc(v)}</td>`;
-    }
+    });
     html += '</tr>';
   }
   $('ll-table').innerHTML = html + '</tbody>';
@@ -245,7 +275,9 @@ $('btn-generate').addEventListener('click', async () => {
     $('parsers-empty').style.display  = 'none';
     $('parsers-result').style.display = 'block';
     $('code-rd').textContent = d.rd;
-    $('code-td').textContent = d.td;
+    $('code-td').textContent = d.td ??
+      '# A gramática tem conflitos LL(1): a tabela teria células com várias produções.\n' +
+      '# Foi gerado apenas o parser RD, com backtracking memorizado (packrat).';
     hljs.highlightElement($('code-rd'));
     hljs.highlightElement($('code-td'));
 
@@ -317,8 +349,8 @@ async function runPhrase() {
   $('phrase-result').style.display = 'none';
   $('phrase-empty').style.display  = 'flex';
 
-  if (!ready) {
-    showBanners('phrase-banners', ['Analisa a gramática primeiro (sem conflitos).'], 'warn');
+  if (!grammar) {
+    showBanners('phrase-banners', ['Analisa a gramática primeiro.'], 'warn');
     return;
   }
   if (!phrase) return;
@@ -333,11 +365,14 @@ async function runPhrase() {
 
     if (!d.ok) { showBanners('phrase-banners', d.errors, 'error'); return; }
 
-    const ptLabel = activeParserType === 'rd'
-      ? '<span class="parser-badge rd">RD</span>'
-      : '<span class="parser-badge td">TD</span>';
+    const pt      = d.parser_type || activeParserType;
+    const ptLabel = `<span class="parser-badge ${pt}">${pt.toUpperCase()}</span>`;
 
     showBanners('phrase-banners', [`Frase reconhecida com sucesso.`], 'ok');
+    if (d.derivations === '∞' || d.derivations > 1) {
+      $('phrase-banners').innerHTML += `<div class="banner warn"><span>⚠</span>` +
+        `<span>Frase ambígua: ${esc(String(d.derivations))} árvores de derivação (mostra-se uma).</span></div>`;
+    }
 
     $('phrase-empty').style.display  = 'none';
     $('phrase-result').style.display = 'block';